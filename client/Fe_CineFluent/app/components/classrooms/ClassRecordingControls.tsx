@@ -1,6 +1,6 @@
 "use client";
 
-import { useRef, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { Mic, Square, WandSparkles } from "lucide-react";
 
 import { BeUrl } from "@/app/lib/services/api_client";
@@ -13,6 +13,13 @@ function compactText(value: string | null | undefined, maxChars: number) {
   return `${text.slice(0, maxChars).trimEnd()}…`;
 }
 
+const JOB_POLL_INTERVAL_MS = 2000;
+const JOB_POLL_TIMEOUT_MS = 10 * 60 * 1000;
+
+function wait(ms: number) {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
 export default function ClassRecordingControls({
   classroomId,
   sessionId,
@@ -32,6 +39,47 @@ export default function ClassRecordingControls({
   const chunksRef = useRef<BlobPart[]>([]);
   const startedAtRef = useRef<number | null>(null);
   const streamRef = useRef<MediaStream | null>(null);
+  const unmountedRef = useRef(false);
+
+  useEffect(() => {
+    unmountedRef.current = false;
+    return () => {
+      unmountedRef.current = true;
+    };
+  }, []);
+
+  // Upload trả 202 + job id, recap do worker tạo: hỏi trạng thái job tới khi xong.
+  async function waitForRecapJob(jobId: number) {
+    const deadline = Date.now() + JOB_POLL_TIMEOUT_MS;
+
+    while (!unmountedRef.current && Date.now() < deadline) {
+      await wait(JOB_POLL_INTERVAL_MS);
+      if (unmountedRef.current) return null;
+
+      const response = await fetch(`${BeUrl}/jobs/${jobId}`, {
+        credentials: "include",
+        cache: "no-store",
+      });
+      const payload = await response.json();
+
+      if (!response.ok) {
+        throw new Error(payload?.message || "Không thể lấy trạng thái recap.");
+      }
+
+      const job = payload?.data;
+      if (job?.status === "SUCCEEDED") {
+        return (job.result?.recap || null) as IClassSessionRecap | null;
+      }
+      if (job?.status === "FAILED") {
+        throw new Error(job.error_message || "Không thể tạo recap từ ghi âm.");
+      }
+    }
+
+    if (!unmountedRef.current) {
+      throw new Error("Tạo recap quá lâu, vui lòng tải lại trang sau ít phút.");
+    }
+    return null;
+  }
 
   async function uploadRecording(blob: Blob, durationSeconds: number) {
     setIsUploading(true);
@@ -56,11 +104,21 @@ export default function ClassRecordingControls({
         throw new Error(payload?.message || "Không thể tạo recap từ ghi âm.");
       }
 
-      setRecap(payload?.data?.recap || null);
+      const jobId = payload?.data?.job?.id;
+      const nextRecap =
+        payload?.data?.recap || (jobId ? await waitForRecapJob(jobId) : null);
+
+      if (!unmountedRef.current && nextRecap) {
+        setRecap(nextRecap);
+      }
     } catch (uploadError: any) {
-      setError(uploadError?.message || "Không thể upload ghi âm.");
+      if (!unmountedRef.current) {
+        setError(uploadError?.message || "Không thể upload ghi âm.");
+      }
     } finally {
-      setIsUploading(false);
+      if (!unmountedRef.current) {
+        setIsUploading(false);
+      }
     }
   }
 
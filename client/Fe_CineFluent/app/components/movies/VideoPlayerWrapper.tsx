@@ -171,14 +171,17 @@ export function VideoPlayerWrapper({ video }: VideoPlayerWrapperProps) {
 
   // [VTT_OPTIMIZATION] Náº¡p file VTT qua Web Worker
   useEffect(() => {
-    if (!video.subtitle_vtt_url) return;
+    if (!video.subtitle_vtt_url && !video.subtitle_track_url) return;
 
     const fetchAndParseVTT = async () => {
       try {
+        // Ưu tiên track nhị phân dạng cột (nhỏ hơn, không phải parse text/JSON); VTT là fallback
+        const useTrack = Boolean(video.subtitle_track_url);
         const response = await fetch(
-          `${FeApiProxyUrl}${video.subtitle_vtt_url}`,
+          `${FeApiProxyUrl}${useTrack ? video.subtitle_track_url : video.subtitle_vtt_url}`,
         );
-        const vttText = await response.text();
+        const trackBuffer = useTrack ? await response.arrayBuffer() : null;
+        const vttText = useTrack ? null : await response.text();
 
         // Khá»Ÿi táº¡o Web Worker
         const worker = new Worker(
@@ -200,14 +203,18 @@ export function VideoPlayerWrapper({ video }: VideoPlayerWrapperProps) {
           worker.terminate();
         };
 
-        worker.postMessage({ vttText });
+        if (trackBuffer) {
+          worker.postMessage({ trackBuffer }, [trackBuffer]);
+        } else {
+          worker.postMessage({ vttText });
+        }
       } catch (err) {
         console.error("âŒ Failed to fetch/parse VTT:", err);
       }
     };
 
     fetchAndParseVTT();
-  }, [video.subtitle_vtt_url]);
+  }, [video.subtitle_vtt_url, video.subtitle_track_url]);
 
   // Handle Seek
   const handleSeek = useCallback(
@@ -70,6 +70,7 @@ export interface I_Video {
   status: "public" | "private";
   comment_count?: number;
   subtitle_vtt_url?: string;
+  subtitle_track_url?: string;
   subtitles?: I_Subtitle[];
   categories?: {
     id: number;
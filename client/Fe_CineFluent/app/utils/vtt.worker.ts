@@ -8,10 +8,12 @@
  */
 
 self.onmessage = (e: MessageEvent) => {
-  const { vttText } = e.data;
+  const { vttText, trackBuffer } = e.data;
 
   try {
-    const subtitles = parseVTT(vttText);
+    const subtitles = trackBuffer
+      ? decodeSubtitleTrack(trackBuffer)
+      : parseVTT(vttText);
     self.postMessage({ success: true, subtitles });
   } catch (error) {
     self.postMessage({ success: false, error: (error as Error).message });
@@ -101,3 +103,85 @@ function timeToSeconds(t: string): number {
   }
   return hours * 3600 + minutes * 60 + seconds;
 }
+
+/**
+ * Đọc track phụ đề nhị phân dạng cột (xem app/utils/subtitle_track.py phía backend).
+ * Thời gian đọc thẳng bằng Float32Array, text giải mã theo offset, không cần regex/JSON.parse.
+ */
+const TRACK_MAGIC = "CFST";
+const TRACK_VERSION = 1;
+const NO_VALUE = 255;
+
+function decodeSubtitleTrack(buffer: ArrayBuffer): any[] {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(
+    view.getUint8(0),
+    view.getUint8(1),
+    view.getUint8(2),
+    view.getUint8(3),
+  );
+  const version = view.getUint16(4, true);
+  if (magic !== TRACK_MAGIC || version !== TRACK_VERSION) {
+    throw new Error(`Unsupported subtitle track (${magic} v${version})`);
+  }
+
+  const count = view.getUint32(8, true);
+  const tableLength = view.getUint32(12, true);
+  const decoder = new TextDecoder("utf-8");
+  const align = (n: number) => n + ((4 - (n % 4)) % 4);
+
+  let offset = 16;
+  const clozeTypeNames: string[] = JSON.parse(
+    decoder.decode(new Uint8Array(buffer, offset, tableLength)),
+  );
+  offset = align(offset + tableLength);
+
+  const starts = new Float32Array(buffer, offset, count);
+  offset += 4 * count;
+  const ends = new Float32Array(buffer, offset, count);
+  offset += 4 * count;
+  const tagIds = new Uint8Array(buffer, offset, count);
+  offset = align(offset + count);
+  const clozeTypes = new Uint8Array(buffer, offset, count);
+  offset = align(offset + count);
+
+  const readColumn = (): string[] => {
+    const offsets = new Uint32Array(buffer, offset, count + 1);
+    offset += 4 * (count + 1);
+    const blob = new Uint8Array(buffer, offset, offsets[count]);
+    offset = align(offset + offsets[count]);
+    const values = new Array<string>(count);
+    for (let i = 0; i < count; i++) {
+      values[i] = decoder.decode(blob.subarray(offsets[i], offsets[i + 1]));
+    }
+    return values;
+  };
+  const contentEn = readColumn();
+  const contentVi = readColumn();
+  const maskedTexts = readColumn();
+  const targetWords = readColumn();
+  const distractors = readColumn();
+
+  const subtitles: any[] = new Array(count);
+  for (let i = 0; i < count; i++) {
+    const sub: any = {
+      id: i + 1,
+      // float32 -> làm tròn về mili giây như timestamp trong VTT
+      start_time: Math.round(starts[i] * 1000) / 1000,
+      end_time: Math.round(ends[i] * 1000) / 1000,
+      content_en: contentEn[i],
+      content_vi: contentVi[i] || null,
+    };
+    if (tagIds[i] !== NO_VALUE) sub.grammar_tag_id = tagIds[i];
+    if (clozeTypes[i] !== NO_VALUE) {
+      sub.cloze_data = {
+        masked_text: maskedTexts[i],
+        target_word: targetWords[i],
+        distractors: distractors[i] ? distractors[i].split("\n") : [],
+        cloze_type: clozeTypeNames[clozeTypes[i]],
+      };
+    }
+    subtitles[i] = sub;
+  }
+  return subtitles;
+}
@@ -1,7 +1,5 @@
 # app/__init__.py
 
-import os
-
 from flask import Flask , jsonify
 
 from .extensions import db, migrate, jwt, cors, socketio
@@ -86,8 +84,13 @@ def create_app(config_name='default'):
     from .controller.kt_controller import kt_bp
     app.register_blueprint(kt_bp, url_prefix='/api/kt')
 
+    # Trạng thái job nền (import YouTube, phân tích AI, recap)
+    from .controller.job_controller import job_bp
+    app.register_blueprint(job_bp, url_prefix='/api/jobs')
+
     # Import socket controllers
     from .controller import typing_socket_controller
+    from .controller import job_socket_controller
 
 
 
@@ -148,18 +151,14 @@ def create_app(config_name='default'):
     from .services import users_service, role_service, auth_service,upload_service
 
     # [VTT_OPTIMIZATION] Cấu hình serving file tĩnh cho phụ đề .vtt
+    # Production: nginx trả thẳng file từ volume (gzip_static); route này là fallback khi chạy không có nginx
+    from .services.subtitle_export_service import send_subtitle_asset
+    from .utils.storage_paths import get_subtitle_storage_dir
+
+    subs_dir = get_subtitle_storage_dir()
+
     @app.route('/api/static/subs/<path:filename>')
     def serve_subtitles(filename):
-        from flask import send_from_directory, current_app
-        from .utils.storage_paths import get_subtitle_storage_dir
-
-        subs_dir = get_subtitle_storage_dir()
-        
-        # Log để debug nếu có lỗi 500
-        print(f"📂 [VTT_SERVE] Request: {filename} from {subs_dir}")
-        if not os.path.exists(os.path.join(subs_dir, filename)):
-            print(f"❌ [VTT_SERVE] File not found: {filename}")
-            
-        return send_from_directory(subs_dir, filename)
+        return send_subtitle_asset(subs_dir, filename)
 
     return app
@@ -1,6 +1,8 @@
 from flask import Blueprint, current_app, request
+from flask_jwt_extended import jwt_required
 
-from ..services.movie_ai_service import analyze_subtitle_content_service
+from .auth_controller import Role_required
+from ..services.inference_pool import InferencePoolBusyError, analyze_subtitle_content, inference_pool_metrics
 from ..utils.response import error_response, success_response
 
 
@@ -55,7 +57,8 @@ def predict_movie_difficulty():
             len(subtitle_text),
         )
 
-        report = analyze_subtitle_content_service(subtitle_text, source_name=source_name)
+        # Model chạy trong pool inference riêng, process web chỉ chờ kết quả
+        report = analyze_subtitle_content(subtitle_text, source_name=source_name)
         response_payload = {
             "source_name": report.get("source_name"),
             "segment_count": report["segment_count"],
@@ -67,6 +70,12 @@ def predict_movie_difficulty():
             data=response_payload,
             message="Phan tich ngu phap subtitle thanh cong.",
         )
+    except InferencePoolBusyError as ex:
+        current_app.logger.warning("[AI_DEMO_PREDICT_BUSY] %s", ex)
+        return error_response(str(ex), 503, error_code="AI_INFERENCE_BUSY")
+    except TimeoutError as ex:
+        current_app.logger.warning("[AI_DEMO_PREDICT_TIMEOUT] %s", ex)
+        return error_response(str(ex), 504, error_code="AI_INFERENCE_TIMEOUT")
     except Exception as ex:
         current_app.logger.exception("[AI_DEMO_PREDICT_ERROR]")
         return error_response(
@@ -74,3 +83,11 @@ def predict_movie_difficulty():
             500,
             error_code="AI_DEMO_PREDICT_FAILED",
         )
+
+
+@ai_bp.route("/inference/metrics", methods=["GET"])
+@Role_required(role="admin")
+@jwt_required()
+def get_inference_metrics():
+    # Độ sâu hàng đợi + thời gian chờ/chạy trung bình của pool inference trong process này
+    return success_response(data=inference_pool_metrics())
@@ -175,8 +175,8 @@ def upload_session_recording(classroom_id: int, session_id: int):
 
     return success_response(
         data=result.get("data"),
-        message="Đã tạo recap từ ghi âm buổi học",
-        code=201,
+        message="Đã nhận ghi âm, recap đang được tạo",
+        code=202,
     )
 
 
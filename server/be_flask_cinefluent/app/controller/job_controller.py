@@ -0,0 +1,40 @@
+from flask import Blueprint, request
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
+
+from ..models.models_model import BackgroundJob
+from ..services.jobs import get_job, serialize_job
+from ..utils.response import error_response, success_response
+
+
+job_bp = Blueprint("job_bp", __name__)
+
+
+@job_bp.route("/<int:job_id>", methods=["GET"])
+@jwt_required()
+def get_job_status(job_id: int):
+    job = get_job(job_id)
+    if not job:
+        return error_response(message="Không tìm thấy job", code=404)
+    if job.created_by != get_jwt_identity() and not get_jwt().get("is_admin"):
+        return error_response(message="Bạn không có quyền xem job này", code=403)
+
+    return success_response(data=serialize_job(job), message="Lấy trạng thái job thành công")
+
+
+@job_bp.route("", methods=["GET"], strict_slashes=False)
+@jwt_required()
+def list_my_jobs():
+    query = BackgroundJob.query.filter_by(created_by=get_jwt_identity())
+    status = request.args.get("status")
+    if status:
+        query = query.filter(BackgroundJob.status == status.upper())
+    job_type = request.args.get("job_type")
+    if job_type:
+        query = query.filter(BackgroundJob.job_type == job_type)
+
+    limit = min(request.args.get("limit", 20, type=int), 100)
+    jobs = query.order_by(BackgroundJob.id.desc()).limit(limit).all()
+    return success_response(
+        data={"jobs": [serialize_job(job) for job in jobs]},
+        message="Lấy danh sách job thành công",
+    )
@@ -0,0 +1,57 @@
+from flask import request
+from flask_jwt_extended import decode_token
+from flask_socketio import join_room, leave_room
+
+from ..extensions import socketio
+from ..services.jobs import get_job, job_room, user_jobs_room
+
+
+def _socket_claims(data):
+    """
+    Claims JWT của client socket: token gửi kèm event, cookie access_token của handshake
+    (cùng origin qua nginx) hoặc header Authorization. None nếu thiếu / không hợp lệ.
+    """
+    token = data.get('token') or request.cookies.get('access_token')
+    if not token:
+        auth_header = request.headers.get('Authorization', '')
+        if auth_header.startswith('Bearer '):
+            token = auth_header[len('Bearer '):]
+    if not token:
+        return None
+    try:
+        return decode_token(token)
+    except Exception:
+        return None
+
+
+@socketio.on('job_subscribe')
+def on_job_subscribe(data):
+    data = data or {}
+    claims = _socket_claims(data)
+    if not claims:
+        return {'ok': False, 'message': 'Unauthorized.'}
+
+    identity = claims.get('sub')
+    is_admin = bool(claims.get('is_admin'))
+    joined = []
+    if data.get('job_id'):
+        job = get_job(int(data['job_id']))
+        if not job or (job.created_by != identity and not is_admin):
+            return {'ok': False, 'message': 'Bạn không có quyền theo dõi job này'}
+        join_room(job_room(job.id))
+        joined.append(job_room(job.id))
+    if data.get('user_id'):
+        if str(data['user_id']) != identity:
+            return {'ok': False, 'message': 'Bạn không có quyền theo dõi job của user khác'}
+        join_room(user_jobs_room(identity))
+        joined.append(user_jobs_room(identity))
+    return {'ok': True, 'rooms': joined}
+
+
+@socketio.on('job_unsubscribe')
+def on_job_unsubscribe(data):
+    data = data or {}
+    if data.get('job_id'):
+        leave_room(job_room(int(data['job_id'])))
+    if data.get('user_id'):
+        leave_room(user_jobs_room(data['user_id']))
@@ -1,10 +1,11 @@
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from ..models.models_model import db, UserKnowledgeState, UserTagMastery
-from ..services.learning_tree_service import discover_learning_tag_service
+from .auth_controller import Role_required
+from ..services.kt_interaction_service import record_kt_answer_service
 from ..services.kt_inference_service import dkt_engine
+from ..services.mastery_service import get_user_learning_state, invalidate_user_masteries
+from ..services.write_behind import write_behind_metrics
 from ..utils.response import success_response, error_response
-from datetime import datetime
 
 kt_bp = Blueprint('kt', __name__)
 
@@ -23,33 +24,25 @@ def predict_kt():
         
     tag_ids = data['tag_ids']
     
-    # 1. Rút "Bản ghi nhớ lưu game" của học sinh ra
-    knowledge_state = UserKnowledgeState.query.filter_by(user_id=user_id).first()
-    history = []
-    if knowledge_state and knowledge_state.latent_state:
-        history = list(knowledge_state.latent_state)
+    # 1. Rút "Bản ghi nhớ lưu game" của học sinh ra (lịch sử DKT + toàn bộ mastery trong một lần)
+    learning_state = get_user_learning_state(user_id)
         
     probabilities = {}    
     
-    # 2. Quăng vô AI (Chỉ tốn ~10ms nhờ Singleton)
-    prob_vector = dkt_engine.predict_probabilities(history)
+    # 2. Quăng vô AI (Chỉ tốn ~10ms nhờ Singleton, lịch sử chưa đổi thì lấy lại kết quả đã cache)
+    prob_vector = dkt_engine.predict_probabilities(
+        learning_state.history, user_id=user_id, version=learning_state.version
+    )
+
+    # A. Tính Toán Lười Biếng (Thuật toán Thời gian mài mòn) cho cả danh sách tag một lượt,
+    # Newbie chưa từng gặp tag thì 0 điểm
+    decay_scores = learning_state.masteries.decayed_for(tag_ids)
     
     # 3. Phân tích điểm lai tạo (Hybrid)
     target_cloze = None
     min_prob = 1.0 # Tìm thằng có xác suất đúng thấp nhất để đục!
     
-    for tag in tag_ids:
-        # A. Tính Toán Lười Biếng (Thuật toán Thời gian mài mòn)
-        mastery = UserTagMastery.query.filter_by(user_id=user_id, tag_id=tag).first()
-        if mastery:
-            decay_score = dkt_engine.calculate_decay_score(
-                mastery.mastery_score, 
-                mastery.last_practiced_at, 
-                mastery.interval_days
-            )
-        else:
-            decay_score = 0.0 # Newbie chưa từng gặp
-            
+    for tag, decay_score in zip(tag_ids, decay_scores):
         # B. Rút xác suất AI phán
         ai_prob = 0.5
         if prob_vector is not None and tag < len(prob_vector):
@@ -69,6 +62,14 @@ def predict_kt():
                 
     return success_response(data={"target_tag_to_cloze": target_cloze, "details": probabilities})
 
+@kt_bp.route('/metrics', methods=['GET'])
+@Role_required(role="admin")
+@jwt_required()
+def get_kt_metrics():
+    # Cache theo user + kích thước batch / thời gian chờ của micro-batching DKT trong process này,
+    # kèm độ trễ / kích thước lô của các buffer write-behind
+    return success_response(data={**dkt_engine.serving_metrics(), "write_behind": write_behind_metrics()})
+
 @kt_bp.route('/update_state', methods=['POST'])
 @jwt_required()
 def update_state():
@@ -85,47 +86,16 @@ def update_state():
     tag_id = int(data['tag_id'])
     is_correct = int(data['is_correct'])
 
-    discover_learning_tag_service(user_id=user_id, tag_id=tag_id, source='quiz')
-    
-    # --- BƯỚC 1: XỬ LÝ TRÍ NHỚ MÔ HÌNH AI (DKT HISTORY) ---
-    knowledge_state = UserKnowledgeState.query.filter_by(user_id=user_id).first()
-    if not knowledge_state:
-        # Lần đầu tiên ghi nhận user này
-        knowledge_state = UserKnowledgeState(user_id=user_id, latent_state=[], interaction_count=0)
-        db.session.add(knowledge_state)
-        db.session.flush() # Lấy ID gốc tạm thời
-        
-    history = list(knowledge_state.latent_state) if knowledge_state.latent_state else []
-    
-    # Nạp kiến thức vào não
-    history.append([tag_id, is_correct])
-    if len(history) > 100:
-        history = history[-100:] # Cắt chóp giữ đúng 100 câu mới nhất
-        
-    knowledge_state.latent_state = history
-    knowledge_state.interaction_count += 1
-    
-    # --- BƯỚC 2: TÍNH ĐIỂM HỌC THUẬT SUPERMEMO (SRS) ---
-    mastery = UserTagMastery.query.filter_by(user_id=user_id, tag_id=tag_id).first()
-    if not mastery:
-        mastery = UserTagMastery(user_id=user_id, tag_id=tag_id, mastery_score=0.0, interval_days=1.0)
-        db.session.add(mastery)
-        
-    if is_correct == 1:
-        # Vượt câu: Thưởng 20% Học lực, kéo chuỗi quên ra gấp đôi (Giỏi rồi thì cho lâu quên hơn)
-        mastery.mastery_score = min(100.0, mastery.mastery_score + 20.0)
-        mastery.interval_days *= 2.0 
-    else:
-        # Đuối sức: Giáng chức 15% Học lực, gọt chuỗi quên đi 1 nửa bắt ôn sấp mặt
-        mastery.mastery_score = max(0.0, mastery.mastery_score - 15.0)
-        mastery.interval_days = max(1.0, mastery.interval_days / 2.0)
-        
-    mastery.last_practiced_at = datetime.utcnow()
-    
-    # Lưu sạch xuống CSDL
-    db.session.commit()
+    # Thêm 1 dòng kt_interactions + SRS + đánh dấu tag đã khám phá trong cùng một commit
+    # (mặc định gộp vào buffer write-behind, ghi theo lô cùng câu trả lời của user khác)
+    result = record_kt_answer_service(user_id=user_id, tag_id=tag_id, is_correct=is_correct)
+    if not result.get("success"):
+        return error_response(result.get("error"), code=result.get("code", 400))
+
+    dkt_engine.invalidate_user(user_id)
+    invalidate_user_masteries(user_id)
     
     return success_response(
         message="Trí nhớ của User đã được ghi nạp!", 
-        data={"new_mastery": mastery.mastery_score, "is_correct": bool(is_correct)}
+        data=result["data"]
     )
@@ -2,7 +2,6 @@
 from ..utils.response import success_response, error_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..services.video_service import (
-    import_youtube_video, 
     get_all_videos, 
     delete_video_youtube, 
     import_local_video_by_tmdb, 
@@ -15,7 +14,6 @@ from ..extensions import db
 from google.auth.transport.requests import Request
 import requests
 import os
-import threading
 video_bp = Blueprint('api/videos', __name__)
 
 
@@ -27,17 +25,31 @@ def controller_import_youtube():
 
     from flask import Response, stream_with_context
     import json
+    from ..services.jobs import YOUTUBE_IMPORT, enqueue_job, follow_job, serialize_job
+
+    # Import chạy trong worker (sống sót khi web process restart); request chỉ theo dõi tiến độ của job
+    job = enqueue_job(
+        YOUTUBE_IMPORT,
+        {"user_id": uid, "request": req_data.model_dump()},
+        created_by=uid,
+        dedupe_key=f"{YOUTUBE_IMPORT}:{req_data.url}",
+    )
+    if request.args.get('async') in ('1', 'true'):
+        return success_response(data=serialize_job(job), message="Đã đưa video vào hàng đợi import", code=202)
+
+    job_id = job.id
 
     def generate_progress():
-        try:
-            for progress in import_youtube_video(
-                user_id=uid, 
-                data=req_data
-            ):
-                yield json.dumps(progress) + "\n"
-        except Exception as ex:
-            yield json.dumps({"status": "error", "message": str(ex)}) + "\n"
-    
+        yield json.dumps({"status": "queued", "message": "Đã đưa video vào hàng đợi import...", "job_id": job_id}) + "\n"
+        for current in follow_job(job_id):
+            progress = dict(current.progress or {})
+            progress["job_id"] = job_id
+            if current.status == "FAILED":
+                progress = {"status": "error", "message": current.error_message, "job_id": job_id}
+            elif current.status == "SUCCEEDED" and current.result:
+                progress.setdefault("video_id", current.result.get("video_id"))
+            yield json.dumps(progress) + "\n"
+
     return Response(stream_with_context(generate_progress()), mimetype='application/json')
 
 @video_bp.route('/import/local/tmdb', methods=['POST'])
@@ -143,17 +155,17 @@ def get_detail(slug: str):
 
     # Nếu User đã login, đính kèm thông tin lịch sử xem (last_position)
     from flask_jwt_extended import verify_jwt_in_request
-    from ..models.models_model import WatchHistory
+    from ..services.watch_history_service import get_watch_progress
     try:
         verify_jwt_in_request(optional=True)
         uid = get_jwt_identity()
         if uid:
-            history = WatchHistory.query.filter_by(user_id=uid, video_id=video.id).first()
+            history = get_watch_progress(uid, video.id)
             if history:
                 res_data['user_history'] = {
-                    "last_position": history.last_position,
-                    "duration": history.duration,
-                    "updated_at": history.watched_at.isoformat()
+                    "last_position": history["last_position"],
+                    "duration": history["duration"],
+                    "updated_at": history["watched_at"].isoformat()
                 }
     except:
         pass
@@ -218,7 +230,7 @@ def update_video_info(video_id):
 @video_bp.route('/<int:video_id>/watch', methods=['POST'])
 @jwt_required()
 def save_watch_history(video_id):
-    from ..models.models_model import WatchHistory
+    from ..services.watch_history_service import record_watch_progress
     uid = get_jwt_identity()
     
     video = Video.query.get(video_id)
@@ -229,17 +241,8 @@ def save_watch_history(video_id):
     last_pos = data.get('last_position', 0)
     duration = data.get('duration', 0)
         
-    history = WatchHistory.query.filter_by(user_id=uid, video_id=video_id).first()
-    from datetime import datetime
-    if history:
-        history.watched_at = datetime.utcnow()
-        if last_pos > 0: history.last_position = last_pos
-        if duration > 0: history.duration = duration
-    else:
-        history = WatchHistory(user_id=uid, video_id=video_id, last_position=last_pos, duration=duration)
-        db.session.add(history)
-        
-    db.session.commit()
+    # Gộp vào buffer write-behind, ghi xuống DB theo lô (WRITE_BEHIND_MODE=sync để ghi ngay)
+    record_watch_progress(uid, video_id, last_pos, duration)
     return success_response(message="Watch history updated")
 
 @video_bp.route('/history', methods=['GET'])
@@ -267,18 +270,24 @@ def get_watch_history():
 
 @video_bp.route('/<int:video_id>/subtitles', methods=['GET'])
 def get_subtitles(video_id, ordered_subs=None):
+    if ordered_subs is None:
+        # Body JSON serialize sẵn (RAM + đĩa) theo phiên bản phụ đề; client gửi If-None-Match thì trả 304
+        from ..services.subtitle_timeline_service import get_subtitle_list_body
+
+        cached = get_subtitle_list_body(video_id)
+        if cached.cue_count == 0 and not Video.query.get(video_id):
+            return error_response("Video not found", 404)
+
+        response = current_app.response_class(cached.body, mimetype="application/json")
+        response.set_etag(cached.etag)
+        # Cùng URL nhưng nội dung đổi khi lưu lại phụ đề: trình duyệt luôn hỏi lại, server trả 304 nếu không đổi
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
+
     video = Video.query.get(video_id)
     if not video:
         return error_response("Video not found", 404)
 
-    if ordered_subs is None:
-        ordered_subs = (
-            Subtitle.query
-            .filter_by(video_id=video_id)
-            .order_by(Subtitle.start_time.asc())
-            .all()
-        )
-
     return success_response(data=SubtitleSchema(many=True).dump(ordered_subs))
 
 from flask import Response, stream_with_context
@@ -391,14 +400,11 @@ def parse_subtitle_file():
         return error_response("File must be .srt", 400)
         
     try:
-        # Đọc nội dung file
-        content = file.read().decode('utf-8')
-        
         # Import hàm parse từ service cũ (để tận dụng code)
         from app.utils.subtitle_utils import parse_srt
         
-        # Parse
-        subtitles = parse_srt(content)
+        # Parse trực tiếp từ upload stream (decode UTF-8 từng dòng, không đọc cả file vào RAM)
+        subtitles = parse_srt(file.stream)
         
         return success_response(data=subtitles, message="Parsed successfully")
         
@@ -493,77 +499,25 @@ def analyze_video_ai(video_id):
                 code=202,
             )
 
-        app_obj = current_app._get_current_object()
         from ..services.movie_ai_service import (
             mark_video_ai_analysis_processing_service,
         )
+        from ..services.jobs import VIDEO_AI_ANALYSIS, enqueue_job
 
         mark_video_ai_analysis_processing_service(video)
 
-        def _run_ai_analysis_async(target_video_id: int):
-            from ..services.movie_ai_service import (
-                save_video_ai_analysis_failure_service,
-                save_video_ai_analysis_service,
-            )
-
-            with app_obj.app_context():
-                target_video = Video.query.get(target_video_id)
-                if not target_video:
-                    current_app.logger.warning(
-                        "[VIDEO_AI_ANALYSIS_ASYNC_MISSING_VIDEO] video_id=%s",
-                        target_video_id,
-                    )
-                    return
-
-                target_subtitles = (
-                    Subtitle.query
-                    .filter_by(video_id=target_video_id)
-                    .order_by(Subtitle.start_time.asc())
-                    .all()
-                )
-
-                if not target_subtitles:
-                    current_app.logger.warning(
-                        "[VIDEO_AI_ANALYSIS_ASYNC_NO_SUBTITLES] video_id=%s",
-                        target_video_id,
-                    )
-                    return
-
-                try:
-                    save_video_ai_analysis_service(target_video, target_subtitles)
-                    current_app.logger.info(
-                        "[VIDEO_AI_ANALYSIS_ASYNC_DONE] video_id=%s",
-                        target_video_id,
-                    )
-                except Exception as ex:
-                    db.session.rollback()
-                    error_detail = str(ex).strip()
-                    error_message = (
-                        f"{type(ex).__name__}: {error_detail}"
-                        if error_detail
-                        else type(ex).__name__
-                    )
-                    current_app.logger.exception(
-                        "[VIDEO_AI_ANALYSIS_ASYNC_ERROR] video_id=%s",
-                        target_video_id,
-                    )
-                    try:
-                        save_video_ai_analysis_failure_service(target_video, error_message)
-                    except Exception:
-                        db.session.rollback()
-                        current_app.logger.exception(
-                            "[VIDEO_AI_ANALYSIS_ASYNC_FAILURE_SAVE_ERROR] video_id=%s",
-                            target_video_id,
-                        )
-
-        threading.Thread(
-            target=_run_ai_analysis_async,
-            args=(video_id,),
-            daemon=True,
-        ).start()
+        # Worker giới hạn số phân tích chạy đồng thời; dedupe_key gộp các request trùng thành một job
+        # ?force=1: phân tích lại toàn bộ câu thay vì chỉ các câu mới/đổi nội dung
+        force = request.args.get('force', '').lower() in ('1', 'true', 'yes')
+        job = enqueue_job(
+            VIDEO_AI_ANALYSIS,
+            {"video_id": video_id, "force": force},
+            created_by=get_jwt_identity(),
+            dedupe_key=f"{VIDEO_AI_ANALYSIS}:{video_id}",
+        )
 
         return success_response(
-            data={"video_id": video_id},
+            data={"video_id": video_id, "job_id": job.id},
             message="Đã bắt đầu phân tích ngữ pháp AI. Kết quả sẽ chuyển sang trạng thái Processing trong lúc hệ thống cập nhật metadata VTT.",
             code=202,
         )
@@ -578,6 +532,8 @@ def analyze_video_ai(video_id):
         current_app.logger.exception("[VIDEO_AI_ANALYSIS_ERROR] video_id=%s", video_id)
 
         try:
+            from ..services.movie_ai_service import save_video_ai_analysis_failure_service
+
             save_video_ai_analysis_failure_service(video, error_message)
         except Exception:
             db.session.rollback()
@@ -81,9 +81,10 @@ class UserKnowledgeState(db.Model):
     
     # Lưu trạng thái Hidden State của LSTM (Từ Numpy mảng -> JSON)
     # Lưu kiểu JSON cho tốc độ cao và thân thiện với môi trường SQL
+    # Không còn ghi: lịch sử trả lời nằm ở bảng kt_interactions (migration đã chép dữ liệu cũ sang)
     latent_state = db.Column(db.JSON, nullable=True) 
     
-    # Bộ đếm lượt xem (optional)
+    # Bộ đếm lượt trả lời: tăng cùng transaction với kt_interactions, dùng làm phiên bản lịch sử cho cache
     interaction_count = db.Column(db.Integer, default=0)
     
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -112,6 +113,19 @@ class UserTagMastery(db.Model):
     user = db.relationship('User', back_populates='tag_masteries')
     grammar_tag = db.relationship('GrammarTag', back_populates='user_masteries')
 
+# Nhật ký trả lời của DKT, chỉ ghi thêm (append-only): nguồn lịch sử 100 câu gần nhất cho suy luận
+# và nguồn dữ liệu export để train lại mô hình (scripts/train_dkt_colab.py)
+class KTInteraction(db.Model):
+    __tablename__ = 'kt_interactions'
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    tag_id = db.Column(db.Integer, db.ForeignKey('grammar_tags.id'), nullable=False)
+    is_correct = db.Column(db.Boolean, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Lấy N câu mới nhất của một user / export theo user đều đi theo index này
+    __table_args__ = (db.Index('ix_kt_interactions_user_id_id', 'user_id', 'id'),)
+
 class UserDiscoveredTag(db.Model):
     __tablename__ = 'user_discovered_tags'
     id = db.Column(db.Integer, primary_key=True)
@@ -172,6 +186,8 @@ class Video(db.Model):
     thumbnail_url = db.Column(db.String(500), nullable= True)
     # [VTT_OPTIMIZATION] Thêm cột lưu URL file VTT
     subtitle_vtt_url = db.Column(db.String(500), nullable=True) 
+    # Track phụ đề nhị phân dạng cột (app/utils/subtitle_track.py), xuất cùng lúc với VTT
+    subtitle_track_url = db.Column(db.String(500), nullable=True)
     # Metadata
     view_count = db.Column(db.Integer, default=0, index=True) 
     level = db.Column(db.Enum('Beginner', 'Intermediate', 'Advanced'), default='Intermediate', index=True)
@@ -224,10 +240,27 @@ class Subtitle(db.Model):
     # [XLM-R NLP Integration]
     grammar_tag_id = db.Column(db.Integer, db.ForeignKey('grammar_tags.id'), nullable=True, index=True)
     cloze_data = db.Column(db.JSON, nullable=True) # Chứa JSON đục lỗ: {"masked": "...", "answer": "...", "distractors": ["...", "..."]}
+    grammar_confidence = db.Column(db.Float, nullable=True)
+    # Phân tích tăng dần: sha1 câu EN đã làm sạch + phiên bản model lúc dán nhãn
+    analysis_hash = db.Column(db.String(40), nullable=True)
+    analysis_model_version = db.Column(db.String(64), nullable=True)
     
     video = db.relationship('Video', back_populates='subtitles')
     grammar_tag = db.relationship('GrammarTag', back_populates='subtitles')
 
+# Bộ nhớ dịch dùng chung giữa các phim: câu tiếng Anh (đã chuẩn hóa) -> bản dịch
+class TranslationMemoryEntry(db.Model):
+    __tablename__ = 'translation_memory'
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    source_hash = db.Column(db.String(40), nullable=False) # sha1 của câu gốc đã chuẩn hóa
+    target_lang = db.Column(db.String(10), nullable=False, default='vi')
+    source_text = db.Column(db.Text, nullable=False)
+    translated_text = db.Column(db.Text, nullable=False)
+    origin = db.Column(db.String(20), nullable=False, default='machine') # machine | subtitle (backfill)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('source_hash', 'target_lang', name='uq_translation_memory_source_lang'),)
+
 # Bảng quản lý báo lỗi thẻ phạt/phim mờ/không play được
 class VideoReport(db.Model):
     __tablename__ = 'video_reports'
@@ -551,6 +584,9 @@ class WatchHistory(db.Model):
     watched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     last_position = db.Column(db.Float, nullable=True, default=0.0)
     duration = db.Column(db.Float, nullable=True, default=0.0)
+
+    # Một dòng cho mỗi (user, phim): write-behind upsert theo cặp khóa này
+    __table_args__ = (db.UniqueConstraint('user_id', 'video_id', name='uq_watch_history_user_video'),)
     
     user = db.relationship('User', back_populates='watch_history')
     video = db.relationship('Video', back_populates='watch_history')
@@ -563,6 +599,7 @@ class MovieAIAnalysis(db.Model):
 
     model_name = db.Column(db.String(100), nullable=False, default='FacebookAI/xlm-roberta-base')
     model_mode = db.Column(db.String(50), nullable=False, default='multitask_inference')
+    model_version = db.Column(db.String(64), nullable=True)
     segment_count = db.Column(db.Integer, nullable=False, default=0)
 
     movie_score = db.Column(db.Float, nullable=False)
@@ -721,3 +758,36 @@ class ChatFeedback(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
     message = db.relationship('ChatMessage', back_populates='feedback')
+
+
+# Hàng đợi job nền (import YouTube, phân tích AI, recap buổi học) - worker process đọc từ bảng này
+class BackgroundJob(db.Model):
+    __tablename__ = 'background_jobs'
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    job_type = db.Column(db.String(50), nullable=False, index=True)
+    status = db.Column(db.Enum('QUEUED', 'RUNNING', 'SUCCEEDED', 'FAILED'), default='QUEUED', nullable=False, index=True)
+    payload = db.Column(db.JSON, nullable=False)
+    result = db.Column(db.JSON, nullable=True)
+    progress = db.Column(db.JSON, nullable=True) # Sự kiện tiến độ gần nhất: {"status", "message", "step", ...}
+    dedupe_key = db.Column(db.String(120), nullable=True, index=True) # Không enqueue trùng job đang chờ/chạy
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow) # Backoff khi retry
+    # Slot chạy trong giới hạn concurrency của job_type; unique (job_type, running_slot) chặn vượt giới hạn
+    running_slot = db.Column(db.Integer, nullable=True)
+    locked_by = db.Column(db.String(100), nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    error_message = db.Column(db.Text, nullable=True)
+
+    created_by = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('job_type', 'running_slot', name='uq_background_jobs_type_slot'),
+        db.Index('ix_background_jobs_claim', 'status', 'job_type', 'run_after'),
+    )
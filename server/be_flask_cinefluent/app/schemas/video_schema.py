@@ -161,6 +161,7 @@ class VideoSchema(Schema):
     stream_url = fields.Str()
     thumbnail_url = fields.Str()
     subtitle_vtt_url = fields.Str()
+    subtitle_track_url = fields.Str()
     author = fields.Str()
     runtime = fields.Int()
     country = fields.Str()
@@ -1,19 +1,17 @@
 from __future__ import annotations
 
-from sqlalchemy import and_
-
 from ..models.models_model import (
     AIAssessment,
     DailyTask,
     Flashcard,
     FlashcardExercise,
     StudyRoadmap,
-    Subtitle,
     TypingGameMap,
     TypingGameStage,
     Video,
     WatchHistory,
 )
+from .subtitle_timeline_service import cue_at
 
 
 def _safe_float(value) -> float | None:
@@ -34,18 +32,6 @@ def _safe_int(value) -> int | None:
         return None
 
 
-def _serialize_subtitle(subtitle: Subtitle | None) -> dict | None:
-    if not subtitle:
-        return None
-    return {
-        "id": subtitle.id,
-        "start_time": subtitle.start_time,
-        "end_time": subtitle.end_time,
-        "content_en": subtitle.content_en,
-        "content_vi": subtitle.content_vi,
-    }
-
-
 def _serialize_flashcard(flashcard: Flashcard) -> dict:
     return {
         "id": flashcard.id,
@@ -154,39 +140,9 @@ def _serialize_typing_stage(stage: TypingGameStage | None) -> dict | None:
     }
 
 
-def _find_current_subtitle(video_id: int, current_time: float) -> Subtitle | None:
-    subtitle = (
-        Subtitle.query.filter(
-            and_(
-                Subtitle.video_id == video_id,
-                Subtitle.start_time <= current_time,
-                Subtitle.end_time >= current_time,
-            )
-        )
-        .order_by(Subtitle.start_time.desc())
-        .first()
-    )
-    if subtitle:
-        return subtitle
-
-    previous_subtitle = (
-        Subtitle.query.filter(
-            and_(
-                Subtitle.video_id == video_id,
-                Subtitle.start_time <= current_time,
-            )
-        )
-        .order_by(Subtitle.start_time.desc())
-        .first()
-    )
-    if previous_subtitle:
-        return previous_subtitle
-
-    return (
-        Subtitle.query.filter(Subtitle.video_id == video_id)
-        .order_by(Subtitle.start_time.asc())
-        .first()
-    )
+def _find_current_subtitle(video_id: int, current_time: float) -> dict | None:
+    # Tra trên timeline đã cache của video (bisect), không truy vấn DB mỗi lượt chat
+    return cue_at(video_id, current_time)
 
 
 def build_movie_context_service(
@@ -258,7 +214,7 @@ def build_movie_context_service(
             "effective_current_time": effective_current_time,
             "time_source": time_source,
         },
-        "current_subtitle": _serialize_subtitle(current_subtitle),
+        "current_subtitle": current_subtitle,
         "user_history": {
             "last_position": watch_history.last_position,
             "duration": watch_history.duration,
@@ -13,8 +13,9 @@ from .chat_context_service import build_chat_context_service
 from .chat_service import append_chat_message_service
 from .product_rag.config import ProductRagSettings
 from .product_rag.embeddings import HashEmbeddingProvider
+from .product_rag.lexical import get_lexical_index
 from .product_rag.retrieval import run_retrieval
-from .product_rag.stores import JsonVectorStore, QdrantVectorStore
+from .product_rag.stores import JsonVectorStore, NpyVectorStore, QdrantVectorStore
 
 
 CHAT_MODEL_NAME = "gemini-2.5-flash"
@@ -39,6 +40,8 @@ def _load_vector_store(settings: ProductRagSettings):
             api_key=settings.qdrant_api_key,
             collection_name=settings.qdrant_collection,
         )
+    if settings.store_kind == "npy":
+        return NpyVectorStore(settings.npy_store_dir)
     return JsonVectorStore(settings.json_store_path)
 
 
@@ -179,12 +182,25 @@ def _run_ai_chat_completion(
         rag_settings = ProductRagSettings.from_env(repo_root)
         vector_store = _load_vector_store(rag_settings)
         embedding_provider = HashEmbeddingProvider(dim=rag_settings.embedding_dim)
+        # Chỉ mục BM25 build một lần mỗi process (nạp lại từ đĩa nếu corpus không đổi)
+        lexical_index = None
+        retrieval_mode = rag_settings.retrieval_mode
+        if retrieval_mode != "vector":
+            try:
+                lexical_index = get_lexical_index(rag_settings)
+            except (OSError, ValueError) as exc:
+                # Thiếu rag_data (vd. image chỉ có vector store): lùi về tìm theo vector như trước
+                print(f"⚠️ [PRODUCT_RAG] Khong build duoc chi muc BM25: {exc}")
+                retrieval_mode = "vector"
         rag_hits = run_retrieval(
             question=content,
             vector_store=vector_store,
             embedding_provider=embedding_provider,
             top_k=5,
             context_type=context_type,
+            lexical_index=lexical_index,
+            mode=retrieval_mode,
+            rrf_k=rag_settings.rrf_k,
         )
         rag_sources = _serialize_retrieval_hits(rag_hits)
 
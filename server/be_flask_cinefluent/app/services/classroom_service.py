@@ -754,42 +754,78 @@ def upload_session_recording_service(
         status="UPLOADED",
     )
     db.session.add(recording)
-    db.session.flush()
+    db.session.commit()
 
-    try:
-        audio_base64 = base64.b64encode(file_path.read_bytes()).decode("utf-8")
-        payload = _build_recap_with_ai(session, audio_base64, mime_type)
-
-        recap = ClassSessionRecap.query.filter_by(session_id=session.id).first()
-        if not recap:
-            recap = ClassSessionRecap(session_id=session.id, summary_text="")
-            db.session.add(recap)
-
-        recap.recording_id = recording.id
-        recap.summary_text = payload.get("summary_text") or "AI chÆ°a táº¡o Ä‘Æ°á»£c tÃ³m táº¯t rÃµ rÃ ng."
-        recap.key_points = payload.get("key_points") or []
-        recap.examples = payload.get("examples") or []
-        recap.homework_text = payload.get("homework_text")
-        recap.review_suggestions = payload.get("review_suggestions") or []
-        recap.transcript_text = payload.get("transcript_text")
-        recap.model_name = payload.get("_model_name") or RECAP_MODEL_NAME
-        recap.updated_at = datetime.utcnow()
-
-        recording.status = "PROCESSED"
-        db.session.commit()
+    # Gọi Gemini tốn nhiều thời gian -> đưa vào hàng đợi job, worker tạo recap và báo tiến độ qua socketio
+    from .jobs import SESSION_RECAP, enqueue_job, serialize_job
 
-        return {
-            "success": True,
-            "data": {
-                "recording": _serialize_recording(recording),
-                "recap": _serialize_recap(recap),
-            },
-        }
-    except Exception as exc:
-        recording.status = "FAILED"
-        recording.error_message = str(exc)
-        db.session.commit()
-        return {"success": False, "error": str(exc), "code": 500}
+    job = enqueue_job(
+        SESSION_RECAP,
+        {"recording_id": recording.id},
+        created_by=user_id,
+        dedupe_key=f"{SESSION_RECAP}:{recording.id}",
+    )
+
+    return {
+        "success": True,
+        "data": {
+            "recording": _serialize_recording(recording),
+            "recap": None,
+            "job": serialize_job(job),
+        },
+    }
+
+
+def generate_session_recap_service(recording_id: int) -> dict:
+    """Chạy trong worker: gửi ghi âm cho AI, lưu recap. Lỗi được raise để hàng đợi job retry."""
+    from .jobs import PermanentJobError
+
+    recording = ClassSessionRecording.query.get(recording_id)
+    if not recording:
+        raise PermanentJobError(f"Không tìm thấy ghi âm {recording_id}")
+    session = ClassSession.query.get(recording.session_id)
+    if not session:
+        raise PermanentJobError(f"Không tìm thấy buổi học của ghi âm {recording_id}")
+
+    file_path = Path(recording.file_path)
+    if not file_path.exists():
+        raise PermanentJobError(f"File ghi âm không tồn tại: {file_path.name}")
+
+    audio_base64 = base64.b64encode(file_path.read_bytes()).decode("utf-8")
+    payload = _build_recap_with_ai(session, audio_base64, recording.mime_type)
+
+    recap = ClassSessionRecap.query.filter_by(session_id=session.id).first()
+    if not recap:
+        recap = ClassSessionRecap(session_id=session.id, summary_text="")
+        db.session.add(recap)
+
+    recap.recording_id = recording.id
+    recap.summary_text = payload.get("summary_text") or "AI chÆ°a táº¡o Ä‘Æ°á»£c tÃ³m táº¯t rÃµ rÃ ng."
+    recap.key_points = payload.get("key_points") or []
+    recap.examples = payload.get("examples") or []
+    recap.homework_text = payload.get("homework_text")
+    recap.review_suggestions = payload.get("review_suggestions") or []
+    recap.transcript_text = payload.get("transcript_text")
+    recap.model_name = payload.get("_model_name") or RECAP_MODEL_NAME
+    recap.updated_at = datetime.utcnow()
+
+    recording.status = "PROCESSED"
+    recording.error_message = None
+    db.session.commit()
+
+    return {
+        "recording": _serialize_recording(recording),
+        "recap": _serialize_recap(recap),
+    }
+
+
+def mark_session_recording_failed_service(recording_id: int, error_message: str) -> None:
+    recording = ClassSessionRecording.query.get(recording_id)
+    if not recording:
+        return
+    recording.status = "FAILED"
+    recording.error_message = error_message
+    db.session.commit()
 
 
 def get_session_recap_service(user_id: str, classroom_id: int, session_id: int):
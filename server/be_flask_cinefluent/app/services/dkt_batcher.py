@@ -0,0 +1,194 @@
+"""
+Gom các lần chạy DKT (cả chuỗi 100 câu) của nhiều user đồng thời thành một batch ONNX.
+
+Request đặt (tags, answers) vào hàng đợi; một thread dispatcher lấy tối đa max_batch phần tử
+trong cửa sổ max_wait_ms, xếp thành tensor (B, 100), gọi session.run một lần rồi trả từng dòng
+về cho request. Request chờ bằng socketio.sleep nên không khóa hub eventlet của process web.
+Chỉ bật khi graph có trục batch động (train_dkt_colab.py mới); graph cũ (batch cố định 1) chạy như trước.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import onnxruntime as ort
+
+from ..extensions import socketio
+
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+
+@dataclass(slots=True)
+class DKTServingSettings:
+    # 0 = để onnxruntime tự chọn theo số core
+    intra_op_threads: int = 0
+    inter_op_threads: int = 0
+    graph_optimization: str = "all"
+    # max_batch <= 1 tắt micro-batching
+    max_batch: int = 32
+    max_wait_ms: float = 2.0
+    poll_ms: float = 0.5
+    timeout_seconds: float = 5.0
+
+    @classmethod
+    def from_env(cls) -> "DKTServingSettings":
+        graph_optimization = os.getenv("DKT_ORT_GRAPH_OPT", "all").strip().lower()
+        if graph_optimization not in GRAPH_OPTIMIZATION_LEVELS:
+            raise ValueError(
+                f"DKT_ORT_GRAPH_OPT khong hop le: {graph_optimization} (chon {', '.join(GRAPH_OPTIMIZATION_LEVELS)})"
+            )
+        return cls(
+            intra_op_threads=max(0, int(os.getenv("DKT_ORT_INTRA_OP_THREADS", "0"))),
+            inter_op_threads=max(0, int(os.getenv("DKT_ORT_INTER_OP_THREADS", "0"))),
+            graph_optimization=graph_optimization,
+            max_batch=max(1, int(os.getenv("DKT_MAX_BATCH", "32"))),
+            max_wait_ms=max(0.0, float(os.getenv("DKT_BATCH_MAX_WAIT_MS", "2"))),
+            timeout_seconds=float(os.getenv("DKT_BATCH_TIMEOUT", "5")),
+        )
+
+    def session_options(self) -> ort.SessionOptions:
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[self.graph_optimization]
+        return options
+
+
+def has_dynamic_batch(session: ort.InferenceSession) -> bool:
+    """Trục 0 của input là tên symbol (hoặc None) thay vì số cố định."""
+    return all(not isinstance(node.shape[0], int) for node in session.get_inputs())
+
+
+class _PendingPrediction:
+    __slots__ = ("tags", "answers", "valid_idx", "enqueued_at", "done", "result", "error")
+
+    def __init__(self, tags: np.ndarray, answers: np.ndarray, valid_idx: int) -> None:
+        self.tags = tags
+        self.answers = answers
+        self.valid_idx = valid_idx
+        self.enqueued_at = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class DKTMicroBatcher:
+    """Hàng đợi + thread dispatcher quanh một InferenceSession có trục batch động."""
+
+    def __init__(self, session: ort.InferenceSession, settings: DKTServingSettings) -> None:
+        self.session = session
+        self.settings = settings
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {
+            "requests": 0,
+            "batches": 0,
+            "max_batch_seen": 0,
+            "queue_wait_seconds": 0.0,
+            "run_seconds": 0.0,
+            "failed_batches": 0,
+        }
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch_loop, name="dkt-micro-batcher", daemon=True)
+                self._thread.start()
+
+    def predict(self, tags: np.ndarray, answers: np.ndarray, valid_idx: int) -> np.ndarray:
+        """tags/answers: mảng int64 (max_seq_len,) đã padding. Trả về vector xác suất tại valid_idx."""
+        self._ensure_started()
+        pending = _PendingPrediction(tags, answers, valid_idx)
+        self._queue.put(pending)
+
+        if not self._wait(pending):
+            raise TimeoutError(f"DKT batch qua {self.settings.timeout_seconds:.1f}s chua xong.")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _wait(self, pending: _PendingPrediction) -> bool:
+        server = socketio.server
+        if server is None or server.async_mode == "threading":
+            # Thread thật (werkzeug threaded, script): chờ trực tiếp trên Event
+            return pending.done.wait(self.settings.timeout_seconds)
+
+        # eventlet không monkey patch: Event.wait sẽ khóa cả hub, nên nhường CPU theo chu kỳ ngắn
+        deadline = time.monotonic() + self.settings.timeout_seconds
+        poll_seconds = self.settings.poll_ms / 1000.0
+        while not pending.done.is_set():
+            if time.monotonic() > deadline:
+                return False
+            socketio.sleep(poll_seconds)
+        return True
+
+    def _collect(self) -> list[_PendingPrediction]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.settings.max_wait_ms / 1000.0
+        while len(batch) < self.settings.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            batch = self._collect()
+            started_at = time.monotonic()
+            try:
+                ort_inputs = {
+                    "question_seq": np.stack([item.tags for item in batch]),
+                    "answer_seq": np.stack([item.answers for item in batch]),
+                }
+                preds = self.session.run(None, ort_inputs)[0]
+                for row, item in enumerate(batch):
+                    # Copy để cache của từng user không giữ cả tensor (B, 100, NUM_TAGS)
+                    item.result = preds[row, item.valid_idx].copy()
+                    item.result.setflags(write=False)
+            except Exception as ex:
+                for item in batch:
+                    item.error = ex
+                with self._lock:
+                    self._stats["failed_batches"] += 1
+            finished_at = time.monotonic()
+
+            with self._lock:
+                self._stats["requests"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(batch))
+                self._stats["queue_wait_seconds"] += sum(started_at - item.enqueued_at for item in batch)
+                self._stats["run_seconds"] += finished_at - started_at
+            for item in batch:
+                item.done.set()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        requests, batches = stats["requests"], stats["batches"]
+        return {
+            "max_batch": self.settings.max_batch,
+            "max_wait_ms": self.settings.max_wait_ms,
+            "requests": requests,
+            "batches": batches,
+            "avg_batch_size": round(requests / batches, 2) if batches else 0.0,
+            "max_batch_seen": stats["max_batch_seen"],
+            "failed_batches": stats["failed_batches"],
+            "avg_queue_wait_ms": round(stats["queue_wait_seconds"] * 1000 / requests, 3) if requests else 0.0,
+            "avg_batch_run_ms": round(stats["run_seconds"] * 1000 / batches, 3) if batches else 0.0,
+        }
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(slots=True)
+class InferenceSettings:
+    # Tổng số token (batch_size x độ dài đã pad) tối đa trong một lần forward
+    token_budget: int = 4096
+    max_batch_size: int = 64
+    max_length: int = 128
+    # None: giữ mặc định của torch (số core vật lý)
+    num_threads: int | None = None
+
+    @classmethod
+    def from_env(cls, max_length: int = 128) -> "InferenceSettings":
+        num_threads = os.getenv("MOVIE_AI_NUM_THREADS", "").strip()
+        return cls(
+            token_budget=int(os.getenv("MOVIE_AI_TOKEN_BUDGET", "4096")),
+            max_batch_size=int(os.getenv("MOVIE_AI_MAX_BATCH_SIZE", "64")),
+            max_length=max_length,
+            num_threads=int(num_threads) if num_threads else None,
+        )
+
+
+_THREADS_LOCK = threading.Lock()
+_CONFIGURED_THREADS = None
+
+
+def configure_torch_threads(num_threads: int | None) -> None:
+    """torch.set_num_threads chỉ gọi một lần cho mỗi giá trị (áp dụng cho toàn process)."""
+    global _CONFIGURED_THREADS
+
+    if not num_threads or num_threads == _CONFIGURED_THREADS:
+        return
+
+    import torch
+
+    with _THREADS_LOCK:
+        if num_threads != _CONFIGURED_THREADS:
+            torch.set_num_threads(num_threads)
+            _CONFIGURED_THREADS = num_threads
+
+
+def plan_length_buckets(lengths: list[int], token_budget: int, max_batch_size: int) -> list[list[int]]:
+    """
+    Sắp xếp câu theo số token rồi gom batch sao cho batch_size x độ dài dài nhất <= token_budget.
+    Câu ngắn đi thành batch lớn, câu dài thành batch nhỏ; padding trong mỗi batch gần như bằng 0.
+    Trả về danh sách index (theo thứ tự gốc) của từng batch.
+    """
+    order = sorted(range(len(lengths)), key=lambda index: lengths[index])
+    batches = []
+    batch = []
+    for index in order:
+        # Danh sách đã sắp tăng dần -> câu hiện tại là câu dài nhất nếu thêm vào batch
+        padded_length = max(1, lengths[index])
+        if batch and (len(batch) >= max_batch_size or (len(batch) + 1) * padded_length > token_budget):
+            batches.append(batch)
+            batch = []
+        batch.append(index)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _pad_batch(input_ids: list[list[int]], pad_token_id: int) -> tuple[np.ndarray, np.ndarray]:
+    width = max(len(ids) for ids in input_ids)
+    batch_ids = np.full((len(input_ids), width), pad_token_id, dtype=np.int64)
+    attention_mask = np.zeros((len(input_ids), width), dtype=np.int64)
+    for row, ids in enumerate(input_ids):
+        batch_ids[row, :len(ids)] = ids
+        attention_mask[row, :len(ids)] = 1
+    return batch_ids, attention_mask
+
+
+class TorchGrammarRunner:
+    """Forward model PyTorch cho một batch đã pad, trả về (grammar_id, confidence) dạng numpy."""
+
+    def __init__(self, model, device) -> None:
+        self.model = model
+        self.device = device
+
+    def __call__(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        import torch
+
+        with torch.inference_mode():
+            logits = self.model(
+                input_ids=torch.from_numpy(input_ids).to(self.device),
+                attention_mask=torch.from_numpy(attention_mask).to(self.device),
+            ).logits
+            # Chỉ cần nhãn và xác suất lớn nhất: tính trên device, chuyển về CPU 2 vector nhỏ
+            confidence, pred_ids = torch.softmax(logits.float(), dim=-1).max(dim=-1)
+        return pred_ids.cpu().numpy(), confidence.cpu().numpy()
+
+
+class OnnxGrammarRunner:
+    """Forward graph ONNX (fp32 hoặc int8) bằng onnxruntime, cùng interface với TorchGrammarRunner."""
+
+    def __init__(self, session) -> None:
+        self.session = session
+        self.input_names = {item.name for item in session.get_inputs()}
+
+    def __call__(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        logits = self.session.run(None, {name: value for name, value in feeds.items() if name in self.input_names})[0]
+        logits = logits.astype(np.float32, copy=False)
+        # Softmax ổn định số học trên numpy
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        probs = exp / exp.sum(axis=-1, keepdims=True)
+        return probs.argmax(axis=-1).astype(np.int64), probs.max(axis=-1).astype(np.float32)
+
+
+def create_onnx_session(model_path, num_threads: int | None = None):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    return ort.InferenceSession(str(model_path), sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def run_bucketed_inference(texts: list[str], tokenizer, runner, settings: InferenceSettings) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Tokenize toàn bộ câu một lần (không pad), chạy runner theo các bucket độ dài,
+    rồi ghi kết quả về đúng vị trí ban đầu. Trả về (pred_ids[int64], confidences[float32]).
+    """
+    pred_ids = np.zeros(len(texts), dtype=np.int64)
+    confidences = np.zeros(len(texts), dtype=np.float32)
+    if not texts:
+        return pred_ids, confidences
+
+    if isinstance(runner, TorchGrammarRunner):
+        # ONNX đặt số luồng qua SessionOptions, không import torch
+        configure_torch_threads(settings.num_threads)
+
+    encoded = tokenizer(texts, truncation=True, max_length=settings.max_length, padding=False)
+    input_ids = encoded["input_ids"]
+    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else 0
+
+    for batch_indices in plan_length_buckets([len(ids) for ids in input_ids], settings.token_budget, settings.max_batch_size):
+        batch_ids, attention_mask = _pad_batch([input_ids[index] for index in batch_indices], pad_token_id)
+        batch_pred, batch_conf = runner(batch_ids, attention_mask)
+        pred_ids[batch_indices] = batch_pred
+        confidences[batch_indices] = batch_conf
+
+    return pred_ids, confidences
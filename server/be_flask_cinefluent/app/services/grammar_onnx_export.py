@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+ONNX_SUBDIR = "onnx"
+ONNX_FP32_FILENAME = "model.onnx"
+ONNX_INT8_FILENAME = "model.int8.onnx"
+
+
+def onnx_model_path(model_dir: Path, quantized: bool = False) -> Path:
+    return Path(model_dir) / ONNX_SUBDIR / (ONNX_INT8_FILENAME if quantized else ONNX_FP32_FILENAME)
+
+
+def export_grammar_onnx(model_dir: Path, quantize: bool = True, opset: int = 17) -> dict:
+    """
+    Xuất grammar classifier (XLM-R) sang ONNX với batch/độ dài động,
+    tùy chọn lượng tử hóa động int8 (chỉ trọng số MatMul/Gemm) cho CPU.
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    model_dir = Path(model_dir)
+    fp32_path = onnx_model_path(model_dir)
+    fp32_path.parent.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(str(model_dir), local_files_only=True)
+    model = AutoModelForSequenceClassification.from_pretrained(str(model_dir), local_files_only=True)
+    model.eval()
+    model.config.return_dict = False
+
+    sample = tokenizer(["I have been waiting for you.", "Go."], padding=True, return_tensors="pt")
+    with torch.inference_mode():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            str(fp32_path),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+
+    result = {"fp32": str(fp32_path), "fp32_mb": round(fp32_path.stat().st_size / 1024 / 1024, 1)}
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = onnx_model_path(model_dir, quantized=True)
+        quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+        result["int8"] = str(int8_path)
+        result["int8_mb"] = round(int8_path.stat().st_size / 1024 / 1024, 1)
+
+    return result
@@ -0,0 +1,238 @@
+"""
+Pool process riêng cho grammar classifier (torch/transformers/spaCy).
+
+Process web không nạp model: handler gửi cả batch câu sang pool rồi chờ kết quả bằng
+socketio.sleep, nên một lần phân tích dài không giữ GIL của process đang phục vụ HTTP/socket.
+Phân tích hàng loạt (VIDEO_AI_ANALYSIS) vẫn chạy trong `flask jobs-worker`, pool này chỉ phục vụ
+các request tương tác như /api/ai/movie-difficulty/predict.
+"""
+
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+
+from ..extensions import socketio
+
+
+INFERENCE_POOL_MODES = ("process", "inline")
+
+
+class InferencePoolBusyError(RuntimeError):
+    """Hàng đợi inference đã đầy, caller nên trả 503 để client thử lại sau."""
+
+
+@dataclass(slots=True)
+class InferencePoolSettings:
+    mode: str = "process"
+    workers: int = 1
+    # Số batch tối đa đang chờ + đang chạy; vượt quá thì từ chối ngay thay vì xếp hàng vô hạn
+    max_pending: int = 8
+    timeout_seconds: float = 300.0
+    poll_seconds: float = 0.05
+    backend: str | None = None
+
+    @classmethod
+    def from_env(cls) -> "InferencePoolSettings":
+        mode = os.getenv("MOVIE_AI_POOL_MODE", "process").strip().lower()
+        if mode not in INFERENCE_POOL_MODES:
+            raise ValueError(f"MOVIE_AI_POOL_MODE khong hop le: {mode} (chon {', '.join(INFERENCE_POOL_MODES)})")
+        return cls(
+            mode=mode,
+            workers=max(1, int(os.getenv("MOVIE_AI_POOL_WORKERS", "1"))),
+            max_pending=max(1, int(os.getenv("MOVIE_AI_POOL_MAX_PENDING", "8"))),
+            timeout_seconds=float(os.getenv("MOVIE_AI_POOL_TIMEOUT", "300")),
+            backend=os.getenv("MOVIE_AI_BACKEND") or None,
+        )
+
+
+def _init_inference_worker(backend: str | None) -> None:
+    from .movie_ai_service import get_cloze_nlp, load_movie_ai_bundle
+
+    # Nạp sẵn model + spaCy để batch đầu tiên không phải chờ; lỗi nạp model được báo lại
+    # khi task thật gọi load_movie_ai_bundle (lỗi trong initializer sẽ làm hỏng cả pool)
+    try:
+        load_movie_ai_bundle(backend)
+        get_cloze_nlp()
+    except Exception as ex:
+        print(f"⚠️ [INFERENCE_POOL] pid={os.getpid()} chua nap duoc model: {type(ex).__name__}: {ex}")
+
+
+def _timed_call(fn, args: tuple):
+    started_at = time.time()
+    result = fn(*args)
+    return started_at, time.time(), result
+
+
+def _analyze_subtitle_content(subtitle_content: str, source_name: str | None) -> dict:
+    from .movie_ai_service import analyze_subtitle_content_service
+
+    return analyze_subtitle_content_service(subtitle_content, source_name=source_name)
+
+
+class InferencePool:
+    """ProcessPoolExecutor sở hữu model + bộ đếm hàng đợi (đọc qua metrics())."""
+
+    def __init__(self, settings: InferencePoolSettings) -> None:
+        self.settings = settings
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "restarts": 0,
+            "peak_pending": 0,
+            "queue_wait_seconds": 0.0,
+            "run_seconds": 0.0,
+            "last_error": None,
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: worker không thừa kế trạng thái eventlet/socket của process web
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.settings.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_inference_worker,
+                initargs=(self.settings.backend,),
+            )
+        return self._executor
+
+    def _reset_executor(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._stats["restarts"] += 1
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.settings.max_pending:
+                self._stats["rejected"] += 1
+                raise InferencePoolBusyError(
+                    f"Hang doi inference dang day ({self._pending}/{self.settings.max_pending} batch)."
+                )
+            self._pending += 1
+            self._stats["submitted"] += 1
+            self._stats["peak_pending"] = max(self._stats["peak_pending"], self._pending)
+            submitted_at = time.time()
+            try:
+                future = self._get_executor().submit(_timed_call, fn, args)
+            except Exception:
+                self._pending -= 1
+                raise
+
+        future.add_done_callback(lambda done: self._on_done(done, submitted_at))
+        return future
+
+    def _on_done(self, future, submitted_at: float) -> None:
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                self._stats["failed"] += 1
+                self._stats["last_error"] = f"{type(error).__name__}: {error}"
+                return
+            started_at, finished_at, _ = future.result()
+            self._stats["completed"] += 1
+            self._stats["queue_wait_seconds"] += max(0.0, started_at - submitted_at)
+            self._stats["run_seconds"] += max(0.0, finished_at - started_at)
+
+    def run(self, fn, *args, timeout: float | None = None):
+        """Gửi task rồi chờ kết quả; socketio.sleep nhường CPU cho greenlet khác khi chạy eventlet."""
+        timeout = self.settings.timeout_seconds if timeout is None else timeout
+        future = self.submit(fn, *args)
+        deadline = time.monotonic() + timeout
+        while not future.done():
+            if time.monotonic() > deadline:
+                future.cancel()
+                with self._lock:
+                    self._stats["timed_out"] += 1
+                raise TimeoutError(f"Inference qua {timeout:.0f}s chua xong.")
+            socketio.sleep(self.settings.poll_seconds)
+
+        try:
+            return future.result()[2]
+        except BrokenProcessPool:
+            # Worker chết (OOM, segfault): tạo pool mới cho request sau
+            self._reset_executor()
+            raise
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            pending = self._pending
+            started = self._executor is not None
+        completed = stats["completed"]
+        return {
+            "mode": self.settings.mode,
+            "workers": self.settings.workers,
+            "started": started,
+            "pending": pending,
+            "max_pending": self.settings.max_pending,
+            "peak_pending": stats["peak_pending"],
+            "submitted": stats["submitted"],
+            "completed": completed,
+            "failed": stats["failed"],
+            "rejected": stats["rejected"],
+            "timed_out": stats["timed_out"],
+            "restarts": stats["restarts"],
+            "avg_queue_wait_ms": round(stats["queue_wait_seconds"] * 1000 / completed, 1) if completed else 0.0,
+            "avg_run_ms": round(stats["run_seconds"] * 1000 / completed, 1) if completed else 0.0,
+            "last_error": stats["last_error"],
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_inference_pool() -> InferencePool | None:
+    """Pool dùng chung của process (None nếu MOVIE_AI_POOL_MODE=inline)."""
+    global _POOL
+
+    if _POOL is not None:
+        return _POOL
+
+    settings = InferencePoolSettings.from_env()
+    if settings.mode == "inline":
+        return None
+
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = InferencePool(settings)
+            atexit.register(_POOL.shutdown)
+    return _POOL
+
+
+def analyze_subtitle_content(subtitle_content: str, source_name: str | None = None) -> dict:
+    """analyze_subtitle_content_service chạy trong pool inference (hoặc ngay trong process nếu inline)."""
+    pool = get_inference_pool()
+    if pool is None:
+        return _analyze_subtitle_content(subtitle_content, source_name)
+    return pool.run(_analyze_subtitle_content, subtitle_content, source_name)
+
+
+def inference_pool_metrics() -> dict:
+    pool = get_inference_pool()
+    if pool is None:
+        return {"mode": "inline"}
+    return pool.metrics()
@@ -0,0 +1,26 @@
+from .events import JOB_EVENT_NAME, job_room, start_job_event_relay, user_jobs_room
+from .handlers import SESSION_RECAP, VIDEO_AI_ANALYSIS, YOUTUBE_IMPORT
+from .queue import count_jobs_by_status, enqueue_job, follow_job, get_job, serialize_job
+from .registry import PermanentJobError, get_job_type, list_job_types, register_job_type
+from .worker import run_worker, run_worker_pool
+
+__all__ = [
+    "JOB_EVENT_NAME",
+    "PermanentJobError",
+    "SESSION_RECAP",
+    "VIDEO_AI_ANALYSIS",
+    "YOUTUBE_IMPORT",
+    "count_jobs_by_status",
+    "enqueue_job",
+    "follow_job",
+    "get_job",
+    "get_job_type",
+    "job_room",
+    "list_job_types",
+    "register_job_type",
+    "run_worker",
+    "run_worker_pool",
+    "serialize_job",
+    "start_job_event_relay",
+    "user_jobs_room",
+]
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+
+from ...extensions import db, socketio
+from ...models.models_model import BackgroundJob
+from .queue import serialize_job
+
+JOB_EVENT_NAME = "job_progress"
+RELAY_POLL_SECONDS = float(os.getenv("JOBS_EVENT_POLL_SECONDS", "1"))
+
+
+def job_room(job_id: int) -> str:
+    return f"job:{job_id}"
+
+
+def user_jobs_room(user_id: str) -> str:
+    return f"jobs:user:{user_id}"
+
+
+def emit_job_event(job_data: dict) -> None:
+    socketio.emit(JOB_EVENT_NAME, job_data, room=job_room(job_data["id"]))
+    if job_data.get("created_by"):
+        socketio.emit(JOB_EVENT_NAME, job_data, room=user_jobs_room(job_data["created_by"]))
+
+
+def start_job_event_relay(app) -> None:
+    """
+    Worker chạy ở process khác nên không emit trực tiếp tới client được.
+    Web process poll các job vừa thay đổi (theo updated_at) và phát 'job_progress' qua socketio
+    tới room của job và room của người tạo job.
+    """
+
+    def _relay():
+        last_seen = datetime.utcnow()
+        signatures: dict[int, tuple] = {}
+        with app.app_context():
+            while True:
+                socketio.sleep(RELAY_POLL_SECONDS)
+                try:
+                    # DATETIME của MySQL chỉ chính xác tới giây -> lùi lại 2s, lọc trùng bằng signature
+                    since = last_seen - timedelta(seconds=2)
+                    last_seen = datetime.utcnow()
+                    jobs = (
+                        BackgroundJob.query.filter(BackgroundJob.updated_at >= since)
+                        .order_by(BackgroundJob.updated_at.asc())
+                        .limit(500)
+                        .all()
+                    )
+                    for job in jobs:
+                        signature = (job.status, job.attempts, repr(job.progress))
+                        if signatures.get(job.id) == signature:
+                            continue
+                        signatures[job.id] = signature
+                        emit_job_event(serialize_job(job))
+
+                    # Chỉ giữ signature của các job còn xuất hiện trong cửa sổ gần đây
+                    if len(signatures) > 5000:
+                        recent_ids = {job.id for job in jobs}
+                        signatures = {key: value for key, value in signatures.items() if key in recent_ids}
+                except Exception as e:
+                    print(f"⚠️ [JOBS] Event relay error: {e}")
+                finally:
+                    db.session.remove()
+
+    socketio.start_background_task(_relay)
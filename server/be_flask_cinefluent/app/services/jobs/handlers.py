@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from ...models.models_model import Subtitle, Video
+from .registry import PermanentJobError, register_job_type
+
+YOUTUBE_IMPORT = "youtube_import"
+VIDEO_AI_ANALYSIS = "video_ai_analysis"
+SESSION_RECAP = "session_recap"
+
+
+@register_job_type(YOUTUBE_IMPORT, concurrency=2, max_attempts=2, backoff_seconds=60)
+def run_youtube_import(ctx, payload: dict) -> dict:
+    from ...schemas.video_schema import ImportYoutubeRequest
+    from ..video_service import import_youtube_video
+
+    data = ImportYoutubeRequest(**payload["request"])
+    result = {}
+    for progress in import_youtube_video(user_id=payload["user_id"], data=data):
+        ctx.report(progress)
+        if progress.get("video_id"):
+            result["video_id"] = progress["video_id"]
+    return result
+
+
+def _save_video_ai_analysis_failure(payload: dict, error_message: str) -> None:
+    from ..movie_ai_service import save_video_ai_analysis_failure_service
+
+    video = Video.query.get(payload["video_id"])
+    if video:
+        save_video_ai_analysis_failure_service(video, error_message)
+
+
+@register_job_type(
+    VIDEO_AI_ANALYSIS,
+    concurrency=1,
+    max_attempts=2,
+    backoff_seconds=30,
+    on_failure=_save_video_ai_analysis_failure,
+)
+def run_video_ai_analysis(ctx, payload: dict) -> dict:
+    from ..movie_ai_service import save_video_ai_analysis_service
+
+    video_id = payload["video_id"]
+    video = Video.query.get(video_id)
+    if not video:
+        raise PermanentJobError(f"Video {video_id} không tồn tại")
+
+    subtitles = (
+        Subtitle.query
+        .filter_by(video_id=video_id)
+        .order_by(Subtitle.start_time.asc())
+        .all()
+    )
+    if not subtitles:
+        raise PermanentJobError(f"Video {video_id} chưa có subtitle để phân tích")
+
+    ctx.report({"status": "processing", "message": f"Đang phân tích {len(subtitles)} câu phụ đề...", "video_id": video_id})
+    # force: bỏ qua kết quả đã lưu theo analysis_hash, chạy lại model cho toàn bộ câu
+    save_video_ai_analysis_service(video, subtitles, force=bool(payload.get("force")))
+    ctx.report({"status": "completed", "message": "Phân tích ngữ pháp AI hoàn tất.", "video_id": video_id})
+    return {"video_id": video_id}
+
+
+def _mark_session_recording_failed(payload: dict, error_message: str) -> None:
+    from ..classroom_service import mark_session_recording_failed_service
+
+    mark_session_recording_failed_service(payload["recording_id"], error_message)
+
+
+@register_job_type(
+    SESSION_RECAP,
+    concurrency=2,
+    max_attempts=3,
+    backoff_seconds=20,
+    on_failure=_mark_session_recording_failed,
+)
+def run_session_recap(ctx, payload: dict) -> dict:
+    from ..classroom_service import generate_session_recap_service
+
+    recording_id = payload["recording_id"]
+    ctx.report({"status": "processing", "message": "AI đang nghe ghi âm và tạo recap...", "recording_id": recording_id})
+    result = generate_session_recap_service(recording_id)
+    ctx.report({"status": "completed", "message": "Đã tạo recap buổi học.", "recording_id": recording_id})
+    return result
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ...extensions import db, socketio
+from ...models.models_model import BackgroundJob
+from .registry import get_job_type, list_job_types
+
+ACTIVE_STATUSES = ("QUEUED", "RUNNING")
+TERMINAL_STATUSES = ("SUCCEEDED", "FAILED")
+# Kết quả của mark_job_*: job đã bị recover_stale_jobs thu hồi (và có thể worker khác đang chạy lại)
+LEASE_LOST = "LEASE_LOST"
+_CLAIM_CANDIDATES = 20
+
+
+def serialize_job(job: BackgroundJob) -> dict:
+    return {
+        "id": job.id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "progress": job.progress,
+        "result": job.result,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "error_message": job.error_message,
+        "created_by": job.created_by,
+        "run_after": job.run_after.isoformat() if job.run_after else None,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def enqueue_job(job_type: str, payload: dict, created_by: str | None = None, dedupe_key: str | None = None) -> BackgroundJob:
+    """
+    Thêm job vào hàng đợi (commit ngay để worker thấy được).
+    Nếu dedupe_key đã có job đang chờ/chạy thì trả về job đó thay vì tạo thêm.
+    """
+    definition = get_job_type(job_type)
+
+    if dedupe_key:
+        existing = (
+            BackgroundJob.query.filter(
+                BackgroundJob.dedupe_key == dedupe_key,
+                BackgroundJob.status.in_(ACTIVE_STATUSES),
+            )
+            .order_by(BackgroundJob.id.desc())
+            .first()
+        )
+        if existing:
+            return existing
+
+    job = BackgroundJob(
+        job_type=job_type,
+        payload=payload,
+        dedupe_key=dedupe_key,
+        max_attempts=definition.max_attempts,
+        created_by=created_by,
+        progress={"status": "queued", "message": "Đang chờ xử lý..."},
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def get_job(job_id: int) -> BackgroundJob | None:
+    return db.session.get(BackgroundJob, job_id)
+
+
+def claim_next_job(worker_id: str, job_types: list[str] | None = None) -> BackgroundJob | None:
+    """
+    Nhận job kế tiếp đã tới hạn chạy. Mỗi job chạy chiếm một running_slot trong [0, concurrency);
+    unique (job_type, running_slot) khiến hai worker không thể vượt giới hạn concurrency của cùng loại job,
+    còn điều kiện status='QUEUED' trong UPDATE đảm bảo mỗi job chỉ một worker nhận.
+    """
+    definitions = {item.name: item for item in list_job_types() if not job_types or item.name in job_types}
+    if not definitions:
+        return None
+
+    used_slots: dict[str, set[int]] = {name: set() for name in definitions}
+    rows = db.session.execute(
+        select(BackgroundJob.job_type, BackgroundJob.running_slot).where(
+            BackgroundJob.status == "RUNNING",
+            BackgroundJob.job_type.in_(definitions),
+        )
+    )
+    for name, slot in rows:
+        if slot is not None:
+            used_slots[name].add(slot)
+
+    available = [name for name, item in definitions.items() if len(used_slots[name]) < item.concurrency]
+    if not available:
+        db.session.rollback()
+        return None
+
+    now = datetime.utcnow()
+    candidates = db.session.execute(
+        select(BackgroundJob.id, BackgroundJob.job_type)
+        .where(
+            BackgroundJob.status == "QUEUED",
+            BackgroundJob.job_type.in_(available),
+            BackgroundJob.run_after <= now,
+        )
+        .order_by(BackgroundJob.run_after.asc(), BackgroundJob.id.asc())
+        .limit(_CLAIM_CANDIDATES)
+    ).all()
+    db.session.rollback()
+
+    for job_id, name in candidates:
+        free_slots = [slot for slot in range(definitions[name].concurrency) if slot not in used_slots[name]]
+        for slot in free_slots:
+            try:
+                claimed = db.session.execute(
+                    update(BackgroundJob)
+                    .where(BackgroundJob.id == job_id, BackgroundJob.status == "QUEUED")
+                    .values(
+                        status="RUNNING",
+                        running_slot=slot,
+                        locked_by=worker_id,
+                        attempts=BackgroundJob.attempts + 1,
+                        heartbeat_at=now,
+                        started_at=now,
+                        error_message=None,
+                    )
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                db.session.commit()
+            except IntegrityError:
+                # Slot vừa bị worker khác chiếm -> thử slot kế tiếp
+                db.session.rollback()
+                used_slots[name].add(slot)
+                continue
+
+            if claimed:
+                used_slots[name].add(slot)
+                return db.session.get(BackgroundJob, job_id)
+            break  # Job đã được worker khác nhận
+
+    return None
+
+
+def mark_job_succeeded(job_id: int, worker_id: str, result: dict | None, progress: dict | None = None) -> bool:
+    """False nếu worker không còn giữ job (lease bị thu hồi): kết quả bị bỏ, không đè lượt chạy mới."""
+    values = {
+        "status": "SUCCEEDED",
+        "result": result,
+        "running_slot": None,
+        "locked_by": None,
+        "finished_at": datetime.utcnow(),
+    }
+    if progress is not None:
+        values["progress"] = progress
+    return _update_job(job_id, values, worker_id)
+
+
+def mark_job_failed(job_id: int, worker_id: str, error_message: str, retry: bool) -> str:
+    """
+    Ghi nhận lỗi: xếp lại vào hàng đợi với backoff nếu còn lượt, ngược lại chuyển FAILED.
+    Trả về LEASE_LOST (không ghi gì) nếu job không còn RUNNING dưới worker_id.
+    """
+    job = db.session.get(BackgroundJob, job_id)
+    definition = get_job_type(job.job_type)
+    now = datetime.utcnow()
+
+    if retry and job.attempts < job.max_attempts:
+        delay = definition.retry_delay(job.attempts)
+        updated = _update_job(
+            job_id,
+            {
+                "status": "QUEUED",
+                "running_slot": None,
+                "locked_by": None,
+                "error_message": error_message,
+                "run_after": now + timedelta(seconds=delay),
+                "progress": {
+                    "status": "retrying",
+                    "message": f"Lỗi: {error_message}. Thử lại sau {int(delay)}s (lần {job.attempts}/{job.max_attempts}).",
+                },
+            },
+            worker_id,
+        )
+        return "QUEUED" if updated else LEASE_LOST
+
+    updated = _update_job(
+        job_id,
+        {
+            "status": "FAILED",
+            "running_slot": None,
+            "locked_by": None,
+            "error_message": error_message,
+            "finished_at": now,
+            "progress": {"status": "error", "message": error_message},
+        },
+        worker_id,
+    )
+    return "FAILED" if updated else LEASE_LOST
+
+
+def touch_job(job_id: int, worker_id: str, progress: dict | None = None) -> None:
+    """
+    Cập nhật heartbeat (và tiến độ) bằng connection riêng, không đụng transaction của handler.
+    Chỉ khi worker_id còn giữ job: worker cũ không giữ sống lượt chạy của worker khác.
+    """
+    values = {"heartbeat_at": datetime.utcnow()}
+    if progress is not None:
+        values["progress"] = progress
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(BackgroundJob.__table__)
+            .where(
+                BackgroundJob.__table__.c.id == job_id,
+                BackgroundJob.__table__.c.status == "RUNNING",
+                BackgroundJob.__table__.c.locked_by == worker_id,
+            )
+            .values(**values)
+        )
+
+
+def recover_stale_jobs(lease_seconds: float) -> list[BackgroundJob]:
+    """
+    Job RUNNING mà worker không còn gửi heartbeat (process bị kill, container restart)
+    được trả về hàng đợi, hoặc FAILED nếu đã hết lượt thử. Trả về các job đã chuyển FAILED.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    stale = BackgroundJob.query.filter(
+        BackgroundJob.status == "RUNNING",
+        BackgroundJob.heartbeat_at < cutoff,
+    ).all()
+    exhausted = []
+    for job in stale:
+        message = f"Worker {job.locked_by} không phản hồi"
+        # Điều kiện locked_by: worker cũ vừa kịp ghi kết quả thì job không bị thu hồi nữa
+        if mark_job_failed(job.id, job.locked_by, message, retry=True) == "FAILED":
+            exhausted.append(job)
+    return exhausted
+
+
+def count_jobs_by_status() -> dict:
+    rows = db.session.execute(
+        select(BackgroundJob.job_type, BackgroundJob.status, func.count(BackgroundJob.id)).group_by(
+            BackgroundJob.job_type, BackgroundJob.status
+        )
+    )
+    summary: dict[str, dict[str, int]] = {}
+    for job_type, status, count in rows:
+        summary.setdefault(job_type, {})[status] = count
+    return summary
+
+
+def follow_job(job_id: int, poll_interval: float = 1.0, timeout: float | None = None):
+    """Generator trả về tiến độ mỗi khi job thay đổi, dừng khi job kết thúc (dùng cho HTTP streaming)."""
+    started = time.monotonic()
+    last_signature = None
+    while True:
+        db.session.expire_all()
+        job = db.session.get(BackgroundJob, job_id)
+        if job is None:
+            return
+
+        status = job.status
+        signature = (status, job.attempts, repr(job.progress))
+        if signature != last_signature:
+            last_signature = signature
+            yield job
+        db.session.rollback()
+
+        if status in TERMINAL_STATUSES:
+            return
+        if timeout is not None and time.monotonic() - started > timeout:
+            return
+        # socketio.sleep nhường CPU cho greenlet khác khi server chạy eventlet
+        socketio.sleep(poll_interval)
+
+
+def _update_job(job_id: int, values: dict, worker_id: str) -> bool:
+    """UPDATE có điều kiện lease (RUNNING + locked_by); 0 dòng nghĩa là worker đã mất job."""
+    updated = db.session.execute(
+        update(BackgroundJob)
+        .where(
+            BackgroundJob.id == job_id,
+            BackgroundJob.status == "RUNNING",
+            BackgroundJob.locked_by == worker_id,
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    job = db.session.get(BackgroundJob, job_id)
+    if job is not None:
+        db.session.refresh(job)
+    return bool(updated)
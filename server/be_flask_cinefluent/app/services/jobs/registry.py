@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Callable
+
+
+class PermanentJobError(Exception):
+    """Lỗi không thể khắc phục bằng cách chạy lại (dữ liệu không tồn tại, input sai...): bỏ qua retry."""
+
+
+@dataclass(slots=True)
+class JobType:
+    name: str
+    handler: Callable
+    concurrency: int = 1
+    max_attempts: int = 3
+    backoff_seconds: float = 30.0
+    # Gọi một lần khi job thất bại hẳn (hết lượt retry) để cập nhật trạng thái nghiệp vụ
+    on_failure: Callable | None = None
+
+    def retry_delay(self, attempts: int) -> float:
+        return self.backoff_seconds * (2 ** max(0, attempts - 1))
+
+
+_JOB_TYPES: dict[str, JobType] = {}
+
+
+def register_job_type(
+    name: str,
+    concurrency: int = 1,
+    max_attempts: int = 3,
+    backoff_seconds: float = 30.0,
+    on_failure: Callable | None = None,
+):
+    """
+    Đăng ký handler(ctx, payload) -> result cho một loại job.
+    Giới hạn concurrency có thể ghi đè bằng biến môi trường JOBS_CONCURRENCY_<NAME>.
+    """
+
+    def decorator(handler: Callable) -> Callable:
+        env_key = f"JOBS_CONCURRENCY_{name.upper()}"
+        _JOB_TYPES[name] = JobType(
+            name=name,
+            handler=handler,
+            concurrency=max(1, int(os.getenv(env_key, concurrency))),
+            max_attempts=max(1, max_attempts),
+            backoff_seconds=backoff_seconds,
+            on_failure=on_failure,
+        )
+        return handler
+
+    return decorator
+
+
+def get_job_type(name: str) -> JobType:
+    _load_handlers()
+    job_type = _JOB_TYPES.get(name)
+    if job_type is None:
+        raise ValueError(f"Loại job không hợp lệ: {name}")
+    return job_type
+
+
+def list_job_types() -> list[JobType]:
+    _load_handlers()
+    return list(_JOB_TYPES.values())
+
+
+def _load_handlers() -> None:
+    # Import trễ để các service nặng (torch, yt_dlp...) chỉ nạp khi thực sự cần tới job
+    from . import handlers  # noqa: F401
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+
+from ...extensions import db
+from .queue import LEASE_LOST, claim_next_job, mark_job_failed, mark_job_succeeded, recover_stale_jobs, touch_job
+from .registry import PermanentJobError, get_job_type
+
+HEARTBEAT_SECONDS = float(os.getenv("JOBS_HEARTBEAT_SECONDS", "15"))
+# Job RUNNING không có heartbeat quá thời gian này được coi là mất worker và đưa lại vào hàng đợi
+LEASE_SECONDS = float(os.getenv("JOBS_LEASE_SECONDS", "120"))
+POLL_SECONDS = float(os.getenv("JOBS_POLL_SECONDS", "1"))
+
+
+class JobContext:
+    """Truyền vào handler: báo tiến độ (lưu DB -> relay socketio ở web process) và đọc thông tin job."""
+
+    def __init__(self, job) -> None:
+        self.job_id = job.id
+        self.job_type = job.job_type
+        self.attempt = job.attempts
+        self.created_by = job.created_by
+        self.worker_id = job.locked_by
+        self.last_progress = None
+
+    def report(self, progress: dict) -> None:
+        self.last_progress = progress
+        touch_job(self.job_id, self.worker_id, progress=progress)
+
+
+class _Heartbeat:
+    """Thread gửi heartbeat định kỳ trong lúc handler chạy lâu mà không báo tiến độ (vd. inference AI)."""
+
+    def __init__(self, app, job_id: int, worker_id: str) -> None:
+        self._app = app
+        self._job_id = job_id
+        self._worker_id = worker_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-heartbeat-{job_id}", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join(timeout=HEARTBEAT_SECONDS)
+
+    def _run(self) -> None:
+        with self._app.app_context():
+            while not self._stop.wait(HEARTBEAT_SECONDS):
+                try:
+                    touch_job(self._job_id, self._worker_id)
+                except Exception as e:
+                    print(f"⚠️ [JOBS] Heartbeat failed for job {self._job_id}: {e}")
+
+
+def _format_error(error: Exception) -> str:
+    detail = str(error).strip()
+    return f"{type(error).__name__}: {detail}" if detail else type(error).__name__
+
+
+def _notify_failure(definition, job) -> None:
+    if definition.on_failure is None:
+        return
+    try:
+        definition.on_failure(job.payload, job.error_message or "")
+    except Exception:
+        db.session.rollback()
+        print(f"❌ [JOBS] on_failure hook error for job {job.id}")
+        print(traceback.format_exc())
+
+
+def execute_job(app, job) -> str:
+    definition = get_job_type(job.job_type)
+    context = JobContext(job)
+    payload = dict(job.payload or {})
+    print(f"▶️ [JOBS] Start job {job.id} ({job.job_type}) attempt {job.attempts}/{job.max_attempts}")
+
+    try:
+        with _Heartbeat(app, job.id, context.worker_id):
+            result = definition.handler(context, payload)
+    except Exception as e:
+        db.session.rollback()
+        message = _format_error(e)
+        print(f"❌ [JOBS] Job {job.id} ({job.job_type}) failed: {message}")
+        print(traceback.format_exc())
+        status = mark_job_failed(job.id, context.worker_id, message, retry=not isinstance(e, PermanentJobError))
+        if status == "FAILED":
+            _notify_failure(definition, job)
+        elif status == LEASE_LOST:
+            print(f"⚠️ [JOBS] Job {job.id} ({job.job_type}) lease lost, dropping failure from worker {context.worker_id}")
+        return status
+
+    final_progress = context.last_progress
+    if not final_progress or final_progress.get("status") != "completed":
+        final_progress = {"status": "completed", "message": "Hoàn tất."}
+    if not mark_job_succeeded(
+        job.id, context.worker_id, result if isinstance(result, dict) else None, progress=final_progress
+    ):
+        print(f"⚠️ [JOBS] Job {job.id} ({job.job_type}) lease lost, dropping result from worker {context.worker_id}")
+        return LEASE_LOST
+    print(f"✅ [JOBS] Job {job.id} ({job.job_type}) succeeded")
+    return "SUCCEEDED"
+
+
+def run_worker(app, job_types: list[str] | None = None, worker_id: str | None = None, stop_event=None) -> None:
+    """Vòng lặp worker: nhận job theo giới hạn concurrency, chạy, ghi kết quả; định kỳ thu hồi job mất worker."""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    stop_event = stop_event or threading.Event()
+    last_recovery = 0.0
+
+    with app.app_context():
+        print(f"🚀 [JOBS] Worker {worker_id} started (types: {', '.join(job_types) if job_types else 'all'})")
+        while not stop_event.is_set():
+            try:
+                if time.monotonic() - last_recovery > HEARTBEAT_SECONDS:
+                    last_recovery = time.monotonic()
+                    for failed_job in recover_stale_jobs(LEASE_SECONDS):
+                        _notify_failure(get_job_type(failed_job.job_type), failed_job)
+
+                job = claim_next_job(worker_id, job_types)
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️ [JOBS] Worker {worker_id} poll error: {e}")
+                job = None
+
+            if job is None:
+                stop_event.wait(POLL_SECONDS)
+                continue
+
+            execute_job(app, job)
+            db.session.remove()
+
+        print(f"🛑 [JOBS] Worker {worker_id} stopped")
+
+
+def _worker_process_main(job_types: list[str] | None, config_name: str) -> None:
+    from ... import create_app
+
+    stop_event = threading.Event()
+    # SIGTERM (docker stop): làm xong job hiện tại rồi thoát
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    run_worker(create_app(config_name), job_types=job_types, stop_event=stop_event)
+
+
+def run_worker_pool(processes: int = 2, job_types: list[str] | None = None, config_name: str = "default") -> None:
+    """Chạy N worker process độc lập với web process (mỗi process tự tạo app và connection pool)."""
+    ctx = multiprocessing.get_context("spawn")
+    workers = [
+        ctx.Process(target=_worker_process_main, args=(job_types, config_name), name=f"job-worker-{index}")
+        for index in range(max(1, processes))
+    ]
+    for process in workers:
+        process.start()
+
+    def _shutdown(*_):
+        for process in workers:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        _shutdown()
+        for process in workers:
+            process.join()
@@ -1,9 +1,34 @@
 import os
 import json
+import threading
 import numpy as np
 import onnxruntime as ort
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime
 
+from .dkt_batcher import DKTMicroBatcher, DKTServingSettings, has_dynamic_batch
+
+
+# Số user giữ kết quả dự đoán (và hidden state nếu có graph stateful) trong RAM
+DKT_CACHE_SIZE = int(os.getenv("DKT_CACHE_SIZE", "4096"))
+
+
+@dataclass(slots=True)
+class _UserPrediction:
+    """Kết quả DKT của một user tại một phiên bản lịch sử (interaction_count)."""
+
+    version: int
+    prob_vector: np.ndarray | None
+    # (h, c) của LSTM sau tương tác cuối, chỉ có khi chạy bằng graph stateful
+    hidden: tuple | None = None
+
+
+def _readonly(array):
+    array.setflags(write=False)
+    return array
+
+
 class DKTInferenceSingleton:
     """
     Class Singleton chịu trách nhiệm nạp mô hình ONNX một lần duy nhất vào RAM
@@ -20,58 +45,172 @@ class DKTInferenceSingleton:
     def _initialize(self):
         base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         model_path = os.path.join(base_dir, 'storage', 'cinefluent_dkt.onnx')
-        
+        stateful_path = os.getenv(
+            "DKT_STATEFUL_MODEL_PATH",
+            os.path.join(base_dir, 'storage', 'cinefluent_dkt_stateful.onnx'),
+        )
+
         self.max_seq_len = 100  # Khớp với MAX_SEQ_LEN lúc Train trên Colab
-        
+        self.settings = DKTServingSettings.from_env()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.batcher = None
+
         try:
             # ExecutionProvider giúp chạy nhẹ trên CPU của VPS/Server
-            self.session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+            self.session = ort.InferenceSession(
+                model_path, sess_options=self.settings.session_options(), providers=['CPUExecutionProvider']
+            )
             print(f"[CineFluent AI] Da nap thanh cong bo nao DKT tu: {model_path}")
         except Exception as e:
             print(f"[CineFluent AI] Loi nap mo hinh DKT: {str(e)}")
             self.session = None
 
-    def predict_probabilities(self, history_sequence):
+        if self.session is not None and self.settings.max_batch > 1:
+            if has_dynamic_batch(self.session):
+                self.batcher = DKTMicroBatcher(self.session, self.settings)
+            else:
+                print("[CineFluent AI] Graph DKT co batch co dinh = 1, bo qua micro-batching (xuat lai bang train_dkt_colab.py)")
+
+        # Graph stateful (train_dkt_colab.py, EXPORT_STATEFUL): nhận/trả hidden state của LSTM,
+        # trục thời gian động nên một lần trả lời mới chỉ tốn một bước thay vì replay 100 bước
+        self.stateful_session = None
+        self.hidden_dim = None
+        if os.getenv("DKT_STATEFUL", "1") != "0" and os.path.exists(stateful_path):
+            try:
+                self.stateful_session = ort.InferenceSession(
+                    stateful_path, sess_options=self.settings.session_options(), providers=['CPUExecutionProvider']
+                )
+                self.hidden_dim = int(self.stateful_session.get_inputs()[2].shape[-1])
+                print(f"[CineFluent AI] Da nap graph DKT stateful tu: {stateful_path}")
+            except Exception as e:
+                print(f"[CineFluent AI] Loi nap graph DKT stateful: {str(e)}")
+                self.stateful_session = None
+
+    def predict_probabilities(self, history_sequence, user_id=None, version=None):
         """
         Đưa chuỗi tương tác trong quá khứ của User vào ONNX để dự đoán TẤT CẢ các thẻ.
         - history_sequence: list chứa các cặp `[tag_id, is_correct]`
         VD: [[10, 1], [15, 0], [12, 1]]
+        - user_id + version (interaction_count của UserKnowledgeState): có thì kết quả được cache theo
+          (user_id, version), các lần predict giữa hai lần trả lời không chạy lại mô hình.
+        Mảng trả về dùng chung giữa các request nên chỉ đọc.
         """
-        if self.session is None:
+        if self.session is None and self.stateful_session is None:
             return None # Trả về None để API bên ngoài tự xử lý fail-safe
 
-        seq_len = len(history_sequence)
-        
-        # Nếu chuỗi quá dài 100, cắt lấy 100 cái mới nhất
-        if seq_len > self.max_seq_len:
-            history_sequence = history_sequence[-self.max_seq_len:]
-            seq_len = self.max_seq_len
+        if user_id is None or version is None:
+            return self._predict_window(history_sequence)
 
-        # Tạo mảng rỗng (Padding bằng số 0)
-        tags = np.zeros(self.max_seq_len, dtype=np.int64)
-        answers = np.zeros(self.max_seq_len, dtype=np.int64)
+        key = str(user_id)
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                if entry.version == version and entry.prob_vector is not None:
+                    return entry.prob_vector
 
-        # Trút dữ liệu thật vào
-        for i, (t, a) in enumerate(history_sequence):
-            tags[i] = t
-            answers[i] = a
+        entry = self._advance(entry, history_sequence, version)
+        with self._cache_lock:
+            current = self._cache.get(key)
+            # Request chậm mang phiên bản cũ không được ghi đè kết quả mới hơn
+            if current is None or current.version <= version:
+                self._cache[key] = entry
+                self._cache.move_to_end(key)
+                while len(self._cache) > DKT_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return entry.prob_vector
+
+    def invalidate_user(self, user_id):
+        """
+        Gọi sau khi lịch sử của user thay đổi (/api/kt/update_state): bỏ kết quả đã cache.
+        Hidden state được giữ lại để lần predict sau chỉ chạy thêm các tương tác mới.
+        """
+        key = str(user_id)
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return
+            if entry.hidden is None:
+                self._cache.pop(key, None)
+            else:
+                entry.prob_vector = None
+
+    def _advance(self, entry, history_sequence, version):
+        window = history_sequence[-self.max_seq_len:]
+        if self.stateful_session is None or not window:
+            return _UserPrediction(version=version, prob_vector=self._predict_window(history_sequence))
+
+        new_steps = version - entry.version if entry is not None else 0
+        # Chạy tiếp từ snapshot khi biết chính xác các tương tác mới (nằm ở đuôi history).
+        # Chỉ khi lịch sử còn ngắn hơn max_seq_len: từ đó trở đi cửa sổ trượt bỏ các tương tác cũ,
+        # hidden state nối tiếp sẽ còn mang chúng nên phải replay cửa sổ để khớp mô hình windowed
+        if (
+            entry is not None
+            and entry.hidden is not None
+            and 0 < new_steps <= len(window)
+            and len(history_sequence) < self.max_seq_len
+        ):
+            prob_vector, hidden = self._run_stateful(window[-new_steps:], entry.hidden)
+            return _UserPrediction(version, prob_vector, hidden)
+
+        prob_vector, hidden = self._run_stateful(window, None)
+        return _UserPrediction(version, prob_vector, hidden)
+
+    def _run_stateful(self, steps, hidden):
+        pairs = np.asarray(steps, dtype=np.int64).reshape(-1, 2)
+        if hidden is None:
+            zeros = np.zeros((1, 1, self.hidden_dim), dtype=np.float32)
+            hidden = (zeros, zeros)
 
-        # Nặn dữ liệu về đúng Format (1, 100) mà Colab yêu cầu
         ort_inputs = {
-            'question_seq': np.expand_dims(tags, axis=0),
-            'answer_seq': np.expand_dims(answers, axis=0)
+            'question_seq': np.ascontiguousarray(pairs[None, :, 0]),
+            'answer_seq': np.ascontiguousarray(pairs[None, :, 1]),
+            'h0': hidden[0],
+            'c0': hidden[1],
         }
+        preds, h_n, c_n = self.stateful_session.run(None, ort_inputs)
+        return _readonly(preds[0, -1]), (h_n, c_n)
 
-        # Gọi linh hồn ONNX suy luận!
-        ort_outs = self.session.run(None, ort_inputs)
-        preds = ort_outs[0] # output shape: (1, 100, NUM_TAGS)
+    def _predict_window(self, history_sequence):
+        # Nếu chuỗi quá dài 100, cắt lấy 100 cái mới nhất
+        window = history_sequence[-self.max_seq_len:]
+        seq_len = len(window)
+
+        if self.session is None:
+            # Chỉ có graph stateful: chuỗi rỗng tương đương một bước padding (0, 0) như mô hình cũ
+            return self._run_stateful(window or [(0, 0)], None)[0]
+
+        # Nặn dữ liệu về đúng Format (100,) mà Colab yêu cầu, phần thiếu Padding bằng số 0
+        tags = np.zeros(self.max_seq_len, dtype=np.int64)
+        answers = np.zeros(self.max_seq_len, dtype=np.int64)
+        if seq_len:
+            pairs = np.asarray(window, dtype=np.int64).reshape(-1, 2)
+            tags[:seq_len] = pairs[:, 0]
+            answers[:seq_len] = pairs[:, 1]
 
         # Lấy Mảng xác suất ở đuôi của chuỗi (mốc thời gian hiện tại)
         # Để phán đoán cho Tương lai (step N+1)
         valid_idx = max(0, seq_len - 1)
-        prob_vector = preds[0, valid_idx] # Mảng 1 chiều chứa Xác suất 1D: [0.3, 0.9, 0.45...]
 
-        return prob_vector
+        if self.batcher is not None:
+            # Gộp với request của user khác thành một lần chạy (B, 100)
+            return self.batcher.predict(tags, answers, valid_idx)
+
+        # Gọi linh hồn ONNX suy luận!
+        ort_outs = self.session.run(None, {'question_seq': tags[None], 'answer_seq': answers[None]})
+        preds = ort_outs[0] # output shape: (1, 100, NUM_TAGS)
+        return _readonly(preds[0, valid_idx]) # Mảng 1 chiều chứa Xác suất 1D: [0.3, 0.9, 0.45...]
+
+    def serving_metrics(self):
+        metrics = {
+            "cached_users": len(self._cache),
+            "stateful": self.stateful_session is not None,
+            "micro_batching": self.batcher is not None,
+        }
+        if self.batcher is not None:
+            metrics["batcher"] = self.batcher.metrics()
+        return metrics
 
     def calculate_decay_score(self, mastery_score, last_practiced_at, interval_days):
         """
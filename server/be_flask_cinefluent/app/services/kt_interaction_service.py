@@ -0,0 +1,337 @@
+"""
+Lịch sử trả lời DKT trên bảng kt_interactions (append-only).
+
+- record_kt_answer_service: một lần trả lời = thêm một dòng kt_interactions + tăng interaction_count
+  + cập nhật SRS + đánh dấu tag đã khám phá, tất cả trong MỘT commit. Mặc định (WRITE_BEHIND_MODE=buffer)
+  câu trả lời được gộp theo user trong RAM và ghi theo lô bằng upsert (xem write_behind.py);
+  pending_kt_answers cho phép đọc lại ngay phần chưa flush.
+- get_recent_interactions: 100 câu gần nhất của user lấy từ ring buffer trong RAM; khi
+  interaction_count tăng chỉ đọc thêm các dòng có id lớn hơn dòng cuối đã biết.
+- iter_kt_interactions: đọc tuần tự theo (user_id, id) để export dữ liệu train.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import func, insert, select
+
+from ..extensions import db
+from ..models.models_model import GrammarTag, KTInteraction, UserDiscoveredTag, UserKnowledgeState, UserTagMastery
+from ..utils.sql_upsert import build_upsert
+from .write_behind import register_write_behind_buffer
+
+
+# Khớp với max_seq_len của DKTInferenceSingleton (MAX_SEQ_LEN lúc train)
+KT_HISTORY_LENGTH = 100
+KT_HISTORY_CACHE_SIZE = int(os.getenv("KT_HISTORY_CACHE_SIZE", "4096"))
+
+
+class InteractionRing:
+    """
+    Ring buffer cố định KT_HISTORY_LENGTH cặp (tag_id, is_correct) dạng int32.
+    Không sửa tại chỗ: extended() trả bản mới nên request khác đang đọc bản cũ không bị ảnh hưởng.
+    """
+
+    __slots__ = ("version", "last_id", "_data", "_start", "_size")
+
+    def __init__(self, capacity: int = KT_HISTORY_LENGTH, version: int = 0, last_id: int = 0) -> None:
+        self.version = version
+        self.last_id = last_id
+        self._data = np.zeros((capacity, 2), dtype=np.int32)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _push(self, tag_id: int, is_correct: int) -> None:
+        capacity = len(self._data)
+        self._data[(self._start + self._size) % capacity] = (tag_id, is_correct)
+        if self._size < capacity:
+            self._size += 1
+        else:
+            self._start = (self._start + 1) % capacity
+
+    def extended(self, rows, version: int) -> "InteractionRing":
+        """rows: (id, tag_id, is_correct) theo id tăng dần."""
+        ring = InteractionRing(len(self._data), version, self.last_id)
+        ring._data[:] = self._data
+        ring._start, ring._size = self._start, self._size
+        for interaction_id, tag_id, is_correct in rows:
+            ring._push(tag_id, int(is_correct))
+            ring.last_id = interaction_id
+        return ring
+
+    def pairs(self) -> list:
+        """Các cặp [tag_id, is_correct] từ cũ đến mới (cùng định dạng latent_state trước đây)."""
+        end = self._start + self._size
+        capacity = len(self._data)
+        if end <= capacity:
+            ordered = self._data[self._start:end]
+        else:
+            ordered = np.concatenate((self._data[self._start:], self._data[:end - capacity]))
+        return ordered.tolist()
+
+
+_RINGS: OrderedDict = OrderedDict()
+_RINGS_LOCK = threading.Lock()
+
+
+def _select_interactions(user_id: str):
+    return select(KTInteraction.id, KTInteraction.tag_id, KTInteraction.is_correct).where(
+        KTInteraction.user_id == user_id
+    )
+
+
+def _load_ring(user_id: str, version: int) -> InteractionRing:
+    rows = db.session.execute(
+        _select_interactions(user_id).order_by(KTInteraction.id.desc()).limit(KT_HISTORY_LENGTH)
+    ).all()
+    return InteractionRing(version=version).extended(reversed(rows), version)
+
+
+def get_recent_interactions(user_id: str, version: int) -> list:
+    """
+    KT_HISTORY_LENGTH câu gần nhất của user. version là interaction_count hiện tại trong DB:
+    trùng với ring đang cache thì không truy vấn, tăng ít thì chỉ đọc phần mới.
+    """
+    user_id = str(user_id)
+    with _RINGS_LOCK:
+        ring = _RINGS.get(user_id)
+        if ring is not None:
+            _RINGS.move_to_end(user_id)
+
+    if ring is not None and ring.version == version:
+        return ring.pairs()
+
+    if ring is None or not 0 < version - ring.version <= KT_HISTORY_LENGTH:
+        ring = _load_ring(user_id, version)
+    else:
+        rows = db.session.execute(
+            _select_interactions(user_id)
+            .where(KTInteraction.id > ring.last_id)
+            .order_by(KTInteraction.id.asc())
+            .limit(KT_HISTORY_LENGTH)
+        ).all()
+        # Số dòng mới phải khớp số lần tăng interaction_count, lệch (dữ liệu sửa tay...) thì nạp lại
+        ring = ring.extended(rows, version) if len(rows) == version - ring.version else _load_ring(user_id, version)
+
+    with _RINGS_LOCK:
+        _RINGS[user_id] = ring
+        _RINGS.move_to_end(user_id)
+        while len(_RINGS) > KT_HISTORY_CACHE_SIZE:
+            _RINGS.popitem(last=False)
+    return ring.pairs()
+
+
+def _next_srs(mastery_score: float, interval_days: float, is_correct: int) -> tuple[float, float]:
+    if is_correct == 1:
+        # Vượt câu: Thưởng 20% Học lực, kéo chuỗi quên ra gấp đôi (Giỏi rồi thì cho lâu quên hơn)
+        return min(100.0, mastery_score + 20.0), interval_days * 2.0
+    # Đuối sức: Giáng chức 15% Học lực, gọt chuỗi quên đi 1 nửa bắt ôn sấp mặt
+    return max(0.0, mastery_score - 15.0), max(1.0, interval_days / 2.0)
+
+
+def _apply_srs(mastery: UserTagMastery, is_correct: int) -> None:
+    mastery.mastery_score, mastery.interval_days = _next_srs(mastery.mastery_score, mastery.interval_days, is_correct)
+    mastery.last_practiced_at = datetime.utcnow()
+
+
+@dataclass(slots=True)
+class PendingAnswers:
+    """Các câu trả lời chưa flush của một user."""
+
+    # [(tag_id, is_correct, answered_at)] theo thứ tự trả lời
+    interactions: list = field(default_factory=list)
+    # tag_id -> (mastery_score, interval_days, last_practiced_at): giá trị tuyệt đối sau SRS
+    masteries: dict = field(default_factory=dict)
+    # tag_id -> (số lần gặp thêm, last_seen_at)
+    discoveries: dict = field(default_factory=dict)
+
+
+def _merge_answers(old: PendingAnswers, new: PendingAnswers) -> PendingAnswers:
+    discoveries = dict(old.discoveries)
+    for tag_id, (count, seen_at) in new.discoveries.items():
+        previous = discoveries.get(tag_id)
+        discoveries[tag_id] = (count, seen_at) if previous is None else (previous[0] + count, max(previous[1], seen_at))
+    return PendingAnswers(
+        interactions=old.interactions + new.interactions,
+        masteries={**old.masteries, **new.masteries},
+        discoveries=discoveries,
+    )
+
+
+def _flush_answers(batch: dict) -> None:
+    """Ghi cả lô: kt_interactions thêm dòng, ba bảng còn lại upsert (một câu lệnh mỗi bảng)."""
+    now = datetime.utcnow()
+    dialect = db.engine.dialect.name
+
+    db.session.execute(
+        insert(KTInteraction.__table__),
+        [
+            {"user_id": user_id, "tag_id": tag_id, "is_correct": bool(is_correct), "created_at": answered_at}
+            for user_id, pending in batch.items()
+            for tag_id, is_correct, answered_at in pending.interactions
+        ],
+    )
+
+    states = UserKnowledgeState.__table__
+    db.session.execute(
+        build_upsert(
+            states,
+            dialect,
+            ["user_id"],
+            ["updated_at"],
+            update_values=lambda inserted: {
+                "interaction_count": func.coalesce(states.c.interaction_count, 0) + inserted["interaction_count"]
+            },
+        ),
+        [
+            {
+                "user_id": user_id,
+                "latent_state": [],
+                "interaction_count": len(pending.interactions),
+                "created_at": now,
+                "updated_at": now,
+            }
+            for user_id, pending in batch.items()
+        ],
+    )
+
+    db.session.execute(
+        build_upsert(
+            UserTagMastery.__table__,
+            dialect,
+            ["user_id", "tag_id"],
+            ["mastery_score", "interval_days", "last_practiced_at", "updated_at"],
+        ),
+        [
+            {
+                "user_id": user_id,
+                "tag_id": tag_id,
+                "mastery_score": score,
+                "interval_days": interval,
+                "last_practiced_at": practiced_at,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for user_id, pending in batch.items()
+            for tag_id, (score, interval, practiced_at) in pending.masteries.items()
+        ],
+    )
+
+    discovered = UserDiscoveredTag.__table__
+    db.session.execute(
+        build_upsert(
+            discovered,
+            dialect,
+            ["user_id", "tag_id"],
+            ["source", "last_seen_at", "updated_at"],
+            update_values=lambda inserted: {
+                "encounter_count": discovered.c.encounter_count + inserted["encounter_count"]
+            },
+        ),
+        [
+            {
+                "user_id": user_id,
+                "tag_id": tag_id,
+                "source": "quiz",
+                "encounter_count": count,
+                "discovered_at": seen_at,
+                "last_seen_at": seen_at,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for user_id, pending in batch.items()
+            for tag_id, (count, seen_at) in pending.discoveries.items()
+        ],
+    )
+
+
+_ANSWERS = register_write_behind_buffer("kt_answers", _merge_answers, _flush_answers)
+
+
+def pending_kt_answers(user_id: str) -> PendingAnswers | None:
+    return _ANSWERS.pending(str(user_id)) if _ANSWERS.enabled else None
+
+
+def _buffer_kt_answer(user_id: str, tag_id: int, is_correct: int):
+    # Tag sai phải bị chặn ngay: lỗi khóa ngoại lúc flush sẽ làm cả lô phải ghi lại từng user
+    if db.session.get(GrammarTag, tag_id) is None:
+        return {"success": False, "error": "Không tìm thấy grammar tag", "code": 404}
+
+    user_id = str(user_id)
+    pending = _ANSWERS.pending(user_id)
+    if pending is not None and tag_id in pending.masteries:
+        score, interval, _ = pending.masteries[tag_id]
+    else:
+        row = db.session.execute(
+            select(UserTagMastery.mastery_score, UserTagMastery.interval_days).where(
+                UserTagMastery.user_id == user_id, UserTagMastery.tag_id == tag_id
+            )
+        ).first()
+        score, interval = (row[0] or 0.0, row[1] or 1.0) if row else (0.0, 1.0)
+
+    now = datetime.utcnow()
+    score, interval = _next_srs(score, interval, is_correct)
+    _ANSWERS.add(
+        user_id,
+        PendingAnswers(
+            interactions=[(tag_id, int(is_correct), now)],
+            masteries={tag_id: (score, interval, now)},
+            discoveries={tag_id: (1, now)},
+        ),
+    )
+    return {"success": True, "data": {"new_mastery": score, "is_correct": bool(is_correct)}}
+
+
+def record_kt_answer_service(user_id: str, tag_id: int, is_correct: int):
+    """Ghi nhận một câu trả lời đúng/sai của user cho tag (một commit duy nhất hoặc gộp vào buffer)."""
+    if _ANSWERS.enabled:
+        return _buffer_kt_answer(user_id, tag_id, is_correct)
+
+    from .learning_tree_service import discover_learning_tag_service
+
+    discovery = discover_learning_tag_service(user_id=user_id, tag_id=tag_id, source='quiz', commit=False)
+    if not discovery.get("success"):
+        db.session.rollback()
+        return discovery
+
+    # --- BƯỚC 1: TRÍ NHỚ MÔ HÌNH AI (DKT HISTORY): chỉ thêm một dòng, không ghi lại cả mảng JSON ---
+    knowledge_state = UserKnowledgeState.query.filter_by(user_id=user_id).first()
+    if not knowledge_state:
+        # Lần đầu tiên ghi nhận user này
+        knowledge_state = UserKnowledgeState(user_id=user_id, latent_state=[], interaction_count=1)
+        db.session.add(knowledge_state)
+    else:
+        # Tăng trong SQL: hai câu trả lời đồng thời không làm mất lượt đếm
+        knowledge_state.interaction_count = UserKnowledgeState.interaction_count + 1
+
+    db.session.add(KTInteraction(user_id=user_id, tag_id=tag_id, is_correct=bool(is_correct)))
+
+    # --- BƯỚC 2: TÍNH ĐIỂM HỌC THUẬT SUPERMEMO (SRS) ---
+    mastery = UserTagMastery.query.filter_by(user_id=user_id, tag_id=tag_id).first()
+    if not mastery:
+        mastery = UserTagMastery(user_id=user_id, tag_id=tag_id, mastery_score=0.0, interval_days=1.0)
+        db.session.add(mastery)
+    _apply_srs(mastery, is_correct)
+
+    # Lưu sạch xuống CSDL
+    db.session.commit()
+
+    return {"success": True, "data": {"new_mastery": mastery.mastery_score, "is_correct": bool(is_correct)}}
+
+
+def iter_kt_interactions(since: datetime | None = None, batch_size: int = 5000):
+    """(user_id, tag_id, is_correct, created_at) theo thứ tự user rồi thời gian, đọc theo từng batch."""
+    stmt = select(KTInteraction.user_id, KTInteraction.tag_id, KTInteraction.is_correct, KTInteraction.created_at)
+    if since is not None:
+        stmt = stmt.where(KTInteraction.created_at >= since)
+    stmt = stmt.order_by(KTInteraction.user_id.asc(), KTInteraction.id.asc()).execution_options(yield_per=batch_size)
+    yield from db.session.execute(stmt)
@@ -177,81 +177,17 @@ def suggest_multiple_categories(title: str, year: str = None):
 
 def translate_batch(texts: list[str], target_lang: str = 'vi') -> list[str]:
     """
-    Dịch danh sách văn bản sang ngôn ngữ đích sử dụng Batch request.
-    Tối ưu hóa tốc độ bằng cách gộp nhiều câu thành 1 request.
+    Dịch danh sách văn bản sang ngôn ngữ đích qua translation engine dùng chung
+    (gộp batch, dịch song song có giới hạn, tra bộ nhớ dịch trước khi gọi API).
     """
     if not texts:
         return []
 
-    from deep_translator import GoogleTranslator
-    import time
-
-    def _translate_with_retry(text, max_retries=3):
-        for attempt in range(max_retries):
-            try:
-                return GoogleTranslator(source='auto', target=target_lang).translate(text)
-            except Exception as e:
-                error_str = str(e)
-                # Check for rate limit errors
-                if '429' in error_str or 'Too Many Requests' in error_str:
-                    if attempt < max_retries - 1:
-                        time.sleep((2 ** attempt) * 1)
-                    else:
-                        raise e
-                else:
-                    raise e
-        return text
+    from .translation import get_translation_engine
 
-    # Tính batch size động
-    total_chars = sum(len(text) for text in texts)
-    avg_chars = total_chars / len(texts) if texts else 50
-    
-    MAX_CHARS_PER_BATCH = 4500
-    SEPARATOR = ' |||SUBTITLE_SEP||| '
-    SEPARATOR_LENGTH = len(SEPARATOR)
-    
-    # Tính batch size tối ưu (tránh quá dài)
-    BATCH_SIZE = int(MAX_CHARS_PER_BATCH / (avg_chars + SEPARATOR_LENGTH))
-    BATCH_SIZE = max(10, min(BATCH_SIZE, 100)) # Giới hạn 10-100 câu/batch
-    
-    results = []
-    
-    for batch_idx in range(0, len(texts), BATCH_SIZE):
-        batch = texts[batch_idx:batch_idx + BATCH_SIZE]
-        
-        try:
-            combined_text = SEPARATOR.join(batch)
-            translated_combined = _translate_with_retry(combined_text)
-            
-            # Tách lại
-            parts = translated_combined.split('|||SUBTITLE_SEP|||')
-            parts = [p.strip() for p in parts]
-            
-            # Nếu số lượng không khớp, fallback về dịch từng câu
-            if len(parts) != len(batch):
-                print(f"Batch translation mismatch ({len(parts)} vs {len(batch)}). Fallback to single.")
-                parts = []
-                for text in batch:
-                    try:
-                        parts.append(_translate_with_retry(text))
-                    except:
-                         parts.append(text)
-            
-            results.extend(parts)
-            
-            # Delay nhẹ
-            if batch_idx + BATCH_SIZE < len(texts):
-                time.sleep(0.5)
-                
-        except Exception as e:
-            print(f"Batch translation error: {e}. Fallback to single.")
-            for text in batch:
-                    try:
-                        results.append(_translate_with_retry(text))
-                    except:
-                        results.append(text) # Giữ nguyên nếu lỗi
-    
-    return results
+    translated = get_translation_engine(target=target_lang, source='auto').translate_many(texts)
+    # Giữ nguyên câu gốc nếu dịch lỗi
+    return [vi_text if vi_text is not None else text for text, vi_text in zip(texts, translated)]
 
 
 def generate_flashcard_exercises_service(flashcards: list[dict]):
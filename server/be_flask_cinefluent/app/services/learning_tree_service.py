@@ -8,10 +8,8 @@ from ..models.models_model import (
     GrammarBranch,
     GrammarTag,
     UserDiscoveredTag,
-    UserKnowledgeState,
-    UserTagMastery,
 )
-from ..services.kt_inference_service import dkt_engine
+from ..services.mastery_service import MasteryRecord, get_user_learning_state
 from ..utils.grammar_catalog import DISCOVERY_SOURCE_LABELS, GRAMMAR_TAG_PRESENTATION
 
 
@@ -23,20 +21,7 @@ def _safe_tag_presentation(tag: GrammarTag) -> dict:
     }
 
 
-def _calculate_decayed_mastery(mastery: UserTagMastery | None) -> float:
-    if not mastery:
-        return 0.0
-
-    return float(
-        dkt_engine.calculate_decay_score(
-            mastery.mastery_score,
-            mastery.last_practiced_at,
-            mastery.interval_days,
-        )
-    )
-
-
-def _calculate_review_priority(mastery: UserTagMastery | None, decayed_mastery: float) -> float:
+def _calculate_review_priority(mastery: MasteryRecord | None, decayed_mastery: float) -> float:
     if not mastery:
         return 0.0
 
@@ -58,13 +43,12 @@ def _resolve_node_state(decayed_mastery: float) -> str:
     return "discovered"
 
 
-def _build_history_counts(user_id: str) -> dict[int, int]:
-    knowledge_state = UserKnowledgeState.query.filter_by(user_id=user_id).first()
-    if not knowledge_state or not knowledge_state.latent_state:
+def _build_history_counts(history: list) -> dict[int, int]:
+    if not history:
         return {}
 
     counts: dict[int, int] = defaultdict(int)
-    for item in knowledge_state.latent_state:
+    for item in history:
         if not isinstance(item, (list, tuple)) or not item:
             continue
         try:
@@ -75,7 +59,7 @@ def _build_history_counts(user_id: str) -> dict[int, int]:
     return counts
 
 
-def discover_learning_tag_service(user_id: str, tag_id: int, source: str = "movie"):
+def discover_learning_tag_service(user_id: str, tag_id: int, source: str = "movie", commit: bool = True):
     grammar_tag = GrammarTag.query.get(tag_id)
     if not grammar_tag:
         return {"success": False, "error": "Không tìm thấy grammar tag", "code": 404}
@@ -98,7 +82,9 @@ def discover_learning_tag_service(user_id: str, tag_id: int, source: str = "movi
         )
         db.session.add(discovered)
 
-    db.session.commit()
+    # commit=False: caller gộp vào transaction của mình (vd. /api/kt/update_state)
+    if commit:
+        db.session.commit()
 
     presentation = _safe_tag_presentation(grammar_tag)
     return {
@@ -127,10 +113,13 @@ def get_learning_tree_service(user_id: str):
         .order_by(UserDiscoveredTag.discovered_at.asc(), UserDiscoveredTag.id.asc())
         .all()
     )
-    mastery_rows = UserTagMastery.query.filter_by(user_id=user_id).all()
-    mastery_map = {row.tag_id: row for row in mastery_rows}
+    learning_state = get_user_learning_state(user_id)
+    mastery_rows = learning_state.masteries.records
+    mastery_map = learning_state.masteries.by_tag
+    # Điểm suy giảm của mọi tag tính một lượt (vector hóa), cùng đường với /api/kt/predict
+    decayed_map = learning_state.masteries.decayed_map()
     discovered_map = {row.tag_id: row for row in discovered_rows}
-    history_counts = _build_history_counts(user_id)
+    history_counts = _build_history_counts(learning_state.history)
 
     total_tags_by_branch: dict[int, int] = defaultdict(int)
     for tag in grammar_tags:
@@ -158,7 +147,7 @@ def get_learning_tree_service(user_id: str):
             continue
 
         mastery = mastery_map.get(tag.id)
-        decayed_mastery = _calculate_decayed_mastery(mastery)
+        decayed_mastery = decayed_map.get(tag.id, 0.0)
         review_priority = _calculate_review_priority(mastery, decayed_mastery)
         node_state = _resolve_node_state(decayed_mastery)
         presentation = _safe_tag_presentation(tag)
@@ -196,7 +185,7 @@ def get_learning_tree_service(user_id: str):
         if not tag or not tag.branch_id or tag.branch_id not in branch_payload:
             continue
 
-        decayed_mastery = _calculate_decayed_mastery(mastery)
+        decayed_mastery = decayed_map[mastery.tag_id]
         review_priority = _calculate_review_priority(mastery, decayed_mastery)
         node_state = _resolve_node_state(decayed_mastery)
         presentation = _safe_tag_presentation(tag)
@@ -0,0 +1,187 @@
+"""
+Đọc trạng thái học của user cho DKT/SRS: lịch sử DKT (kt_interactions) + toàn bộ UserTagMastery.
+
+Mastery của user được nạp bằng một truy vấn và giữ dạng mảng NumPy, cache theo
+(user_id, interaction_count): /api/kt/update_state tăng interaction_count cùng transaction với
+việc sửa mastery nên process khác tự thấy phiên bản mới. Điểm suy giảm theo thời gian
+(calculate_decay_score) tính vector hóa lúc đọc vì phụ thuộc thời điểm hiện tại.
+Câu trả lời còn nằm trong buffer write-behind được phủ lên trên (không cache) để user thấy ngay.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+
+from ..extensions import db
+from ..models.models_model import UserKnowledgeState, UserTagMastery
+from .kt_interaction_service import KT_HISTORY_LENGTH, get_recent_interactions, pending_kt_answers
+
+
+MASTERY_CACHE_SIZE = int(os.getenv("MASTERY_CACHE_SIZE", "4096"))
+# Trừ bấy nhiêu điểm cho mỗi ngày quá hạn interval_days (cùng quy tắc với calculate_decay_score)
+DECAY_POINTS_PER_OVERDUE_DAY = 5.0
+
+
+@dataclass(slots=True, frozen=True)
+class MasteryRecord:
+    """Bản chỉ đọc của một dòng UserTagMastery (cùng tên field với model)."""
+
+    tag_id: int
+    mastery_score: float
+    interval_days: float
+    last_practiced_at: datetime | None
+    created_at: datetime | None
+
+
+def calculate_decay_scores(scores: np.ndarray, intervals: np.ndarray, last_practiced_at: np.ndarray, now: datetime | None = None) -> np.ndarray:
+    """
+    Bản vector hóa của dkt_engine.calculate_decay_score.
+    - last_practiced_at: mảng datetime64 (NaT nếu chưa luyện lần nào, khi đó giữ nguyên điểm)
+    """
+    now = np.datetime64(now or datetime.utcnow(), "us")
+    days_passed = (now - last_practiced_at) / np.timedelta64(1, "D")
+    decayed = np.maximum(0.0, scores - (days_passed - intervals) * DECAY_POINTS_PER_OVERDUE_DAY)
+    # Chưa quá hạn interval_days (hoặc chưa có mốc luyện tập) thì chưa quên
+    return np.where(np.isnan(days_passed) | (days_passed < intervals), scores, decayed)
+
+
+@dataclass(slots=True)
+class UserMasteries:
+    user_id: str
+    version: int
+    records: tuple
+    by_tag: dict
+    scores: np.ndarray
+    intervals: np.ndarray
+    last_practiced_at: np.ndarray
+
+    def decayed_scores(self, now: datetime | None = None) -> np.ndarray:
+        """Điểm sau suy giảm, cùng thứ tự với records."""
+        return calculate_decay_scores(self.scores, self.intervals, self.last_practiced_at, now)
+
+    def decayed_map(self, now: datetime | None = None) -> dict[int, float]:
+        return dict(zip((record.tag_id for record in self.records), self.decayed_scores(now).tolist()))
+
+    def decayed_for(self, tag_ids, now: datetime | None = None) -> list[float]:
+        """Điểm sau suy giảm cho từng tag được hỏi; tag user chưa từng gặp là 0.0."""
+        decayed = self.decayed_map(now)
+        return [decayed.get(tag_id, 0.0) for tag_id in tag_ids]
+
+
+@dataclass(slots=True)
+class UserLearningState:
+    history: list
+    version: int
+    masteries: UserMasteries
+
+
+_MASTERIES: OrderedDict = OrderedDict()
+_MASTERIES_LOCK = threading.Lock()
+
+
+def _build_masteries(user_id: str, version: int, records) -> UserMasteries:
+    records = tuple(records)
+    return UserMasteries(
+        user_id=user_id,
+        version=version,
+        records=records,
+        by_tag={record.tag_id: record for record in records},
+        scores=np.array([record.mastery_score for record in records], dtype=np.float64),
+        intervals=np.array([record.interval_days for record in records], dtype=np.float64),
+        last_practiced_at=np.array([record.last_practiced_at for record in records], dtype="datetime64[us]"),
+    )
+
+
+def _load_masteries(user_id: str, version: int) -> UserMasteries:
+    rows = db.session.execute(
+        select(
+            UserTagMastery.tag_id,
+            UserTagMastery.mastery_score,
+            UserTagMastery.interval_days,
+            UserTagMastery.last_practiced_at,
+            UserTagMastery.created_at,
+        )
+        .where(UserTagMastery.user_id == user_id)
+        .order_by(UserTagMastery.id.asc())
+    ).all()
+
+    return _build_masteries(
+        user_id,
+        version,
+        (
+            MasteryRecord(
+                tag_id=tag_id,
+                mastery_score=float(score if score is not None else 0.0),
+                interval_days=float(interval if interval is not None else 1.0),
+                last_practiced_at=last_practiced_at,
+                created_at=created_at,
+            )
+            for tag_id, score, interval, last_practiced_at, created_at in rows
+        ),
+    )
+
+
+def _overlay_masteries(masteries: UserMasteries, pending: dict, version: int) -> UserMasteries:
+    """pending: tag_id -> (mastery_score, interval_days, last_practiced_at) chưa flush."""
+    records = []
+    for record in masteries.records:
+        if record.tag_id in pending:
+            score, interval, practiced_at = pending[record.tag_id]
+            record = MasteryRecord(record.tag_id, score, interval, practiced_at, record.created_at)
+        records.append(record)
+    for tag_id, (score, interval, practiced_at) in pending.items():
+        if tag_id not in masteries.by_tag:
+            records.append(MasteryRecord(tag_id, score, interval, practiced_at, practiced_at))
+    return _build_masteries(masteries.user_id, version, records)
+
+
+def get_user_masteries(user_id: str, version: int) -> UserMasteries:
+    user_id = str(user_id)
+    with _MASTERIES_LOCK:
+        masteries = _MASTERIES.get(user_id)
+        if masteries is not None:
+            _MASTERIES.move_to_end(user_id)
+    if masteries is not None and masteries.version == version:
+        return masteries
+
+    masteries = _load_masteries(user_id, version)
+    with _MASTERIES_LOCK:
+        _MASTERIES[user_id] = masteries
+        _MASTERIES.move_to_end(user_id)
+        while len(_MASTERIES) > MASTERY_CACHE_SIZE:
+            _MASTERIES.popitem(last=False)
+    return masteries
+
+
+def get_user_learning_state(user_id: str) -> UserLearningState:
+    """
+    Một truy vấn interaction_count; lịch sử (ring buffer kt_interactions) và mastery lấy từ cache
+    nếu phiên bản chưa đổi.
+    """
+    version = db.session.execute(
+        select(UserKnowledgeState.interaction_count).where(UserKnowledgeState.user_id == user_id)
+    ).scalar()
+    version = int(version or 0)
+    history = get_recent_interactions(user_id, version) if version else []
+    masteries = get_user_masteries(user_id, version)
+
+    # Đọc buffer SAU khi đọc DB: flush xen giữa chỉ làm thiếu tạm thời, không đếm trùng câu trả lời
+    pending = pending_kt_answers(user_id)
+    if pending is not None and pending.interactions:
+        history = (history + [[tag_id, is_correct] for tag_id, is_correct, _ in pending.interactions])[-KT_HISTORY_LENGTH:]
+        version += len(pending.interactions)
+        masteries = _overlay_masteries(masteries, pending.masteries, version)
+    return UserLearningState(history=history, version=version, masteries=masteries)
+
+
+def invalidate_user_masteries(user_id: str) -> None:
+    """Gọi sau khi commit thay đổi mastery của user trong process này."""
+    with _MASTERIES_LOCK:
+        _MASTERIES.pop(str(user_id), None)
@@ -1,46 +1,55 @@
+import hashlib
 import json
 import os
-import re
 import threading
-from collections import Counter
+import time
+from collections import Counter, OrderedDict
 from pathlib import Path
 
 import numpy as np
-import torch
-import torch.nn as nn
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, AutoConfig
+
+from .grammar_inference import (
+    InferenceSettings,
+    OnnxGrammarRunner,
+    TorchGrammarRunner,
+    create_onnx_session,
+    run_bucketed_inference,
+)
+from .grammar_onnx_export import onnx_model_path
+from .subtitle_timeline_service import invalidate_subtitle_timeline
+from ..utils.subtitle_analysis import (
+    analysis_text_hash,
+    clean_subtitle_text as _clean_subtitle_text,
+    is_analyzable_text,
+)
 
 
 MODEL_NAME = "FacebookAI/xlm-roberta-base"
 MAX_LENGTH = 128
 DEFAULT_MODEL_DIR = "storage/models/grammar_xlm_roberta"
 
-# Load spaCy for automated masking
-import spacy
-try:
-    nlp = spacy.load("en_core_web_sm")
-except:
-    # Fail-safe if model not downloaded
-    nlp = None
+# spaCy (cloze) và torch/transformers chỉ nạp khi thật sự phân tích: process web import module này
+# để cập nhật trạng thái phân tích mà không phải kéo cả stack ML vào bộ nhớ
+_NLP = None
+_NLP_LOADED = False
+_NLP_LOCK = threading.Lock()
 
-_MODEL_BUNDLE = None
+_MODEL_BUNDLES = {}
+_MODEL_VERSIONS = {}
 _MODEL_LOCK = threading.Lock()
+# Tăng khi đổi logic hậu xử lý (cloze, làm sạch câu) để phụ đề cũ được phân tích lại
+ANALYSIS_PIPELINE_VERSION = "grammar_classification_v2+cloze_v1"
 
+CLOZE_DISABLED_PIPES = ("parser", "ner")
+CLOZE_PIPE_BATCH_SIZE = int(os.getenv("MOVIE_AI_CLOZE_BATCH_SIZE", "256"))
+CLOZE_PIPE_PROCESSES = int(os.getenv("MOVIE_AI_CLOZE_PROCESSES", "1"))
+CLOZE_CACHE_SIZE = int(os.getenv("MOVIE_AI_CLOZE_CACHE_SIZE", "50000"))
+# sha1(câu đã làm sạch) -> cloze (hoặc None nếu câu không có động từ để đục lỗ)
+_CLOZE_CACHE: OrderedDict = OrderedDict()
+_CLOZE_CACHE_LOCK = threading.Lock()
 
-# Old XLMRMultiTaskModel removed. Using AutoModelForSequenceClassification instead.
-
-
-def _clean_subtitle_text(text: str) -> str:
-    if not isinstance(text, str):
-        return ""
 
-    text = re.sub(r"<[^>]*>", " ", text)
-    text = re.sub(r"{\\.*?}", " ", text)
-    text = re.sub(r"\[.*?\]", " ", text)
-    text = re.sub(r"\(.*?\)", " ", text)
-    text = text.replace("â™ª", " ")
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+# Old XLMRMultiTaskModel removed. Using AutoModelForSequenceClassification instead.
 
 
 def _resolve_model_dir() -> Path:
@@ -123,45 +132,111 @@ def _normalize_ratios(counter: Counter, ordered_labels: list[str]) -> dict:
     return {label: round(counter.get(label, 0) / total, 4) for label in ordered_labels}
 
 
-def load_movie_ai_bundle():
-    global _MODEL_BUNDLE
+MOVIE_AI_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def get_cloze_nlp():
+    """spaCy en_core_web_sm cho bước đục lỗ, nạp một lần cho mỗi process (None nếu chưa cài model)."""
+    global _NLP, _NLP_LOADED
+
+    if _NLP_LOADED:
+        return _NLP
 
-    if _MODEL_BUNDLE is not None:
-        return _MODEL_BUNDLE
+    with _NLP_LOCK:
+        if not _NLP_LOADED:
+            try:
+                import spacy
+
+                _NLP = spacy.load("en_core_web_sm")
+            except Exception:
+                # Fail-safe if model not downloaded
+                _NLP = None
+            _NLP_LOADED = True
+    return _NLP
+
+
+def _resolve_backend(backend: str | None) -> str:
+    backend = (backend or os.getenv("MOVIE_AI_BACKEND", "torch")).strip().lower()
+    if backend not in MOVIE_AI_BACKENDS:
+        raise ValueError(f"MOVIE_AI_BACKEND khong hop le: {backend} (chon {', '.join(MOVIE_AI_BACKENDS)})")
+    return backend
+
+
+def load_movie_ai_bundle(backend: str | None = None):
+    """
+    Nạp grammar classifier một lần cho mỗi backend:
+    - torch: model PyTorch fp32 (transformers)
+    - onnx / onnx-int8: graph xuất bởi `flask movie-ai-export-onnx`, không nạp model PyTorch
+    """
+    backend = _resolve_backend(backend)
+    bundle = _MODEL_BUNDLES.get(backend)
+    if bundle is not None:
+        return bundle
 
     with _MODEL_LOCK:
-        if _MODEL_BUNDLE is not None:
-            return _MODEL_BUNDLE
+        bundle = _MODEL_BUNDLES.get(backend)
+        if bundle is not None:
+            return bundle
+
+        from transformers import AutoTokenizer
 
         model_dir = _resolve_model_dir()
         grammar_id_to_label = _load_grammar_label_map(model_dir)
+        inference_settings = InferenceSettings.from_env(max_length=MAX_LENGTH)
 
         tokenizer = AutoTokenizer.from_pretrained(str(model_dir), local_files_only=True)
-        model = AutoModelForSequenceClassification.from_pretrained(str(model_dir), local_files_only=True)
-
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        model.to(device)
-        model.eval()
 
-        _MODEL_BUNDLE = {
+        if backend == "torch":
+            # torch chỉ nạp cho backend torch: process chạy ONNX không phải kéo cả libtorch vào RAM
+            import torch
+            from transformers import AutoModelForSequenceClassification
+
+            model = AutoModelForSequenceClassification.from_pretrained(str(model_dir), local_files_only=True)
+
+            device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            model.to(device)
+            model.eval()
+            runner = TorchGrammarRunner(model, device)
+            model_path = model_dir
+        else:
+            model_path = onnx_model_path(model_dir, quantized=backend == "onnx-int8")
+            if not model_path.exists():
+                raise FileNotFoundError(
+                    f"Chua co file ONNX {model_path}. Chay `flask movie-ai-export-onnx` truoc khi dung backend {backend}."
+                )
+            model = None
+            # onnxruntime chỉ chạy CPUExecutionProvider: device để dạng chuỗi cho metadata/log
+            device = "cpu"
+            runner = OnnxGrammarRunner(create_onnx_session(model_path, num_threads=inference_settings.num_threads))
+
+        bundle = {
+            "backend": backend,
             "model_dir": str(model_dir),
+            "model_path": str(model_path),
             "model_name": MODEL_NAME,
             "device": device,
             "tokenizer": tokenizer,
             "model": model,
+            "runner": runner,
+            "inference_settings": inference_settings,
             "grammar_id_to_label": grammar_id_to_label,
         }
-        return _MODEL_BUNDLE
+        _MODEL_BUNDLES[backend] = bundle
+        return bundle
 
 
 def generate_cloze_data(text: str):
     """
     Sá»­ dá»¥ng spaCy Ä‘á»ƒ tá»± Ä‘á»™ng Ä‘á»¥c lá»— Äá»™ng tá»« chÃ­nh vÃ  táº¡o Ä‘Ã¡p Ã¡n nhiá»…u.
     """
+    nlp = get_cloze_nlp()
     if not nlp:
         return None
 
-    doc = nlp(text)
+    return _build_cloze_from_doc(nlp(text, disable=_cloze_disabled_pipes(nlp)), text)
+
+
+def _build_cloze_from_doc(doc, text: str):
     # TÃ¬m Ä‘á»™ng tá»« chÃ­nh (thÆ°á»ng lÃ  VERB, khÃ´ng pháº£i AUX)
     verbs = [token for token in doc if token.pos_ == "VERB" and not token.is_stop]
     if not verbs:
@@ -198,94 +273,203 @@ def generate_cloze_data(text: str):
         "cloze_type": "grammar_verb"
     }
 
-def _predict_grammar_only(cleaned_rows: list[dict], batch_size: int = 16) -> list[dict]:
+
+def _cloze_disabled_pipes(nlp) -> list[str]:
+    # Cloze chỉ đọc pos_, lemma_, is_stop: bỏ parser và NER (chiếm phần lớn thời gian của en_core_web_sm)
+    return [name for name in CLOZE_DISABLED_PIPES if name in nlp.pipe_names]
+
+
+def _copy_cloze(cloze):
+    if cloze is None:
+        return None
+    return {**cloze, "distractors": list(cloze["distractors"])}
+
+
+def generate_cloze_data_batch(texts: list[str], batch_size: int | None = None, n_process: int | None = None) -> list:
+    """
+    Sinh cloze cho nhiều câu: nlp.pipe theo batch (tắt parser/NER), câu trùng nhau
+    (trong phim hoặc giữa các lần phân tích) lấy lại từ cache theo hash nội dung.
+    """
+    nlp = get_cloze_nlp()
+    if not nlp:
+        return [None] * len(texts)
+
+    batch_size = batch_size or CLOZE_PIPE_BATCH_SIZE
+    n_process = n_process or CLOZE_PIPE_PROCESSES
+
+    results = [None] * len(texts)
+    pending: dict[str, list[int]] = {}
+    with _CLOZE_CACHE_LOCK:
+        for index, text in enumerate(texts):
+            key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+            if key in _CLOZE_CACHE:
+                _CLOZE_CACHE.move_to_end(key)
+                results[index] = _copy_cloze(_CLOZE_CACHE[key])
+            else:
+                pending.setdefault(key, []).append(index)
+
+    if pending:
+        keys = list(pending)
+        pending_texts = [texts[pending[key][0]] for key in keys]
+        docs = nlp.pipe(pending_texts, batch_size=batch_size, n_process=n_process, disable=_cloze_disabled_pipes(nlp))
+        computed = {}
+        for key, text, doc in zip(keys, pending_texts, docs):
+            cloze = _build_cloze_from_doc(doc, text)
+            computed[key] = cloze
+            for index in pending[key]:
+                results[index] = _copy_cloze(cloze)
+
+        with _CLOZE_CACHE_LOCK:
+            _CLOZE_CACHE.update(computed)
+            while len(_CLOZE_CACHE) > CLOZE_CACHE_SIZE:
+                _CLOZE_CACHE.popitem(last=False)
+
+    return results
+
+
+def _predict_grammar_only(cleaned_rows: list[dict], settings: InferenceSettings | None = None) -> list[dict]:
     bundle = load_movie_ai_bundle()
-    tokenizer = bundle["tokenizer"]
-    model = bundle["model"]
-    device = bundle["device"]
     grammar_id_to_label = bundle["grammar_id_to_label"]
+    settings = settings or bundle["inference_settings"]
+
+    # Batch theo bucket độ dài token (ít padding), kết quả trả về đúng thứ tự cleaned_rows
+    texts = [row["subtitle_text_clean"] for row in cleaned_rows]
+    started = time.perf_counter()
+    pred_ids, confidences = run_bucketed_inference(texts, bundle["tokenizer"], bundle["runner"], settings)
+    inference_seconds = time.perf_counter() - started
+
+    # Bước riêng: sinh cloze cho toàn bộ câu bằng spaCy nlp.pipe
+    started = time.perf_counter()
+    clozes = generate_cloze_data_batch(texts)
+    cloze_seconds = time.perf_counter() - started
+    print(
+        f"⏱️ [MOVIE_AI] {len(texts)} segments: inference {inference_seconds:.2f}s ({bundle['backend']}), "
+        f"cloze {cloze_seconds:.2f}s"
+    )
 
     results = []
-    for index in range(0, len(cleaned_rows), batch_size):
-        batch_rows = cleaned_rows[index:index + batch_size]
-        texts = [row["subtitle_text_clean"] for row in batch_rows]
-        encoded = tokenizer(
-            texts,
-            truncation=True,
-            padding=True,
-            max_length=MAX_LENGTH,
-            return_tensors="pt",
-        )
-        encoded = {key: value.to(device) for key, value in encoded.items()}
-
-        with torch.no_grad():
-            outputs = model(**encoded)
-            logits = outputs.logits
-
-        probs = torch.softmax(logits, dim=-1).cpu().numpy()
-        pred_ids = np.argmax(probs, axis=-1)
-
-        for row, prob, g_idx in zip(batch_rows, probs, pred_ids):
-            label = grammar_id_to_label.get(int(g_idx), "unknown")
-            # Táº¡o Cloze Data tá»± Ä‘á»™ng
-            cloze = generate_cloze_data(row["subtitle_text_clean"])
-
-            results.append({
-                "scene_id": row["scene_id"],
-                "subtitle_text_clean": row["subtitle_text_clean"],
-                "start_time": row["start_time"],
-                "end_time": row["end_time"],
-                "grammar_tag": label,
-                "grammar_tag_id": int(g_idx),
-                "confidence": float(np.max(prob)),
-                "cloze_data": cloze
-            })
+    for row, g_idx, confidence, cloze in zip(cleaned_rows, pred_ids.tolist(), confidences.tolist(), clozes):
+        results.append({
+            "scene_id": row["scene_id"],
+            "subtitle_text_clean": row["subtitle_text_clean"],
+            "start_time": row["start_time"],
+            "end_time": row["end_time"],
+            "grammar_tag": grammar_id_to_label.get(g_idx, "unknown"),
+            "grammar_tag_id": g_idx,
+            "confidence": confidence,
+            "cloze_data": cloze,
+        })
 
     return results
 
 
-def analyze_video_subtitles_service(video, subtitles) -> dict:
-    from ..extensions import db
+def get_movie_ai_model_version(backend: str | None = None) -> str:
+    """
+    Phiên bản của toàn bộ pipeline phân tích (backend + file model + logic cloze).
+    Phụ đề được dán nhãn với phiên bản khác phiên bản hiện tại sẽ được phân tích lại.
+    """
+    backend = _resolve_backend(backend)
+    version = _MODEL_VERSIONS.get(backend)
+    if version is not None:
+        return version
+
+    override = os.getenv("MOVIE_AI_MODEL_VERSION", "").strip()
+    if override:
+        version = f"{backend}:{override}"
+    else:
+        model_dir = _resolve_model_dir()
+        digest = hashlib.sha1(ANALYSIS_PIPELINE_VERSION.encode("utf-8"))
+        for name in ("config.json", "grammar_label_map.json"):
+            path = model_dir / name
+            if path.exists():
+                digest.update(path.read_bytes())
+        digest.update(str((model_dir / "model.safetensors").stat().st_size).encode("utf-8"))
+        version = f"{backend}:{digest.hexdigest()[:16]}"
 
-    cleaned_rows = []
-    # Dictionary to map subtitle scene_id back to subtitle object
-    id_to_sub = { f"subtitle_{s.id}": s for s in subtitles }
+    _MODEL_VERSIONS[backend] = version
+    return version
 
-    # Clear stale AI metadata before writing a fresh analysis pass.
-    for subtitle in subtitles:
-        subtitle.grammar_tag_id = None
-        subtitle.cloze_data = None
 
+def analyze_video_subtitles_service(video, subtitles, force: bool = False) -> dict:
+    """
+    Phân tích tăng dần: chỉ đưa vào model các phụ đề có câu EN đã đổi (analysis_hash)
+    hoặc được dán nhãn bởi phiên bản model khác; phần còn lại dùng lại kết quả đã lưu.
+    force=True bỏ qua kết quả cũ và phân tích lại toàn bộ.
+    """
+    from ..extensions import db
+
+    backend = _resolve_backend(None)
+    model_version = get_movie_ai_model_version(backend)
+    model_dir = _resolve_model_dir()
+    grammar_id_to_label = _load_grammar_label_map(model_dir)
+
+    # Giữ thứ tự phụ đề: mỗi phần tử là (row, subtitle, prediction đã lưu hoặc None)
+    ordered = []
+    pending_rows = []
+    pending_subtitles = {}
     for subtitle in subtitles:
         cleaned_text = _clean_subtitle_text(subtitle.content_en)
-        # Bá» qua cÃ¢u quÃ¡ ngáº¯n (< 3 tá»«) Ä‘á»ƒ AI ko dÃ¡n nhÃ£n bá»«a
-        if not cleaned_text or len(cleaned_text.split()) < 3:
+        if not is_analyzable_text(cleaned_text):
+            # Câu quá ngắn: không dán nhãn, xóa metadata cũ nếu câu vừa bị sửa ngắn lại
+            if subtitle.grammar_tag_id is not None or subtitle.cloze_data is not None or subtitle.analysis_hash:
+                subtitle.grammar_tag_id = None
+                subtitle.cloze_data = None
+                subtitle.grammar_confidence = None
+                subtitle.analysis_hash = None
+                subtitle.analysis_model_version = None
             continue
 
-        cleaned_rows.append(
-            {
-                "scene_id": f"subtitle_{subtitle.id}",
-                "subtitle_text_clean": cleaned_text,
-                "start_time": float(subtitle.start_time or 0),
-                "end_time": float(subtitle.end_time or 0),
-            }
+        row = {
+            "scene_id": f"subtitle_{subtitle.id}",
+            "subtitle_text_clean": cleaned_text,
+            "start_time": float(subtitle.start_time or 0),
+            "end_time": float(subtitle.end_time or 0),
+        }
+        text_hash = analysis_text_hash(subtitle.content_en)
+        reusable = (
+            not force
+            and subtitle.grammar_tag_id is not None
+            and subtitle.analysis_hash == text_hash
+            and subtitle.analysis_model_version == model_version
         )
-
-    if not cleaned_rows:
+        if reusable:
+            ordered.append((row, {
+                **row,
+                "grammar_tag": grammar_id_to_label.get(subtitle.grammar_tag_id, "unknown"),
+                "grammar_tag_id": subtitle.grammar_tag_id,
+                "confidence": subtitle.grammar_confidence,
+                "cloze_data": subtitle.cloze_data,
+            }))
+        else:
+            ordered.append((row, None))
+            pending_rows.append(row)
+            pending_subtitles[row["scene_id"]] = (subtitle, text_hash)
+
+    if not ordered:
         raise ValueError("Video nÃ y chÆ°a cÃ³ subtitle tiáº¿ng Anh Ä‘á»§ dÃ i (>= 3 tá»«) Ä‘á»ƒ dÃ¡n nhÃ£n ngá»¯ phÃ¡p.")
 
-    # Gá»i bá»™ nÃ£o AI 12 thÃ¬
-    predictions = _predict_grammar_only(cleaned_rows)
-
-    # LÆ°u káº¿t quáº£ vÃ o Database cho tá»«ng Subtitle
-    for pred in predictions:
-        sub_obj = id_to_sub.get(pred["scene_id"])
-        if sub_obj:
-            sub_obj.grammar_tag_id = pred["grammar_tag_id"]
-            sub_obj.cloze_data = pred["cloze_data"]
+    # Chỉ nạp model khi thực sự có câu cần suy luận
+    inferred = {}
+    if pending_rows:
+        for pred in _predict_grammar_only(pending_rows):
+            inferred[pred["scene_id"]] = pred
+            subtitle, text_hash = pending_subtitles[pred["scene_id"]]
+            subtitle.grammar_tag_id = pred["grammar_tag_id"]
+            subtitle.cloze_data = pred["cloze_data"]
+            subtitle.grammar_confidence = pred["confidence"]
+            subtitle.analysis_hash = text_hash
+            subtitle.analysis_model_version = model_version
 
     db.session.commit()
+    invalidate_subtitle_timeline(video.id)
 
+    predictions = [stored or inferred[row["scene_id"]] for row, stored in ordered]
+    print(
+        f"🧠 [MOVIE_AI] video_id={video.id}: inferred {len(pending_rows)}, "
+        f"reused {len(predictions) - len(pending_rows)} segments (model {model_version})"
+    )
+
+    # Thống kê lại trên kết quả đã gộp (cũ + mới)
     grammar_counter = Counter(item["grammar_tag"] for item in predictions)
     dominant_grammar_tags = [tag for tag, _ in grammar_counter.most_common(5)]
 
@@ -293,11 +477,15 @@ def analyze_video_subtitles_service(video, subtitles) -> dict:
         "video_id": video.id,
         "video_title": video.title,
         "segment_count": len(predictions),
+        "inferred_segment_count": len(pending_rows),
+        "reused_segment_count": len(predictions) - len(pending_rows),
         "dominant_grammar_tags": dominant_grammar_tags,
         "predicted_segments": predictions,
         "model_meta": {
             "model_name": "XLM-Roberta-Grammar-Only",
-            "model_dir": load_movie_ai_bundle()["model_dir"],
+            "model_dir": str(model_dir),
+            "backend": backend,
+            "model_version": model_version,
             "mode": "grammar_classification_v2",
         },
     }
@@ -307,7 +495,8 @@ def analyze_video_subtitles_service(video, subtitles) -> dict:
 def analyze_subtitle_content_service(subtitle_content: str, source_name: str | None = None) -> dict:
     from ..utils.subtitle_utils import parse_srt, parse_vtt
 
-    normalized_content = (subtitle_content or "").replace("\r\n", "\n").replace("\r", "\n").strip()
+    # Parser tự chuẩn hóa xuống dòng khi đọc từng dòng, không cần copy lại toàn bộ nội dung
+    normalized_content = (subtitle_content or "").strip()
     if not normalized_content:
         raise ValueError("Noi dung subtitle trong.")
 
@@ -348,6 +537,7 @@ def analyze_subtitle_content_service(subtitle_content: str, source_name: str | N
         "model_meta": {
             "model_name": "XLM-Roberta-Grammar-Only",
             "model_dir": load_movie_ai_bundle()["model_dir"],
+            "backend": load_movie_ai_bundle()["backend"],
             "mode": "grammar_classification_v2",
         },
     }
@@ -379,13 +569,13 @@ def mark_video_ai_analysis_processing_service(video):
     return analysis
 
 
-def save_video_ai_analysis_service(video, subtitles) -> dict:
+def save_video_ai_analysis_service(video, subtitles, force: bool = False) -> dict:
     from ..extensions import db
     from ..models.models_model import MovieAIAnalysis
 
     # Thá»±c hiá»‡n phÃ¢n tÃ­ch ngá»¯ phÃ¡p vÃ  Ä‘á»¥c lá»—
     mark_video_ai_analysis_processing_service(video)
-    report = analyze_video_subtitles_service(video, subtitles)
+    report = analyze_video_subtitles_service(video, subtitles, force=force)
 
     analysis = MovieAIAnalysis.query.filter_by(video_id=video.id).first()
     if not analysis:
@@ -394,6 +584,7 @@ def save_video_ai_analysis_service(video, subtitles) -> dict:
 
     analysis.model_name = report["model_meta"].get("model_name", "XLM-Roberta-Grammar-Only")
     analysis.model_mode = report["model_meta"].get("mode", "grammar_classification_v2")
+    analysis.model_version = report["model_meta"].get("model_version")
     analysis.segment_count = int(report["segment_count"])
     # Äáº·t cÃ¡c giÃ¡ trá»‹ cÅ© vá» 0 vÃ¬ model nÃ y khÃ´ng dá»± Ä‘oÃ¡n Ä‘á»™ khÃ³
     analysis.movie_score = 0.0
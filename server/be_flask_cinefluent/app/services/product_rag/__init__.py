@@ -1,14 +1,22 @@
 from .config import ProductRagSettings
 from .corpus import load_rag_chunks
 from .embeddings import HashEmbeddingProvider
-from .retrieval import run_retrieval
-from .stores import JsonVectorStore, QdrantVectorStore
+from .index import VectorIndex
+from .lexical import LexicalIndex, get_lexical_index
+from .retrieval import reciprocal_rank_fusion, run_retrieval
+from .stores import JsonVectorStore, NpyVectorStore, QdrantVectorStore, convert_json_store
 
 __all__ = [
     "HashEmbeddingProvider",
     "JsonVectorStore",
+    "LexicalIndex",
+    "NpyVectorStore",
     "ProductRagSettings",
     "QdrantVectorStore",
+    "VectorIndex",
+    "convert_json_store",
+    "get_lexical_index",
     "load_rag_chunks",
+    "reciprocal_rank_fusion",
     "run_retrieval",
 ]
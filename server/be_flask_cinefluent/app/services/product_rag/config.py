@@ -13,6 +13,13 @@ class ProductRagSettings:
     chunk_overlap: int = 120
     embedding_dim: int = 256
     json_store_path: Path | None = None
+    # store_kind="npy": thư mục NpyVectorStore (vectors.npy mmap + records.jsonl)
+    npy_store_dir: Path | None = None
+    # vector | bm25 | hybrid (RRF của cosine vector băm và BM25 trên chunk)
+    retrieval_mode: str = "hybrid"
+    keyword_boost: float = 2.0
+    rrf_k: int = 60
+    lexical_index_path: Path | None = None
     qdrant_url: str | None = None
     qdrant_api_key: str | None = None
     qdrant_collection: str = "cinefluent_product_rag"
@@ -27,6 +34,11 @@ class ProductRagSettings:
             chunk_overlap=int(os.getenv("PRODUCT_RAG_CHUNK_OVERLAP", "120")),
             embedding_dim=int(os.getenv("PRODUCT_RAG_EMBEDDING_DIM", "256")),
             json_store_path=Path(os.getenv("PRODUCT_RAG_JSON_STORE", storage_dir / "vector_store.json")),
+            npy_store_dir=Path(os.getenv("PRODUCT_RAG_NPY_STORE", storage_dir / "npy_store")),
+            retrieval_mode=os.getenv("PRODUCT_RAG_RETRIEVAL", "hybrid").strip().lower() or "hybrid",
+            keyword_boost=float(os.getenv("PRODUCT_RAG_KEYWORD_BOOST", "2.0")),
+            rrf_k=int(os.getenv("PRODUCT_RAG_RRF_K", "60")),
+            lexical_index_path=Path(os.getenv("PRODUCT_RAG_LEXICAL_INDEX", storage_dir / "bm25_index.npz")),
             qdrant_url=os.getenv("QDRANT_URL"),
             qdrant_api_key=os.getenv("QDRANT_API_KEY"),
             qdrant_collection=os.getenv("QDRANT_COLLECTION", "cinefluent_product_rag"),
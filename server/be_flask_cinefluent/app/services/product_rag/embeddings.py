@@ -1,8 +1,50 @@
 from __future__ import annotations
 
 import hashlib
-import math
+import os
 import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[\wÀ-ỹ]+")
+
+# token -> (số nguyên 4 byte đầu của sha256, sign * weight). Không phụ thuộc dim nên dùng chung cho
+# mọi provider; provider được tạo mới mỗi lượt chat nên bảng phải nằm ở mức module.
+TOKEN_CACHE_SIZE = int(os.getenv("PRODUCT_RAG_TOKEN_CACHE_SIZE", "200000"))
+_TOKENS: OrderedDict = OrderedDict()
+_TOKENS_LOCK = threading.Lock()
+
+
+def _hash_token(token: str) -> tuple[int, float]:
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    sign = 1.0 if digest[4] % 2 == 0 else -1.0
+    weight = 1.0 + (digest[5] / 255.0)
+    return int.from_bytes(digest[:4], byteorder="big"), sign * weight
+
+
+def _token_features(tokens: list[str]) -> list[tuple[int, float]]:
+    features = []
+    missing = []
+    with _TOKENS_LOCK:
+        for token in tokens:
+            feature = _TOKENS.get(token)
+            if feature is None:
+                missing.append(token)
+            else:
+                _TOKENS.move_to_end(token)
+            features.append(feature)
+    if not missing:
+        return features
+
+    # Băm ngoài lock, rồi mới ghi vào bảng
+    hashed = {token: _hash_token(token) for token in missing}
+    with _TOKENS_LOCK:
+        _TOKENS.update(hashed)
+        while len(_TOKENS) > TOKEN_CACHE_SIZE:
+            _TOKENS.popitem(last=False)
+    return [feature if feature is not None else hashed[token] for token, feature in zip(tokens, features)]
 
 
 class HashEmbeddingProvider:
@@ -11,23 +53,28 @@ class HashEmbeddingProvider:
             raise ValueError("Embedding dimension must be positive.")
         self.dim = dim
 
+    def _features(self, tokens: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        features = _token_features(tokens)
+        indices = np.fromiter((raw % self.dim for raw, _ in features), dtype=np.int64, count=len(features))
+        values = np.fromiter((value for _, value in features), dtype=np.float64, count=len(features))
+        return indices, values
+
     def embed_text(self, text: str) -> list[float]:
-        vector = [0.0] * self.dim
-        tokens = re.findall(r"[\wÀ-ỹ]+", text.lower())
-        if not tokens:
-            return vector
+        return self.embed_texts([text], dtype=np.float64)[0].tolist()
+
+    def embed_texts(self, texts: list[str], dtype=np.float32) -> np.ndarray:
+        """
+        Ma trận (n, dim). Cộng dồn (np.add.at theo thứ tự token) và tính norm (cumsum tuần tự) bằng
+        float64 đúng thứ tự phép cộng của bản Python cũ nên dtype=np.float64 cho kết quả trùng từng bit
+        với vector đã lưu; float32 là bản ép kiểu của chính các giá trị đó.
+        """
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float64)
+        token_lists = [_TOKEN_RE.findall(text.lower()) for text in texts]
+        rows = np.repeat(np.arange(len(texts)), [len(tokens) for tokens in token_lists])
+        indices, values = self._features([token for tokens in token_lists for token in tokens])
+        np.add.at(matrix, (rows, indices), values)
+
+        norms = np.sqrt(np.cumsum(matrix * matrix, axis=1)[:, -1:])
+        np.divide(matrix, norms, out=matrix, where=norms != 0.0)
+        return matrix.astype(dtype, copy=False)
 
-        for token in tokens:
-            digest = hashlib.sha256(token.encode("utf-8")).digest()
-            index = int.from_bytes(digest[:4], byteorder="big") % self.dim
-            sign = 1.0 if digest[4] % 2 == 0 else -1.0
-            weight = 1.0 + (digest[5] / 255.0)
-            vector[index] += sign * weight
-
-        norm = math.sqrt(sum(value * value for value in vector))
-        if norm == 0.0:
-            return vector
-        return [value / norm for value in vector]
-
-    def embed_texts(self, texts: list[str]) -> list[list[float]]:
-        return [self.embed_text(item) for item in texts]
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from .corpus import _read_jsonl, load_rag_chunks
+from .embeddings import HashEmbeddingProvider
+from .lexical import LexicalIndex
+from .retrieval import run_retrieval
+from .stores import JsonVectorStore, NpyVectorStore, QdrantVectorStore
+from .types import RetrievalHit
+
+EVAL_STORE_KINDS = ("json", "npy", "qdrant")
+
+
+def load_eval_questions(base_dir: Path) -> list[dict]:
+    """rag_data/eval/questions.jsonl: question, expected_topic, expected_context_type, ..."""
+    return _read_jsonl(base_dir / "rag_data" / "eval" / "questions.jsonl")
+
+
+def first_relevant_rank(hits: list[RetrievalHit], expected_topic: str) -> int | None:
+    """Hạng (từ 1) của chunk đầu tiên thuộc đúng topic mong đợi; nhãn của bộ eval ở mức topic."""
+    for rank, hit in enumerate(hits, start=1):
+        if (hit.payload or {}).get("topic") == expected_topic:
+            return rank
+    return None
+
+
+def _percentiles(latencies_ms: np.ndarray) -> dict:
+    if not len(latencies_ms):
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "mean": round(float(latencies_ms.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+    }
+
+
+def evaluate_retrieval(questions: list[dict], retrieve, ks=(1, 3, 5), repeat: int = 1) -> dict:
+    """
+    retrieve(question, context_type) -> list[RetrievalHit] (lấy ít nhất max(ks) hit), chạy lần lượt.
+    - hit@k: tỉ lệ câu có chunk đúng topic trong top k (mỗi câu chỉ có một topic đúng nên = recall@k)
+    - mrr:   trung bình 1 / hạng của chunk đúng đầu tiên trong top max(ks), không có thì 0
+    repeat > 1 chạy lại cả bộ câu hỏi chỉ để đo độ trễ ổn định hơn (chất lượng lấy lượt đầu).
+    """
+    ranks = []
+    latencies = []
+    for round_index in range(max(1, repeat)):
+        for item in questions:
+            started = time.perf_counter()
+            hits = retrieve(item["question"], item.get("expected_context_type"))
+            latencies.append(time.perf_counter() - started)
+            if round_index == 0:
+                ranks.append(first_relevant_rank(hits[: max(ks)], item["expected_topic"]))
+
+    count = len(questions)
+    result = {"questions": count}
+    for k in ks:
+        result[f"hit@{k}"] = round(sum(rank is not None and rank <= k for rank in ranks) / count, 4) if count else 0.0
+    result["mrr"] = round(sum(1.0 / rank for rank in ranks if rank is not None) / count, 4) if count else 0.0
+    result["latency_ms"] = _percentiles(np.array(latencies, dtype=np.float64) * 1000)
+    result["misses"] = [item["id"] for item, rank in zip(questions, ranks) if rank is None]
+    return result
+
+
+def build_eval_store(store_kind: str, settings, chunks, vectors, work_dir: Path):
+    """Store tạm (json/npy trong work_dir) hoặc collection Qdrant đã cấu hình, đã upsert corpus."""
+    if store_kind == "json":
+        store = JsonVectorStore(work_dir / "vector_store.json")
+    elif store_kind == "npy":
+        store = NpyVectorStore(work_dir / "npy_store")
+    elif store_kind == "qdrant":
+        if not settings.qdrant_url:
+            raise ValueError("Store qdrant cần QDRANT_URL.")
+        store = QdrantVectorStore(
+            url=settings.qdrant_url,
+            api_key=settings.qdrant_api_key,
+            collection_name=f"{settings.qdrant_collection}_eval",
+        )
+    else:
+        raise ValueError(f"Store kind không hợp lệ: {store_kind} (chọn {', '.join(EVAL_STORE_KINDS)})")
+    store.upsert(chunks, vectors)
+    return store
+
+
+def run_rag_eval(
+    settings,
+    store_kinds=("json", "npy"),
+    modes=("vector", "bm25", "hybrid"),
+    ks=(1, 3, 5),
+    repeat: int = 1,
+    work_dir: Path | None = None,
+) -> dict:
+    """
+    Build chunk + vector + chỉ mục BM25 từ rag_data theo settings, chạy toàn bộ câu hỏi eval qua
+    run_retrieval cho từng cặp (store kind, retrieval mode). Trả về báo cáo dạng dict (ghi JSON được).
+    """
+    chunks = load_rag_chunks(settings.base_dir, max_chars=settings.chunk_size, overlap_chars=settings.chunk_overlap)
+    questions = load_eval_questions(settings.base_dir)
+    provider = HashEmbeddingProvider(dim=settings.embedding_dim)
+
+    started = time.perf_counter()
+    vectors = provider.embed_texts([chunk.text for chunk in chunks], dtype=np.float64)
+    embed_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    lexical_index = LexicalIndex.build(chunks, keyword_boost=settings.keyword_boost)
+    lexical_ms = (time.perf_counter() - started) * 1000
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "corpus": {
+            "chunks": len(chunks),
+            "questions": len(questions),
+            "chunk_size": settings.chunk_size,
+            "chunk_overlap": settings.chunk_overlap,
+            "embedding_dim": settings.embedding_dim,
+            "keyword_boost": settings.keyword_boost,
+            "rrf_k": settings.rrf_k,
+            "embed_ms": round(embed_ms, 2),
+            "bm25_build_ms": round(lexical_ms, 2),
+        },
+        "runs": [],
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base = work_dir or Path(temp_dir)
+        for store_kind in store_kinds:
+            started = time.perf_counter()
+            store = build_eval_store(store_kind, settings, chunks, vectors.tolist(), base / store_kind)
+            upsert_ms = (time.perf_counter() - started) * 1000
+
+            for mode in modes:
+
+                def retrieve(question, context_type, store=store, mode=mode):
+                    return run_retrieval(
+                        question,
+                        store,
+                        provider,
+                        top_k=max(ks),
+                        context_type=context_type,
+                        lexical_index=lexical_index,
+                        mode=mode,
+                        rrf_k=settings.rrf_k,
+                    )
+
+                # Lượt nháp: nạp chỉ mục của store (đọc file/mmap) không tính vào độ trễ
+                if questions:
+                    retrieve(questions[0]["question"], questions[0].get("expected_context_type"))
+                result = evaluate_retrieval(questions, retrieve, ks=ks, repeat=repeat)
+                report["runs"].append({"store": store_kind, "mode": mode, "upsert_ms": round(upsert_ms, 2), **result})
+
+    return report
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import numpy as np
+
+from .types import RetrievalHit
+
+# Chunk gắn context_type này được trả cho mọi context_type
+GENERAL_CONTEXT = "general"
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Ma trận float32 liền bộ nhớ, mỗi dòng chia cho norm của nó (vector 0 giữ nguyên 0)."""
+    matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(len(matrix), -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def context_masks(payloads) -> dict[str, np.ndarray]:
+    """context_type -> mask boolean các dòng khai báo context_type đó (chưa gộp "general")."""
+    context_sets = [set(payload.get("context_types") or []) for payload in payloads]
+    return {
+        context_type: np.fromiter((context_type in item for item in context_sets), dtype=bool, count=len(context_sets))
+        for context_type in sorted(set().union(*context_sets))
+    }
+
+
+def top_k_positions(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Vị trí top_k điểm cao nhất (argpartition), điểm giảm dần, bằng điểm thì vị trí nhỏ trước."""
+    if top_k < len(scores):
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        top = np.arange(len(scores))
+    # Như sort ổn định trước đây: bằng điểm thì giữ thứ tự ghi
+    return top[np.lexsort((top, -scores[top]))]
+
+
+class ContextFilter:
+    """Chunk được trả cho context_type khi khai báo context_type đó hoặc "general"."""
+
+    __slots__ = ("_general", "_masks")
+
+    def __init__(self, masks: dict[str, np.ndarray], count: int) -> None:
+        self._general = masks.get(GENERAL_CONTEXT, np.zeros(count, dtype=bool))
+        self._masks = {context_type: mask | self._general for context_type, mask in masks.items()}
+
+    def mask_for(self, context_type: str | None) -> np.ndarray | None:
+        """None = không lọc; context_type chưa chunk nào khai báo thì chỉ còn chunk "general"."""
+        if not context_type:
+            return None
+        return self._masks.get(context_type, self._general)
+
+
+class VectorIndex:
+    """
+    Chỉ mục nằm trong RAM cho vector store cục bộ:
+    - matrix: (n, dim) float32 đã chuẩn hóa, cosine = một phép nhân ma trận-vector
+      (có thể là np.memmap chỉ đọc, xem NpyVectorStore)
+    - records: dãy {"id", "payload"} cùng thứ tự dòng với matrix (list hoặc dãy đọc lười từ JSONL)
+    - mask boolean theo context_type (kèm chunk "general"), tính sẵn lúc nạp
+    """
+
+    __slots__ = ("records", "matrix", "_contexts")
+
+    def __init__(self, records, matrix: np.ndarray, masks: dict[str, np.ndarray]) -> None:
+        self.records = records
+        self.matrix = matrix
+        self._contexts = ContextFilter(masks, len(records))
+
+    @classmethod
+    def from_records(cls, records: list[dict]) -> "VectorIndex":
+        if not records:
+            return cls([], np.zeros((0, 0), dtype=np.float32), {})
+        payloads = [record["payload"] for record in records]
+        return cls(
+            [{"id": record["id"], "payload": payload} for record, payload in zip(records, payloads)],
+            normalize_rows([record["vector"] for record in records]),
+            context_masks(payloads),
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def mask_for(self, context_type: str | None) -> np.ndarray | None:
+        return self._contexts.mask_for(context_type)
+
+    def search(
+        self,
+        query_vector,
+        top_k: int = 5,
+        context_type: str | None = None,
+    ) -> list[RetrievalHit]:
+        if not len(self) or top_k <= 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        query_norm = float(np.linalg.norm(query))
+        if query.shape != (self.matrix.shape[1],):
+            raise ValueError(f"Query vector có {query.size} chiều, chỉ mục có {self.matrix.shape[1]} chiều.")
+
+        candidates = self.mask_for(context_type)
+        rows = np.flatnonzero(candidates) if candidates is not None else None
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        if not len(matrix):
+            return []
+
+        scores = matrix @ (query / query_norm) if query_norm > 0.0 else np.zeros(len(matrix), dtype=np.float32)
+        top = top_k_positions(scores, top_k)
+        positions = top if rows is None else rows[top]
+
+        hits = []
+        for rank, position in zip(top.tolist(), positions.tolist()):
+            record = self.records[position]
+            hits.append(RetrievalHit(chunk_id=record["id"], score=float(scores[rank]), payload=record["payload"]))
+        return hits
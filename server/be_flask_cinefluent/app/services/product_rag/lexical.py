@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+
+from .index import ContextFilter, context_masks, top_k_positions
+from .types import RagChunk, RetrievalHit
+
+_WORD_RE = re.compile(r"[\wÀ-ỹ]+")
+# Tăng khi đổi tokenizer / công thức trọng số: file chỉ mục cũ trên đĩa tự bị bỏ
+LEXICAL_INDEX_FORMAT = 1
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def fold_diacritics(text: str) -> str:
+    """Bỏ dấu tiếng Việt ("phụ đề" -> "phu de"), cho user gõ không dấu."""
+    stripped = "".join(char for char in unicodedata.normalize("NFD", text) if unicodedata.category(char) != "Mn")
+    return stripped.replace("đ", "d").replace("Đ", "D")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Tiếng Việt viết cách từng âm tiết nên từ ghép ("song ngữ", "phụ đề") là hai token:
+    ngoài âm tiết còn lấy cặp âm tiết liền nhau ("song_ngữ"), và thêm bản bỏ dấu của mỗi term có dấu.
+    """
+    syllables = _WORD_RE.findall(unicodedata.normalize("NFC", text.lower()))
+    terms = syllables + [f"{left}_{right}" for left, right in zip(syllables, syllables[1:])]
+    folded = [fold_diacritics(term) for term in terms]
+    return terms + [term for term, original in zip(folded, terms) if term != original]
+
+
+class LexicalIndex:
+    """
+    BM25 trên chunk RAG, hai trường: text và keywords của metadata (BM25F: tf của keywords nhân
+    keyword_boost trước khi bão hòa). Trọng số từng posting tính sẵn lúc build nên search chỉ là
+    cộng dồn (np.add.at) các posting của term trong câu hỏi.
+    Postings dạng CSR: term_id -> doc_ids[offsets[t]:offsets[t + 1]], weights cùng vị trí.
+    """
+
+    __slots__ = ("chunk_ids", "payloads", "fingerprint", "_terms", "_offsets", "_doc_ids", "_weights", "_contexts")
+
+    def __init__(self, chunk_ids, payloads, fingerprint, terms, offsets, doc_ids, weights) -> None:
+        self.chunk_ids = chunk_ids
+        self.payloads = payloads
+        self.fingerprint = fingerprint
+        self._terms = {term: term_id for term_id, term in enumerate(terms)}
+        self._offsets = offsets
+        self._doc_ids = doc_ids
+        self._weights = weights
+        self._contexts = ContextFilter(context_masks(payloads), len(payloads))
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    @classmethod
+    def build(
+        cls,
+        chunks: list[RagChunk],
+        keyword_boost: float = 2.0,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+    ) -> "LexicalIndex":
+        vocabulary: dict[str, int] = {}
+        postings: list[dict[int, float]] = []
+        lengths = np.zeros(len(chunks), dtype=np.float64)
+
+        for doc_id, chunk in enumerate(chunks):
+            fields = ((tokenize(chunk.text), 1.0), (tokenize(" ".join(chunk.keywords or [])), keyword_boost))
+            for terms, field_weight in fields:
+                lengths[doc_id] += len(terms) * field_weight
+                for term in terms:
+                    term_id = vocabulary.setdefault(term, len(vocabulary))
+                    if term_id == len(postings):
+                        postings.append({})
+                    postings[term_id][doc_id] = postings[term_id].get(doc_id, 0.0) + field_weight
+
+        count = len(chunks)
+        average_length = float(lengths.mean()) if count and lengths.any() else 1.0
+        offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(docs) for docs in postings])
+        doc_ids = np.fromiter((doc for docs in postings for doc in docs), dtype=np.int32, count=int(offsets[-1]))
+        frequencies = np.fromiter((tf for docs in postings for tf in docs.values()), dtype=np.float64, count=int(offsets[-1]))
+
+        document_frequency = np.diff(offsets).astype(np.float64)
+        idf = np.log1p((count - document_frequency + 0.5) / (document_frequency + 0.5))
+        norm = k1 * (1.0 - b + b * lengths[doc_ids] / average_length)
+        weights = np.repeat(idf, np.diff(offsets)) * frequencies * (k1 + 1.0) / (frequencies + norm)
+
+        return cls(
+            [chunk.chunk_id for chunk in chunks],
+            [chunk.to_payload() for chunk in chunks],
+            corpus_fingerprint(chunks, keyword_boost, k1, b),
+            list(vocabulary),
+            offsets,
+            doc_ids,
+            weights.astype(np.float32),
+        )
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(f".{path.name}.tmp")
+        with temp.open("wb") as handle:
+            np.savez(
+                handle,
+                fingerprint=np.array(self.fingerprint),
+                terms=np.array(list(self._terms), dtype=str),
+                offsets=self._offsets,
+                doc_ids=self._doc_ids,
+                weights=self._weights,
+            )
+        temp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path, chunks: list[RagChunk], fingerprint: str) -> "LexicalIndex | None":
+        """Chỉ mục trên đĩa, None nếu không có hoặc build từ corpus/tham số khác."""
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            if str(data["fingerprint"]) != fingerprint:
+                return None
+            return cls(
+                [chunk.chunk_id for chunk in chunks],
+                [chunk.to_payload() for chunk in chunks],
+                fingerprint,
+                data["terms"].tolist(),
+                data["offsets"],
+                data["doc_ids"],
+                data["weights"],
+            )
+
+    def scores(self, question: str) -> np.ndarray:
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term in set(tokenize(question)):
+            term_id = self._terms.get(term)
+            if term_id is None:
+                continue
+            start, end = self._offsets[term_id], self._offsets[term_id + 1]
+            np.add.at(scores, self._doc_ids[start:end], self._weights[start:end])
+        return scores
+
+    def search(self, question: str, top_k: int = 5, context_type: str | None = None) -> list[RetrievalHit]:
+        if not len(self) or top_k <= 0:
+            return []
+        scores = self.scores(question)
+        candidates = self._contexts.mask_for(context_type)
+        rows = np.flatnonzero(candidates & (scores > 0)) if candidates is not None else np.flatnonzero(scores > 0)
+        top = rows[top_k_positions(scores[rows], top_k)]
+        return [
+            RetrievalHit(chunk_id=self.chunk_ids[position], score=float(scores[position]), payload=self.payloads[position])
+            for position in top.tolist()
+        ]
+
+
+def corpus_fingerprint(chunks: list[RagChunk], keyword_boost: float, k1: float, b: float) -> str:
+    digest = hashlib.sha256(json.dumps([LEXICAL_INDEX_FORMAT, keyword_boost, k1, b]).encode("utf-8"))
+    for chunk in chunks:
+        digest.update(json.dumps([chunk.chunk_id, chunk.text, chunk.keywords], ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+_LEXICAL: dict[tuple, LexicalIndex] = {}
+_LEXICAL_LOCK = threading.Lock()
+
+
+def get_lexical_index(settings) -> LexicalIndex:
+    """
+    Chỉ mục BM25 của corpus rag_data: build một lần mỗi process rồi giữ trong RAM, ghi ra
+    settings.lexical_index_path để lần khởi động sau nạp lại nếu corpus và tham số không đổi.
+    """
+    from .corpus import load_rag_chunks
+
+    key = (settings.base_dir, settings.chunk_size, settings.chunk_overlap, settings.keyword_boost)
+    with _LEXICAL_LOCK:
+        index = _LEXICAL.get(key)
+        if index is not None:
+            return index
+
+        chunks = load_rag_chunks(settings.base_dir, max_chars=settings.chunk_size, overlap_chars=settings.chunk_overlap)
+        fingerprint = corpus_fingerprint(chunks, settings.keyword_boost, BM25_K1, BM25_B)
+        path = settings.lexical_index_path
+        index = LexicalIndex.load(path, chunks, fingerprint) if path else None
+        if index is None:
+            index = LexicalIndex.build(chunks, keyword_boost=settings.keyword_boost)
+            if path:
+                index.save(path)
+        _LEXICAL[key] = index
+        return index
@@ -1,6 +1,26 @@
 from __future__ import annotations
 
 from .embeddings import HashEmbeddingProvider
+from .types import RetrievalHit
+
+RETRIEVAL_MODES = ("vector", "bm25", "hybrid")
+
+
+def reciprocal_rank_fusion(rankings: list[list[RetrievalHit]], top_k: int = 5, rrf_k: int = 60) -> list[RetrievalHit]:
+    """
+    Gộp nhiều bảng xếp hạng theo RRF: điểm = tổng 1 / (rrf_k + hạng) qua các bảng chunk xuất hiện.
+    Chỉ dùng hạng nên không cần chuẩn hóa điểm cosine với điểm BM25.
+    """
+    fused: dict[str, float] = {}
+    hits: dict[str, RetrievalHit] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            fused[hit.chunk_id] = fused.get(hit.chunk_id, 0.0) + 1.0 / (rrf_k + rank)
+            hits.setdefault(hit.chunk_id, hit)
+
+    # sorted ổn định: bằng điểm thì chunk gặp trước (hạng cao hơn ở bảng đầu) đứng trước
+    ordered = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    return [RetrievalHit(chunk_id=chunk_id, score=fused[chunk_id], payload=hits[chunk_id].payload) for chunk_id in ordered]
 
 
 def run_retrieval(
@@ -9,6 +29,28 @@ def run_retrieval(
     embedding_provider: HashEmbeddingProvider,
     top_k: int = 5,
     context_type: str | None = None,
+    lexical_index=None,
+    mode: str | None = None,
+    candidate_k: int = 50,
+    rrf_k: int = 60,
 ):
+    """
+    mode: "vector" (cosine trên vector băm), "bm25" (chỉ mục từ khóa) hoặc "hybrid" (RRF của cả hai,
+    mỗi bên lấy candidate_k ứng viên). Mặc định hybrid khi có lexical_index, không thì vector như cũ.
+    """
+    mode = mode or ("hybrid" if lexical_index is not None else "vector")
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Retrieval mode không hợp lệ: {mode} (chọn {', '.join(RETRIEVAL_MODES)})")
+    if mode != "vector" and lexical_index is None:
+        raise ValueError(f"Retrieval mode {mode} cần lexical_index.")
+
+    if mode == "bm25":
+        return lexical_index.search(question, top_k=top_k, context_type=context_type)
+
     query_vector = embedding_provider.embed_text(question)
-    return vector_store.search(query_vector=query_vector, top_k=top_k, context_type=context_type)
+    if mode == "vector":
+        return vector_store.search(query_vector=query_vector, top_k=top_k, context_type=context_type)
+
+    vector_hits = vector_store.search(query_vector=query_vector, top_k=candidate_k, context_type=context_type)
+    lexical_hits = lexical_index.search(question, top_k=candidate_k, context_type=context_type)
+    return reciprocal_rank_fusion([vector_hits, lexical_hits], top_k=top_k, rrf_k=rrf_k)
@@ -1,21 +1,54 @@
 from __future__ import annotations
 
 import json
-import math
+import mmap
+import os
+import threading
 from pathlib import Path
 
+import numpy as np
+
+from .index import VectorIndex, context_masks, normalize_rows
 from .types import RagChunk, RetrievalHit
 
 
-def _cosine_similarity(left: list[float], right: list[float]) -> float:
-    if not left or not right:
-        return 0.0
-    numerator = sum(a * b for a, b in zip(left, right))
-    left_norm = math.sqrt(sum(a * a for a in left))
-    right_norm = math.sqrt(sum(b * b for b in right))
-    if left_norm == 0.0 or right_norm == 0.0:
-        return 0.0
-    return numerator / (left_norm * right_norm)
+# Chỉ mục đã nạp theo đường dẫn file: (mtime_ns, size) -> VectorIndex. JsonVectorStore được tạo mới
+# mỗi lượt chat nên cache phải nằm ở mức module; file đổi (upsert, copy đè) thì tự nạp lại.
+_INDEXES: dict[Path, tuple[tuple[int, int], VectorIndex]] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def _file_stamp(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _cached_index(path: Path, load) -> VectorIndex | None:
+    """load(path) -> VectorIndex, chỉ gọi khi file đổi so với lần nạp trước."""
+    key = path.resolve()
+    stamp = _file_stamp(key)
+    if stamp is None:
+        return None
+    with _INDEXES_LOCK:
+        cached = _INDEXES.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    index = load(key)
+    with _INDEXES_LOCK:
+        _INDEXES[key] = (stamp, index)
+    return index
+
+
+def _remember_index(path: Path, index: VectorIndex) -> None:
+    key = path.resolve()
+    stamp = _file_stamp(key)
+    if stamp is not None:
+        with _INDEXES_LOCK:
+            _INDEXES[key] = (stamp, index)
 
 
 class JsonVectorStore:
@@ -29,11 +62,12 @@ class JsonVectorStore:
             records.append(
                 {
                     "id": chunk.chunk_id,
-                    "vector": vector,
+                    "vector": [float(value) for value in vector],
                     "payload": chunk.to_payload(),
                 }
             )
         self.path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+        _remember_index(self.path, VectorIndex.from_records(records))
         return len(records)
 
     def load_records(self) -> list[dict]:
@@ -41,24 +75,134 @@ class JsonVectorStore:
             return []
         return json.loads(self.path.read_text(encoding="utf-8"))
 
+    def load_index(self) -> VectorIndex | None:
+        return _cached_index(self.path, lambda path: VectorIndex.from_records(self.load_records()))
+
+    def search(
+        self,
+        query_vector: list[float],
+        top_k: int = 5,
+        context_type: str | None = None,
+    ) -> list[RetrievalHit]:
+        index = self.load_index()
+        if index is None:
+            return []
+        return index.search(query_vector, top_k=top_k, context_type=context_type)
+
+
+class JsonlRecords:
+    """
+    Dãy {"id", "payload"} đọc lười từ records.jsonl theo bảng offset (n + 1 vị trí byte):
+    chỉ parse dòng của top-k hit, file được mmap nên các worker dùng chung page cache.
+    """
+
+    __slots__ = ("_buffer", "_offsets")
+
+    def __init__(self, path: Path, offsets: np.ndarray) -> None:
+        self._offsets = offsets
+        if len(offsets) > 1 and offsets[-1] > 0:
+            with path.open("rb") as handle:
+                self._buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._buffer = b""
+
+    def __len__(self) -> int:
+        return max(0, len(self._offsets) - 1)
+
+    def __getitem__(self, position: int) -> dict:
+        start, end = int(self._offsets[position]), int(self._offsets[position + 1])
+        return json.loads(self._buffer[start:end])
+
+
+class NpyVectorStore:
+    """
+    Vector store nhị phân trong một thư mục:
+    - vectors.npy:   (n, dim) float32 đã chuẩn hóa, mở bằng np.load(mmap_mode="r")
+    - records.jsonl: mỗi dòng {"id", "payload"}; offsets.npy (int64, n + 1) là vị trí byte từng dòng
+    - contexts.npy:  (n, số context_type) bool, tên cột nằm trong manifest.json
+    - manifest.json: ghi sau cùng, mtime của nó là phiên bản của cả store
+    Mỗi file được ghi ra file tạm rồi os.replace: worker đang mmap bản cũ vẫn đọc được inode cũ.
+    """
+
+    VECTORS = "vectors.npy"
+    RECORDS = "records.jsonl"
+    OFFSETS = "offsets.npy"
+    CONTEXTS = "contexts.npy"
+    MANIFEST = "manifest.json"
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _replace(self, name: str, write) -> None:
+        target = self.directory / name
+        temp = target.with_name(f".{name}.tmp")
+        with temp.open("wb") as handle:
+            write(handle)
+        os.replace(temp, target)
+
+    def write(self, records: list[dict], vectors) -> int:
+        """records: [{"id", "payload"}] cùng thứ tự với vectors (chưa cần chuẩn hóa)."""
+        matrix = normalize_rows(vectors) if records else np.zeros((0, 0), dtype=np.float32)
+        masks = context_masks([record["payload"] for record in records])
+        context_types = list(masks)
+        contexts = (
+            np.stack([masks[name] for name in context_types], axis=1)
+            if context_types
+            else np.zeros((len(records), 0), dtype=bool)
+        )
+
+        offsets = np.zeros(len(records) + 1, dtype=np.int64)
+
+        def write_records(handle) -> None:
+            for position, record in enumerate(records):
+                line = json.dumps({"id": record["id"], "payload": record["payload"]}, ensure_ascii=False)
+                handle.write(line.encode("utf-8") + b"\n")
+                offsets[position + 1] = handle.tell()
+
+        self._replace(self.RECORDS, write_records)
+        self._replace(self.OFFSETS, lambda handle: np.save(handle, offsets))
+        self._replace(self.VECTORS, lambda handle: np.save(handle, matrix))
+        self._replace(self.CONTEXTS, lambda handle: np.save(handle, contexts))
+        manifest = {"count": len(records), "dim": int(matrix.shape[1]), "context_types": context_types}
+        self._replace(self.MANIFEST, lambda handle: handle.write(json.dumps(manifest).encode("utf-8")))
+        return len(records)
+
+    def upsert(self, chunks: list[RagChunk], vectors: list[list[float]]) -> int:
+        records = [{"id": chunk.chunk_id, "payload": chunk.to_payload()} for chunk in chunks]
+        return self.write(records, vectors)
+
+    def _load(self, manifest_path: Path) -> VectorIndex:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        offsets = np.load(self.directory / self.OFFSETS)
+        contexts = np.load(self.directory / self.CONTEXTS)
+        matrix = (
+            np.load(self.directory / self.VECTORS, mmap_mode="r")
+            if manifest["count"]
+            else np.zeros((0, manifest["dim"]), dtype=np.float32)
+        )
+        masks = {name: contexts[:, column] for column, name in enumerate(manifest["context_types"])}
+        return VectorIndex(JsonlRecords(self.directory / self.RECORDS, offsets), matrix, masks)
+
+    def load_index(self) -> VectorIndex | None:
+        return _cached_index(self.directory / self.MANIFEST, self._load)
+
     def search(
         self,
         query_vector: list[float],
         top_k: int = 5,
         context_type: str | None = None,
     ) -> list[RetrievalHit]:
-        records = self.load_records()
-        hits: list[RetrievalHit] = []
-        for record in records:
-            payload = record["payload"]
-            if context_type and context_type not in payload.get("context_types", []):
-                if "general" not in payload.get("context_types", []):
-                    continue
-            score = _cosine_similarity(query_vector, record["vector"])
-            hits.append(RetrievalHit(chunk_id=record["id"], score=score, payload=payload))
-
-        hits.sort(key=lambda item: item.score, reverse=True)
-        return hits[:top_k]
+        index = self.load_index()
+        if index is None:
+            return []
+        return index.search(query_vector, top_k=top_k, context_type=context_type)
+
+
+def convert_json_store(json_path: Path, npy_directory: Path) -> int:
+    """Chuyển vector_store.json sang NpyVectorStore, giữ nguyên id/payload/thứ tự."""
+    records = JsonVectorStore(json_path).load_records()
+    return NpyVectorStore(npy_directory).write(records, [record["vector"] for record in records])
 
 
 class QdrantVectorStore:
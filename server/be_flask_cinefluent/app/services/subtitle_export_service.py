@@ -0,0 +1,272 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+import time
+
+from flask import request, send_from_directory
+from sqlalchemy import select
+from werkzeug.exceptions import NotFound
+
+from ..extensions import db
+from ..models.models_model import Subtitle, Video
+from ..utils.storage_paths import get_subtitle_storage_dir
+from ..utils.subtitle_track import SubtitleTrackBuilder
+
+try:
+    import brotli
+except ImportError:  # Brotli là tùy chọn: thiếu thì chỉ sinh bản .gz
+    brotli = None
+
+
+SUBTITLE_URL_PREFIX = "/static/subs"
+# Track nhị phân dạng cột (app/utils/subtitle_track.py) xuất cùng lúc với VTT
+SUBTITLE_TRACK_EXTENSION = "cfst"
+# video_<id>.<hash 12 ký tự>.vtt: nội dung đổi thì tên đổi, nên file đã phát hành không bao giờ bị ghi đè
+VERSIONED_SUBTITLE_RE = re.compile(r"^video_\d+\.[0-9a-f]{12}\.[a-z0-9]+$")
+IMMUTABLE_MAX_AGE = 31536000
+EXPORT_FETCH_SIZE = 2000
+WRITE_BUFFER_CUES = 500
+COMPRESS_CHUNK_SIZE = 1 << 20
+# (Accept-Encoding, đuôi file) theo thứ tự ưu tiên khi phục vụ
+PRECOMPRESSED_VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+# Bản cũ mới ghi gần đây có thể là của một lượt export khác chưa kịp commit URL: chưa xóa
+STALE_VERSION_GRACE_SECONDS = 600
+
+mimetypes.add_type("text/vtt", ".vtt")
+mimetypes.add_type("application/octet-stream", f".{SUBTITLE_TRACK_EXTENSION}")
+
+
+def format_vtt_time(seconds) -> str:
+    total_ms = int(round(float(seconds or 0) * 1000))
+    hours, rest = divmod(total_ms, 3600000)
+    minutes, rest = divmod(rest, 60000)
+    secs, millis = divmod(rest, 1000)
+    return f"{hours:02}:{minutes:02}:{secs:02}.{millis:03}"
+
+
+def _format_vtt_cue(index: int, start_time, end_time, content_en, content_vi, grammar_tag_id, cloze_data) -> str:
+    lines = [str(index), f"{format_vtt_time(start_time)} --> {format_vtt_time(end_time)}", f"{content_en}"]
+    if content_vi:
+        lines.append(f"{content_vi}")
+
+    # AI Metadata (High-Performance Learning Payload), bọc trong tiền tố để Worker phía player tách ra
+    if grammar_tag_id is not None or cloze_data:
+        meta = {}
+        if grammar_tag_id is not None:
+            meta["tag_id"] = int(grammar_tag_id)
+        if cloze_data:
+            meta["cloze"] = cloze_data
+        lines.append(f"[METADATA]{json.dumps(meta, ensure_ascii=False)}")
+
+    lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def _iter_subtitle_rows(video_id: int):
+    """Đọc phụ đề theo lô bằng Core select (không dựng object ORM), sắp theo thời gian."""
+    stmt = (
+        select(
+            Subtitle.start_time,
+            Subtitle.end_time,
+            Subtitle.content_en,
+            Subtitle.content_vi,
+            Subtitle.grammar_tag_id,
+            Subtitle.cloze_data,
+        )
+        .where(Subtitle.video_id == video_id)
+        .order_by(Subtitle.start_time.asc(), Subtitle.id.asc())
+        .execution_options(yield_per=EXPORT_FETCH_SIZE)
+    )
+    yield from db.session.execute(stmt)
+
+
+def _write_atomic_from(source_path: str, final_path: str, compress) -> None:
+    """Nén source_path ra file tạm cùng thư mục rồi os.replace sang final_path."""
+    storage_dir = os.path.dirname(final_path)
+    fd, temp_path = tempfile.mkstemp(dir=storage_dir, prefix=".tmp_", suffix=os.path.basename(final_path))
+    try:
+        with os.fdopen(fd, "wb") as target, open(source_path, "rb") as source:
+            compress(source, target)
+        os.replace(temp_path, final_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _gzip_stream(source, target) -> None:
+    # mtime=0: cùng nội dung cho ra cùng file .gz
+    with gzip.GzipFile(fileobj=target, mode="wb", compresslevel=9, mtime=0) as gz:
+        while chunk := source.read(COMPRESS_CHUNK_SIZE):
+            gz.write(chunk)
+
+
+def _brotli_stream(source, target) -> None:
+    compressor = brotli.Compressor(quality=11)
+    while chunk := source.read(COMPRESS_CHUNK_SIZE):
+        target.write(compressor.process(chunk))
+    target.write(compressor.finish())
+
+
+def publish_subtitle_asset(video_id: int, extension: str, write_body) -> str:
+    """
+    Ghi một file phụ đề theo kiểu content-addressed:
+    - write_body(file_binary) ghi nội dung vào file tạm, đồng thời băm sha256
+    - tên cuối cùng video_<id>.<hash>.<extension>; nếu đã tồn tại (nội dung không đổi) thì bỏ file tạm
+    - kèm bản .gz (và .br nếu có Brotli) để nginx/Flask trả thẳng bản nén sẵn
+    Trả về tên file.
+    """
+    storage_dir = get_subtitle_storage_dir()
+    fd, temp_path = tempfile.mkstemp(dir=storage_dir, prefix=".tmp_", suffix=f".{extension}")
+    try:
+        digest = hashlib.sha256()
+        with os.fdopen(fd, "wb") as f:
+            write_body(_HashingWriter(f, digest))
+
+        file_name = f"video_{video_id}.{digest.hexdigest()[:12]}.{extension}"
+        final_path = os.path.join(storage_dir, file_name)
+        if os.path.exists(final_path):
+            os.remove(temp_path)
+        else:
+            # Bản nén xong trước rồi mới rename file gốc: khi file gốc xuất hiện thì mọi biến thể đã sẵn sàng
+            _write_atomic_from(temp_path, final_path + ".gz", _gzip_stream)
+            if brotli is not None:
+                _write_atomic_from(temp_path, final_path + ".br", _brotli_stream)
+            os.replace(temp_path, final_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return file_name
+
+
+class _HashingWriter:
+    def __init__(self, target, digest) -> None:
+        self.target = target
+        self.digest = digest
+
+    def write(self, data: bytes) -> None:
+        self.digest.update(data)
+        self.target.write(data)
+
+
+def _remove_stale_versions(video_id: int, extension: str, keep: set[str]) -> None:
+    """
+    Chỉ gọi sau khi URL mới đã commit. Giữ các file trong keep (bản mới và bản DB vừa trỏ tới, cho
+    player đã tải trang trước đó) cùng các bản ghi trong STALE_VERSION_GRACE_SECONDS gần đây.
+    """
+    storage_dir = get_subtitle_storage_dir()
+    pattern = re.compile(rf"^video_{video_id}(\.[0-9a-f]{{12}})?\.{re.escape(extension)}(\.gz|\.br)?$")
+    cutoff = time.time() - STALE_VERSION_GRACE_SECONDS
+    for name in os.listdir(storage_dir):
+        if not pattern.match(name) or any(name == kept or name.startswith(f"{kept}.") for kept in keep):
+            continue
+        path = os.path.join(storage_dir, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _write_vtt_body(video_id: int, track: SubtitleTrackBuilder):
+    # Một lượt đọc DB cho cả hai định dạng: VTT ghi dần ra file, track gom cột trong bộ nhớ
+    def write_body(f) -> None:
+        f.write(b"WEBVTT\n\n")
+        buffer = []
+        for index, row in enumerate(_iter_subtitle_rows(video_id), start=1):
+            buffer.append(_format_vtt_cue(index, *row))
+            track.add(*row)
+            if len(buffer) >= WRITE_BUFFER_CUES:
+                f.write("".join(buffer).encode("utf-8"))
+                buffer.clear()
+        if buffer:
+            f.write("".join(buffer).encode("utf-8"))
+
+    return write_body
+
+
+def export_subtitle_to_vtt(video_id):
+    """
+    Xuất phụ đề của video ra WebVTT (kèm [METADATA] grammar/cloze) và track nhị phân, tên có hash nội dung.
+    Nội dung không đổi thì không ghi file và không commit; URL mới chỉ được lưu khi đã ghi xong toàn bộ.
+    """
+    video = db.session.get(Video, video_id)
+    if not video:
+        raise ValueError(f"Video ID {video_id} không tồn tại")
+
+    track = SubtitleTrackBuilder()
+    vtt_name = publish_subtitle_asset(video_id, "vtt", _write_vtt_body(video_id, track))
+    track_name = publish_subtitle_asset(video_id, SUBTITLE_TRACK_EXTENSION, track.write_to)
+
+    # Không để /api ở đầu vì sẽ bị nhân đôi khi quan qua Proxy/API_BASE_URL
+    subtitle_vtt_url = f"{SUBTITLE_URL_PREFIX}/{vtt_name}"
+    subtitle_track_url = f"{SUBTITLE_URL_PREFIX}/{track_name}"
+    if video.subtitle_vtt_url != subtitle_vtt_url or video.subtitle_track_url != subtitle_track_url:
+        previous_urls = {"vtt": video.subtitle_vtt_url, SUBTITLE_TRACK_EXTENSION: video.subtitle_track_url}
+        video.subtitle_vtt_url = subtitle_vtt_url
+        video.subtitle_track_url = subtitle_track_url
+        db.session.commit()
+        # Dọn bản cũ sau khi commit thành công: commit lỗi thì DB vẫn trỏ về file cũ còn nguyên
+        for extension, new_name in (("vtt", vtt_name), (SUBTITLE_TRACK_EXTENSION, track_name)):
+            previous_name = (previous_urls[extension] or "").rsplit("/", 1)[-1]
+            _remove_stale_versions(video_id, extension, keep={new_name, previous_name} - {""})
+        print(f"✅ Exported VTT for Video {video_id}: {vtt_name} + {track_name} ({len(track)} cues)")
+    return video.subtitle_vtt_url
+
+
+def ensure_subtitle_vtt(video_id):
+    """Chỉ xuất lại khi video chưa có file VTT/track hợp lệ (file đã xuất luôn khớp DB nhờ hash nội dung)."""
+    video = db.session.get(Video, video_id)
+    if not video:
+        raise ValueError(f"Video ID {video_id} không tồn tại")
+
+    storage_dir = get_subtitle_storage_dir()
+    for url in (video.subtitle_vtt_url, video.subtitle_track_url):
+        file_name = (url or "").rsplit("/", 1)[-1]
+        if not VERSIONED_SUBTITLE_RE.match(file_name) or not os.path.exists(os.path.join(storage_dir, file_name)):
+            return export_subtitle_to_vtt(video_id)
+    return video.subtitle_vtt_url
+
+
+def remove_subtitle_exports(video_id: int) -> None:
+    storage_dir = get_subtitle_storage_dir()
+    pattern = re.compile(rf"^video_{video_id}(\.[0-9a-f]{{12}})?\.[a-z0-9]+(\.gz|\.br)?$")
+    for name in os.listdir(storage_dir):
+        if pattern.match(name):
+            try:
+                os.remove(os.path.join(storage_dir, name))
+            except FileNotFoundError:
+                pass
+
+
+def send_subtitle_asset(storage_dir: str, filename: str):
+    """
+    Phục vụ file phụ đề khi không có nginx đứng trước: file có hash trong tên là bất biến
+    (cache 1 năm) và ưu tiên bản nén sẵn theo Accept-Encoding.
+    """
+    if not VERSIONED_SUBTITLE_RE.match(filename):
+        return send_from_directory(storage_dir, filename)
+
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    for encoding, suffix in PRECOMPRESSED_VARIANTS:
+        if not request.accept_encodings[encoding]:
+            continue
+        try:
+            response = send_from_directory(storage_dir, filename + suffix, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+        except NotFound:
+            continue
+        response.headers["Content-Encoding"] = encoding
+        response.headers["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        response.vary.add("Accept-Encoding")
+        return response
+
+    response = send_from_directory(storage_dir, filename, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+    response.headers["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    response.vary.add("Accept-Encoding")
+    return response
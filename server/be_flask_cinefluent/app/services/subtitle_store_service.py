@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from sqlalchemy import delete, insert, null, select
+
+from ..extensions import db
+from ..models.models_model import Subtitle
+from ..utils.subtitle_analysis import analysis_text_hash
+
+
+# Số dòng mỗi lần executemany. MySQL gộp thành INSERT ... VALUES (...), (...) nhiều dòng,
+# 1000 dòng giữ mỗi câu lệnh dưới max_allowed_packet mặc định với phụ đề thông thường.
+SUBTITLE_INSERT_CHUNK_SIZE = 1000
+
+_SUBTITLE_TABLE = Subtitle.__table__
+
+
+def bulk_insert_subtitles(video_id: int, rows: Iterable[dict], chunk_size: int = SUBTITLE_INSERT_CHUNK_SIZE) -> int:
+    """
+    Ghi hàng loạt phụ đề bằng Core insert (executemany theo từng chunk), bỏ qua unit of work của ORM.
+    - rows: iterable các dict có start_time, end_time, content_en, content_vi
+      (tùy chọn: kết quả phân tích grammar_tag_id, cloze_data, grammar_confidence, analysis_*).
+    Không commit: caller quyết định ranh giới transaction.
+    """
+    stmt = insert(_SUBTITLE_TABLE)
+    chunk = []
+    count = 0
+
+    for row in rows:
+        chunk.append(
+            {
+                "video_id": video_id,
+                "start_time": row["start_time"],
+                "end_time": row["end_time"],
+                "content_en": row["content_en"],
+                "content_vi": row.get("content_vi"),
+                "grammar_tag_id": row.get("grammar_tag_id"),
+                # null(): SQL NULL thay vì JSON 'null' để các truy vấn cloze_data IS NOT NULL vẫn đúng
+                "cloze_data": row["cloze_data"] if row.get("cloze_data") is not None else null(),
+                "grammar_confidence": row.get("grammar_confidence"),
+                "analysis_hash": row.get("analysis_hash"),
+                "analysis_model_version": row.get("analysis_model_version"),
+            }
+        )
+        if len(chunk) >= chunk_size:
+            db.session.execute(stmt, chunk)
+            count += len(chunk)
+            chunk = []
+
+    if chunk:
+        db.session.execute(stmt, chunk)
+        count += len(chunk)
+
+    return count
+
+
+def delete_video_subtitles(video_id: int) -> None:
+    """Xóa toàn bộ phụ đề của video trong transaction hiện tại (không commit)."""
+    # synchronize_session mặc định ("auto") đánh dấu luôn các object Subtitle đang có trong session
+    db.session.execute(delete(Subtitle).where(Subtitle.video_id == video_id))
+
+
+def _load_stored_analysis(video_id: int) -> dict[str, dict]:
+    """Kết quả phân tích AI đã lưu của video, theo analysis_hash của câu EN."""
+    stmt = select(
+        Subtitle.analysis_hash,
+        Subtitle.grammar_tag_id,
+        Subtitle.cloze_data,
+        Subtitle.grammar_confidence,
+        Subtitle.analysis_model_version,
+    ).where(Subtitle.video_id == video_id, Subtitle.analysis_hash.isnot(None))
+
+    stored = {}
+    for analysis_hash, grammar_tag_id, cloze_data, grammar_confidence, model_version in db.session.execute(stmt):
+        stored.setdefault(
+            analysis_hash,
+            {
+                "grammar_tag_id": grammar_tag_id,
+                "cloze_data": cloze_data,
+                "grammar_confidence": grammar_confidence,
+                "analysis_hash": analysis_hash,
+                "analysis_model_version": model_version,
+            },
+        )
+    return stored
+
+
+def _carry_over_analysis(rows: Iterable[dict], stored: dict[str, dict]) -> Iterable[dict]:
+    for row in rows:
+        carried = stored.get(analysis_text_hash(row["content_en"]))
+        yield {**row, **carried} if carried else row
+
+
+def replace_video_subtitles(
+    video_id: int,
+    rows: Iterable[dict],
+    chunk_size: int = SUBTITLE_INSERT_CHUNK_SIZE,
+    preserve_analysis: bool = True,
+) -> int:
+    """
+    Thay toàn bộ phụ đề của video: xóa cũ + insert mới trong cùng một transaction.
+    preserve_analysis: câu EN không đổi giữ lại nhãn ngữ pháp/cloze cũ để lần phân tích sau khỏi chạy lại model.
+    Không commit: caller commit một lần để việc hoán đổi là nguyên tử.
+    """
+    stored = _load_stored_analysis(video_id) if preserve_analysis else {}
+    delete_video_subtitles(video_id)
+    if stored:
+        rows = _carry_over_analysis(rows, stored)
+    return bulk_insert_subtitles(video_id, rows, chunk_size=chunk_size)
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import func, select
+
+from ..extensions import db
+from ..models.models_model import Subtitle
+from ..utils.storage_paths import get_subtitle_response_cache_dir
+
+
+SUBTITLE_TIMELINE_CACHE_SIZE = int(os.getenv("SUBTITLE_TIMELINE_CACHE_SIZE", "64"))
+# Ghi phụ đề ở process khác (jobs-worker) không gọi được invalidate của process này:
+# sau khoảng này entry được đối chiếu lại với DB bằng một truy vấn COUNT/MAX(id) rẻ
+SUBTITLE_TIMELINE_REVALIDATE_SECONDS = float(os.getenv("SUBTITLE_TIMELINE_REVALIDATE_SECONDS", "30"))
+SUBTITLE_RESPONSE_CACHE_SIZE = int(os.getenv("SUBTITLE_RESPONSE_CACHE_SIZE", "256"))
+
+
+@dataclass(slots=True)
+class SubtitleTimeline:
+    """Phụ đề của một video sắp theo start_time, tra cứu theo thời điểm bằng bisect."""
+
+    video_id: int
+    fingerprint: tuple
+    starts: list[float]
+    ends: list[float]
+    # max(ends[0..i]): dừng sớm khi lùi tìm cue còn phủ thời điểm t
+    max_end_prefix: list[float]
+    cues: tuple
+    checked_at: float
+
+    def index_at(self, current_time: float) -> int | None:
+        """
+        Cùng quy tắc với truy vấn SQL cũ: cue đang phủ t có start lớn nhất, nếu không có
+        thì cue gần nhất bắt đầu trước t, nếu t trước mọi cue thì cue đầu tiên.
+        """
+        if not self.cues:
+            return None
+
+        index = bisect_right(self.starts, current_time) - 1
+        if index < 0:
+            return 0
+
+        position = index
+        while position >= 0 and self.max_end_prefix[position] >= current_time:
+            if self.ends[position] >= current_time:
+                return position
+            position -= 1
+        return index
+
+
+_TIMELINES: OrderedDict = OrderedDict()
+_TIMELINES_LOCK = threading.Lock()
+
+
+@dataclass(slots=True)
+class SubtitleListBody:
+    """Body JSON đã serialize sẵn của GET /api/videos/<id>/subtitles cùng ETag mạnh."""
+
+    video_id: int
+    fingerprint: tuple
+    etag: str
+    body: bytes
+    checked_at: float
+
+    @property
+    def cue_count(self) -> int:
+        return self.fingerprint[0]
+
+
+_BODIES: OrderedDict = OrderedDict()
+_BODIES_LOCK = threading.Lock()
+
+
+def _fetch_fingerprint(video_id: int) -> tuple:
+    count, max_id = db.session.execute(
+        select(func.count(Subtitle.id), func.max(Subtitle.id)).where(Subtitle.video_id == video_id)
+    ).one()
+    return int(count or 0), int(max_id or 0)
+
+
+def _load_timeline(video_id: int) -> SubtitleTimeline:
+    rows = db.session.execute(
+        select(Subtitle.id, Subtitle.start_time, Subtitle.end_time, Subtitle.content_en, Subtitle.content_vi)
+        .where(Subtitle.video_id == video_id)
+        .order_by(Subtitle.start_time.asc(), Subtitle.id.asc())
+    ).all()
+
+    starts, ends, max_end_prefix, cues = [], [], [], []
+    max_end = float("-inf")
+    max_id = 0
+    for subtitle_id, start_time, end_time, content_en, content_vi in rows:
+        starts.append(start_time)
+        ends.append(end_time)
+        max_end = max(max_end, end_time)
+        max_end_prefix.append(max_end)
+        max_id = max(max_id, subtitle_id)
+        # Cùng field và thứ tự với SubtitleSchema
+        cues.append({
+            "id": subtitle_id,
+            "start_time": start_time,
+            "end_time": end_time,
+            "content_en": content_en,
+            "content_vi": content_vi,
+        })
+
+    return SubtitleTimeline(
+        video_id=video_id,
+        fingerprint=(len(cues), max_id),
+        starts=starts,
+        ends=ends,
+        max_end_prefix=max_end_prefix,
+        cues=tuple(cues),
+        checked_at=time.monotonic(),
+    )
+
+
+def get_subtitle_timeline(video_id: int) -> SubtitleTimeline:
+    with _TIMELINES_LOCK:
+        timeline = _TIMELINES.get(video_id)
+        if timeline is not None:
+            _TIMELINES.move_to_end(video_id)
+
+    if timeline is not None:
+        if time.monotonic() - timeline.checked_at < SUBTITLE_TIMELINE_REVALIDATE_SECONDS:
+            return timeline
+        if _fetch_fingerprint(video_id) == timeline.fingerprint:
+            timeline.checked_at = time.monotonic()
+            return timeline
+
+    timeline = _load_timeline(video_id)
+    with _TIMELINES_LOCK:
+        _TIMELINES[video_id] = timeline
+        _TIMELINES.move_to_end(video_id)
+        while len(_TIMELINES) > SUBTITLE_TIMELINE_CACHE_SIZE:
+            _TIMELINES.popitem(last=False)
+    return timeline
+
+
+def invalidate_subtitle_timeline(video_id: int) -> None:
+    """Gọi sau khi commit thay đổi phụ đề của video (lưu lại, xóa, phân tích AI): bỏ cả timeline lẫn body đã serialize."""
+    with _TIMELINES_LOCK:
+        _TIMELINES.pop(video_id, None)
+    with _BODIES_LOCK:
+        _BODIES.pop(video_id, None)
+    _remove_cached_bodies(video_id)
+
+
+def cue_at(video_id: int, current_time: float) -> dict | None:
+    timeline = get_subtitle_timeline(video_id)
+    index = timeline.index_at(current_time)
+    return dict(timeline.cues[index]) if index is not None else None
+
+
+def window(video_id: int, current_time: float, k: int) -> list[dict]:
+    """Cue tại thời điểm current_time cùng k cue trước và k cue sau."""
+    timeline = get_subtitle_timeline(video_id)
+    index = timeline.index_at(current_time)
+    if index is None:
+        return []
+    return [dict(cue) for cue in timeline.cues[max(0, index - k):index + k + 1]]
+
+
+def subtitle_cues(video_id: int) -> tuple:
+    """Toàn bộ cue (dict dùng chung, chỉ đọc) theo thứ tự thời gian."""
+    return get_subtitle_timeline(video_id).cues
+
+
+def _body_cache_path(video_id: int, fingerprint: tuple) -> str:
+    # Tên file gắn với phiên bản nội dung (COUNT, MAX(id)): file cũ không bao giờ bị đọc nhầm
+    return os.path.join(get_subtitle_response_cache_dir(), f"video_{video_id}.{fingerprint[0]}_{fingerprint[1]}.json")
+
+
+def _remove_cached_bodies(video_id: int, keep: str | None = None) -> None:
+    cache_dir = get_subtitle_response_cache_dir()
+    pattern = re.compile(rf"^video_{video_id}\.\d+_\d+\.json$")
+    for name in os.listdir(cache_dir):
+        if pattern.match(name) and name != keep:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except FileNotFoundError:
+                pass
+
+
+def _read_cached_body(video_id: int, fingerprint: tuple) -> bytes | None:
+    try:
+        with open(_body_cache_path(video_id, fingerprint), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write_cached_body(video_id: int, fingerprint: tuple, body: bytes) -> None:
+    path = _body_cache_path(video_id, fingerprint)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    # Phiên bản cũ do process khác ghi (không qua invalidate của process này)
+    _remove_cached_bodies(video_id, keep=os.path.basename(path))
+
+
+def _serialize_subtitle_list(cues) -> bytes:
+    # Cùng envelope với success_response
+    payload = {"code": 200, "message": None, "data": list(cues)}
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _make_list_body(video_id: int, fingerprint: tuple, body: bytes) -> SubtitleListBody:
+    etag = f"{video_id}-{fingerprint[0]}-{fingerprint[1]}-{hashlib.sha256(body).hexdigest()[:16]}"
+    return SubtitleListBody(video_id, fingerprint, etag, body, time.monotonic())
+
+
+def get_subtitle_list_body(video_id: int) -> SubtitleListBody:
+    """
+    Body của danh sách phụ đề: RAM (LRU) -> file trên đĩa theo phiên bản -> serialize từ timeline.
+    Process mới khởi động chỉ tốn một truy vấn COUNT/MAX(id) nếu file đĩa đã có.
+    """
+    with _BODIES_LOCK:
+        entry = _BODIES.get(video_id)
+        if entry is not None:
+            _BODIES.move_to_end(video_id)
+
+    now = time.monotonic()
+    if entry is not None and now - entry.checked_at < SUBTITLE_TIMELINE_REVALIDATE_SECONDS:
+        return entry
+
+    fingerprint = _fetch_fingerprint(video_id)
+    if entry is not None and entry.fingerprint == fingerprint:
+        entry.checked_at = now
+        return entry
+
+    body = _read_cached_body(video_id, fingerprint)
+    if body is None:
+        timeline = get_subtitle_timeline(video_id)
+        fingerprint = timeline.fingerprint
+        body = _serialize_subtitle_list(timeline.cues)
+        _write_cached_body(video_id, fingerprint, body)
+
+    entry = _make_list_body(video_id, fingerprint, body)
+    with _BODIES_LOCK:
+        _BODIES[video_id] = entry
+        _BODIES.move_to_end(video_id)
+        while len(_BODIES) > SUBTITLE_RESPONSE_CACHE_SIZE:
+            _BODIES.popitem(last=False)
+    return entry
@@ -0,0 +1,36 @@
+from .config import TranslationSettings
+from .engine import (
+    TranslationEngine,
+    TranslationRun,
+    build_translation_memory,
+    get_translation_engine,
+    get_translation_memory,
+)
+from .memory import (
+    DbTranslationMemory,
+    LruTranslationMemory,
+    NullTranslationMemory,
+    SqliteTranslationMemory,
+    backfill_translation_memory_from_subtitles,
+    normalize_source_text,
+)
+from .rate_limit import TokenBucket
+from .translators import FakeTranslator, GoogleRemoteTranslator
+
+__all__ = [
+    "DbTranslationMemory",
+    "FakeTranslator",
+    "GoogleRemoteTranslator",
+    "LruTranslationMemory",
+    "NullTranslationMemory",
+    "SqliteTranslationMemory",
+    "TokenBucket",
+    "TranslationEngine",
+    "TranslationRun",
+    "TranslationSettings",
+    "backfill_translation_memory_from_subtitles",
+    "build_translation_memory",
+    "get_translation_engine",
+    "get_translation_memory",
+    "normalize_source_text",
+]
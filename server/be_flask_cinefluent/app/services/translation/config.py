@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass(slots=True)
+class TranslationSettings:
+    backend: str = "google"
+    max_workers: int = 4
+    rate_per_second: float = 4.0
+    burst: int = 4
+    max_chars_per_batch: int = 4500
+    max_batch_size: int = 200
+    max_retries: int = 3
+    backoff_seconds: float = 2.0
+    memory_kind: str = "db"
+    memory_lru_size: int = 50000
+    memory_path: Path | None = None
+
+    @classmethod
+    def from_env(cls) -> "TranslationSettings":
+        storage_dir = Path(__file__).resolve().parents[3] / "storage" / "translation"
+        return cls(
+            backend=os.getenv("TRANSLATION_BACKEND", "google").strip().lower() or "google",
+            max_workers=int(os.getenv("TRANSLATION_MAX_WORKERS", "4")),
+            rate_per_second=float(os.getenv("TRANSLATION_RATE_PER_SECOND", "4")),
+            burst=int(os.getenv("TRANSLATION_BURST", "4")),
+            max_chars_per_batch=int(os.getenv("TRANSLATION_MAX_CHARS_PER_BATCH", "4500")),
+            max_batch_size=int(os.getenv("TRANSLATION_MAX_BATCH_SIZE", "200")),
+            max_retries=int(os.getenv("TRANSLATION_MAX_RETRIES", "3")),
+            backoff_seconds=float(os.getenv("TRANSLATION_BACKOFF_SECONDS", "2")),
+            memory_kind=os.getenv("TRANSLATION_MEMORY", "db").strip().lower() or "db",
+            memory_lru_size=int(os.getenv("TRANSLATION_MEMORY_LRU_SIZE", "50000")),
+            memory_path=Path(os.getenv("TRANSLATION_MEMORY_PATH", storage_dir / "translation_memory.sqlite3")),
+        )
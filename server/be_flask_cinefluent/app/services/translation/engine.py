@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator
+
+from .config import TranslationSettings
+from .memory import (
+    DbTranslationMemory,
+    LruTranslationMemory,
+    NullTranslationMemory,
+    SqliteTranslationMemory,
+    normalize_source_text,
+)
+from .rate_limit import TokenBucket
+from .translators import BATCH_SEPARATOR, BATCH_SPLIT_TOKEN, build_translator
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    error_str = str(error)
+    return "429" in error_str or "Too Many Requests" in error_str or "rate" in error_str.lower()
+
+
+class TranslationRun:
+    """
+    Một lượt dịch danh sách câu. Duyệt qua object để nhận tiến độ (done, total) mỗi khi
+    một batch xong; kết quả nằm trong `results` (None với câu dịch lỗi), đúng thứ tự đầu vào.
+    """
+
+    def __init__(self, engine: "TranslationEngine", texts: list[str]) -> None:
+        self._engine = engine
+        self._texts = texts
+        self.total = len(texts)
+        self.results: list[str | None] = [None] * len(texts)
+        self.cache_hits = 0
+        self.remote_texts = 0
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        engine = self._engine
+
+        # Gom các câu giống nhau sau chuẩn hóa: mỗi câu chỉ tra bộ nhớ dịch / dịch một lần
+        positions: dict[str, list[int]] = {}
+        done = 0
+        for index, text in enumerate(self._texts):
+            key = normalize_source_text(text)
+            if not key:
+                self.results[index] = ""
+                done += 1
+                continue
+            positions.setdefault(key, []).append(index)
+
+        cached = engine.memory.get_many(list(positions), engine.target)
+        for text, translated in cached.items():
+            for index in positions.pop(text):
+                self.results[index] = translated
+                done += 1
+        self.cache_hits = len(cached)
+        yield done, self.total
+
+        pending = deque(positions)
+        self.remote_texts = len(pending)
+        if not pending:
+            return
+
+        with ThreadPoolExecutor(max_workers=engine.max_workers, thread_name_prefix="translate") as pool:
+            in_flight = {}
+            while pending or in_flight:
+                # Lập batch kế tiếp theo kích thước batch hiện tại (đã điều chỉnh theo kết quả trước đó)
+                while pending and len(in_flight) < engine.max_workers:
+                    batch = engine._take_batch(pending)
+                    in_flight[pool.submit(engine._translate_chunk, batch)] = batch
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    batch = in_flight.pop(future)
+                    learned = {}
+                    for text, translated in zip(batch, future.result()):
+                        for index in positions[text]:
+                            self.results[index] = translated
+                            done += 1
+                        if translated:
+                            learned[text] = translated
+                    engine.memory.put_many(learned, engine.target)
+                yield done, self.total
+
+
+class TranslationEngine:
+    """
+    Dịch hàng loạt với worker pool giới hạn, token bucket chống rate limit, batch size tự điều chỉnh
+    và bộ nhớ dịch (câu đã dịch không bao giờ gửi lại lần hai).
+    """
+
+    def __init__(
+        self,
+        translator,
+        memory=None,
+        target: str = "vi",
+        max_workers: int = 4,
+        rate_limiter: TokenBucket | None = None,
+        max_chars_per_batch: int = 4500,
+        max_batch_size: int = 200,
+        max_retries: int = 3,
+        backoff_seconds: float = 2.0,
+    ) -> None:
+        self.translator = translator
+        self.memory = memory or NullTranslationMemory()
+        self.target = target
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = rate_limiter or TokenBucket(rate=0)
+        self.max_chars_per_batch = max_chars_per_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_retries = max(1, max_retries)
+        self.backoff_seconds = backoff_seconds
+        self._batch_size = self.max_batch_size
+        self._batch_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(
+        cls,
+        settings: TranslationSettings,
+        source: str = "en",
+        target: str = "vi",
+        memory=None,
+        rate_limiter: TokenBucket | None = None,
+    ):
+        return cls(
+            translator=build_translator(settings, source=source, target=target),
+            memory=memory,
+            target=target,
+            max_workers=settings.max_workers,
+            rate_limiter=rate_limiter or TokenBucket(rate=settings.rate_per_second, capacity=settings.burst),
+            max_chars_per_batch=settings.max_chars_per_batch,
+            max_batch_size=settings.max_batch_size,
+            max_retries=settings.max_retries,
+            backoff_seconds=settings.backoff_seconds,
+        )
+
+    def start(self, texts: list[str]) -> TranslationRun:
+        return TranslationRun(self, list(texts))
+
+    def translate_many(self, texts: list[str]) -> list[str | None]:
+        run = self.start(texts)
+        for _ in run:
+            pass
+        return run.results
+
+    # --- Batch sizing (AIMD: tăng dần khi thành công, giảm một nửa khi lệch/lỗi) ---
+    def _take_batch(self, pending: deque) -> list[str]:
+        with self._batch_lock:
+            limit = self._batch_size
+        batch = [pending.popleft()]
+        chars = len(batch[0])
+        while pending and len(batch) < limit:
+            next_chars = chars + len(BATCH_SEPARATOR) + len(pending[0])
+            if next_chars > self.max_chars_per_batch:
+                break
+            batch.append(pending.popleft())
+            chars = next_chars
+        return batch
+
+    def _record_batch(self, size: int, ok: bool) -> None:
+        with self._batch_lock:
+            if ok:
+                self._batch_size = min(self.max_batch_size, self._batch_size + max(1, self._batch_size // 4))
+            else:
+                self._batch_size = max(1, min(self._batch_size, size) // 2)
+
+    # --- Remote call ---
+    def _call(self, text: str) -> str:
+        for attempt in range(self.max_retries):
+            self.rate_limiter.acquire()
+            try:
+                translated = self.translator.translate(text)
+                if not isinstance(translated, str):
+                    raise ValueError("Translator trả về kết quả rỗng")
+                return translated
+            except Exception as e:
+                if _is_rate_limited(e) and attempt < self.max_retries - 1:
+                    wait_time = (2 ** attempt) * self.backoff_seconds  # Exponential backoff
+                    print(f"      ⚠️ Rate limited, waiting {wait_time}s before retry...")
+                    time.sleep(wait_time)
+                    continue
+                raise
+        raise RuntimeError(f"Rate limit exceeded after {self.max_retries} retries")
+
+    def _translate_chunk(self, texts: list[str]) -> list[str | None]:
+        if len(texts) == 1:
+            try:
+                return [self._call(texts[0]).strip()]
+            except Exception as e:
+                print(f"      ❌ Translation failed: {e}")
+                return [None]
+
+        try:
+            translated_combined = self._call(BATCH_SEPARATOR.join(texts))
+            parts = [part.strip() for part in translated_combined.split(BATCH_SPLIT_TOKEN)]
+            if len(parts) == len(texts):
+                self._record_batch(len(texts), ok=True)
+                return parts
+            print(f"      ⚠️ Batch mismatch: expected {len(texts)} parts, got {len(parts)}")
+        except Exception as e:
+            print(f"      ❌ Batch of {len(texts)} failed: {e}")
+
+        # Chia đôi batch và dịch lại thay vì rơi về dịch từng câu một
+        self._record_batch(len(texts), ok=False)
+        middle = len(texts) // 2
+        return self._translate_chunk(texts[:middle]) + self._translate_chunk(texts[middle:])
+
+
+_ENGINES: dict[tuple[str, str], TranslationEngine] = {}
+_ENGINES_LOCK = threading.Lock()
+# Bộ nhớ dịch và rate limit dùng chung cho mọi cặp ngôn ngữ (cùng một dịch vụ dịch phía sau)
+_SHARED_MEMORY = None
+_SHARED_RATE_LIMITER = None
+
+
+def build_translation_memory(settings: TranslationSettings):
+    """Bộ nhớ dịch theo TRANSLATION_MEMORY (db | sqlite | none), có LRU trong process phía trước."""
+    if settings.memory_kind == "none":
+        return NullTranslationMemory()
+    if settings.memory_kind == "sqlite":
+        backend = SqliteTranslationMemory(settings.memory_path)
+    elif settings.memory_kind == "db":
+        backend = DbTranslationMemory()
+    else:
+        raise ValueError(f"TRANSLATION_MEMORY không hợp lệ: {settings.memory_kind}")
+    if settings.memory_lru_size <= 0:
+        return backend
+    return LruTranslationMemory(backend, capacity=settings.memory_lru_size)
+
+
+def get_translation_memory():
+    """Bộ nhớ dịch dùng chung trong process (None nếu chưa engine nào được tạo)."""
+    return _SHARED_MEMORY
+
+
+def get_translation_engine(target: str = "vi", source: str = "en") -> TranslationEngine:
+    """Engine dùng chung trong process cho mỗi cặp ngôn ngữ (cấu hình qua biến môi trường TRANSLATION_*)."""
+    global _SHARED_MEMORY, _SHARED_RATE_LIMITER
+
+    key = (source, target)
+    engine = _ENGINES.get(key)
+    if engine is not None:
+        return engine
+
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(key)
+        if engine is None:
+            settings = TranslationSettings.from_env()
+            if _SHARED_MEMORY is None:
+                _SHARED_MEMORY = build_translation_memory(settings)
+            if _SHARED_RATE_LIMITER is None:
+                _SHARED_RATE_LIMITER = TokenBucket(rate=settings.rate_per_second, capacity=settings.burst)
+            engine = TranslationEngine.from_settings(
+                settings,
+                source=source,
+                target=target,
+                memory=_SHARED_MEMORY,
+                rate_limiter=_SHARED_RATE_LIMITER,
+            )
+            _ENGINES[key] = engine
+        return engine
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from pathlib import Path
+
+# SQLite giới hạn số biến trong một câu lệnh (mặc định 999)
+_SQLITE_LOOKUP_CHUNK = 500
+_DB_LOOKUP_CHUNK = 500
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_QUOTE_TRANSLATION = str.maketrans({"\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"', "\u2013": "-", "\u2014": "-"})
+
+
+def normalize_source_text(text: str) -> str:
+    """
+    Chuẩn hóa câu gốc làm khóa bộ nhớ dịch: NFKC (… -> ...), thống nhất dấu nháy/gạch ngang,
+    gộp khoảng trắng. Giữ nguyên hoa/thường để không làm sai nghĩa ("US" vs "us").
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text).translate(_QUOTE_TRANSLATION)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class SqliteTranslationMemory:
+    """
+    Bộ nhớ dịch trong một file SQLite cục bộ: sha1(câu gốc đã chuẩn hóa) -> bản dịch.
+    Dùng khi chạy ngoài Flask app (benchmark, script) hoặc TRANSLATION_MEMORY=sqlite.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translation_memory ("
+            " target_lang TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " translated TEXT NOT NULL,"
+            " PRIMARY KEY (target_lang, text_hash))"
+        )
+        self._conn.commit()
+
+    def get_many(self, texts: list[str], target_lang: str) -> dict[str, str]:
+        hash_to_text = {text_hash(text): text for text in texts}
+        hashes = list(hash_to_text)
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), _SQLITE_LOOKUP_CHUNK):
+                chunk = hashes[start:start + _SQLITE_LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT text_hash, translated FROM translation_memory"
+                    f" WHERE target_lang = ? AND text_hash IN ({placeholders})",
+                    [target_lang, *chunk],
+                ).fetchall()
+                for key, translated in rows:
+                    found[hash_to_text[key]] = translated
+        return found
+
+    def put_many(self, translations: dict[str, str], target_lang: str) -> None:
+        if not translations:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translation_memory (target_lang, text_hash, translated) VALUES (?, ?, ?)",
+                [(target_lang, text_hash(text), translated) for text, translated in translations.items()],
+            )
+            self._conn.commit()
+
+
+class DbTranslationMemory:
+    """
+    Bộ nhớ dịch dùng chung trong database (bảng translation_memory), chia sẻ giữa mọi worker
+    và mọi phim. Dùng connection riêng (db.engine) để không đụng vào transaction của session.
+    """
+
+    def get_many(self, texts: list[str], target_lang: str) -> dict[str, str]:
+        from sqlalchemy import select
+
+        from ...extensions import db
+        from ...models.models_model import TranslationMemoryEntry
+
+        hash_to_text = {text_hash(text): text for text in texts}
+        hashes = list(hash_to_text)
+        found = {}
+        with db.engine.connect() as conn:
+            for start in range(0, len(hashes), _DB_LOOKUP_CHUNK):
+                chunk = hashes[start:start + _DB_LOOKUP_CHUNK]
+                rows = conn.execute(
+                    select(TranslationMemoryEntry.source_hash, TranslationMemoryEntry.translated_text).where(
+                        TranslationMemoryEntry.target_lang == target_lang,
+                        TranslationMemoryEntry.source_hash.in_(chunk),
+                    )
+                )
+                for key, translated in rows:
+                    found[hash_to_text[key]] = translated
+        return found
+
+    def put_many(self, translations: dict[str, str], target_lang: str, origin: str = "machine") -> int:
+        """Thêm bản dịch mới; câu đã có trong bộ nhớ được giữ nguyên (không ghi đè)."""
+        if not translations:
+            return 0
+
+        from datetime import datetime
+
+        from ...extensions import db
+        from ...models.models_model import TranslationMemoryEntry
+        from ...utils.sql_upsert import build_upsert
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                "source_hash": text_hash(text),
+                "target_lang": target_lang,
+                "source_text": text,
+                "translated_text": translated,
+                "origin": origin,
+                "created_at": now,
+            }
+            for text, translated in translations.items()
+        ]
+        stmt = build_upsert(
+            TranslationMemoryEntry.__table__,
+            db.engine.dialect.name,
+            conflict_columns=["source_hash", "target_lang"],
+        )
+        with db.engine.begin() as conn:
+            for start in range(0, len(rows), _DB_LOOKUP_CHUNK):
+                conn.execute(stmt, rows[start:start + _DB_LOOKUP_CHUNK])
+        return len(rows)
+
+    def count(self, target_lang: str | None = None) -> int:
+        from ...models.models_model import TranslationMemoryEntry
+
+        query = TranslationMemoryEntry.query
+        if target_lang:
+            query = query.filter_by(target_lang=target_lang)
+        return query.count()
+
+
+class LruTranslationMemory:
+    """
+    LRU trong process đặt trước một bộ nhớ dịch bền vững (DB/SQLite).
+    Câu hay lặp ("Yeah.", "What?") được trả ngay từ RAM; đếm hit/miss để báo hit ratio.
+    """
+
+    def __init__(self, backend, capacity: int = 50000) -> None:
+        self.backend = backend
+        self.capacity = max(1, capacity)
+        self._entries: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.lru_hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+
+    def get_many(self, texts: list[str], target_lang: str) -> dict[str, str]:
+        found = {}
+        missing = []
+        with self._lock:
+            for text in texts:
+                key = (target_lang, text)
+                translated = self._entries.get(key)
+                if translated is None:
+                    missing.append(text)
+                else:
+                    self._entries.move_to_end(key)
+                    found[text] = translated
+            self.lru_hits += len(found)
+
+        from_backend = self.backend.get_many(missing, target_lang) if missing else {}
+        found.update(from_backend)
+        with self._lock:
+            self.backend_hits += len(from_backend)
+            self.misses += len(missing) - len(from_backend)
+            self._remember(from_backend, target_lang)
+        return found
+
+    def put_many(self, translations: dict[str, str], target_lang: str) -> None:
+        if not translations:
+            return
+        self.backend.put_many(translations, target_lang)
+        with self._lock:
+            self._remember(translations, target_lang)
+
+    def _remember(self, translations: dict[str, str], target_lang: str) -> None:
+        for text, translated in translations.items():
+            self._entries[(target_lang, text)] = translated
+            self._entries.move_to_end((target_lang, text))
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.lru_hits + self.backend_hits + self.misses
+            hits = self.lru_hits + self.backend_hits
+            return {
+                "lookups": lookups,
+                "lru_hits": self.lru_hits,
+                "backend_hits": self.backend_hits,
+                "misses": self.misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "lru_size": len(self._entries),
+                "lru_capacity": self.capacity,
+            }
+
+
+class NullTranslationMemory:
+    def get_many(self, texts: list[str], target_lang: str) -> dict[str, str]:
+        return {}
+
+    def put_many(self, translations: dict[str, str], target_lang: str) -> None:
+        return None
+
+
+def backfill_translation_memory_from_subtitles(
+    memory: DbTranslationMemory,
+    target_lang: str = "vi",
+    video_id: int | None = None,
+    batch_size: int = 5000,
+) -> dict:
+    """
+    Seed bộ nhớ dịch từ các dòng subtitles đã có cả EN và VI.
+    Một câu EN xuất hiện với nhiều bản dịch khác nhau -> chọn bản dịch phổ biến nhất.
+    """
+    from sqlalchemy import select
+
+    from ...extensions import db
+    from ...models.models_model import Subtitle
+
+    query = select(Subtitle.content_en, Subtitle.content_vi).where(
+        Subtitle.content_en != "",
+        Subtitle.content_vi.isnot(None),
+        Subtitle.content_vi != "",
+    )
+    if video_id is not None:
+        query = query.where(Subtitle.video_id == video_id)
+
+    votes: dict[str, Counter] = {}
+    scanned = 0
+    with db.engine.connect() as conn:
+        result = conn.execution_options(yield_per=batch_size).execute(query)
+        for content_en, content_vi in result:
+            scanned += 1
+            source = normalize_source_text(content_en)
+            translated = (content_vi or "").strip()
+            if source and translated:
+                votes.setdefault(source, Counter())[translated] += 1
+
+    translations = {source: counter.most_common(1)[0][0] for source, counter in votes.items()}
+    before = memory.count(target_lang)
+    memory.put_many(translations, target_lang, origin="subtitle")
+    after = memory.count(target_lang)
+    return {
+        "scanned_rows": scanned,
+        "unique_sources": len(translations),
+        "inserted": after - before,
+        "total_entries": after,
+    }
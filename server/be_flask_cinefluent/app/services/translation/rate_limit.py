@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket dùng chung giữa các worker dịch: tối đa `rate` request/giây,
+    cho phép dồn tối đa `capacity` request một lúc. rate <= 0 nghĩa là không giới hạn.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1) -> None:
+        self.rate = float(rate)
+        self.capacity = max(1, int(capacity))
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_seconds = (tokens - self._tokens) / self.rate
+            time.sleep(wait_seconds)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from .config import TranslationSettings
+
+# Dùng khi gộp nhiều câu thành một request dịch
+BATCH_SEPARATOR = " |||SUBTITLE_SEP||| "
+BATCH_SPLIT_TOKEN = "|||SUBTITLE_SEP|||"
+
+
+class GoogleRemoteTranslator:
+    """
+    Bọc deep_translator.GoogleTranslator. Object gốc sửa params dùng chung trong mỗi lần gọi
+    nên không thread-safe: mỗi worker thread giữ một instance riêng và dùng lại cho mọi request.
+    """
+
+    def __init__(self, source: str = "en", target: str = "vi") -> None:
+        self.source = source
+        self.target = target
+        self._local = threading.local()
+
+    def translate(self, text: str) -> str:
+        translator = getattr(self._local, "translator", None)
+        if translator is None:
+            from deep_translator import GoogleTranslator
+
+            translator = GoogleTranslator(source=self.source, target=self.target)
+            self._local.translator = translator
+        return translator.translate(text)
+
+
+class FakeTranslator:
+    """
+    Translator giả lập chạy offline (benchmark, chạy thử không có mạng).
+    Giữ nguyên separator của batch và mô phỏng độ trễ mạng.
+    """
+
+    def __init__(self, target: str = "vi", latency: float = 0.0, per_char_latency: float = 0.0) -> None:
+        self.target = target
+        self.latency = latency
+        self.per_char_latency = per_char_latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def translate(self, text: str) -> str:
+        with self._lock:
+            self.calls += 1
+        delay = self.latency + self.per_char_latency * len(text)
+        if delay > 0:
+            time.sleep(delay)
+        parts = [part.strip() for part in text.split(BATCH_SPLIT_TOKEN)]
+        return BATCH_SEPARATOR.join(f"[{self.target}] {part}" for part in parts)
+
+
+def build_translator(settings: TranslationSettings, source: str = "en", target: str = "vi"):
+    if settings.backend == "google":
+        return GoogleRemoteTranslator(source=source, target=target)
+    if settings.backend == "fake":
+        return FakeTranslator(target=target)
+    raise ValueError(f"TRANSLATION_BACKEND không hợp lệ: {settings.backend}")
@@ -1,43 +1,24 @@
 import os
 import json
 import tempfile
-import time
 import shutil
 import glob
 import traceback
 import yt_dlp
 from datetime import timedelta
 from slugify import slugify
-from deep_translator import GoogleTranslator
 from sqlalchemy.orm import selectinload
 
-# Global Translator instance
-translator = GoogleTranslator(source='en', target='vi')
-
-def translate_with_retry(text, max_retries=3):
-    """Dịch với retry logic cho rate limiting"""
-    for attempt in range(max_retries):
-        try:
-            return translator.translate(text)
-        except Exception as e:
-            error_str = str(e)
-            if '429' in error_str or 'Too Many Requests' in error_str or 'rate' in error_str.lower():
-                if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt) * 2  # Exponential backoff: 2s, 4s, 8s
-                    print(f"      ⚠️ Rate limited, waiting {wait_time}s before retry...")
-                    time.sleep(wait_time)
-                else:
-                    raise Exception(f"Rate limit exceeded after {max_retries} retries")
-            else:
-                raise
-    return text
-
-from ..models.models_model import Video, Subtitle, Category, MovieAIAnalysis
+from ..models.models_model import Video, Category, MovieAIAnalysis
 from ..extensions import db, socketio
 from ..schemas.video_schema import VideoSchema
 from ..utils.subtitle_utils import parse_vtt
-from ..utils.storage_paths import get_subtitle_storage_dir
+from ..utils.subtitle_alignment import align_subtitles, merge_aligned_texts, resolve_alignment_strategy
 from .tmdb_service import search_movie_by_tmdb
+from .translation import get_translation_engine
+from .subtitle_store_service import bulk_insert_subtitles, delete_video_subtitles, replace_video_subtitles
+from .subtitle_export_service import ensure_subtitle_vtt, export_subtitle_to_vtt, remove_subtitle_exports
+from .subtitle_timeline_service import invalidate_subtitle_timeline
 from .learning_service import suggest_multiple_categories
 from ..schemas.video_schema import (
     ImportYoutubeRequest, 
@@ -237,103 +218,30 @@ def import_youtube_video(user_id, data: ImportYoutubeRequest):
 
         print(f"Got {len(transcript)} English entries ({en_type})")
 
-        # Dịch subtitle bằng Google Translate API (BATCH MODE - Tối ưu động)
-        print("Translating subtitles using Google Translate (Dynamic Batch mode)...")
-        
-        # Tái sử dụng translator toàn cục
-        # Tính batch size động dựa trên độ dài text
-        total_chars = sum(len(item['text']) for item in transcript)
-        avg_chars = total_chars / len(transcript) if transcript else 50
-        
-        MAX_CHARS_PER_BATCH = 4500
-        SEPARATOR = ' |||SUBTITLE_SEP||| '
-        SEPARATOR_LENGTH = len(SEPARATOR)
-        
-        BATCH_SIZE = int(MAX_CHARS_PER_BATCH / (avg_chars + SEPARATOR_LENGTH))
-        BATCH_SIZE = max(10, min(BATCH_SIZE, 200))
-        
-        transcript_vi = []
-        total_batches = (len(transcript) + BATCH_SIZE - 1) // BATCH_SIZE
-        print(f"   🎯 Optimal batch size: {BATCH_SIZE}, Total batches: {total_batches}")
-        yield {"status": "processing", "message": f"Đang dịch {len(transcript)} câu phụ đề (chia làm {total_batches} đợt)...", "step": 3}
-        
-        for batch_idx in range(0, len(transcript), BATCH_SIZE):
-            batch_num = (batch_idx // BATCH_SIZE) + 1
-            batch = transcript[batch_idx:batch_idx + BATCH_SIZE]
-            
-            # Tính số ký tự trong batch này
-            batch_chars = sum(len(item['text']) for item in batch)
-            
-            try:
-                # Gộp tất cả câu trong batch thành 1 string
-                combined_text = SEPARATOR.join([item['text'] for item in batch])
-                
-                print(f"   📦 Batch {batch_num}/{total_batches}: {len(batch)} subtitles ({batch_chars} chars)...")
-                
-                # Dịch 1 lần cho cả batch với retry
-                translated_combined = translate_with_retry(combined_text)
-                
-                # Tách lại thành các câu riêng lẻ
-                translated_parts = translated_combined.split('|||SUBTITLE_SEP|||')
-                
-                # Clean up whitespace
-                translated_parts = [part.strip() for part in translated_parts]
-                
-                # Kiểm tra số lượng có khớp không
-                if len(translated_parts) != len(batch):
-                    print(f"      ⚠️ Warning: Expected {len(batch)} parts, got {len(translated_parts)}")
-                    # Fallback: dịch từng câu nếu batch translation fail
-                    print(f"      🔄 Falling back to single-sentence translation...")
-                    translated_parts = []
-                    for item in batch:
-                        try:
-                            vi_text = translate_with_retry(item['text'])
-                            translated_parts.append(vi_text)
-                        except:
-                            translated_parts.append('')
-                
-                # Thêm vào kết quả
-                for i, item in enumerate(batch):
-                    vi_text = translated_parts[i] if i < len(translated_parts) else ''
-                    transcript_vi.append({
-                        'text': vi_text,
-                        'start': item['start'],
-                        'duration': item['duration']
-                    })
-                
-                print(f"      ✅ Batch {batch_num}/{total_batches} completed!")
-                yield {"status": "processing", "message": f"Đã dịch xong {min(batch_idx + BATCH_SIZE, len(transcript))}/{len(transcript)} câu...", "step": 3}
-                
-                # Thêm delay nhỏ giữa các batch để tránh rate limit
-                if batch_num < total_batches:
-                    time.sleep(0.5)
-                
-            except Exception as e:
-                print(f"      ❌ Batch {batch_num} failed: {str(e)}")
-                print(f"      🔄 Falling back to single-sentence translation...")
-                
-                # Fallback: dịch từng câu
-                for item in batch:
-                    try:
-                        vi_text = translate_with_retry(item['text'])
-                    except:
-                        vi_text = ''
-                    
-                    transcript_vi.append({
-                        'text': vi_text,
-                        'start': item['start'],
-                        'duration': item['duration']
-                    })
-                    time.sleep(0.3)  # Delay nhỏ giữa các câu
-        
-        print(f"✅ Translated {len(transcript_vi)}/{len(transcript)} subtitles successfully (Dynamic Batch mode)")
+        # Dịch subtitle qua translation engine (worker pool + rate limit + bộ nhớ dịch)
+        print("Translating subtitles using translation engine...")
+        engine = get_translation_engine(target='vi', source='en')
+        translation_run = engine.start([item['text'] for item in transcript])
+
+        yield {"status": "processing", "message": f"Đang dịch {len(transcript)} câu phụ đề...", "step": 3}
+        for done, total in translation_run:
+            yield {"status": "processing", "message": f"Đã dịch xong {done}/{total} câu...", "step": 3}
+
+        # Câu dịch lỗi giữ rỗng như trước
+        transcript_vi = [text or '' for text in translation_run.results]
+        print(
+            f"✅ Translated {sum(1 for text in transcript_vi if text)}/{len(transcript)} subtitles "
+            f"(memory hits: {translation_run.cache_hits}, remote: {translation_run.remote_texts} unique lines)"
+        )
+        if hasattr(engine.memory, "stats"):
+            print(f"📚 Translation memory: {engine.memory.stats()}")
 
         # Cleanup temp files
         shutil.rmtree(temp_dir, ignore_errors=True)
 
         # 3. Khởi tạo Object Video
         raw_title = meta['title']
-        translated_title = translate_with_retry(raw_title)
+        translated_title = engine.translate_many([raw_title])[0] or raw_title
         
         video = Video(
             source_type='youtube',
@@ -353,23 +261,26 @@ def import_youtube_video(user_id, data: ImportYoutubeRequest):
         db.session.add(video)
         db.session.flush()
 
-        # 4. Lưu phụ đề
-        saved_count = 0
-        for i, item in enumerate(transcript):
-            if item['text']:
-                db.session.add(Subtitle(
-                    video_id=video.id,
-                    start_time=item['start'],
-                    end_time=item['start'] + item['duration'],
-                    content_en=item['text'],
-                    content_vi=transcript_vi[i]['text']
-                ))
-                saved_count += 1
+        # 4. Lưu phụ đề (bulk insert theo chunk, cùng transaction với video)
+        saved_count = bulk_insert_subtitles(
+            video.id,
+            (
+                {
+                    "start_time": item['start'],
+                    "end_time": item['start'] + item['duration'],
+                    "content_en": item['text'],
+                    "content_vi": transcript_vi[i],
+                }
+                for i, item in enumerate(transcript)
+                if item['text']
+            ),
+        )
 
         print(f"💾 Saved {saved_count} subtitle entries")
         print(f"📊 Summary: EN={en_type}, VI={vi_type}\n")
 
         db.session.commit()
+        invalidate_subtitle_timeline(video.id)
         
         # [VTT_OPTIMIZATION] Tự động xuất file VTT ngay sau khi lưu DB thành công
         yield {"status": "processing", "message": "Đang khởi tạo file phụ đề VTT tối ưu...", "step": 4}
@@ -480,12 +391,13 @@ def import_video_local(user_id, data: ImportLocalManualRequest):
 
     return video
 
-def save_subtitles_from_content(video_id, en_content, vi_content=None, export_vtt=True):
+def save_subtitles_from_content(video_id, en_content, vi_content=None, export_vtt=True, alignment_strategy=None):
     """
     Parse và lưu phụ đề từ nội dung text (SRT hoặc VTT) vào database.
     Tự động nhận diện định dạng dựa trên nội dung.
+    alignment_strategy: midpoint | overlap | dtw | auto (mặc định theo SUBTITLE_ALIGNMENT_STRATEGY).
     """
-    from ..utils.subtitle_utils import parse_vtt, parse_srt
+    from ..utils.subtitle_utils import parse_srt, is_vtt_content
     from flask import current_app
     
     video = Video.query.get(video_id)
@@ -500,15 +412,15 @@ def save_subtitles_from_content(video_id, en_content, vi_content=None, export_vt
         export_vtt,
     )
 
-    # Xóa sub cũ
-    Subtitle.query.filter_by(video_id=video_id).delete()
+    # Xóa phân tích AI cũ (phụ đề cũ được xóa cùng lúc insert mới ở replace_video_subtitles)
     MovieAIAnalysis.query.filter_by(video_id=video_id).delete()
     if not export_vtt:
         video.subtitle_vtt_url = None
+        video.subtitle_track_url = None
 
     # Nhận diện định dạng cho file Anh
     if en_content:
-        parser_en = parse_vtt if 'WEBVTT' in en_content.upper() else parse_srt
+        parser_en = parse_vtt if is_vtt_content(en_content) else parse_srt
         en_subs = parser_en(en_content)
     else:
         en_subs = []
@@ -516,7 +428,7 @@ def save_subtitles_from_content(video_id, en_content, vi_content=None, export_vt
     # Nhận diện định dạng cho file Việt
     vi_subs = []
     if vi_content:
-        parser_vi = parse_vtt if 'WEBVTT' in vi_content.upper() else parse_srt
+        parser_vi = parse_vtt if is_vtt_content(vi_content) else parse_srt
         vi_subs = parser_vi(vi_content)
 
     current_app.logger.info(
@@ -534,55 +446,40 @@ def save_subtitles_from_content(video_id, en_content, vi_content=None, export_vt
         en_subs = vi_subs
         vi_subs = []
 
-    count = 0
-    en_midpoints = [(sub['start_time'] + sub['end_time']) / 2.0 for sub in en_subs]
-    vi_matched_texts = [[] for _ in en_subs]
+    # Ghép câu VI vào câu EN theo thời gian (vector hóa, chiến lược cấu hình qua SUBTITLE_ALIGNMENT_STRATEGY)
+    matches = align_subtitles(en_subs, vi_subs, strategy=alignment_strategy)
+    vi_matched_texts = merge_aligned_texts(len(en_subs), vi_subs, matches)
+    current_app.logger.info(
+        "[SAVE_SUBTITLE_CONTENT_ALIGNED] video_id=%s strategy=%s matched_vi=%s/%s",
+        video_id,
+        resolve_alignment_strategy(alignment_strategy),
+        int((matches >= 0).sum()),
+        len(vi_subs),
+    )
 
-    en_idx = 0
-    num_en = len(en_subs)
+    def build_rows():
+        for i, en_sub in enumerate(en_subs):
+            best_vi_text = vi_matched_texts[i]
 
-    for vi_sub in vi_subs:
-        if num_en == 0:
-            break
-            
-        vi_mid = (vi_sub['start_time'] + vi_sub['end_time']) / 2.0
-        
-        # Tiến en_idx để tìm midpoint gần nhất
-        while en_idx < num_en - 1:
-            dist_curr = abs(en_midpoints[en_idx] - vi_mid)
-            dist_next = abs(en_midpoints[en_idx + 1] - vi_mid)
-            if dist_next <= dist_curr:
-                en_idx += 1
+            # Trường hợp chỉ có 1 file (đã map vi_subs sang en_subs ở trên)
+            if not en_content and vi_content:
+                en_text = ""
+                vi_text = en_sub['text']
             else:
-                break
-        
-        if en_idx < num_en:
-            # Ngưỡng 10 giây (nếu lệch quá 10s so với câu EN gần nhất thì bỏ qua)
-            if abs(en_midpoints[en_idx] - vi_mid) <= 10.0:
-                vi_matched_texts[en_idx].append(vi_sub['text'])
-
-    for i, en_sub in enumerate(en_subs):
-        best_vi_text = " ".join(vi_matched_texts[i])
-
-        # Trường hợp chỉ có 1 file (đã map vi_subs sang en_subs ở trên)
-        if not en_content and vi_content:
-            en_text = ""
-            vi_text = en_sub['text']
-        else:
-            en_text = en_sub['text']
-            vi_text = best_vi_text
-
-        new_sub = Subtitle(
-            video_id=video_id,
-            start_time=en_sub['start_time'],
-            end_time=en_sub['end_time'],
-            content_en=en_text,
-            content_vi=vi_text
-        )
-        db.session.add(new_sub)
-        count += 1
-
+                en_text = en_sub['text']
+                vi_text = best_vi_text
+
+            yield {
+                "start_time": en_sub['start_time'],
+                "end_time": en_sub['end_time'],
+                "content_en": en_text,
+                "content_vi": vi_text,
+            }
+
+    # Xóa sub cũ + insert sub mới trong cùng một transaction
+    count = replace_video_subtitles(video_id, build_rows())
     db.session.commit()
+    invalidate_subtitle_timeline(video_id)
 
     current_app.logger.info(
         "[SAVE_SUBTITLE_CONTENT_COMMIT] video_id=%s saved_count=%s export_vtt=%s",
@@ -648,8 +545,9 @@ def update_video(video_id, data: UpdateVideoRequest):
     update_data = data.model_dump(exclude_unset=True)
 
     if not update_data:
+        # File VTT có hash nội dung và đã được xuất lại ở mọi lần ghi phụ đề: chỉ tạo khi còn thiếu
         if video.subtitles.count() > 0:
-            export_subtitle_to_vtt(video_id)
+            ensure_subtitle_vtt(video_id)
         return Video.query.get(video_id)
 
     if 'title' in update_data:
@@ -678,82 +576,14 @@ def delete_all_subtitles(video_id):
     if not video:
         raise ValueError(f"Video ID {video_id} không tồn tại")
     
-    Subtitle.query.filter_by(video_id=video_id).delete()
+    delete_video_subtitles(video_id)
     MovieAIAnalysis.query.filter_by(video_id=video_id).delete()
     video.subtitle_vtt_url = None
+    video.subtitle_track_url = None
     db.session.commit()
+    invalidate_subtitle_timeline(video_id)
     
-    # Xóa file vật lý nếu có
-    storage_dir = get_subtitle_storage_dir()
-    file_path = os.path.join(storage_dir, f"video_{video_id}.vtt")
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    # Xóa file vật lý (mọi phiên bản + bản nén)
+    remove_subtitle_exports(video_id)
         
     return True
-
-# [VTT_OPTIMIZATION] Cung cấp hàm xuất sub ra file vật lý để tăng hiệu năng
-def export_subtitle_to_vtt(video_id):
-    import os
-    from datetime import timedelta
-    from ..models.models_model import Video, Subtitle
-
-    video = Video.query.get(video_id)
-    if not video:
-        raise ValueError(f"Video ID {video_id} không tồn tại")
-
-    # 1. Tạo thư mục lưu trữ nếu chưa có
-    storage_dir = get_subtitle_storage_dir()
-    
-    file_name = f"video_{video_id}.vtt"
-    file_path = os.path.join(storage_dir, file_name)
-
-    # 2. Lấy danh sách phụ đề sắp xếp theo thời gian
-    subs = Subtitle.query.filter_by(video_id=video_id).order_by(Subtitle.start_time.asc()).all()
-    
-    def format_vtt_time(seconds):
-        td = timedelta(seconds=seconds)
-        total_seconds = int(td.total_seconds())
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        secs = total_seconds % 60
-        millis = int((td.total_seconds() - total_seconds) * 1000)
-        return f"{hours:02}:{minutes:02}:{secs:02}.{millis:03}"
-
-    # 3. Ghi file theo chuẩn WebVTT
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write("WEBVTT\n\n")
-        for i, sub in enumerate(subs):
-            start = format_vtt_time(sub.start_time)
-            end = format_vtt_time(sub.end_time)
-            # Ghi cả tiếng Anh và tiếng Việt
-            f.write(f"{i+1}\n")
-            f.write(f"{start} --> {end}\n")
-            
-            # 1. English Content
-            f.write(f"{sub.content_en}\n")
-            
-            # 2. Vietnamese Content (Optional but usually present)
-            if sub.content_vi:
-                f.write(f"{sub.content_vi}\n")
-            
-            # 3. AI Metadata (High-Performance Learning Payload)
-            if sub.grammar_tag_id is not None or sub.cloze_data:
-                import json
-                meta = {}
-                if sub.grammar_tag_id is not None:
-                    meta["tag_id"] = int(sub.grammar_tag_id)
-                if sub.cloze_data:
-                    meta["cloze"] = sub.cloze_data
-                
-                # Wrap metadata in a unique identifier for easier Worker parsing
-                f.write(f"[METADATA]{json.dumps(meta, ensure_ascii=False)}\n")
-            
-            f.write("\n")
-
-    # 4. Cập nhật đường dẫn vào Database (URL tương đối cho Frontend)
-    # Không để /api ở đầu vì sẽ bị nhân đôi khi quan qua Proxy/API_BASE_URL
-    video.subtitle_vtt_url = f"/static/subs/{file_name}"
-    db.session.commit()
-    
-    print(f"✅ Exported VTT for Video {video_id}: {file_path}")
-    return video.subtitle_vtt_url
@@ -0,0 +1,86 @@
+"""
+Vị trí xem phim (watch_history): player gửi POST /api/videos/<id>/watch vài giây một lần.
+
+Mặc định các lần gửi được gộp theo (user_id, video_id) trong buffer write-behind (chỉ giữ lần mới nhất)
+và ghi theo lô bằng upsert trên uq_watch_history_user_video; WRITE_BEHIND_MODE=sync ghi ngay như trước.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import case
+
+from ..extensions import db
+from ..models.models_model import WatchHistory
+from ..utils.sql_upsert import build_upsert
+from .write_behind import register_write_behind_buffer
+
+
+def _merge_progress(old: dict, new: dict) -> dict:
+    # Cùng quy tắc với bản ghi trực tiếp: vị trí/thời lượng = 0 không đè giá trị đã có
+    return {
+        "watched_at": new["watched_at"],
+        "last_position": new["last_position"] if new["last_position"] > 0 else old["last_position"],
+        "duration": new["duration"] if new["duration"] > 0 else old["duration"],
+    }
+
+
+def _flush_progress(batch: dict) -> None:
+    table = WatchHistory.__table__
+
+    def keep_positive(inserted, column):
+        return case((inserted[column] > 0, inserted[column]), else_=table.c[column])
+
+    db.session.execute(
+        build_upsert(
+            table,
+            db.engine.dialect.name,
+            ["user_id", "video_id"],
+            ["watched_at"],
+            update_values=lambda inserted: {
+                "last_position": keep_positive(inserted, "last_position"),
+                "duration": keep_positive(inserted, "duration"),
+            },
+        ),
+        [{"user_id": user_id, "video_id": video_id, **progress} for (user_id, video_id), progress in batch.items()],
+    )
+
+
+_PROGRESS = register_write_behind_buffer("watch_history", _merge_progress, _flush_progress)
+
+
+def record_watch_progress(user_id: str, video_id: int, last_position: float, duration: float) -> None:
+    progress = {
+        "watched_at": datetime.utcnow(),
+        "last_position": last_position or 0,
+        "duration": duration or 0,
+    }
+    if _PROGRESS.enabled:
+        _PROGRESS.add((str(user_id), video_id), progress)
+        return
+
+    history = WatchHistory.query.filter_by(user_id=user_id, video_id=video_id).first()
+    if history:
+        history.watched_at = progress["watched_at"]
+        if progress["last_position"] > 0: history.last_position = progress["last_position"]
+        if progress["duration"] > 0: history.duration = progress["duration"]
+    else:
+        history = WatchHistory(user_id=user_id, video_id=video_id, **progress)
+        db.session.add(history)
+
+    db.session.commit()
+
+
+def get_watch_progress(user_id: str, video_id: int) -> dict | None:
+    """{last_position, duration, watched_at} của user cho phim, gồm cả lần gửi chưa flush."""
+    history = WatchHistory.query.filter_by(user_id=user_id, video_id=video_id).first()
+    stored = (
+        {"watched_at": history.watched_at, "last_position": history.last_position or 0, "duration": history.duration or 0}
+        if history
+        else None
+    )
+    pending = _PROGRESS.pending((str(user_id), video_id)) if _PROGRESS.enabled else None
+    if pending is None:
+        return stored
+    return pending if stored is None else _merge_progress(stored, pending)
@@ -0,0 +1,303 @@
+"""
+Write-behind cho các sự kiện ghi dày đặc (trả lời cloze, vị trí xem phim).
+
+Request chỉ gộp sự kiện vào buffer trong RAM theo khóa (vd. (user_id, video_id)) rồi trả về ngay;
+một background task (socketio.start_background_task, cùng kiểu job event relay) cứ
+WRITE_BEHIND_FLUSH_MS lại ghi cả buffer xuống DB bằng upsert theo lô trong một transaction.
+
+Giới hạn độ bền:
+- Sự kiện đã trả 200 nhưng chưa flush chỉ nằm trong RAM: process chết đột ngột thì mất tối đa
+  khoảng WRITE_BEHIND_FLUSH_MS dữ liệu (flush cuối khi tắt process bình thường qua atexit).
+- Buffer đã đủ WRITE_BEHIND_MAX_PENDING khóa thì request mang khóa mới tự flush trước (backpressure).
+- Flush lỗi thì sự kiện được gộp trả lại buffer để thử lại; khi sự kiện cũ nhất đã chờ quá
+  WRITE_BEHIND_MAX_LAG_MS, request mới phải flush đồng bộ trước khi gộp và nhận lỗi (sự kiện của
+  nó không vào buffer) thay vì tiếp tục nhận dữ liệu. Sự kiện đã vào buffer thì request luôn thành công.
+WRITE_BEHIND_MODE=sync tắt buffer (ghi ngay trong request như trước).
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from flask import current_app
+from sqlalchemy.exc import DBAPIError, IntegrityError
+
+from ..extensions import db, socketio
+
+
+WRITE_BEHIND_MODES = ("buffer", "sync")
+LAST_ERROR_MAX_CHARS = 120
+
+
+@dataclass(slots=True)
+class WriteBehindSettings:
+    mode: str = "buffer"
+    flush_interval_ms: float = 500.0
+    max_pending: int = 5000
+    max_lag_ms: float = 10000.0
+
+    @classmethod
+    def from_env(cls) -> "WriteBehindSettings":
+        mode = os.getenv("WRITE_BEHIND_MODE", "buffer").strip().lower()
+        if mode not in WRITE_BEHIND_MODES:
+            raise ValueError(f"WRITE_BEHIND_MODE khong hop le: {mode} (chon {', '.join(WRITE_BEHIND_MODES)})")
+        return cls(
+            mode=mode,
+            flush_interval_ms=max(10.0, float(os.getenv("WRITE_BEHIND_FLUSH_MS", "500"))),
+            max_pending=max(1, int(os.getenv("WRITE_BEHIND_MAX_PENDING", "5000"))),
+            max_lag_ms=max(0.0, float(os.getenv("WRITE_BEHIND_MAX_LAG_MS", "10000"))),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode == "buffer"
+
+
+class WriteBehindBuffer:
+    """
+    Buffer gộp sự kiện theo khóa.
+    - merge(old, new) -> giá trị gộp (sự kiện sau đè/cộng dồn lên sự kiện trước)
+    - flush(batch: dict[key, value]) ghi cả lô, không commit (buffer commit/rollback)
+    """
+
+    def __init__(self, name: str, merge, flush, settings: WriteBehindSettings | None = None) -> None:
+        self.name = name
+        self.settings = settings or WriteBehindSettings.from_env()
+        self._merge = merge
+        self._flush = flush
+        self._lock = threading.Lock()
+        # Chỉ một lần flush chạy tại một thời điểm: lô sau luôn ghi sau lô trước
+        self._flush_lock = threading.Lock()
+        self._pending: dict = {}
+        # Lô đang ghi dở: pending() vẫn thấy cho tới khi commit xong, không có khoảng trống đọc-lại
+        self._inflight: dict = {}
+        self._oldest_at = None
+        self._started = False
+        self._stats = {
+            "events": 0,
+            "flushes": 0,
+            "flushed_keys": 0,
+            "last_flush_size": 0,
+            "max_flush_size": 0,
+            "last_flush_ms": 0.0,
+            "flush_seconds": 0.0,
+            "last_lag_ms": 0.0,
+            "max_lag_ms": 0.0,
+            "failures": 0,
+            "dropped_keys": 0,
+            "last_error": None,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.enabled
+
+    def add(self, key, value) -> None:
+        """Gộp sự kiện vào buffer; trả về ngay trừ khi buffer đầy hoặc flush đang trễ quá giới hạn."""
+        self._ensure_started()
+        if self._needs_backpressure(key):
+            # Flush trước khi nhận sự kiện: lỗi ở đây được trả cho request và sự kiện chưa vào buffer,
+            # không nhận thêm dữ liệu khi DB đang không ghi được
+            self.flush(raise_errors=True)
+
+        now = time.monotonic()
+        with self._lock:
+            current = self._pending.get(key)
+            self._pending[key] = value if current is None else self._merge(current, value)
+            if self._oldest_at is None:
+                self._oldest_at = now
+            self._stats["events"] += 1
+
+    def _needs_backpressure(self, key) -> bool:
+        with self._lock:
+            overflow = key not in self._pending and len(self._pending) >= self.settings.max_pending
+            lagging = (
+                self._oldest_at is not None
+                and (time.monotonic() - self._oldest_at) * 1000 > self.settings.max_lag_ms
+            )
+        return overflow or lagging
+
+    def pending(self, key):
+        """Giá trị chưa commit của khóa (đọc-lại-dữ-liệu-vừa-ghi cho chính user đó), kể cả lô đang flush."""
+        with self._lock:
+            return self._combined(key)
+
+    def pending_items(self, predicate) -> list:
+        with self._lock:
+            keys = [key for key in self._inflight if predicate(key)]
+            keys += [key for key in self._pending if key not in self._inflight and predicate(key)]
+            return [(key, self._combined(key)) for key in keys]
+
+    def _combined(self, key):
+        # Gọi khi đang giữ _lock: sự kiện trong _pending mới hơn lô đang flush nên gộp lên trên
+        inflight = self._inflight.get(key)
+        newer = self._pending.get(key)
+        if inflight is None:
+            return newer
+        return inflight if newer is None else self._merge(inflight, newer)
+
+    def flush(self, raise_errors: bool = False) -> int:
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                oldest_at, self._oldest_at = self._oldest_at, None
+                self._inflight = dict(batch)
+            if not batch:
+                return 0
+
+            started = time.monotonic()
+            try:
+                self._flush(batch)
+                db.session.commit()
+                self._clear_inflight()
+            except IntegrityError as ex:
+                # Một khóa hỏng (user/tag vừa bị xóa...) không được chặn cả lô mãi mãi:
+                # ghi lại từng khóa, khóa vẫn vi phạm ràng buộc thì bỏ
+                db.session.rollback()
+                self._record_failure(ex, len(batch))
+                self._flush_one_by_one(batch)
+                self._clear_inflight()
+            except Exception as ex:
+                db.session.rollback()
+                self._restore(batch, oldest_at)
+                self._record_failure(ex, len(batch))
+                if raise_errors:
+                    raise
+                return 0
+
+            finished = time.monotonic()
+            lag_ms = (finished - oldest_at) * 1000 if oldest_at is not None else 0.0
+            with self._lock:
+                stats = self._stats
+                stats["flushes"] += 1
+                stats["flushed_keys"] += len(batch)
+                stats["last_flush_size"] = len(batch)
+                stats["max_flush_size"] = max(stats["max_flush_size"], len(batch))
+                stats["last_flush_ms"] = (finished - started) * 1000
+                stats["flush_seconds"] += finished - started
+                stats["last_lag_ms"] = lag_ms
+                stats["max_lag_ms"] = max(stats["max_lag_ms"], lag_ms)
+            return len(batch)
+
+    def _clear_inflight(self) -> None:
+        with self._lock:
+            self._inflight = {}
+
+    def _record_failure(self, ex: Exception, batch_size: int) -> None:
+        with self._lock:
+            self._stats["failures"] += 1
+            self._stats["last_error"] = _short_error(ex)
+        print(f"⚠️ [WRITE_BEHIND] {self.name} flush {batch_size} khoa loi: {ex}")
+
+    def _flush_one_by_one(self, batch: dict) -> None:
+        for key, value in batch.items():
+            try:
+                self._flush({key: value})
+                db.session.commit()
+                with self._lock:
+                    self._inflight.pop(key, None)
+            except IntegrityError as ex:
+                db.session.rollback()
+                with self._lock:
+                    self._inflight.pop(key, None)
+                    self._stats["dropped_keys"] += 1
+                print(f"⚠️ [WRITE_BEHIND] {self.name} bo khoa {key!r}: {ex}")
+            except Exception:
+                db.session.rollback()
+                self._restore({key: value}, None)
+
+    def _restore(self, batch: dict, oldest_at) -> None:
+        with self._lock:
+            # Sự kiện đến trong lúc flush là mới hơn: gộp lên trên lô cũ
+            for key, value in batch.items():
+                self._inflight.pop(key, None)
+                newer = self._pending.get(key)
+                self._pending[key] = value if newer is None else self._merge(value, newer)
+            if oldest_at is not None and (self._oldest_at is None or oldest_at < self._oldest_at):
+                self._oldest_at = oldest_at
+
+    def _ensure_started(self) -> None:
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        app = current_app._get_current_object()
+        socketio.start_background_task(self._run, app)
+        atexit.register(self._flush_on_exit, app)
+
+    def _run(self, app) -> None:
+        with app.app_context():
+            while True:
+                socketio.sleep(self.settings.flush_interval_ms / 1000.0)
+                try:
+                    self.flush()
+                finally:
+                    db.session.remove()
+
+    def _flush_on_exit(self, app) -> None:
+        with app.app_context():
+            try:
+                self.flush()
+            except Exception as ex:
+                print(f"⚠️ [WRITE_BEHIND] {self.name} flush luc tat process loi: {ex}")
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            pending = len(self._pending)
+            oldest_at = self._oldest_at
+        flushes = stats["flushes"]
+        return {
+            "mode": self.settings.mode,
+            "flush_interval_ms": self.settings.flush_interval_ms,
+            "pending_keys": pending,
+            "current_lag_ms": round((time.monotonic() - oldest_at) * 1000, 1) if oldest_at is not None else 0.0,
+            "events": stats["events"],
+            "flushes": flushes,
+            "flushed_keys": stats["flushed_keys"],
+            "avg_flush_size": round(stats["flushed_keys"] / flushes, 2) if flushes else 0.0,
+            "last_flush_size": stats["last_flush_size"],
+            "max_flush_size": stats["max_flush_size"],
+            "last_flush_ms": round(stats["last_flush_ms"], 2),
+            "avg_flush_ms": round(stats["flush_seconds"] * 1000 / flushes, 2) if flushes else 0.0,
+            "last_lag_ms": round(stats["last_lag_ms"], 1),
+            "max_lag_ms": round(stats["max_lag_ms"], 1),
+            "failures": stats["failures"],
+            "dropped_keys": stats["dropped_keys"],
+            "last_error": stats["last_error"],
+        }
+
+
+def _short_error(ex: Exception) -> str:
+    """
+    Loại lỗi + thông điệp ngắn cho metrics. Lỗi SQLAlchemy kèm câu SQL và tham số, thông điệp của
+    driver cũng có thể chứa giá trị (vd. "Duplicate entry '<user_id>'"): chỉ giữ loại lỗi và mã lỗi.
+    """
+    if isinstance(ex, DBAPIError):
+        args = getattr(ex.orig, "args", ())
+        code = f" {args[0]}" if args and isinstance(args[0], int) else ""
+        return f"{type(ex).__name__} ({type(ex.orig).__name__}{code})"
+    lines = str(ex).strip().splitlines()
+    message = lines[0] if lines else ""
+    if len(message) > LAST_ERROR_MAX_CHARS:
+        message = message[: LAST_ERROR_MAX_CHARS - 1] + "…"
+    return f"{type(ex).__name__}: {message}" if message else type(ex).__name__
+
+
+_BUFFERS: dict[str, WriteBehindBuffer] = {}
+
+
+def register_write_behind_buffer(name: str, merge, flush) -> WriteBehindBuffer:
+    buffer = WriteBehindBuffer(name, merge, flush)
+    _BUFFERS[name] = buffer
+    return buffer
+
+
+def write_behind_metrics() -> dict:
+    return {name: buffer.metrics() for name, buffer in _BUFFERS.items()}
@@ -0,0 +1,48 @@
+from sqlalchemy import insert
+
+
+def build_upsert(
+    table,
+    dialect_name: str,
+    conflict_columns: list[str],
+    update_columns: list[str] | None = None,
+    update_values=None,
+):
+    """
+    Tạo câu INSERT có xử lý trùng khóa theo dialect (dùng với executemany):
+    - MySQL: INSERT ... ON DUPLICATE KEY UPDATE (hoặc INSERT IGNORE nếu không có cột cần cập nhật)
+    - SQLite/PostgreSQL: INSERT ... ON CONFLICT (conflict_columns) DO UPDATE / DO NOTHING
+    - update_values: hàm nhận giá trị định chèn (stmt.inserted / stmt.excluded) và trả về
+      {cột: biểu thức} cho các cột không ghi đè thẳng, vd. cộng dồn `table.c.count + inserted.count`
+    """
+    update_columns = update_columns or []
+
+    def _values(inserted):
+        values = {column: inserted[column] for column in update_columns}
+        if update_values is not None:
+            values.update(update_values(inserted))
+        return values
+
+    if dialect_name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        stmt = mysql_insert(table)
+        values = _values(stmt.inserted)
+        if not values:
+            return stmt.prefix_with("IGNORE")
+        return stmt.on_duplicate_key_update(values)
+
+    if dialect_name in ("sqlite", "postgresql"):
+        if dialect_name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+        stmt = dialect_insert(table)
+        values = _values(stmt.excluded)
+        if not values:
+            return stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+        return stmt.on_conflict_do_update(index_elements=conflict_columns, set_=values)
+
+    # Dialect khác: insert thường, caller tự xử lý trùng khóa
+    return insert(table)
@@ -12,3 +12,15 @@ def get_subtitle_storage_dir() -> str:
 
     storage_dir.mkdir(parents=True, exist_ok=True)
     return str(storage_dir)
+
+
+def get_subtitle_response_cache_dir() -> str:
+    configured_dir = os.getenv("SUBTITLE_RESPONSE_CACHE_DIR")
+    if configured_dir:
+        cache_dir = Path(configured_dir)
+    else:
+        project_root = Path(__file__).resolve().parents[2]
+        cache_dir = project_root / "storage" / "cache" / "subtitle_lists"
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return str(cache_dir)
@@ -0,0 +1,252 @@
+"""
+Ghép phụ đề Việt (VI) vào từng câu Anh (EN) theo thời gian, vector hóa bằng NumPy.
+
+Chiến lược (SUBTITLE_ALIGNMENT_STRATEGY hoặc tham số strategy):
+- midpoint: mỗi câu VI về câu EN có midpoint gần nhất (np.searchsorted), lệch quá max_distance thì bỏ
+- overlap:  câu EN giao nhau nhiều nhất với câu VI; câu VI không giao câu nào thì dùng midpoint
+- dtw:      cho file VI lệch giờ/lệch tốc độ khung hình: ước lượng scale + offset toàn cục bằng
+            tương quan chéo (FFT) rồi gán đơn điệu bằng quy hoạch động trong một dải thời gian quanh đường chéo
+- auto:     ước lượng scale + offset; file lệch rõ thì dùng dtw, ngược lại dùng overlap
+Không chiến lược nào so sánh toàn bộ n x m cặp câu.
+"""
+
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+
+ALIGNMENT_STRATEGIES = ("midpoint", "overlap", "dtw", "auto")
+DEFAULT_MAX_DISTANCE = 10.0
+# Tỉ lệ tốc độ khung hình hay gặp khi file phụ đề được làm cho bản phim khác (23.976 / 24 / 25 / 29.97 fps)
+CANDIDATE_SCALES = (1.0, 25 / 23.976, 23.976 / 25, 25 / 24, 24 / 25, 24 / 23.976, 23.976 / 24, 30 / 29.97, 29.97 / 30)
+DRIFT_RESOLUTION = 0.1
+MAX_DRIFT_OFFSET = 180.0
+# Dưới ngưỡng này coi như file VI khớp giờ, auto không cần dtw
+AUTO_OFFSET_THRESHOLD = 0.75
+# Tương quan thấp hơn mức này (track quá thưa/khác nhau) thì không tin phép biến đổi ước lượng được
+MIN_TRANSFORM_SCORE = 0.3
+# Cue EN bất thường (kéo dài hàng giờ) làm số ứng viên overlap bùng nổ: khi đó giữ kết quả midpoint
+OVERLAP_MAX_CANDIDATES_PER_CUE = 32
+DTW_BAND_SECONDS = 12.0
+
+
+@dataclass(slots=True)
+class TimeTransform:
+    """vi_time * scale + offset ~ en_time; score: tương quan chuẩn hóa (0..1) của hai track."""
+
+    scale: float = 1.0
+    offset: float = 0.0
+    score: float = 0.0
+
+    def apply(self, times: np.ndarray) -> np.ndarray:
+        return times * self.scale + self.offset
+
+    @property
+    def is_identity(self) -> bool:
+        return self.scale == 1.0 and abs(self.offset) < AUTO_OFFSET_THRESHOLD
+
+
+def _times(subs: list[dict]) -> tuple[np.ndarray, np.ndarray]:
+    starts = np.fromiter((sub["start_time"] for sub in subs), dtype=np.float64, count=len(subs))
+    ends = np.fromiter((sub["end_time"] for sub in subs), dtype=np.float64, count=len(subs))
+    return starts, np.maximum(ends, starts)
+
+
+def _nearest_index(sorted_values: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """Chỉ số phần tử gần nhất trong mảng đã sắp xếp; bằng nhau thì lấy phần tử sau (như vòng lặp cũ)."""
+    right = np.clip(np.searchsorted(sorted_values, queries, side="left"), 0, len(sorted_values) - 1)
+    left = np.clip(right - 1, 0, len(sorted_values) - 1)
+    use_left = np.abs(sorted_values[left] - queries) < np.abs(sorted_values[right] - queries)
+    return np.where(use_left, left, right)
+
+
+def _align_midpoint(en_mid: np.ndarray, vi_mid: np.ndarray, max_distance: float) -> np.ndarray:
+    order = np.argsort(en_mid, kind="stable")
+    nearest = order[_nearest_index(en_mid[order], vi_mid)]
+    return np.where(np.abs(en_mid[nearest] - vi_mid) <= max_distance, nearest, -1)
+
+
+def _align_overlap(en_start, en_end, vi_start, vi_end, max_distance: float) -> np.ndarray:
+    en_mid = (en_start + en_end) / 2.0
+    matches = _align_midpoint(en_mid, (vi_start + vi_end) / 2.0, max_distance)
+
+    # Ứng viên của mỗi câu VI: EN bắt đầu trước khi VI kết thúc và kết thúc sau khi VI bắt đầu.
+    # en_start đã sắp tăng; max tích lũy của en_end cũng tăng nên cả hai cận tìm bằng searchsorted
+    order = np.argsort(en_start, kind="stable")
+    sorted_start, sorted_end = en_start[order], en_end[order]
+    hi = np.searchsorted(sorted_start, vi_end, side="left")
+    lo = np.searchsorted(np.maximum.accumulate(sorted_end), vi_start, side="right")
+    counts = np.maximum(hi - lo, 0)
+    total = int(counts.sum())
+    if total == 0 or total > OVERLAP_MAX_CANDIDATES_PER_CUE * len(vi_start):
+        return matches
+
+    vi_rep = np.repeat(np.arange(len(vi_start)), counts)
+    group_offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    en_rep = order[np.repeat(lo, counts) + (np.arange(total) - group_offsets)]
+    overlap = np.minimum(en_end[en_rep], vi_end[vi_rep]) - np.maximum(en_start[en_rep], vi_start[vi_rep])
+
+    positive = overlap > 0
+    vi_rep, en_rep, overlap = vi_rep[positive], en_rep[positive], overlap[positive]
+    if len(vi_rep) == 0:
+        return matches
+
+    # Mỗi câu VI lấy cặp có overlap lớn nhất (sắp theo VI tăng dần, overlap giảm dần, lấy dòng đầu mỗi nhóm)
+    ranked = np.lexsort((-overlap, vi_rep))
+    first = np.unique(vi_rep[ranked], return_index=True)[1]
+    best = ranked[first]
+    matches[vi_rep[best]] = en_rep[best]
+    return matches
+
+
+def _activity_signal(starts: np.ndarray, ends: np.ndarray, length: int) -> np.ndarray:
+    signal = np.zeros(length + 1, dtype=np.float64)
+    start_idx = np.clip((starts / DRIFT_RESOLUTION).astype(np.int64), 0, length)
+    end_idx = np.clip((ends / DRIFT_RESOLUTION).astype(np.int64), 0, length)
+    np.add.at(signal, start_idx, 1.0)
+    np.add.at(signal, end_idx, -1.0)
+    return (np.cumsum(signal[:length]) > 0).astype(np.float64)
+
+
+def estimate_time_transform(en_subs: list[dict], vi_subs: list[dict], max_offset: float = MAX_DRIFT_OFFSET) -> TimeTransform:
+    """
+    Tìm scale (tỉ lệ fps) + offset sao cho "có phụ đề đang hiện" của hai track trùng nhau nhiều nhất.
+    Mỗi scale ứng viên là một lần tương quan chéo bằng FFT: O(L log L) với L = thời lượng / 0.1s.
+    """
+    if not en_subs or not vi_subs:
+        return TimeTransform()
+
+    en_start, en_end = _times(en_subs)
+    vi_start, vi_end = _times(vi_subs)
+    max_lag = int(max_offset / DRIFT_RESOLUTION)
+    length = int(max(en_end.max(), vi_end.max() * max(CANDIDATE_SCALES)) / DRIFT_RESOLUTION) + 1
+    size = 1 << int(np.ceil(np.log2(2 * length + max_lag + 1)))
+
+    en_signal = _activity_signal(en_start, en_end, length)
+    en_fft = np.fft.rfft(en_signal, n=size)
+    en_energy = en_signal.sum()
+
+    best = TimeTransform()
+    for scale in CANDIDATE_SCALES:
+        vi_signal = _activity_signal(vi_start * scale, vi_end * scale, length)
+        correlation = np.fft.irfft(en_fft * np.conj(np.fft.rfft(vi_signal, n=size)), n=size)
+        # correlation[k] = sum_t en[t + k] * vi[t]; lag âm nằm ở cuối mảng
+        lags = np.concatenate((np.arange(0, max_lag + 1), np.arange(-max_lag, 0)))
+        window = np.concatenate((correlation[:max_lag + 1], correlation[size - max_lag:]))
+        position = int(np.argmax(window))
+        score = float(window[position] / max(np.sqrt(en_energy * vi_signal.sum()), 1.0))
+        if score > best.score + 1e-6:
+            best = TimeTransform(scale=scale, offset=float(lags[position] * DRIFT_RESOLUTION), score=score)
+    return best
+
+
+def _align_monotonic(en_mid: np.ndarray, vi_mid: np.ndarray, max_distance: float, band_seconds: float) -> np.ndarray:
+    """
+    Gán mỗi câu VI (theo thứ tự) cho một câu EN sao cho chỉ số EN không giảm, tổng độ lệch thời gian nhỏ nhất.
+    Chỉ xét các câu EN trong ±band_seconds quanh câu VI: mỗi hàng DP là vài phép numpy trên dải đó.
+    """
+    order = np.argsort(en_mid, kind="stable")
+    sorted_mid = en_mid[order]
+    lo = np.searchsorted(sorted_mid, vi_mid - band_seconds, side="left")
+    hi = np.searchsorted(sorted_mid, vi_mid + band_seconds, side="right")
+    # Dải rỗng (không có EN nào gần): giữ câu EN gần nhất để đường đi không bị đứt
+    nearest = _nearest_index(sorted_mid, vi_mid)
+    lo = np.minimum(lo, nearest)
+    hi = np.maximum(hi, nearest + 1)
+    # Cận dưới/trên phải không giảm theo VI để đường đi đơn điệu luôn tồn tại
+    lo = np.maximum.accumulate(lo)
+    hi = np.maximum(np.maximum.accumulate(hi), lo + 1)
+
+    cap = max_distance * 2
+    prev_cost = None
+    prev_lo = prev_hi = 0
+    back_pointers = []
+    for row in range(len(vi_mid)):
+        row_lo, row_hi = int(lo[row]), int(hi[row])
+        cost = np.minimum(np.abs(sorted_mid[row_lo:row_hi] - vi_mid[row]), cap)
+        if prev_cost is None:
+            back_pointers.append(None)
+            prev_cost, prev_lo, prev_hi = cost, row_lo, row_hi
+            continue
+
+        # best_prev[j] = min(D_prev[j'] với j' <= j) trong phần giao của hai dải
+        columns = np.arange(row_lo, row_hi)
+        prefix_min = np.minimum.accumulate(prev_cost)
+        is_new_min = np.concatenate(([True], prev_cost[1:] < prefix_min[:-1]))
+        prefix_arg = np.maximum.accumulate(np.where(is_new_min, np.arange(len(prev_cost)), 0))
+        take = np.clip(columns, prev_lo, prev_hi - 1) - prev_lo
+        best_prev = prefix_min[take]
+        back_pointers.append(prefix_arg[take] + prev_lo)
+
+        prev_cost, prev_lo, prev_hi = cost + best_prev, row_lo, row_hi
+
+    matches = np.empty(len(vi_mid), dtype=np.int64)
+    column = prev_lo + int(np.argmin(prev_cost))
+    for row in range(len(vi_mid) - 1, -1, -1):
+        matches[row] = column
+        if back_pointers[row] is not None:
+            column = int(back_pointers[row][column - int(lo[row])])
+
+    assigned = order[matches]
+    return np.where(np.abs(en_mid[assigned] - vi_mid) <= max_distance, assigned, -1)
+
+
+def resolve_alignment_strategy(strategy: str | None) -> str:
+    strategy = (strategy or os.getenv("SUBTITLE_ALIGNMENT_STRATEGY", "auto")).strip().lower()
+    if strategy not in ALIGNMENT_STRATEGIES:
+        raise ValueError(f"SUBTITLE_ALIGNMENT_STRATEGY khong hop le: {strategy} (chon {', '.join(ALIGNMENT_STRATEGIES)})")
+    return strategy
+
+
+def align_subtitles(
+    en_subs: list[dict],
+    vi_subs: list[dict],
+    strategy: str | None = None,
+    max_distance: float = DEFAULT_MAX_DISTANCE,
+) -> np.ndarray:
+    """
+    Trả về mảng độ dài len(vi_subs): chỉ số câu EN được ghép cho từng câu VI, -1 nếu bỏ qua.
+    Cả hai danh sách là dict có start_time/end_time (giây).
+    """
+    strategy = resolve_alignment_strategy(strategy)
+    if not en_subs or not vi_subs:
+        return np.full(len(vi_subs), -1, dtype=np.int64)
+
+    en_start, en_end = _times(en_subs)
+    vi_start, vi_end = _times(vi_subs)
+
+    if strategy in ("dtw", "auto"):
+        transform = estimate_time_transform(en_subs, vi_subs)
+        if transform.score < MIN_TRANSFORM_SCORE:
+            transform = TimeTransform(score=transform.score)
+        if strategy == "auto" and transform.is_identity:
+            strategy = "overlap"
+        else:
+            vi_start, vi_end = transform.apply(vi_start), transform.apply(vi_end)
+            strategy = "dtw"
+
+    if strategy == "midpoint":
+        return _align_midpoint((en_start + en_end) / 2.0, (vi_start + vi_end) / 2.0, max_distance)
+    if strategy == "overlap":
+        return _align_overlap(en_start, en_end, vi_start, vi_end, max_distance)
+
+    vi_order = np.argsort(vi_start, kind="stable")
+    matches = np.empty(len(vi_subs), dtype=np.int64)
+    matches[vi_order] = _align_monotonic(
+        (en_start + en_end) / 2.0, ((vi_start + vi_end) / 2.0)[vi_order], max_distance, DTW_BAND_SECONDS
+    )
+    return matches
+
+
+def merge_aligned_texts(en_count: int, vi_subs: list[dict], matches: np.ndarray) -> list[str]:
+    """Nối các câu VI của cùng một câu EN theo thứ tự thời gian, bỏ câu lặp liền nhau."""
+    grouped = [[] for _ in range(en_count)]
+    for vi_index in np.argsort([sub["start_time"] for sub in vi_subs], kind="stable"):
+        en_index = int(matches[vi_index])
+        if en_index < 0:
+            continue
+        text = vi_subs[vi_index]["text"]
+        if not grouped[en_index] or grouped[en_index][-1] != text:
+            grouped[en_index].append(text)
+    return [" ".join(texts) for texts in grouped]
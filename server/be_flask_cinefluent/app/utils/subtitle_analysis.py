@@ -0,0 +1,33 @@
+import hashlib
+import re
+
+# Câu ngắn hơn số từ này không được đưa vào model (AI dễ dán nhãn bừa)
+MIN_ANALYSIS_WORDS = 3
+
+
+def clean_subtitle_text(text: str) -> str:
+    if not isinstance(text, str):
+        return ""
+
+    text = re.sub(r"<[^>]*>", " ", text)
+    text = re.sub(r"{\\.*?}", " ", text)
+    text = re.sub(r"\[.*?\]", " ", text)
+    text = re.sub(r"\(.*?\)", " ", text)
+    text = text.replace("â™ª", " ")
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
+def is_analyzable_text(cleaned_text: str) -> bool:
+    return bool(cleaned_text) and len(cleaned_text.split()) >= MIN_ANALYSIS_WORDS
+
+
+def analysis_text_hash(content_en: str) -> str | None:
+    """
+    Hash nội dung tiếng Anh đã làm sạch: dùng để biết phụ đề có đổi từ lần phân tích trước hay không.
+    None với câu không được phân tích (quá ngắn / rỗng).
+    """
+    cleaned_text = clean_subtitle_text(content_en)
+    if not is_analyzable_text(cleaned_text):
+        return None
+    return hashlib.sha1(cleaned_text.encode("utf-8")).hexdigest()
@@ -0,0 +1,139 @@
+"""
+Định dạng track phụ đề nhị phân dạng cột cho player (thay cho việc parse VTT + JSON [METADATA]).
+
+Bố cục (little-endian, mọi section căn lề 4 byte để JS tạo Float32Array/Uint32Array trực tiếp):
+    magic "CFST" | u16 version | u16 reserved | u32 cue_count N | u32 T
+    T byte JSON mảng tên cloze_type
+    f32[N] start_time | f32[N] end_time
+    u8[N] grammar_tag_id (255 = không có) | u8[N] chỉ số cloze_type (255 = không có cloze)
+    5 cột chuỗi theo thứ tự TEXT_COLUMNS, mỗi cột: u32[N + 1] offset rồi blob UTF-8
+Chuỗi rỗng của content_vi nghĩa là không có bản dịch (giống VTT); distractors nối bằng "\\n".
+"""
+
+import json
+import struct
+
+import numpy as np
+
+
+TRACK_MAGIC = b"CFST"
+TRACK_VERSION = 1
+NO_VALUE = 255
+TEXT_COLUMNS = ("content_en", "content_vi", "cloze_masked_text", "cloze_target_word", "cloze_distractors")
+_HEADER = struct.Struct("<4sHHII")
+
+
+def _pad(length: int) -> bytes:
+    return b"\0" * (-length % 4)
+
+
+class SubtitleTrackBuilder:
+    """Gom từng cue (theo thứ tự thời gian) rồi ghi ra track nhị phân một lần."""
+
+    def __init__(self) -> None:
+        self.starts = []
+        self.ends = []
+        self.tag_ids = []
+        self.cloze_types = []
+        self.cloze_type_names = []
+        self.texts = {column: [] for column in TEXT_COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def add(self, start_time, end_time, content_en, content_vi, grammar_tag_id, cloze_data) -> None:
+        self.starts.append(float(start_time or 0))
+        self.ends.append(float(end_time or 0))
+
+        if grammar_tag_id is None:
+            self.tag_ids.append(NO_VALUE)
+        elif 0 <= int(grammar_tag_id) < NO_VALUE:
+            self.tag_ids.append(int(grammar_tag_id))
+        else:
+            raise ValueError(f"grammar_tag_id {grammar_tag_id} vuot qua gioi han uint8 cua track")
+
+        if cloze_data:
+            cloze_type = cloze_data.get("cloze_type") or ""
+            if cloze_type not in self.cloze_type_names:
+                self.cloze_type_names.append(cloze_type)
+            self.cloze_types.append(self.cloze_type_names.index(cloze_type))
+            masked_text = cloze_data.get("masked_text") or ""
+            target_word = cloze_data.get("target_word") or ""
+            distractors = "\n".join(cloze_data.get("distractors") or [])
+        else:
+            self.cloze_types.append(NO_VALUE)
+            masked_text = target_word = distractors = ""
+
+        row = (content_en or "", content_vi or "", masked_text, target_word, distractors)
+        for column, value in zip(TEXT_COLUMNS, row):
+            self.texts[column].append(value)
+
+    def write_to(self, f) -> None:
+        count = len(self.starts)
+        type_table = json.dumps(self.cloze_type_names, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        f.write(_HEADER.pack(TRACK_MAGIC, TRACK_VERSION, 0, count, len(type_table)))
+        f.write(type_table + _pad(len(type_table)))
+
+        f.write(np.asarray(self.starts, dtype="<f4").tobytes())
+        f.write(np.asarray(self.ends, dtype="<f4").tobytes())
+        f.write(np.asarray(self.tag_ids, dtype=np.uint8).tobytes() + _pad(count))
+        f.write(np.asarray(self.cloze_types, dtype=np.uint8).tobytes() + _pad(count))
+
+        for column in TEXT_COLUMNS:
+            encoded = [value.encode("utf-8") for value in self.texts[column]]
+            offsets = np.zeros(count + 1, dtype="<u4")
+            if encoded:
+                offsets[1:] = np.cumsum([len(value) for value in encoded])
+            blob = b"".join(encoded)
+            f.write(offsets.tobytes())
+            f.write(blob + _pad(len(blob)))
+
+
+def decode_subtitle_track(data: bytes) -> list[dict]:
+    """Đọc track về danh sách cue cùng dạng với kết quả parse VTT của player (dùng cho benchmark/kiểm tra)."""
+    magic, version, _, count, table_length = _HEADER.unpack_from(data, 0)
+    if magic != TRACK_MAGIC or version != TRACK_VERSION:
+        raise ValueError(f"Track phu de khong hop le (magic={magic!r}, version={version})")
+
+    offset = _HEADER.size
+    cloze_type_names = json.loads(data[offset:offset + table_length].decode("utf-8"))
+    offset += table_length + len(_pad(table_length))
+
+    starts = np.frombuffer(data, dtype="<f4", count=count, offset=offset)
+    offset += 4 * count
+    ends = np.frombuffer(data, dtype="<f4", count=count, offset=offset)
+    offset += 4 * count
+    tag_ids = np.frombuffer(data, dtype=np.uint8, count=count, offset=offset)
+    offset += count + len(_pad(count))
+    cloze_types = np.frombuffer(data, dtype=np.uint8, count=count, offset=offset)
+    offset += count + len(_pad(count))
+
+    columns = {}
+    for column in TEXT_COLUMNS:
+        offsets = np.frombuffer(data, dtype="<u4", count=count + 1, offset=offset).tolist()
+        offset += 4 * (count + 1)
+        blob = data[offset:offset + offsets[-1]]
+        offset += offsets[-1] + len(_pad(offsets[-1]))
+        columns[column] = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(count)]
+
+    cues = []
+    for index in range(count):
+        cue = {
+            "id": index + 1,
+            "start_time": round(float(starts[index]), 3),
+            "end_time": round(float(ends[index]), 3),
+            "content_en": columns["content_en"][index],
+            "content_vi": columns["content_vi"][index] or None,
+        }
+        if tag_ids[index] != NO_VALUE:
+            cue["grammar_tag_id"] = int(tag_ids[index])
+        if cloze_types[index] != NO_VALUE:
+            distractors = columns["cloze_distractors"][index]
+            cue["cloze_data"] = {
+                "masked_text": columns["cloze_masked_text"][index],
+                "target_word": columns["cloze_target_word"][index],
+                "distractors": distractors.split("\n") if distractors else [],
+                "cloze_type": cloze_type_names[cloze_types[index]],
+            }
+        cues.append(cue)
+    return cues
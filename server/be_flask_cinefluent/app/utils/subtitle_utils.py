@@ -1,59 +1,145 @@
-
+import io
 import re
+from itertools import chain
+from typing import IO, Iterable, Iterator, NamedTuple, Union
+
+# Regex dùng chung, compile một lần khi import module thay vì compile lại cho từng cue
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_SRT_TIME_RE = re.compile(r'(\d{1,2}):(\d{2}):(\d{2})[,\.](\d{3})')
+# VTT có thể có timing dạng 00:00.000 hoặc 00:00:00.000
+_VTT_TIME_RE = re.compile(r'(\d{0,2}:?\d{2}:\d{2}\.\d{3})')
+_VTT_HEADER_RE = re.compile(r'^WEBVTT', re.IGNORECASE)
+_VTT_MARKER_RE = re.compile(r'WEBVTT', re.IGNORECASE)
+
+SubtitleSource = Union[str, bytes, IO, Iterable[str]]
+
+
+class SubtitleCue(NamedTuple):
+    """Một cue phụ đề dạng gọn: (start_time, end_time, text), thời gian tính bằng giây."""
+    start_time: float
+    end_time: float
+    text: str
+
 
-def parse_srt(content: str):
+def _iter_lines(source: SubtitleSource, encoding: str = 'utf-8') -> Iterator[str]:
     """
-    Parse nội dung file SRT cực kỳ bền bỉ (Robust).
-    Xử lý tốt mọi loại xuống dòng (\n, \r\n, \r) và khoảng trắng dư thừa.
+    Trả về iterator từng dòng của nguồn phụ đề (str, bytes, file object hoặc upload stream).
+    Xuống dòng (\n, \r\n, \r) được chuẩn hóa về \n mà không cần copy lại toàn bộ nội dung.
     """
-    # Bước 1: Chuẩn hóa xuống dòng về \n
-    content = content.replace('\r\n', '\n').replace('\r', '\n')
-    
-    # Bước 2: Chia file thành các khối (đoạn phụ đề)
-    # Các đoạn thường cách nhau bởi ít nhất một dòng trống (\n\n)
-    blocks = re.split(r'\n\s*\n', content.strip())
-    
-    subtitles = []
-    for block in blocks:
-        lines = [line.strip() for line in block.strip().split('\n') if line.strip()]
-        if len(lines) < 2:
-            continue
-            
-        # Tìm dòng chứa thời gian (có ký hiệu -->)
-        timing_idx = -1
-        for i, line in enumerate(lines):
-            if '-->' in line:
-                timing_idx = i
-                break
-        
-        if timing_idx == -1:
+    if isinstance(source, str):
+        return iter(io.StringIO(source, newline=None))
+    if isinstance(source, (bytes, bytearray)):
+        return iter(io.TextIOWrapper(io.BytesIO(source), encoding=encoding, newline=None))
+    if hasattr(source, 'read'):
+        if isinstance(source, io.TextIOBase):
+            return iter(source)
+        # File nhị phân (vd: werkzeug FileStorage.stream) -> decode tăng dần
+        return iter(io.TextIOWrapper(source, encoding=encoding, newline=None))
+    return iter(source)
+
+
+def _iter_text_blocks(lines: Iterable[str], min_lines: int) -> Iterator[tuple[str, str]]:
+    """
+    Gom các dòng thành từng khối phụ đề (dòng trống hoặc chỉ có khoảng trắng là ranh giới khối)
+    và yield (timing_line, text) cho các khối hợp lệ. Chỉ duyệt nội dung đúng một lần.
+    """
+    strip_tags = _HTML_TAG_RE.sub
+    block = []
+    append = block.append
+    for raw_line in chain(lines, ('',)):
+        line = raw_line.strip()
+        if line:
+            append(line)
             continue
-            
-        timing_line = lines[timing_idx]
-        # Text là tất cả các dòng sau dòng timing
-        text_lines = lines[timing_idx + 1:]
-        text = ' '.join(text_lines).strip()
-        
-        # Cleanup text: Xóa HTML tags
-        text = re.sub(r'<[^>]+>', '', text)
-        
-        if not text:
+        if not block:
             continue
 
-        # Parse timing dùng regex để an tâm về format
-        time_matches = re.findall(r'(\d{1,2}:\d{2}:\d{2}[,\.]\d{3})', timing_line)
+        if len(block) >= min_lines:
+            # Tìm dòng chứa thời gian (có ký hiệu -->), text là tất cả các dòng sau dòng timing
+            for i, timing_line in enumerate(block):
+                if '-->' in timing_line:
+                    text = strip_tags('', ' '.join(block[i + 1:]).strip())
+                    if text:
+                        yield timing_line, text
+                    break
+        block.clear()
+
+
+def _srt_match_to_seconds(match: tuple[str, str, str, str]) -> float:
+    hours, minutes, seconds, millis = match
+    return int(hours) * 3600 + int(minutes) * 60 + float(f"{seconds}.{millis}")
+
+
+def iter_srt_cues(source: SubtitleSource, encoding: str = 'utf-8') -> Iterator[SubtitleCue]:
+    """
+    Đọc phụ đề SRT theo kiểu streaming (từng dòng) và yield SubtitleCue.
+    Xử lý tốt mọi loại xuống dòng (\n, \r\n, \r) và khoảng trắng dư thừa.
+    """
+    findall = _SRT_TIME_RE.findall
+    for timing_line, text in _iter_text_blocks(_iter_lines(source, encoding), min_lines=2):
+        time_matches = findall(timing_line)
         if len(time_matches) >= 2:
-            start_str = time_matches[0]
-            end_str = time_matches[1]
-            
-            subtitles.append({
-                "index": len(subtitles) + 1,
-                "start_time": time_to_seconds(start_str),
-                "end_time": time_to_seconds(end_str),
-                "text": text
-            })
-            
-    return subtitles
+            yield SubtitleCue(
+                _srt_match_to_seconds(time_matches[0]),
+                _srt_match_to_seconds(time_matches[1]),
+                text,
+            )
+
+
+def iter_vtt_cues(source: SubtitleSource, encoding: str = 'utf-8') -> Iterator[SubtitleCue]:
+    """
+    Đọc phụ đề WebVTT theo kiểu streaming (từng dòng) và yield SubtitleCue.
+    """
+    lines = _iter_lines(source, encoding)
+    first_line = next(lines, None)
+    if first_line is None:
+        return
+
+    # Bỏ qua header WEBVTT (chỉ xét dòng đầu tiên của file)
+    if not _VTT_HEADER_RE.match(first_line):
+        lines = chain((first_line,), lines)
+
+    findall = _VTT_TIME_RE.findall
+    for timing_line, text in _iter_text_blocks(lines, min_lines=1):
+        raw_times = findall(timing_line)
+        if len(raw_times) >= 2:
+            yield SubtitleCue(
+                time_to_seconds(_pad_vtt_time(raw_times[0])),
+                time_to_seconds(_pad_vtt_time(raw_times[1])),
+                text,
+            )
+
+
+def _pad_vtt_time(ts: str) -> str:
+    # Nếu thiếu phần giờ (HH:), ta thêm vào
+    if ts.count(':') == 1:
+        return f"00:{ts}"
+    return ts
+
+
+def _cues_to_dicts(cues: Iterable[SubtitleCue]) -> list[dict]:
+    return [
+        {
+            "index": index,
+            "start_time": cue.start_time,
+            "end_time": cue.end_time,
+            "text": cue.text,
+        }
+        for index, cue in enumerate(cues, start=1)
+    ]
+
+
+def is_vtt_content(content: str) -> bool:
+    """Nhận diện nhanh nội dung WebVTT (có chữ WEBVTT, không phân biệt hoa thường)."""
+    return bool(content) and _VTT_MARKER_RE.search(content) is not None
+
+
+def parse_srt(content: SubtitleSource):
+    """
+    Parse nội dung file SRT cực kỳ bền bỉ (Robust).
+    Xử lý tốt mọi loại xuống dòng (\n, \r\n, \r) và khoảng trắng dư thừa.
+    """
+    return _cues_to_dicts(iter_srt_cues(content))
 
 
 def time_to_seconds(time_str: str) -> float:
@@ -65,61 +151,12 @@ def time_to_seconds(time_str: str) -> float:
     hours = int(parts[0])
     minutes = int(parts[1])
     seconds = float(parts[2])
-    
+
     return hours * 3600 + minutes * 60 + seconds
 
 
-def parse_vtt(content: str):
+def parse_vtt(content: SubtitleSource):
     """
     Parse nội dung file WebVTT cực kỳ bền bỉ.
     """
-    content = content.replace('\r\n', '\n').replace('\r', '\n')
-    
-    # Xóa header WEBVTT
-    content = re.sub(r'^WEBVTT.*?\n', '', content, flags=re.IGNORECASE)
-    
-    blocks = re.split(r'\n\s*\n', content.strip())
-    
-    subtitles = []
-    for block in blocks:
-        lines = [line.strip() for line in block.strip().split('\n') if line.strip()]
-        if not lines:
-            continue
-            
-        timing_idx = -1
-        for i, line in enumerate(lines):
-            if '-->' in line:
-                timing_idx = i
-                break
-                
-        if timing_idx == -1:
-            continue
-            
-        timing_line = lines[timing_idx]
-        text_lines = lines[timing_idx + 1:]
-        text = ' '.join(text_lines).strip()
-        text = re.sub(r'<[^>]+>', '', text)
-        
-        if not text:
-            continue
-
-        # VTT có thể có timing dạng 00:00.000 hoặc 00:00:00.000
-        raw_times = re.findall(r'(\d{0,2}:?\d{2}:\d{2}\.\d{3})', timing_line)
-        
-        if len(raw_times) >= 2:
-            start_str = raw_times[0]
-            end_str = raw_times[1]
-            
-            # Nếu thiếu phần giờ (HH:), ta thêm vào
-            def format_vtt_time(ts):
-                if ts.count(':') == 1: return f"00:{ts}"
-                return ts
-
-            subtitles.append({
-                "index": len(subtitles) + 1,
-                "start_time": time_to_seconds(format_vtt_time(start_str)),
-                "end_time": time_to_seconds(format_vtt_time(end_str)),
-                "text": text
-            })
-            
-    return subtitles
+    return _cues_to_dicts(iter_vtt_cues(content))
@@ -0,0 +1,36 @@
+"""add translation memory table
+
+Revision ID: 3c1f8a2d7e45
+Revises: e6f42b19c8aa
+Create Date: 2026-05-04 09:20:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f8a2d7e45'
+down_revision = 'e6f42b19c8aa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'translation_memory',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('source_hash', sa.String(length=40), nullable=False),
+        sa.Column('target_lang', sa.String(length=10), nullable=False, server_default='vi'),
+        sa.Column('source_text', sa.Text(), nullable=False),
+        sa.Column('translated_text', sa.Text(), nullable=False),
+        sa.Column('origin', sa.String(length=20), nullable=False, server_default='machine'),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('source_hash', 'target_lang', name='uq_translation_memory_source_lang'),
+    )
+
+
+def downgrade():
+    op.drop_table('translation_memory')
@@ -0,0 +1,66 @@
+"""add background jobs table
+
+Revision ID: 5d2e9b7c4f18
+Revises: 3c1f8a2d7e45
+Create Date: 2026-05-06 14:10:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2e9b7c4f18'
+down_revision = '3c1f8a2d7e45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'background_jobs',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('job_type', sa.String(length=50), nullable=False),
+        sa.Column(
+            'status',
+            sa.Enum('QUEUED', 'RUNNING', 'SUCCEEDED', 'FAILED'),
+            nullable=False,
+            server_default='QUEUED',
+        ),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('progress', sa.JSON(), nullable=True),
+        sa.Column('dedupe_key', sa.String(length=120), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='3'),
+        sa.Column('run_after', sa.DateTime(), nullable=False),
+        sa.Column('running_slot', sa.Integer(), nullable=True),
+        sa.Column('locked_by', sa.String(length=100), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('created_by', sa.String(length=36), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('job_type', 'running_slot', name='uq_background_jobs_type_slot'),
+    )
+    op.create_index('ix_background_jobs_job_type', 'background_jobs', ['job_type'], unique=False)
+    op.create_index('ix_background_jobs_status', 'background_jobs', ['status'], unique=False)
+    op.create_index('ix_background_jobs_dedupe_key', 'background_jobs', ['dedupe_key'], unique=False)
+    op.create_index('ix_background_jobs_created_by', 'background_jobs', ['created_by'], unique=False)
+    op.create_index('ix_background_jobs_updated_at', 'background_jobs', ['updated_at'], unique=False)
+    op.create_index('ix_background_jobs_claim', 'background_jobs', ['status', 'job_type', 'run_after'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_background_jobs_claim', table_name='background_jobs')
+    op.drop_index('ix_background_jobs_updated_at', table_name='background_jobs')
+    op.drop_index('ix_background_jobs_created_by', table_name='background_jobs')
+    op.drop_index('ix_background_jobs_dedupe_key', table_name='background_jobs')
+    op.drop_index('ix_background_jobs_status', table_name='background_jobs')
+    op.drop_index('ix_background_jobs_job_type', table_name='background_jobs')
+    op.drop_table('background_jobs')
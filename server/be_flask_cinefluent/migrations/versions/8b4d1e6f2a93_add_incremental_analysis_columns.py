@@ -0,0 +1,37 @@
+"""add incremental analysis columns
+
+Revision ID: 8b4d1e6f2a93
+Revises: 5d2e9b7c4f18
+Create Date: 2026-05-09 10:30:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4d1e6f2a93'
+down_revision = '5d2e9b7c4f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('subtitles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('grammar_confidence', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('analysis_hash', sa.String(length=40), nullable=True))
+        batch_op.add_column(sa.Column('analysis_model_version', sa.String(length=64), nullable=True))
+
+    with op.batch_alter_table('movie_ai_analyses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('model_version', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('movie_ai_analyses', schema=None) as batch_op:
+        batch_op.drop_column('model_version')
+
+    with op.batch_alter_table('subtitles', schema=None) as batch_op:
+        batch_op.drop_column('analysis_model_version')
+        batch_op.drop_column('analysis_hash')
+        batch_op.drop_column('grammar_confidence')
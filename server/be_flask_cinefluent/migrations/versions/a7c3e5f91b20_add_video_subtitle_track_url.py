@@ -0,0 +1,27 @@
+"""add video subtitle track url
+
+Revision ID: a7c3e5f91b20
+Revises: 8b4d1e6f2a93
+Create Date: 2026-05-16 09:10:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e5f91b20'
+down_revision = '8b4d1e6f2a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('videos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('subtitle_track_url', sa.String(length=500), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('videos', schema=None) as batch_op:
+        batch_op.drop_column('subtitle_track_url')
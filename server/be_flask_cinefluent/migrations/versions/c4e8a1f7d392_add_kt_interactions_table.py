@@ -0,0 +1,74 @@
+"""add kt interactions table
+
+Revision ID: c4e8a1f7d392
+Revises: a7c3e5f91b20
+Create Date: 2026-05-18 10:05:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1f7d392'
+down_revision = 'a7c3e5f91b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'kt_interactions',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.Column('is_correct', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['tag_id'], ['grammar_tags.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    with op.batch_alter_table('kt_interactions', schema=None) as batch_op:
+        batch_op.create_index('ix_kt_interactions_user_id_id', ['user_id', 'id'], unique=False)
+
+    # Chép lịch sử JSON (tối đa 100 câu gần nhất mỗi user) sang bảng mới, giữ nguyên thứ tự.
+    # Không có thời điểm từng câu nên dùng updated_at của user_knowledge_states.
+    bind = op.get_bind()
+    states = sa.table(
+        'user_knowledge_states',
+        sa.column('user_id', sa.String()),
+        sa.column('latent_state', sa.JSON()),
+        sa.column('updated_at', sa.DateTime()),
+    )
+    tags = sa.table('grammar_tags', sa.column('id', sa.Integer()))
+    interactions = sa.table(
+        'kt_interactions',
+        sa.column('user_id', sa.String()),
+        sa.column('tag_id', sa.Integer()),
+        sa.column('is_correct', sa.Boolean()),
+        sa.column('created_at', sa.DateTime()),
+    )
+
+    known_tags = {row[0] for row in bind.execute(sa.select(tags.c.id))}
+    rows = []
+    for user_id, latent_state, updated_at in bind.execute(sa.select(states.c.user_id, states.c.latent_state, states.c.updated_at)):
+        for item in latent_state or []:
+            try:
+                tag_id, is_correct = int(item[0]), bool(int(item[1]))
+            except (TypeError, ValueError, IndexError):
+                continue
+            if tag_id in known_tags:
+                rows.append({'user_id': user_id, 'tag_id': tag_id, 'is_correct': is_correct, 'created_at': updated_at})
+        if len(rows) >= 1000:
+            bind.execute(interactions.insert(), rows)
+            rows = []
+    if rows:
+        bind.execute(interactions.insert(), rows)
+
+
+def downgrade():
+    with op.batch_alter_table('kt_interactions', schema=None) as batch_op:
+        batch_op.drop_index('ix_kt_interactions_user_id_id')
+
+    op.drop_table('kt_interactions')
@@ -0,0 +1,36 @@
+"""add unique watch history user video
+
+Revision ID: d9f2b6a4c715
+Revises: c4e8a1f7d392
+Create Date: 2026-05-25 09:30:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9f2b6a4c715'
+down_revision = 'c4e8a1f7d392'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Dòng trùng (user, phim) do ghi đồng thời trước đây: giữ dòng đầu tiên, dòng đó vẫn là dòng
+    # mà code cũ (filter_by(...).first()) đọc/cập nhật
+    op.execute(
+        sa.text(
+            "DELETE FROM watch_history WHERE id NOT IN ("
+            "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM watch_history GROUP BY user_id, video_id) AS keep"
+            ")"
+        )
+    )
+    with op.batch_alter_table('watch_history', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_watch_history_user_video', ['user_id', 'video_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('watch_history', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_watch_history_user_video', type_='unique')
@@ -69,6 +69,181 @@ def seed(with_admin):
             click.echo(f"Loi khi tao tai khoan admin: {e}")
 
 
+@app.cli.command("translation-memory-backfill")
+@click.option("--target", default="vi", show_default=True, help="Ngon ngu dich.")
+@click.option("--video-id", type=int, default=None, help="Chi backfill tu mot video.")
+def translation_memory_backfill(target, video_id):
+    """Seed bang translation_memory tu cac cap content_en/content_vi da co."""
+    from app.services.translation import DbTranslationMemory, backfill_translation_memory_from_subtitles
+
+    report = backfill_translation_memory_from_subtitles(DbTranslationMemory(), target_lang=target, video_id=video_id)
+    click.echo(
+        f"Da quet {report['scanned_rows']} dong, {report['unique_sources']} cau khac nhau, "
+        f"them moi {report['inserted']} (tong {report['total_entries']})."
+    )
+
+
+@app.cli.command("translation-memory-stats")
+@click.option("--target", default=None, help="Loc theo ngon ngu dich.")
+def translation_memory_stats(target):
+    """Thong ke bang translation_memory theo nguon (machine/subtitle)."""
+    from sqlalchemy import func
+
+    from app.models.models_model import TranslationMemoryEntry
+
+    query = db.session.query(
+        TranslationMemoryEntry.target_lang, TranslationMemoryEntry.origin, func.count(TranslationMemoryEntry.id)
+    )
+    if target:
+        query = query.filter(TranslationMemoryEntry.target_lang == target)
+    rows = query.group_by(TranslationMemoryEntry.target_lang, TranslationMemoryEntry.origin).all()
+    if not rows:
+        click.echo("Bo nho dich dang trong.")
+    for target_lang, origin, count in rows:
+        click.echo(f"{target_lang:<6} {origin:<10} {count}")
+
+
+@app.cli.command("movie-ai-export-onnx")
+@click.option("--no-quantize", is_flag=True, help="Chi xuat ONNX fp32, khong tao ban int8.")
+@click.option("--opset", type=int, default=17, show_default=True)
+def movie_ai_export_onnx(no_quantize, opset):
+    """Xuat grammar classifier sang ONNX (fp32 + int8) trong thu muc model."""
+    from app.services.grammar_onnx_export import export_grammar_onnx
+    from app.services.movie_ai_service import _resolve_model_dir
+
+    result = export_grammar_onnx(_resolve_model_dir(), quantize=not no_quantize, opset=opset)
+    click.echo(f"ONNX fp32: {result['fp32']} ({result['fp32_mb']} MB)")
+    if "int8" in result:
+        click.echo(f"ONNX int8: {result['int8']} ({result['int8_mb']} MB)")
+    click.echo("Kiem tra parity: python scripts/bench_grammar_backends.py")
+
+
+@app.cli.command("kt-export-interactions")
+@click.option("--output", default="kt_interactions.csv", show_default=True, help="File CSV dau ra.")
+@click.option("--since", default=None, help="Chi export cac cau tra loi tu ngay nay (YYYY-MM-DD).")
+def kt_export_interactions(output, since):
+    """Export bang kt_interactions ra CSV (user_id, tags, is_correct, timestamp) cho scripts/train_dkt_colab.py."""
+    import csv
+    from datetime import datetime
+
+    from app.services.kt_interaction_service import iter_kt_interactions
+
+    since_at = datetime.strptime(since, "%Y-%m-%d") if since else None
+    rows = users = 0
+    last_user_id = None
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["user_id", "tags", "is_correct", "timestamp"])
+        for user_id, tag_id, is_correct, created_at in iter_kt_interactions(since=since_at):
+            writer.writerow([user_id, tag_id, int(is_correct), created_at.isoformat()])
+            rows += 1
+            if user_id != last_user_id:
+                users += 1
+                last_user_id = user_id
+    click.echo(f"Da export {rows} cau tra loi cua {users} user vao {output}.")
+
+
+@app.cli.command("jobs-worker")
+@click.option("--processes", type=int, default=lambda: int(os.getenv("JOBS_WORKER_PROCESSES", "2")), show_default="2")
+@click.option("--types", default=None, help="Chi xu ly cac loai job nay (phan cach bang dau phay).")
+def jobs_worker(processes, types):
+    """Chay worker xu ly hang doi job nen (import YouTube, phan tich AI, recap)."""
+    from app.services.jobs import run_worker_pool
+
+    job_types = [item.strip() for item in types.split(",") if item.strip()] if types else None
+    click.echo(f"Khoi dong {processes} worker process...")
+    run_worker_pool(processes=processes, job_types=job_types)
+
+
+@app.cli.command("jobs-stats")
+def jobs_stats():
+    """Thong ke so job theo loai va trang thai."""
+    from app.services.jobs import count_jobs_by_status, list_job_types
+
+    summary = count_jobs_by_status()
+    for job_type in list_job_types():
+        counts = summary.get(job_type.name, {})
+        click.echo(
+            f"{job_type.name:<20} concurrency={job_type.concurrency} "
+            + " ".join(f"{status}={counts.get(status, 0)}" for status in ("QUEUED", "RUNNING", "SUCCEEDED", "FAILED"))
+        )
+
+
+@app.cli.command("rag-convert-store")
+@click.option("--source", default=None, help="File vector_store.json (mac dinh PRODUCT_RAG_JSON_STORE).")
+@click.option("--target", default=None, help="Thu muc NpyVectorStore (mac dinh PRODUCT_RAG_NPY_STORE).")
+def rag_convert_store(source, target):
+    """Chuyen vector store JSON cua product RAG sang dinh dang npy (dung voi PRODUCT_RAG_STORE=npy)."""
+    from pathlib import Path
+
+    from app.services.chat_orchestrator_service import _get_repo_root
+    from app.services.product_rag import ProductRagSettings, convert_json_store
+
+    settings = ProductRagSettings.from_env(_get_repo_root())
+    source_path = Path(source) if source else settings.json_store_path
+    target_dir = Path(target) if target else settings.npy_store_dir
+    if not source_path.exists():
+        click.echo(f"Khong tim thay {source_path}.")
+        return
+    count = convert_json_store(source_path, target_dir)
+    click.echo(f"Da chuyen {count} chunk tu {source_path} sang {target_dir}.")
+
+
+@app.cli.command("rag-eval")
+@click.option("--stores", default="json,npy", show_default=True, help="Cac store kind (json, npy, qdrant).")
+@click.option("--modes", default="vector,bm25,hybrid", show_default=True, help="Cac retrieval mode.")
+@click.option("--k", "ks", default="1,3,5", show_default=True, help="Cac gia tri k cho hit@k.")
+@click.option("--repeat", type=int, default=5, show_default=True, help="Chay lai bo cau hoi de do do tre.")
+@click.option("--output", default="storage/reports/rag_eval.json", show_default=True, help="File bao cao JSON.")
+@click.option("--min-hit", type=float, default=None, help="Thoat loi neu hit@k lon nhat cua run nao thap hon.")
+@click.option("--max-p95-ms", type=float, default=None, help="Thoat loi neu p95 cua run nao cao hon.")
+def rag_eval(stores, modes, ks, repeat, output, min_hit, max_p95_ms):
+    """Danh gia retrieval cua product RAG tren rag_data/eval/questions.jsonl (hit@k, MRR, p50/p95/p99)."""
+    import json
+    from pathlib import Path
+
+    from app.services.chat_orchestrator_service import _get_repo_root
+    from app.services.product_rag import ProductRagSettings
+    from app.services.product_rag.evaluation import run_rag_eval
+
+    ks = tuple(sorted({int(value) for value in ks.split(",") if value.strip()}))
+    report = run_rag_eval(
+        ProductRagSettings.from_env(_get_repo_root()),
+        store_kinds=[item.strip() for item in stores.split(",") if item.strip()],
+        modes=[item.strip() for item in modes.split(",") if item.strip()],
+        ks=ks,
+        repeat=repeat,
+    )
+
+    output_path = Path(output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    corpus = report["corpus"]
+    click.echo(f"{corpus['chunks']} chunk, {corpus['questions']} cau hoi, bm25 build {corpus['bm25_build_ms']}ms")
+    failed = []
+    top_k = ks[-1]
+    for run in report["runs"]:
+        latency = run["latency_ms"]
+        click.echo(
+            f"{run['store']:<7} {run['mode']:<7} "
+            + " ".join(f"hit@{k}={run[f'hit@{k}']:.3f}" for k in ks)
+            + f" mrr={run['mrr']:.3f} p50={latency['p50']:.3f}ms p95={latency['p95']:.3f}ms p99={latency['p99']:.3f}ms"
+        )
+        if min_hit is not None and run[f"hit@{top_k}"] < min_hit:
+            failed.append(f"{run['store']}/{run['mode']} hit@{top_k}={run[f'hit@{top_k}']}")
+        if max_p95_ms is not None and latency["p95"] > max_p95_ms:
+            failed.append(f"{run['store']}/{run['mode']} p95={latency['p95']}ms")
+    click.echo(f"Da ghi bao cao vao {output_path}.")
+    if failed:
+        raise click.ClickException("Khong dat nguong: " + ", ".join(failed))
+
+
 if __name__ == "__main__":
+    from app.services.jobs import start_job_event_relay
+
+    # Debug reloader chạy __main__ hai lần: chỉ process phục vụ request mới relay sự kiện job
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true" or not app.debug:
+        start_job_event_relay(app)
     print("Server dang chay voi SocketIO tai http://0.0.0.0:5000")
     socketio.run(app, host="0.0.0.0", port=5000, debug=True, allow_unsafe_werkzeug=True)
@@ -0,0 +1,64 @@
+"""
+Benchmark bước sinh cloze (spaCy) cho một bộ phim đầy đủ.
+
+So sánh cách cũ (nlp(text) full pipeline cho từng câu) với generate_cloze_data_batch
+(nlp.pipe theo batch, tắt parser/NER, cache theo hash câu) ở trạng thái cache trống và cache nóng.
+
+    python scripts/bench_cloze_generation.py
+    python scripts/bench_cloze_generation.py --srt path/to/film.srt --batch-size 512 --processes 2
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_movie_ai_inference import build_film_rows, load_srt_rows  # noqa: E402
+
+
+def _comparable(cloze):
+    if cloze is None:
+        return None
+    # distractors được sinh từ set -> so sánh không phụ thuộc thứ tự
+    return cloze["masked_text"], cloze["target_word"], frozenset(cloze["distractors"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--srt", default=None, help="File SRT/VTT của một bộ phim (mặc định: phim giả lập)")
+    parser.add_argument("--cues", type=int, default=1600)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args()
+
+    from app.services import movie_ai_service as service
+
+    nlp = service.get_cloze_nlp()
+    if nlp is None:
+        print("Chua cai en_core_web_sm: python -m spacy download en_core_web_sm")
+        sys.exit(1)
+
+    texts = load_srt_rows(args.srt) if args.srt else build_film_rows(args.cues)
+    print(f"segments={len(texts)} unique={len(set(texts))} pipes={nlp.pipe_names}")
+
+    started = time.perf_counter()
+    legacy = [service._build_cloze_from_doc(nlp(text), text) for text in texts]
+    legacy_s = time.perf_counter() - started
+    print(f"  legacy nlp(text) full pipeline  {legacy_s:>8.2f}s  {len(texts) / legacy_s:>8.0f} segments/s")
+
+    service._CLOZE_CACHE.clear()
+    for label in ("nlp.pipe (cold cache)", "nlp.pipe (warm cache)"):
+        started = time.perf_counter()
+        batched = service.generate_cloze_data_batch(texts, batch_size=args.batch_size, n_process=args.processes)
+        elapsed = time.perf_counter() - started
+        mismatches = sum(1 for a, b in zip(legacy, batched) if _comparable(a) != _comparable(b))
+        print(
+            f"  {label:<31} {elapsed:>8.2f}s  {len(texts) / elapsed:>8.0f} segments/s  "
+            f"speedup={legacy_s / max(elapsed, 1e-9):.1f}x  mismatches={mismatches}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Throughput / độ trễ DKT khi nhiều learner gọi /api/kt/predict cùng lúc (chỉ phần mô hình).
+
+- direct:  mỗi caller gọi session.run với batch 1 (như trước khi có micro-batching)
+- batched: caller đẩy vào DKTMicroBatcher, dispatcher chạy một tensor (B, 100) cho cả nhóm
+Mỗi caller là một thread, lịch sử ngẫu nhiên khác nhau (không đi qua cache theo user).
+Cần storage/cinefluent_dkt.onnx có trục batch động (xuất lại bằng train_dkt_colab.py).
+
+    python scripts/bench_dkt_batching.py --callers 1,8,32,128 --seconds 5
+    DKT_ORT_INTRA_OP_THREADS=4 DKT_BATCH_MAX_WAIT_MS=1 python scripts/bench_dkt_batching.py
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def build_histories(count, max_seq_len, num_tags, seed=13):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    histories = []
+    for _ in range(count):
+        seq_len = int(rng.integers(1, max_seq_len + 1))
+        tags = np.zeros(max_seq_len, dtype=np.int64)
+        answers = np.zeros(max_seq_len, dtype=np.int64)
+        tags[:seq_len] = rng.integers(0, num_tags, seq_len)
+        answers[:seq_len] = rng.integers(0, 2, seq_len)
+        histories.append((tags, answers, seq_len - 1))
+    return histories
+
+
+def run_callers(callers, seconds, predict, histories):
+    latencies = [[] for _ in range(callers)]
+    deadline = time.perf_counter() + seconds
+
+    def loop(slot):
+        rng = random.Random(slot)
+        while time.perf_counter() < deadline:
+            tags, answers, valid_idx = histories[rng.randrange(len(histories))]
+            started = time.perf_counter()
+            predict(tags, answers, valid_idx)
+            latencies[slot].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=loop, args=(slot,)) for slot in range(callers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    merged = sorted(value for values in latencies for value in values)
+    if not merged:
+        return 0.0, 0.0, 0.0
+    p50 = merged[len(merged) // 2] * 1000
+    p99 = merged[min(len(merged) - 1, int(len(merged) * 0.99))] * 1000
+    return len(merged) / elapsed, p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", default="1,8,32,128")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--num-tags", type=int, default=150)
+    parser.add_argument("--modes", default="direct,batched")
+    args = parser.parse_args()
+
+    from app.services.dkt_batcher import DKTMicroBatcher, has_dynamic_batch
+    from app.services.kt_inference_service import dkt_engine
+
+    session = dkt_engine.session
+    if session is None:
+        sys.exit("Khong nap duoc storage/cinefluent_dkt.onnx")
+
+    settings = dkt_engine.settings
+    print(
+        f"intra_op={settings.intra_op_threads or 'auto'} inter_op={settings.inter_op_threads or 'auto'} "
+        f"graph_opt={settings.graph_optimization} max_batch={settings.max_batch} max_wait={settings.max_wait_ms}ms"
+    )
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    if "batched" in modes and not has_dynamic_batch(session):
+        print("Graph co batch co dinh = 1: bo qua che do batched")
+        modes.remove("batched")
+
+    def direct(tags, answers, valid_idx):
+        return session.run(None, {"question_seq": tags[None], "answer_seq": answers[None]})[0][0, valid_idx]
+
+    histories = build_histories(512, dkt_engine.max_seq_len, args.num_tags)
+    for callers in [int(value) for value in args.callers.split(",") if value.strip()]:
+        baseline = None
+        for mode in modes:
+            batcher = DKTMicroBatcher(session, settings) if mode == "batched" else None
+            predict = batcher.predict if batcher is not None else direct
+            rps, p50, p99 = run_callers(callers, args.seconds, predict, histories)
+            baseline = baseline or rps
+            line = f"  callers={callers:<4} {mode:<8} {rps:>9.1f} req/s  p50={p50:>7.2f}ms  p99={p99:>7.2f}ms  x{rps / baseline:.1f}"
+            if batcher is not None:
+                line += f"  avg_batch={batcher.metrics()['avg_batch_size']}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
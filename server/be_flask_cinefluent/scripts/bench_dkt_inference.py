@@ -0,0 +1,86 @@
+"""
+Đo chi phí một lần /api/kt/predict của DKT (chỉ phần mô hình, không có DB/HTTP).
+
+- legacy:  dựng 2 mảng 100 phần tử bằng vòng lặp Python + chạy cả chuỗi ONNX mỗi request
+- cached:  predict lặp lại khi lịch sử chưa đổi (cache theo user_id + interaction_count)
+- update:  sau mỗi lần trả lời: replay cửa sổ 100 câu, hoặc 1 bước từ hidden state nếu có
+           storage/cinefluent_dkt_stateful.onnx (xuất bằng EXPORT_STATEFUL trong train_dkt_colab.py)
+
+    python scripts/bench_dkt_inference.py --iterations 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def legacy_predict(engine, history):
+    import numpy as np
+
+    history = history[-engine.max_seq_len:]
+    tags = np.zeros(engine.max_seq_len, dtype=np.int64)
+    answers = np.zeros(engine.max_seq_len, dtype=np.int64)
+    for i, (t, a) in enumerate(history):
+        tags[i] = t
+        answers[i] = a
+    preds = engine.session.run(None, {"question_seq": tags[None], "answer_seq": answers[None]})[0]
+    return preds[0, max(0, len(history) - 1)]
+
+
+def _per_call_ms(fn, iterations):
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    return (time.perf_counter() - started) * 1000 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--num-tags", type=int, default=150, help="Tag id ngau nhien trong [0, num_tags)")
+    args = parser.parse_args()
+
+    import numpy as np
+    from app.services.kt_inference_service import dkt_engine
+
+    if dkt_engine.session is None:
+        sys.exit("Khong nap duoc storage/cinefluent_dkt.onnx")
+
+    rng = random.Random(11)
+    history = [[rng.randrange(args.num_tags), rng.randrange(2)] for _ in range(dkt_engine.max_seq_len)]
+
+    print(f"graph stateful: {'co' if dkt_engine.stateful_session is not None else 'khong'}")
+    legacy_ms = _per_call_ms(lambda _: legacy_predict(dkt_engine, history), args.iterations)
+    print(f"  legacy  {legacy_ms:>8.3f} ms/predict")
+
+    dkt_engine.predict_probabilities(history, user_id="bench-cached", version=1)
+    cached_ms = _per_call_ms(
+        lambda _: dkt_engine.predict_probabilities(history, user_id="bench-cached", version=1), args.iterations
+    )
+    print(f"  cached  {cached_ms:>8.3f} ms/predict  x{legacy_ms / max(cached_ms, 1e-9):.0f}")
+
+    # Mỗi vòng: user trả lời thêm 1 câu (update_state) rồi predict
+    live = list(history)
+
+    def answer_then_predict(i):
+        live.append([rng.randrange(args.num_tags), rng.randrange(2)])
+        del live[:-dkt_engine.max_seq_len]
+        dkt_engine.invalidate_user("bench-update")
+        return dkt_engine.predict_probabilities(live, user_id="bench-update", version=2 + i)
+
+    answer_then_predict(-1)
+    update_ms = _per_call_ms(answer_then_predict, args.iterations)
+    print(f"  update  {update_ms:>8.3f} ms/predict  x{legacy_ms / max(update_ms, 1e-9):.1f}")
+
+    if dkt_engine.stateful_session is not None:
+        # Graph stateful replay từ trạng thái 0 phải khớp mô hình cả chuỗi
+        diff = np.abs(dkt_engine._run_stateful(history, None)[0] - legacy_predict(dkt_engine, history)).max()
+        print(f"  max |stateful - sequence| = {diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Kiểm tra parity và so sánh latency/bộ nhớ giữa các backend của grammar classifier
+(torch fp32, onnx fp32, onnx int8) trên scripts/tense.csv.
+
+Cần xuất ONNX trước:  flask movie-ai-export-onnx
+    python scripts/bench_grammar_backends.py
+    python scripts/bench_grammar_backends.py --backends torch,onnx-int8 --repeat 5 --report storage/reports/grammar_backends.json
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+DEFAULT_CSV = os.path.join(os.path.dirname(__file__), "tense.csv")
+
+
+def load_sentences(path):
+    with open(path, "r", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return [row[0].strip() for row in reader if row and row[0].strip()]
+
+
+def run_backend(backend, sentences, repeat, result_queue):
+    from app.services.grammar_inference import run_bucketed_inference
+    from app.services.movie_ai_service import load_movie_ai_bundle
+
+    started = time.perf_counter()
+    bundle = load_movie_ai_bundle(backend)
+    load_seconds = time.perf_counter() - started
+    settings = bundle["inference_settings"]
+
+    run_bucketed_inference(sentences[:16], bundle["tokenizer"], bundle["runner"], settings)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        pred_ids, confidences = run_bucketed_inference(sentences, bundle["tokenizer"], bundle["runner"], settings)
+        timings.append(time.perf_counter() - started)
+
+    result_queue.put(
+        {
+            "backend": backend,
+            "load_seconds": round(load_seconds, 3),
+            "best_seconds": round(min(timings), 4),
+            "sentences_per_second": round(len(sentences) / min(timings), 1),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "model_path": bundle["model_path"],
+            "pred_ids": pred_ids.tolist(),
+            "confidences": confidences.tolist(),
+        }
+    )
+
+
+def _wait_result(process, result_queue, poll_seconds=1.0):
+    """Chờ kết quả của backend; None nếu process con chết mà không gửi gì."""
+    while True:
+        try:
+            return result_queue.get(timeout=poll_seconds)
+        except queue.Empty:
+            if not process.is_alive():
+                try:
+                    return result_queue.get(timeout=poll_seconds)
+                except queue.Empty:
+                    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-agreement", type=float, default=0.98, help="Ngưỡng parity nhãn so với torch")
+    parser.add_argument("--report", default=None, help="Ghi báo cáo JSON ra file")
+    args = parser.parse_args()
+
+    sentences = load_sentences(args.csv)
+    backends = [item.strip() for item in args.backends.split(",") if item.strip()]
+    print(f"sentences={len(sentences)} backends={backends}")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for backend in backends:
+        result_queue = ctx.Queue()
+        process = ctx.Process(target=run_backend, args=(backend, sentences, args.repeat, result_queue))
+        process.start()
+        # Đọc kết quả trước khi join: process con chỉ thoát khi pipe của Queue đã được xả hết,
+        # join trước với payload lớn (pred_ids/confidences) sẽ treo cả hai phía
+        result = _wait_result(process, result_queue)
+        process.join()
+        if result is None:
+            print(f"  {backend:<10} FAILED (xem log phía trên)")
+            continue
+        results[backend] = result
+
+    reference = results.get("torch")
+    report = {"csv": args.csv, "sentences": len(sentences), "backends": {}}
+    failed = False
+    for backend, result in results.items():
+        row = {key: value for key, value in result.items() if key not in ("pred_ids", "confidences")}
+        if reference and backend != "torch":
+            pairs = list(zip(reference["pred_ids"], result["pred_ids"]))
+            row["label_agreement"] = round(sum(1 for a, b in pairs if a == b) / max(1, len(pairs)), 4)
+            row["max_confidence_diff"] = round(
+                max((abs(a - b) for a, b in zip(reference["confidences"], result["confidences"])), default=0.0), 4
+            )
+            row["speedup_vs_torch"] = round(reference["best_seconds"] / result["best_seconds"], 2)
+            failed = failed or row["label_agreement"] < args.min_agreement
+        report["backends"][backend] = row
+        print(
+            f"  {backend:<10} {row['best_seconds']:>8.3f}s  {row['sentences_per_second']:>8.1f} sent/s  "
+            f"load {row['load_seconds']:>6.2f}s  peak RSS {row['peak_rss_mb']:>7.0f} MB"
+            + (f"  agreement={row['label_agreement']:.4f} max_conf_diff={row['max_confidence_diff']:.4f}" if "label_agreement" in row else "")
+        )
+
+    if args.report:
+        os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Report: {args.report}")
+
+    if failed:
+        print(f"Parity FAILED: label agreement < {args.min_agreement}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Throughput HashEmbeddingProvider: bản Python thuần cũ vs bản NumPy có bảng băm token.
+
+- legacy:       sha256 từng token, cộng dồn trong list, chuẩn hóa bằng Python (như trước)
+- embed_text:   từng câu một (như run_retrieval gọi cho câu hỏi)
+- embed_texts:  cả lô một lần, trả ma trận (n, dim)
+Văn bản lấy từ chunk thật của rag_data (load_rag_chunks), lặp lại cho đủ --texts câu.
+Chạy xong kiểm tra vector float64 trùng từng bit với bản cũ.
+
+    python scripts/bench_hash_embeddings.py --texts 5000 --repeat 3
+"""
+
+import argparse
+import hashlib
+import math
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+
+def legacy_embed_text(text, dim):
+    vector = [0.0] * dim
+    tokens = re.findall(r"[\wÀ-ỹ]+", text.lower())
+    if not tokens:
+        return vector
+
+    for token in tokens:
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], byteorder="big") % dim
+        sign = 1.0 if digest[4] % 2 == 0 else -1.0
+        weight = 1.0 + (digest[5] / 255.0)
+        vector[index] += sign * weight
+
+    norm = math.sqrt(sum(value * value for value in vector))
+    if norm == 0.0:
+        return vector
+    return [value / norm for value in vector]
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    import numpy as np
+
+    from app.services.product_rag.corpus import load_rag_chunks
+    from app.services.product_rag.embeddings import HashEmbeddingProvider
+
+    corpus = [chunk.text for chunk in load_rag_chunks(REPO_ROOT)]
+    texts = [corpus[index % len(corpus)] for index in range(args.texts)]
+    provider = HashEmbeddingProvider(dim=args.dim)
+    tokens = sum(len(re.findall(r"[\wÀ-ỹ]+", text.lower())) for text in texts)
+    print(f"texts={len(texts)} tokens={tokens} dim={args.dim} (corpus {len(corpus)} chunk)")
+
+    legacy = best_of(args.repeat, lambda: [legacy_embed_text(text, args.dim) for text in texts])
+    single = best_of(args.repeat, lambda: [provider.embed_text(text) for text in texts])
+    batch = best_of(args.repeat, lambda: provider.embed_texts(texts))
+    for name, seconds in (("legacy", legacy), ("embed_text", single), ("embed_texts", batch)):
+        print(f"  {name:<12} {len(texts) / seconds:>10.0f} text/s  {seconds * 1000:>8.1f}ms  x{legacy / seconds:.1f}")
+
+    expected = np.array([legacy_embed_text(text, args.dim) for text in corpus], dtype=np.float64)
+    exact = np.array_equal(provider.embed_texts(corpus, dtype=np.float64), expected)
+    exact_single = all(provider.embed_text(text) == row.tolist() for text, row in zip(corpus, expected))
+    exact_float32 = np.array_equal(provider.embed_texts(corpus), expected.astype(np.float32))
+    print(f"  trung tung bit: embed_texts={exact} embed_text={exact_single} float32={exact_float32}")
+
+
+if __name__ == "__main__":
+    main()
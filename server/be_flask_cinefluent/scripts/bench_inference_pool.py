@@ -0,0 +1,105 @@
+"""
+Đo độ trễ của process web trong lúc đang phân tích phụ đề.
+
+Chạy cùng một lượng phân tích (nhiều request /movie-difficulty/predict song song) ở hai chế độ:
+- inline: model chạy ngay trong process, giống trước khi có pool inference
+- process: gửi sang inference_pool (ProcessPoolExecutor riêng)
+Trong lúc đó một thread "tick" ngủ 10ms liên tục và ghi lại độ trễ thực tế; tick trễ nghĩa là
+process web (HTTP + socket) đang bị GIL/CPU của model chặn.
+
+    python scripts/bench_inference_pool.py --requests 4 --cues 800 --workers 1
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_movie_ai_inference import build_film_rows  # noqa: E402
+
+TICK_SECONDS = 0.01
+
+
+def build_srt(texts):
+    blocks = []
+    for index, text in enumerate(texts, start=1):
+        start, end = index * 3, index * 3 + 2
+        blocks.append(f"{index}\n00:{start // 60:02d}:{start % 60:02d},000 --> 00:{end // 60:02d}:{end % 60:02d},000\n{text}\n")
+    return "\n".join(blocks)
+
+
+def measure(mode, srt_content, requests, workers):
+    from app.services.inference_pool import InferencePool, InferencePoolSettings, _analyze_subtitle_content
+
+    pool = None
+    if mode == "process":
+        pool = InferencePool(InferencePoolSettings(workers=workers, max_pending=max(requests, 1)))
+        # Khởi động worker + nạp model trước khi đo
+        pool.run(_analyze_subtitle_content, srt_content[:2000], "warmup.srt")
+    else:
+        _analyze_subtitle_content(srt_content[:2000], "warmup.srt")
+
+    delays = []
+    stop = threading.Event()
+
+    def tick():
+        while not stop.is_set():
+            started = time.perf_counter()
+            time.sleep(TICK_SECONDS)
+            delays.append((time.perf_counter() - started - TICK_SECONDS) * 1000)
+
+    def analyze():
+        if pool is None:
+            _analyze_subtitle_content(srt_content, "bench.srt")
+        else:
+            pool.run(_analyze_subtitle_content, srt_content, "bench.srt")
+
+    ticker = threading.Thread(target=tick, daemon=True)
+    ticker.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=analyze) for _ in range(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    ticker.join()
+
+    metrics = pool.metrics() if pool is not None else {}
+    if pool is not None:
+        pool.shutdown()
+
+    delays.sort()
+    p99 = delays[min(len(delays) - 1, int(len(delays) * 0.99))] if delays else 0.0
+    print(
+        f"  {mode:<8} total {elapsed:>7.2f}s  tick delay p50={statistics.median(delays) if delays else 0.0:>7.1f}ms "
+        f"p99={p99:>7.1f}ms max={max(delays, default=0.0):>7.1f}ms"
+    )
+    if metrics:
+        print(
+            f"           peak_pending={metrics['peak_pending']} avg_queue_wait={metrics['avg_queue_wait_ms']}ms "
+            f"avg_run={metrics['avg_run_ms']}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=4, help="So request phan tich gui dong thoi")
+    parser.add_argument("--cues", type=int, default=800)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--modes", default="inline,process")
+    args = parser.parse_args()
+
+    srt_content = build_srt(build_film_rows(args.cues))
+    print(f"requests={args.requests} cues/request={args.cues} workers={args.workers}")
+    for mode in [item.strip() for item in args.modes.split(",") if item.strip()]:
+        measure(mode, srt_content, args.requests, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark inference XLM-R (grammar classifier) trên CPU cho một bộ phim đầy đủ.
+
+So sánh vòng lặp cũ (batch cố định 16 câu theo thứ tự phụ đề, pad tới câu dài nhất) với
+inference theo bucket độ dài + token budget (grammar_inference.run_bucketed_inference).
+Mỗi chế độ chạy trong một process riêng để đo peak RSS độc lập.
+
+    python scripts/bench_movie_ai_inference.py                      # phim giả lập ~1600 câu
+    python scripts/bench_movie_ai_inference.py --srt path/to/film.srt --threads 4 --token-budget 4096
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+SHORT_LINES = [
+    "What are you doing here?",
+    "I don't know what you mean.",
+    "We have to go right now.",
+    "She said she would call me back.",
+    "Have you ever been to London?",
+]
+LONG_LINES = [
+    "If I had known that you were coming tonight, I would have cleaned the whole apartment and cooked something nice.",
+    "They had been waiting at the station for almost three hours before anyone told them the last train was cancelled.",
+    "By the time we get to the border, the guards will have changed shifts and nobody will remember our faces.",
+]
+
+
+def build_film_rows(cue_count, seed=11):
+    rng = random.Random(seed)
+    texts = []
+    for i in range(cue_count):
+        # Phân bố giống phim thật: đa số câu ngắn, một phần nhỏ câu dài
+        if rng.random() < 0.8:
+            texts.append(" ".join([rng.choice(SHORT_LINES)] + ["Okay."] * rng.randint(0, 2)))
+        else:
+            texts.append(f"{rng.choice(LONG_LINES)} Line {i}.")
+    return texts
+
+
+def load_srt_rows(path):
+    from app.services.movie_ai_service import _clean_subtitle_text
+    from app.utils.subtitle_utils import parse_srt, parse_vtt
+
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        parser = parse_vtt if path.lower().endswith(".vtt") else parse_srt
+        entries = parser(f)
+    texts = [_clean_subtitle_text(entry["text"]) for entry in entries]
+    return [text for text in texts if text and len(text.split()) >= 3]
+
+
+def legacy_predict(bundle, texts, batch_size=16):
+    import numpy as np
+    import torch
+
+    tokenizer, model, device = bundle["tokenizer"], bundle["model"], bundle["device"]
+    pred_ids = []
+    for index in range(0, len(texts), batch_size):
+        encoded = tokenizer(texts[index:index + batch_size], truncation=True, padding=True, max_length=128, return_tensors="pt")
+        encoded = {key: value.to(device) for key, value in encoded.items()}
+        with torch.no_grad():
+            logits = model(**encoded).logits
+        probs = torch.softmax(logits, dim=-1).cpu().numpy()
+        pred_ids.extend(int(value) for value in np.argmax(probs, axis=-1))
+    return pred_ids
+
+
+def run_mode(mode, texts, threads, token_budget, max_batch_size, result_queue):
+    import torch
+
+    from app.services.grammar_inference import InferenceSettings, run_bucketed_inference
+    from app.services.movie_ai_service import load_movie_ai_bundle
+
+    if threads:
+        torch.set_num_threads(threads)
+    bundle = load_movie_ai_bundle()
+    settings = InferenceSettings(token_budget=token_budget, max_batch_size=max_batch_size, num_threads=threads)
+
+    # Warm-up để không tính thời gian khởi tạo kernel lần đầu
+    warmup = texts[:32]
+    if mode == "legacy":
+        legacy_predict(bundle, warmup)
+    else:
+        run_bucketed_inference(warmup, bundle["tokenizer"], bundle["runner"], settings)
+
+    started = time.perf_counter()
+    if mode == "legacy":
+        pred_ids = legacy_predict(bundle, texts)
+    else:
+        pred_ids = run_bucketed_inference(texts, bundle["tokenizer"], bundle["runner"], settings)[0].tolist()
+    elapsed = time.perf_counter() - started
+
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    result_queue.put({"mode": mode, "elapsed": elapsed, "peak_rss_mb": peak_rss_mb, "pred_ids": pred_ids})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--srt", default=None, help="File SRT/VTT của một bộ phim (mặc định: phim giả lập)")
+    parser.add_argument("--cues", type=int, default=1600)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--token-budget", type=int, default=4096)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    texts = load_srt_rows(args.srt) if args.srt else build_film_rows(args.cues)
+    print(f"segments={len(texts)} threads={args.threads or 'default'} token_budget={args.token_budget}")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for mode in ("legacy", "bucketed"):
+        result_queue = ctx.Queue()
+        process = ctx.Process(
+            target=run_mode,
+            args=(mode, texts, args.threads, args.token_budget, args.max_batch_size, result_queue),
+        )
+        process.start()
+        result = result_queue.get()
+        process.join()
+        results[mode] = result
+        print(
+            f"  {mode:<9} {result['elapsed']:>8.2f}s  {len(texts) / result['elapsed']:>8.1f} segments/s  "
+            f"peak RSS {result['peak_rss_mb']:>7.0f} MB"
+        )
+
+    legacy_ids, bucketed_ids = results["legacy"]["pred_ids"], results["bucketed"]["pred_ids"]
+    agreement = sum(1 for a, b in zip(legacy_ids, bucketed_ids) if a == b) / max(1, len(texts))
+    print(f"  speedup={results['legacy']['elapsed'] / results['bucketed']['elapsed']:.2f}x  label agreement={agreement:.4f}")
+
+
+if __name__ == "__main__":
+    main()
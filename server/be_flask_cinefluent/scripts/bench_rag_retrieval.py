@@ -0,0 +1,78 @@
+"""
+Chất lượng + độ trễ retrieval của product RAG trên rag_data/eval/questions.jsonl.
+
+- vector: cosine trên vector băm (HashEmbeddingProvider) như trước
+- bm25:   chỉ mục từ khóa (âm tiết + cặp âm tiết + bản bỏ dấu, keywords của metadata được boost)
+- hybrid: RRF của hai bảng xếp hạng trên
+Vector store dựng trong RAM từ load_rag_chunks (không cần vector_store.json), chỉ mục BM25 build mới.
+So sánh đủ các store kind và ghi báo cáo JSON: flask rag-eval.
+
+    python scripts/bench_rag_retrieval.py --top-k 5 --repeat 20 --keyword-boost 2
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20, help="Chạy lại cả bộ câu hỏi để đo độ trễ ổn định hơn")
+    parser.add_argument("--keyword-boost", type=float, default=2.0)
+    parser.add_argument("--rrf-k", type=int, default=60)
+    parser.add_argument("--modes", default="vector,bm25,hybrid")
+    args = parser.parse_args()
+
+    from app.services.product_rag.config import ProductRagSettings
+    from app.services.product_rag.corpus import load_rag_chunks
+    from app.services.product_rag.embeddings import HashEmbeddingProvider
+    from app.services.product_rag.evaluation import evaluate_retrieval, load_eval_questions
+    from app.services.product_rag.index import VectorIndex
+    from app.services.product_rag.lexical import LexicalIndex
+    from app.services.product_rag.retrieval import run_retrieval
+
+    settings = ProductRagSettings.from_env(REPO_ROOT)
+    chunks = load_rag_chunks(REPO_ROOT, max_chars=settings.chunk_size, overlap_chars=settings.chunk_overlap)
+    provider = HashEmbeddingProvider(dim=settings.embedding_dim)
+    vectors = provider.embed_texts([chunk.text for chunk in chunks])
+    vector_index = VectorIndex.from_records(
+        [{"id": chunk.chunk_id, "vector": vector, "payload": chunk.to_payload()} for chunk, vector in zip(chunks, vectors)]
+    )
+
+    started = time.perf_counter()
+    lexical_index = LexicalIndex.build(chunks, keyword_boost=args.keyword_boost)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    questions = load_eval_questions(REPO_ROOT)
+    print(f"chunks={len(chunks)} questions={len(questions)} bm25_build={build_ms:.1f}ms")
+    for mode in [item.strip() for item in args.modes.split(",") if item.strip()]:
+
+        def retrieve(question, context_type):
+            return run_retrieval(
+                question,
+                vector_index,
+                provider,
+                top_k=args.top_k,
+                context_type=context_type,
+                lexical_index=lexical_index,
+                mode=mode,
+                rrf_k=args.rrf_k,
+            )
+
+        result = evaluate_retrieval(questions, retrieve, ks=(args.top_k,), repeat=args.repeat)
+        latency = result["latency_ms"]
+        print(
+            f"  {mode:<7} recall@{args.top_k}={result[f'hit@{args.top_k}']:.3f}  mrr={result['mrr']:.3f}  "
+            f"p50={latency['p50']:.3f}ms  p95={latency['p95']:.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
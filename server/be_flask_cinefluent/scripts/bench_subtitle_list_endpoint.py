@@ -0,0 +1,141 @@
+"""
+Load test GET /api/videos/<id>/subtitles: requests/giây trước và sau khi cache body + ETag.
+
+- legacy: truy vấn ORM + SubtitleSchema(many=True).dump mỗi request (handler cũ)
+- cached: body JSON serialize sẵn (RAM/đĩa), trả 200
+- 304:    client gửi If-None-Match, server trả 304 không body
+
+Mặc định dùng Flask test client trên SQLite file tạm (script tự tạo video + phụ đề giả):
+    python scripts/bench_subtitle_list_endpoint.py --cues 3000 --seconds 5
+Đo qua HTTP trên server đang chạy (nhiều luồng):
+    python scripts/bench_subtitle_list_endpoint.py --url http://localhost:5000 --video-id 12 --concurrency 16
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_subtitle_bulk_insert import build_rows  # noqa: E402
+
+
+def _run_for(seconds, concurrency, call):
+    counts = [0] * concurrency
+    deadline = time.perf_counter() + seconds
+
+    def loop(slot):
+        while time.perf_counter() < deadline:
+            call()
+            counts[slot] += 1
+
+    threads = [threading.Thread(target=loop, args=(slot,)) for slot in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - started)
+
+
+def bench_test_client(args):
+    fd, sqlite_path = tempfile.mkstemp(suffix=".sqlite")
+    os.close(fd)
+    os.environ["DATABASE_URL"] = f"sqlite:///{sqlite_path}"
+    os.environ["SUBTITLE_RESPONSE_CACHE_DIR"] = tempfile.mkdtemp(prefix="subtitle_lists_")
+
+    from app import create_app
+    from app.extensions import db
+    from app.models.models_model import Subtitle, Video
+    from app.schemas.video_schema import SubtitleSchema
+    from app.services.subtitle_store_service import replace_video_subtitles
+    from app.services.subtitle_timeline_service import invalidate_subtitle_timeline
+    from app.utils.response import success_response
+
+    app = create_app()
+
+    @app.route("/bench/legacy-subtitles/<int:video_id>")
+    def legacy_subtitles(video_id):
+        Video.query.get(video_id)
+        ordered_subs = Subtitle.query.filter_by(video_id=video_id).order_by(Subtitle.start_time.asc()).all()
+        return success_response(data=SubtitleSchema(many=True).dump(ordered_subs))
+
+    with app.app_context():
+        db.create_all()
+        video = Video(title="bench-subtitle-list", slug=f"bench-subtitle-list-{int(time.time())}", status="private")
+        db.session.add(video)
+        db.session.commit()
+        video_id = video.id
+        replace_video_subtitles(video_id, build_rows(args.cues))
+        db.session.commit()
+        invalidate_subtitle_timeline(video_id)
+
+    client = app.test_client()
+    url = f"/api/videos/{video_id}/subtitles"
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    legacy = client.get(f"/bench/legacy-subtitles/{video_id}")
+    assert first.get_json()["data"] == legacy.get_json()["data"], "body cache khac voi handler cu"
+
+    print(f"cues={args.cues} body={len(first.data) / 1024:.1f} KB etag={etag} (Flask test client, SQLite)")
+    results = {
+        "legacy": _run_for(args.seconds, args.concurrency, lambda: client.get(f"/bench/legacy-subtitles/{video_id}")),
+        "cached": _run_for(args.seconds, args.concurrency, lambda: client.get(url)),
+        "304": _run_for(args.seconds, args.concurrency, lambda: client.get(url, headers={"If-None-Match": etag})),
+    }
+    _print_results(results)
+    os.remove(sqlite_path)
+
+
+def bench_http(args):
+    import requests
+
+    url = f"{args.url.rstrip('/')}/api/videos/{args.video_id}/subtitles"
+    first = requests.get(url, timeout=30)
+    first.raise_for_status()
+    etag = first.headers.get("ETag")
+    print(f"{url} body={len(first.content) / 1024:.1f} KB etag={etag}")
+
+    local = threading.local()
+
+    def session():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    results = {"200": _run_for(args.seconds, args.concurrency, lambda: session().get(url, timeout=30))}
+    if etag:
+        results["304"] = _run_for(
+            args.seconds, args.concurrency, lambda: session().get(url, headers={"If-None-Match": etag}, timeout=30)
+        )
+    _print_results(results)
+
+
+def _print_results(results):
+    baseline = next(iter(results.values()))
+    for label, rps in results.items():
+        print(f"  {label:<7} {rps:>9.1f} req/s  x{rps / baseline:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cues", type=int, default=3000)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--url", default=None, help="Base URL cua server dang chay (mac dinh: Flask test client)")
+    parser.add_argument("--video-id", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.url:
+        if args.video_id is None:
+            parser.error("--url can --video-id")
+        bench_http(args)
+    else:
+        bench_test_client(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark parser phụ đề SRT/WebVTT.
+
+So sánh parser cũ (normalize + re.split toàn file) với parser streaming mới trong
+app/utils/subtitle_utils.py trên file phụ đề tổng hợp nhiều nghìn cue.
+
+Chạy từ thư mục be_flask_cinefluent:
+    python scripts/bench_subtitle_parser.py --cues 3000 --repeat 20
+"""
+
+import argparse
+import io
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.subtitle_utils import iter_srt_cues, parse_srt, parse_vtt, time_to_seconds  # noqa: E402
+
+
+SAMPLE_LINES = [
+    "Yeah.",
+    "What?",
+    "Let's go.",
+    "<i>I told you we should have left earlier.</i>",
+    "You don't get to decide that for me,",
+    "not after everything that happened last night.",
+    "We've been driving for hours and I still have no idea where we are.",
+    "- Where is he? - He's gone.",
+]
+
+
+# ---------------------------------------------------------------------------
+# Parser cũ (giữ nguyên để đo so sánh)
+# ---------------------------------------------------------------------------
+def legacy_parse_srt(content):
+    content = content.replace('\r\n', '\n').replace('\r', '\n')
+    blocks = re.split(r'\n\s*\n', content.strip())
+    subtitles = []
+    for block in blocks:
+        lines = [line.strip() for line in block.strip().split('\n') if line.strip()]
+        if len(lines) < 2:
+            continue
+        timing_idx = next((i for i, line in enumerate(lines) if '-->' in line), -1)
+        if timing_idx == -1:
+            continue
+        text = re.sub(r'<[^>]+>', '', ' '.join(lines[timing_idx + 1:]).strip())
+        if not text:
+            continue
+        time_matches = re.findall(r'(\d{1,2}:\d{2}:\d{2}[,\.]\d{3})', lines[timing_idx])
+        if len(time_matches) >= 2:
+            subtitles.append({
+                "index": len(subtitles) + 1,
+                "start_time": time_to_seconds(time_matches[0]),
+                "end_time": time_to_seconds(time_matches[1]),
+                "text": text,
+            })
+    return subtitles
+
+
+def legacy_parse_vtt(content):
+    content = content.replace('\r\n', '\n').replace('\r', '\n')
+    content = re.sub(r'^WEBVTT.*?\n', '', content, flags=re.IGNORECASE)
+    blocks = re.split(r'\n\s*\n', content.strip())
+    subtitles = []
+    for block in blocks:
+        lines = [line.strip() for line in block.strip().split('\n') if line.strip()]
+        if not lines:
+            continue
+        timing_idx = next((i for i, line in enumerate(lines) if '-->' in line), -1)
+        if timing_idx == -1:
+            continue
+        text = re.sub(r'<[^>]+>', '', ' '.join(lines[timing_idx + 1:]).strip())
+        if not text:
+            continue
+        raw_times = re.findall(r'(\d{0,2}:?\d{2}:\d{2}\.\d{3})', lines[timing_idx])
+        if len(raw_times) >= 2:
+            pad = lambda ts: f"00:{ts}" if ts.count(':') == 1 else ts
+            subtitles.append({
+                "index": len(subtitles) + 1,
+                "start_time": time_to_seconds(pad(raw_times[0])),
+                "end_time": time_to_seconds(pad(raw_times[1])),
+                "text": text,
+            })
+    return subtitles
+
+
+# ---------------------------------------------------------------------------
+# Fixture tổng hợp
+# ---------------------------------------------------------------------------
+def _fmt(seconds, sep):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02}:{minutes:02}:{secs:02}{sep}{millis:03}"
+
+
+def build_fixture(cue_count, fmt, newline="\r\n", seed=42):
+    rng = random.Random(seed)
+    out = ["WEBVTT", ""] if fmt == "vtt" else []
+    sep = "." if fmt == "vtt" else ","
+    t = 1.0
+    for i in range(1, cue_count + 1):
+        duration = rng.uniform(0.8, 4.5)
+        out.append(str(i))
+        out.append(f"{_fmt(t, sep)} --> {_fmt(t + duration, sep)}")
+        for _ in range(rng.randint(1, 2)):
+            out.append(rng.choice(SAMPLE_LINES))
+        out.append("")
+        t += duration + rng.uniform(0.05, 1.5)
+    return newline.join(out) + newline
+
+
+def _timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cues", type=int, nargs="+", default=[1000, 3000, 10000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'format':<6} {'cues':>7} {'legacy ms':>10} {'stream ms':>10} {'speedup':>8} {'bytes-stream ms':>16}")
+    for cue_count in args.cues:
+        for fmt, legacy, current in (("srt", legacy_parse_srt, parse_srt), ("vtt", legacy_parse_vtt, parse_vtt)):
+            content = build_fixture(cue_count, fmt)
+            expected = legacy(content)
+            assert current(content) == expected, f"{fmt}: ket qua parser moi khac parser cu"
+
+            legacy_s = _timeit(lambda: legacy(content), args.repeat)
+            current_s = _timeit(lambda: current(content), args.repeat)
+
+            raw = content.encode("utf-8")
+            stream_s = _timeit(lambda: current(io.BytesIO(raw)), args.repeat)
+
+            print(
+                f"{fmt:<6} {len(expected):>7} {legacy_s * 1000:>10.2f} {current_s * 1000:>10.2f} "
+                f"{legacy_s / current_s:>7.2f}x {stream_s * 1000:>16.2f}"
+            )
+
+    # Chế độ tuple gọn (không dựng dict) cho các pipeline nội bộ
+    content = build_fixture(max(args.cues), "srt")
+    tuple_s = _timeit(lambda: list(iter_srt_cues(content)), args.repeat)
+    print(f"\niter_srt_cues (tuple) {max(args.cues)} cues: {tuple_s * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+So sánh VTT (kèm [METADATA] JSON mỗi cue) với track nhị phân dạng cột cho một bộ phim đầy đủ:
+kích thước (thô / gzip / brotli) và thời gian parse phía client.
+
+Parse VTT dùng bản port của parseVTT trong client/Fe_CineFluent/app/utils/vtt.worker.ts;
+track dùng decode_subtitle_track (cùng logic với decodeSubtitleTrack trong worker).
+
+    python scripts/bench_subtitle_track.py                   # phim giả lập 1600 câu, có nhãn + cloze
+    python scripts/bench_subtitle_track.py --video-id 12     # đọc phụ đề thật trong DB
+"""
+
+import argparse
+import gzip
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_movie_ai_inference import build_film_rows  # noqa: E402
+
+VI_LINES = ["Bạn đang làm gì ở đây?", "Tôi không hiểu ý bạn.", "Chúng ta phải đi ngay.", "Cô ấy nói sẽ gọi lại."]
+
+
+def build_film_cues(cue_count, seed=7):
+    rng = random.Random(seed)
+    cues = []
+    for index, text in enumerate(build_film_rows(cue_count, seed=seed)):
+        start = index * 2.7 + rng.random()
+        words = text.split()
+        target = words[1] if len(words) > 1 else words[0]
+        cloze = {
+            "masked_text": text.replace(target, "____", 1),
+            "target_word": target,
+            "distractors": [f"{target}ing", f"{target}ed", f"{target}s"],
+            "cloze_type": "grammar_verb",
+        }
+        cues.append((start, start + 2.2, text, rng.choice(VI_LINES), rng.randrange(12), cloze if rng.random() < 0.9 else None))
+    return cues
+
+
+def load_video_cues(video_id):
+    from app import create_app
+    from app.services.subtitle_export_service import _iter_subtitle_rows
+
+    with create_app().app_context():
+        return [tuple(row) for row in _iter_subtitle_rows(video_id)]
+
+
+def parse_vtt_like_worker(vtt_text):
+    lines = vtt_text.replace("\r", "").split("\n")
+    subtitles = []
+    current = None
+    start_index = next((i + 1 for i, line in enumerate(lines) if line.strip().upper() == "WEBVTT"), 0)
+    for raw in lines[start_index:]:
+        line = raw.strip()
+        if not line:
+            current = None
+            continue
+        if "-->" in line:
+            start, end = (part.strip() for part in line.split("-->"))
+            current = {"id": len(subtitles) + 1, "start_time": _to_seconds(start), "end_time": _to_seconds(end),
+                       "content_en": "", "content_vi": None}
+            subtitles.append(current)
+        elif current is not None:
+            if line.isdigit() and not current["content_en"]:
+                continue
+            if line.startswith("[METADATA]"):
+                meta = json.loads(line[len("[METADATA]"):])
+                if "tag_id" in meta:
+                    current["grammar_tag_id"] = meta["tag_id"]
+                if meta.get("cloze"):
+                    current["cloze_data"] = meta["cloze"]
+                continue
+            if not current["content_en"]:
+                current["content_en"] = line
+            elif current["content_vi"] is None:
+                current["content_vi"] = line
+            else:
+                current["content_vi"] += " " + line
+    return subtitles
+
+
+def _to_seconds(value):
+    hours, minutes, seconds = value.split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _best_of(fn, data, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(data)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cues", type=int, default=1600)
+    parser.add_argument("--video-id", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.services.subtitle_export_service import _format_vtt_cue
+    from app.utils.subtitle_track import SubtitleTrackBuilder, decode_subtitle_track
+
+    cues = load_video_cues(args.video_id) if args.video_id else build_film_cues(args.cues)
+
+    track = SubtitleTrackBuilder()
+    parts = ["WEBVTT\n\n"]
+    for index, row in enumerate(cues, start=1):
+        parts.append(_format_vtt_cue(index, *row))
+        track.add(*row)
+    vtt_bytes = "".join(parts).encode("utf-8")
+    buffer = io.BytesIO()
+    track.write_to(buffer)
+    track_bytes = buffer.getvalue()
+
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    print(f"cues={len(cues)}")
+    for label, data in (("vtt", vtt_bytes), ("track", track_bytes)):
+        sizes = f"raw={len(data) / 1024:>8.1f} KB  gzip={len(gzip.compress(data, 9)) / 1024:>7.1f} KB"
+        if brotli is not None:
+            sizes += f"  br={len(brotli.compress(data, quality=11)) / 1024:>7.1f} KB"
+        print(f"  {label:<6} {sizes}")
+    print(f"  raw size ratio track/vtt = {len(track_bytes) / len(vtt_bytes):.2f}")
+
+    vtt_s, parsed_vtt = _best_of(lambda data: parse_vtt_like_worker(data.decode("utf-8")), vtt_bytes, args.repeat)
+    track_s, parsed_track = _best_of(decode_subtitle_track, track_bytes, args.repeat)
+    print(f"  parse vtt   {vtt_s * 1000:>8.1f} ms")
+    print(f"  parse track {track_s * 1000:>8.1f} ms  speedup={vtt_s / max(track_s, 1e-9):.1f}x")
+
+    mismatches = sum(1 for a, b in zip(parsed_vtt, parsed_track) if a != b)
+    print(f"  cues giong nhau giua hai dinh dang: {len(cues) - mismatches}/{len(cues)}")
+
+
+if __name__ == "__main__":
+    main()
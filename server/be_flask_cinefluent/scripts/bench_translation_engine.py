@@ -0,0 +1,100 @@
+"""
+Benchmark translation engine offline bằng FakeTranslator (không gọi Google).
+
+So sánh vòng lặp dịch tuần tự cũ (batch cố định + sleep 0.5s giữa các batch) với
+TranslationEngine (worker pool + token bucket + bộ nhớ dịch) ở hai trạng thái:
+bộ nhớ trống (lần import đầu) và bộ nhớ đã có dữ liệu (import lại / phim khác trùng câu).
+
+    python scripts/bench_translation_engine.py --cues 3000 --latency 0.25 --workers 4 --rate 8
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.translation import (  # noqa: E402
+    FakeTranslator,
+    SqliteTranslationMemory,
+    TokenBucket,
+    TranslationEngine,
+)
+from app.services.translation.translators import BATCH_SEPARATOR, BATCH_SPLIT_TOKEN  # noqa: E402
+
+COMMON_LINES = ["Yeah.", "What?", "Let's go.", "No.", "Okay.", "Come on.", "Thank you.", "I know."]
+
+
+def build_transcript(cue_count, repeat_ratio, seed=3):
+    rng = random.Random(seed)
+    lines = []
+    for i in range(cue_count):
+        if rng.random() < repeat_ratio:
+            lines.append(rng.choice(COMMON_LINES))
+        else:
+            lines.append(f"Line {i}: I never thought we'd end up here, not after everything.")
+    return lines
+
+
+def legacy_translate(translator, texts, batch_delay):
+    """Mô phỏng vòng lặp cũ trong import_youtube_video (tuần tự, sleep giữa các batch)."""
+    avg_chars = sum(len(t) for t in texts) / len(texts)
+    batch_size = max(10, min(int(4500 / (avg_chars + len(BATCH_SEPARATOR))), 200))
+    results = []
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        parts = translator.translate(BATCH_SEPARATOR.join(batch)).split(BATCH_SPLIT_TOKEN)
+        results.extend(part.strip() for part in parts)
+        if start + batch_size < len(texts):
+            time.sleep(batch_delay)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cues", type=int, default=3000)
+    parser.add_argument("--repeat-ratio", type=float, default=0.25, help="Tỉ lệ câu lặp lại (Yeah., What?...)")
+    parser.add_argument("--latency", type=float, default=0.25, help="Độ trễ giả lập mỗi request (giây)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=8.0, help="Token bucket: request/giây")
+    parser.add_argument("--batch-delay", type=float, default=0.5, help="Sleep giữa các batch của vòng lặp cũ")
+    args = parser.parse_args()
+
+    texts = build_transcript(args.cues, args.repeat_ratio)
+    print(f"cues={len(texts)} unique={len(set(texts))} latency={args.latency}s workers={args.workers} rate={args.rate}/s")
+
+    translator = FakeTranslator(latency=args.latency)
+    started = time.perf_counter()
+    legacy_results = legacy_translate(translator, texts, args.batch_delay)
+    legacy_s = time.perf_counter() - started
+    print(f"  legacy sequential   {legacy_s:>7.2f}s  requests={translator.calls}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        memory = SqliteTranslationMemory(Path(tmp_dir) / "tm.sqlite3")
+        for label in ("engine (cold memory)", "engine (warm memory)"):
+            translator = FakeTranslator(latency=args.latency)
+            engine = TranslationEngine(
+                translator=translator,
+                memory=memory,
+                max_workers=args.workers,
+                rate_limiter=TokenBucket(rate=args.rate, capacity=args.workers),
+            )
+            run = engine.start(texts)
+            started = time.perf_counter()
+            for _ in run:
+                pass
+            elapsed = time.perf_counter() - started
+            assert run.results == legacy_results, "Ket qua engine khac vong lap cu"
+            print(
+                f"  {label:<20}{elapsed:>7.2f}s  requests={translator.calls} "
+                f"memory_hits={run.cache_hits} remote_lines={run.remote_texts} "
+                f"speedup={legacy_s / max(elapsed, 1e-9):.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Độ trễ JsonVectorStore.search trên N chunk tổng hợp (vector 256 chiều ngẫu nhiên).
+
+- legacy: cách cũ, mỗi lượt search đọc + json.loads cả file rồi tính cosine bằng Python thuần
+- index:  VectorIndex nạp một lần (cache theo mtime), search = một phép nhân ma trận-vector + argpartition
+- npy:    NpyVectorStore (vectors.npy mở bằng mmap, payload đọc lười từ JSONL theo offset)
+File JSON tạm được ghi bằng chính JsonVectorStore.upsert nên định dạng giống hệt vector_store.json.
+
+    python scripts/bench_vector_store.py --sizes 10000,100000 --queries 50
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+CONTEXT_TYPES = ["general", "movie", "quiz", "learning_tree", "roadmap"]
+
+
+def build_chunks(count, dim, seed=7):
+    from app.services.product_rag.types import RagChunk
+
+    rng = random.Random(seed)
+    chunks, vectors = [], []
+    for index in range(count):
+        chunks.append(
+            RagChunk(
+                chunk_id=f"doc_{index // 10:05d}::chunk_{index % 10:03d}",
+                doc_id=f"doc_{index // 10:05d}",
+                title=f"Tai lieu {index // 10}",
+                doc_group="faq",
+                topic="system_faq",
+                level="all",
+                lang="vi",
+                source_type="markdown",
+                context_types=rng.sample(CONTEXT_TYPES, rng.randint(1, 2)),
+                keywords=[],
+                updated_at="2026-01-01",
+                path=f"faq/doc_{index // 10}.md",
+                section_title="root",
+                chunk_index=index % 10,
+                text=f"Noi dung chunk {index}",
+            )
+        )
+        vectors.append([rng.gauss(0.0, 1.0) for _ in range(dim)])
+    return chunks, vectors
+
+
+def _cosine_similarity(left, right):
+    if not left or not right:
+        return 0.0
+    numerator = sum(a * b for a, b in zip(left, right))
+    left_norm = math.sqrt(sum(a * a for a in left))
+    right_norm = math.sqrt(sum(b * b for b in right))
+    if left_norm == 0.0 or right_norm == 0.0:
+        return 0.0
+    return numerator / (left_norm * right_norm)
+
+
+def legacy_search(path, query_vector, top_k, context_type):
+    records = json.loads(path.read_text(encoding="utf-8"))
+    hits = []
+    for record in records:
+        payload = record["payload"]
+        if context_type and context_type not in payload.get("context_types", []):
+            if "general" not in payload.get("context_types", []):
+                continue
+        hits.append((record["id"], _cosine_similarity(query_vector, record["vector"])))
+    hits.sort(key=lambda item: item[1], reverse=True)
+    return hits[:top_k]
+
+
+def timed(fn, queries):
+    latencies = []
+    for query, context_type in queries:
+        started = time.perf_counter()
+        fn(query, context_type)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return sum(latencies) / len(latencies) * 1000, latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--legacy-queries", type=int, default=5, help="Cách cũ rất chậm với 100k chunk")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.services.product_rag.stores import JsonVectorStore, NpyVectorStore
+
+    rng = random.Random(11)
+    for size in [int(value) for value in args.sizes.split(",") if value.strip()]:
+        chunks, vectors = build_chunks(size, args.dim)
+        queries = [
+            ([rng.gauss(0.0, 1.0) for _ in range(args.dim)], rng.choice(CONTEXT_TYPES + [None]))
+            for _ in range(args.queries)
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            store = JsonVectorStore(Path(tmp) / "vector_store.json")
+            started = time.perf_counter()
+            store.upsert(chunks, vectors)
+            write_ms = (time.perf_counter() - started) * 1000
+
+            # Lượt đầu tiên nạp chỉ mục từ file (đo riêng), các lượt sau dùng cache
+            started = time.perf_counter()
+            store.search(queries[0][0], args.top_k, queries[0][1])
+            load_ms = (time.perf_counter() - started) * 1000
+
+            legacy_avg, legacy_p95 = timed(
+                lambda query, context_type: legacy_search(store.path, query, args.top_k, context_type),
+                queries[: args.legacy_queries],
+            )
+            index_avg, index_p95 = timed(
+                lambda query, context_type: store.search(query, args.top_k, context_type), queries
+            )
+
+            npy_store = NpyVectorStore(Path(tmp) / "npy_store")
+            started = time.perf_counter()
+            npy_store.upsert(chunks, vectors)
+            npy_write_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            npy_store.search(queries[0][0], args.top_k, queries[0][1])
+            npy_load_ms = (time.perf_counter() - started) * 1000
+            npy_avg, npy_p95 = timed(
+                lambda query, context_type: npy_store.search(query, args.top_k, context_type), queries
+            )
+
+            agree = sum(
+                [hit.chunk_id for hit in store.search(query, args.top_k, context_type)]
+                == [chunk_id for chunk_id, _ in legacy_search(store.path, query, args.top_k, context_type)]
+                for query, context_type in queries[: args.legacy_queries]
+            )
+
+        print(f"chunks={size} dim={args.dim} upsert={write_ms:.0f}ms first_load={load_ms:.0f}ms")
+        print(f"  legacy  avg={legacy_avg:>9.2f}ms  p95={legacy_p95:>9.2f}ms")
+        print(f"  index   avg={index_avg:>9.3f}ms  p95={index_p95:>9.3f}ms  x{legacy_avg / index_avg:.0f}")
+        print(f"  npy     avg={npy_avg:>9.3f}ms  p95={npy_p95:>9.3f}ms  upsert={npy_write_ms:.0f}ms first_load={npy_load_ms:.0f}ms")
+        print(f"  top-{args.top_k} giong nhau {agree}/{min(args.legacy_queries, len(queries))} query")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,11 @@ Hướng dẫn sử dụng trên Google Colab:
 2. Tạo Notebook mới.
 3. Copy toàn bộ nội dung file này dán vào 1 cell và chạy.
 4. Sau khi chạy xong, xem thư mục bên trái của Colab để tải file `cinefluent_dkt.onnx` về máy.
+
+Train lại bằng dữ liệu thật của CineFluent: trên server chạy
+    flask kt-export-interactions --output kt_interactions.csv
+rồi upload file lên Colab và trỏ DATASET_PATH vào đó (cùng tên cột user_id / tags / is_correct,
+đã sắp theo user và thứ tự trả lời).
 """
 
 import torch
@@ -27,6 +32,8 @@ MAX_SEQ_LEN = 100   # Độ dài chuỗi tối đa của một User
 BATCH_SIZE = 32
 EPOCHS = 10
 LEARNING_RATE = 0.005
+# Xuất thêm graph stateful (nhận/trả hidden state của LSTM) để Flask chỉ chạy 1 bước mỗi lần user trả lời
+EXPORT_STATEFUL = True
 
 # ==========================================
 # 2. Xây dựng Dataloader từ CSV (EdNet)
@@ -86,6 +93,7 @@ class CineFluentRealDataset(Dataset):
         return torch.tensor(tags, dtype=torch.long), torch.tensor(answers, dtype=torch.long), torch.tensor(mask, dtype=torch.bool)
 
 # Định nghĩa đường dẫn file CSV trên Colab (thường là để ở Root hoặc upload lên Session)
+# Dùng dữ liệu thật: '/content/kt_interactions.csv' (xuất bằng `flask kt-export-interactions`)
 DATASET_PATH = '/content/EdNet_10k_MVP_Part5.csv'
 
 # Bơm dữ liệu vào Tensor Loader
@@ -250,9 +258,10 @@ model.eval()
 dummy_q = torch.randint(0, NUM_TAGS, (1, MAX_SEQ_LEN), dtype=torch.long)
 dummy_a = torch.randint(0, 2, (1, MAX_SEQ_LEN), dtype=torch.long)
 
-# Bỏ dynamic_axes đi vì Pytorch 2.x mới nhất trên Colab rất hay bị xung đột Dimension Tracking.
+# Trục thời gian giữ cố định vì Pytorch 2.x mới nhất trên Colab rất hay bị xung đột Dimension Tracking.
 # Phương án an toàn & ổn định hơn: Sang Phase 3 (Flask), chúng ta chỉ việc nhét thêm "số 0" (Padding) 
 # cho đủ độ dài chuỗi 100 (MAX_SEQ_LEN) rồi cắm vào ONNX là chạy bao mượt mà, không bao giờ lỗi shape.
+# Chỉ trục batch là động: Flask gom request của nhiều user thành một tensor (B, 100) (micro-batching).
 torch.onnx.export(
     model, 
     (dummy_q, dummy_a), 
@@ -261,6 +270,56 @@ torch.onnx.export(
     opset_version=18,
     do_constant_folding=True,
     input_names=['question_seq', 'answer_seq'],
-    output_names=['predictions']
+    output_names=['predictions'],
+    dynamic_axes={
+        'question_seq': {0: 'batch'},
+        'answer_seq': {0: 'batch'},
+        'predictions': {0: 'batch'},
+    },
 )
 print("✅ Lệnh xuất hoàn tất! File đã được lưu: cinefluent_dkt.onnx")
+
+# ==========================================
+# 6. (Tùy chọn) Xuất graph stateful cho suy luận từng bước
+# ==========================================
+class CineFluentDKTStatefulExport(nn.Module):
+    """Cùng trọng số với model, nhưng nhận (h0, c0) và trả thêm (h_n, c_n) của LSTM."""
+    def __init__(self, dkt_model):
+        super(CineFluentDKTStatefulExport, self).__init__()
+        self.dkt = dkt_model
+
+    def forward(self, q, a, h0, c0):
+        x = self.dkt.interaction_embed(q + a * self.dkt.num_tags)
+        out, (h_n, c_n) = self.dkt.lstm(x, (h0, c0))
+        return self.dkt.sigmoid(self.dkt.fc(out)), h_n, c_n
+
+if EXPORT_STATEFUL:
+    print("Đang xuất graph stateful cinefluent_dkt_stateful.onnx...")
+    stateful_model = CineFluentDKTStatefulExport(model).eval()
+    zero_state = torch.zeros(1, 1, HIDDEN_DIM)
+
+    # Kiểm tra: chạy từng bước nối hidden state phải ra đúng xác suất của cả chuỗi
+    with torch.no_grad():
+        full_preds = model(dummy_q, dummy_a)
+        h, c = zero_state, zero_state
+        for step in range(MAX_SEQ_LEN):
+            step_preds, h, c = stateful_model(dummy_q[:, step:step + 1], dummy_a[:, step:step + 1], h, c)
+        assert torch.allclose(step_preds[0, -1], full_preds[0, -1], atol=1e-5), "Graph stateful lệch với mô hình gốc!"
+
+    # Trục thời gian phải động: replay cả cửa sổ 100 câu hoặc chỉ 1 câu mới đều dùng chung graph này
+    torch.onnx.export(
+        stateful_model,
+        (dummy_q, dummy_a, zero_state, zero_state),
+        "cinefluent_dkt_stateful.onnx",
+        export_params=True,
+        opset_version=18,
+        do_constant_folding=True,
+        input_names=['question_seq', 'answer_seq', 'h0', 'c0'],
+        output_names=['predictions', 'h_n', 'c_n'],
+        dynamic_axes={
+            'question_seq': {1: 'seq_len'},
+            'answer_seq': {1: 'seq_len'},
+            'predictions': {1: 'seq_len'},
+        },
+    )
+    print("✅ Đã lưu cinefluent_dkt_stateful.onnx (đặt cạnh cinefluent_dkt.onnx trong storage/ của backend)")
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_bigint(type_, compiler, **kw):
+    # SQLite chỉ tự tăng khóa chính kiểu INTEGER; MySQL vẫn dùng BIGINT như model khai báo
+    return "INTEGER"
+
+
+@pytest.fixture()
+def app():
+    """App tối thiểu trên SQLite trong RAM (StaticPool: mọi connection thấy cùng một DB), đã create_all."""
+    pytest.importorskip("flask_sqlalchemy")
+    from flask import Flask
+
+    from app.extensions import db
+    from app.models import models_model  # noqa: F401
+
+    flask_app = Flask(__name__)
+    flask_app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(flask_app)
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,86 @@
+"""
+Lease của job queue: worker đã bị recover_stale_jobs thu hồi job không được ghi đè lượt chạy mới
+(status/result) và không được nhả running_slot của worker đang giữ job.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+
+def _expire_heartbeat(job_id):
+    from app.extensions import db
+    from app.models.models_model import BackgroundJob
+
+    job = db.session.get(BackgroundJob, job_id)
+    job.heartbeat_at = datetime.utcnow() - timedelta(hours=1)
+    db.session.commit()
+
+
+def _requeue_now(job_id):
+    from app.extensions import db
+    from app.models.models_model import BackgroundJob
+
+    job = db.session.get(BackgroundJob, job_id)
+    job.run_after = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+
+@pytest.fixture()
+def job(app):
+    from app.services.jobs import YOUTUBE_IMPORT, enqueue_job
+
+    return enqueue_job(YOUTUBE_IMPORT, {"user_id": "u1"})
+
+
+def test_claim_records_worker(app, job):
+    from app.services.jobs.queue import claim_next_job, mark_job_succeeded
+
+    claimed = claim_next_job("worker-a")
+    assert claimed.id == job.id
+    assert (claimed.status, claimed.locked_by, claimed.running_slot) == ("RUNNING", "worker-a", 0)
+
+    assert mark_job_succeeded(job.id, "worker-a", {"ok": True})
+    assert (claimed.status, claimed.result, claimed.running_slot) == ("SUCCEEDED", {"ok": True}, None)
+
+
+def test_stale_worker_cannot_overwrite_new_run(app, job):
+    from app.services.jobs.queue import (
+        LEASE_LOST,
+        claim_next_job,
+        mark_job_failed,
+        mark_job_succeeded,
+        recover_stale_jobs,
+        touch_job,
+    )
+
+    claim_next_job("worker-a")
+    _expire_heartbeat(job.id)
+    assert recover_stale_jobs(lease_seconds=60) == []
+    assert job.status == "QUEUED"
+
+    _requeue_now(job.id)
+    reclaimed = claim_next_job("worker-b")
+    assert (reclaimed.id, reclaimed.locked_by) == (job.id, "worker-b")
+
+    # Worker cũ chạy xong muộn: không đè kết quả, không nhả slot của worker-b
+    assert not mark_job_succeeded(job.id, "worker-a", {"stale": True})
+    assert mark_job_failed(job.id, "worker-a", "boom", retry=True) == LEASE_LOST
+    touch_job(job.id, "worker-a", progress={"status": "stale"})
+    assert (reclaimed.status, reclaimed.locked_by, reclaimed.running_slot) == ("RUNNING", "worker-b", 0)
+    assert reclaimed.result is None
+
+    assert mark_job_succeeded(job.id, "worker-b", {"ok": True})
+    assert (reclaimed.status, reclaimed.result) == ("SUCCEEDED", {"ok": True})
+
+
+def test_recovery_skips_job_finished_by_its_worker(app, job):
+    from app.services.jobs.queue import claim_next_job, mark_job_failed, mark_job_succeeded
+
+    claim_next_job("worker-a")
+    assert mark_job_succeeded(job.id, "worker-a", {"ok": True})
+    # recover_stale_jobs đã đọc job trước khi worker-a ghi kết quả: UPDATE có điều kiện lease bỏ qua
+    assert mark_job_failed(job.id, "worker-a", "Worker worker-a không phản hồi", retry=True) == "LEASE_LOST"
+    assert job.status == "SUCCEEDED"
@@ -0,0 +1,56 @@
+"""
+Cache + hidden state của DKTInferenceSingleton với graph stateful giả: dự đoán nối tiếp phải khớp
+kết quả chạy lại cửa sổ max_seq_len tương tác gần nhất.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+
+
+class _SummingSession:
+    """Graph stateful giả: hidden state = tổng tag_id đã đọc, xác suất = hidden."""
+
+    def __init__(self):
+        self.step_counts = []
+
+    def run(self, _outputs, inputs):
+        tags = inputs["question_seq"][0]
+        self.step_counts.append(len(tags))
+        totals = inputs["h0"][0, 0, 0] + np.cumsum(tags, dtype=np.float32)
+        hidden = np.full((1, 1, 1), totals[-1], dtype=np.float32)
+        return totals.reshape(1, -1, 1), hidden, hidden
+
+
+@pytest.fixture()
+def inference():
+    from app.services.kt_inference_service import DKTInferenceSingleton
+
+    # Không gọi __new__/_initialize: tránh nạp file ONNX thật
+    instance = object.__new__(DKTInferenceSingleton)
+    instance.max_seq_len = 100
+    instance._cache = OrderedDict()
+    instance._cache_lock = threading.Lock()
+    instance.session = None
+    instance.batcher = None
+    instance.stateful_session = _SummingSession()
+    instance.hidden_dim = 1
+    return instance
+
+
+def test_stateful_matches_window_after_history_exceeds_max_seq_len(inference):
+    history = []
+    for version in range(1, 151):
+        history.append([version, 1])
+        window = history[-inference.max_seq_len:]
+        prob = inference.predict_probabilities(window, user_id="u1", version=version)
+        assert prob[0] == sum(tag_id for tag_id, _ in window)
+
+    steps = inference.stateful_session.step_counts
+    # Lịch sử còn ngắn: mỗi câu trả lời chỉ chạy một bước; đủ cửa sổ thì replay cả cửa sổ
+    assert steps[:99] == [1] * 99
+    assert steps[99:] == [inference.max_seq_len] * 51
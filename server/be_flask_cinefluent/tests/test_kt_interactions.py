@@ -0,0 +1,169 @@
+"""
+Lịch sử DKT trên kt_interactions: ring buffer 100 câu gần nhất, đọc tăng dần theo interaction_count,
+ghi một câu trả lời (chế độ sync) và migration chép latent_state JSON cũ sang bảng mới.
+"""
+
+import importlib.util
+import os
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+MIGRATION_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "migrations", "versions", "c4e8a1f7d392_add_kt_interactions_table.py"
+)
+
+
+@pytest.fixture()
+def kt(app, monkeypatch):
+    from app.services import kt_interaction_service
+
+    monkeypatch.setattr(kt_interaction_service, "_RINGS", kt_interaction_service.OrderedDict())
+    return kt_interaction_service
+
+
+def _add_interactions(user_id, answers):
+    from app.extensions import db
+    from app.models.models_model import KTInteraction
+
+    db.session.add_all(KTInteraction(user_id=user_id, tag_id=tag_id, is_correct=bool(ok)) for tag_id, ok in answers)
+    db.session.commit()
+
+
+def _count_loads(monkeypatch, kt):
+    loads = []
+    original = kt._load_ring
+
+    def spy(user_id, version):
+        loads.append(version)
+        return original(user_id, version)
+
+    monkeypatch.setattr(kt, "_load_ring", spy)
+    return loads
+
+
+def test_ring_wraps_around_oldest_first():
+    from app.services.kt_interaction_service import InteractionRing
+
+    empty = InteractionRing(capacity=3)
+    ring = empty.extended([(1, 10, 1), (2, 11, 0), (3, 12, True), (4, 13, False)], version=4)
+    assert ring.pairs() == [[11, 0], [12, 1], [13, 0]]
+    assert (ring.version, ring.last_id, len(ring)) == (4, 4, 3)
+
+    ring = ring.extended([(5, 14, 1), (6, 15, 1)], version=6)
+    assert ring.pairs() == [[13, 0], [14, 1], [15, 1]]
+    # extended() không sửa bản cũ: request khác đang đọc vẫn thấy dữ liệu cũ
+    assert empty.pairs() == [] and len(empty) == 0
+
+
+def test_recent_interactions_extend_incrementally(kt, monkeypatch):
+    loads = _count_loads(monkeypatch, kt)
+    _add_interactions("u1", [(1, 1), (2, 0)])
+    assert kt.get_recent_interactions("u1", 2) == [[1, 1], [2, 0]]
+    assert loads == [2]
+
+    # Cùng version: không truy vấn lại
+    assert kt.get_recent_interactions("u1", 2) == [[1, 1], [2, 0]]
+
+    _add_interactions("u1", [(3, 1)])
+    assert kt.get_recent_interactions("u1", 3) == [[1, 1], [2, 0], [3, 1]]
+    assert loads == [2]
+
+
+def test_recent_interactions_reload_when_count_and_rows_disagree(kt, monkeypatch):
+    loads = _count_loads(monkeypatch, kt)
+    _add_interactions("u1", [(1, 1)])
+    kt.get_recent_interactions("u1", 1)
+
+    # interaction_count tăng 2 nhưng chỉ có 1 dòng mới (dữ liệu sửa tay...): nạp lại từ DB
+    _add_interactions("u1", [(2, 0)])
+    assert kt.get_recent_interactions("u1", 3) == [[1, 1], [2, 0]]
+    assert loads == [1, 3]
+
+    # Version nhảy quá KT_HISTORY_LENGTH hoặc lùi lại cũng nạp lại
+    kt.get_recent_interactions("u1", 3 + kt.KT_HISTORY_LENGTH + 1)
+    kt.get_recent_interactions("u1", 2)
+    assert loads == [1, 3, 3 + kt.KT_HISTORY_LENGTH + 1, 2]
+
+
+def test_record_answer_sync_mode_single_commit_with_sql_increment(kt, monkeypatch):
+    from sqlalchemy import event
+
+    from app.extensions import db
+    from app.models.models_model import GrammarTag, KTInteraction, UserKnowledgeState, UserTagMastery
+
+    monkeypatch.setattr(kt._ANSWERS.settings, "mode", "sync")
+    db.session.add(GrammarTag(id=7, name_en="present_simple"))
+    db.session.add(UserKnowledgeState(user_id="u1", latent_state=[], interaction_count=5))
+    db.session.commit()
+
+    commits, statements = [], []
+
+    def on_commit(session):
+        commits.append(session)
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.session, "after_commit", on_commit)
+    event.listen(db.engine, "before_cursor_execute", on_execute)
+    try:
+        result = kt.record_kt_answer_service("u1", 7, 1)
+    finally:
+        event.remove(db.session, "after_commit", on_commit)
+        event.remove(db.engine, "before_cursor_execute", on_execute)
+
+    assert result == {"success": True, "data": {"new_mastery": 20.0, "is_correct": True}}
+    assert len(commits) == 1
+    # Tăng bằng biểu thức SQL (interaction_count = interaction_count + 1), không ghi đè giá trị đọc trước
+    assert any(
+        statement.startswith("UPDATE user_knowledge_states")
+        and "interaction_count=(user_knowledge_states.interaction_count + " in statement
+        for statement in statements
+    )
+
+    db.session.expire_all()
+    assert UserKnowledgeState.query.filter_by(user_id="u1").one().interaction_count == 6
+    assert [(row.tag_id, row.is_correct) for row in KTInteraction.query.all()] == [(7, True)]
+    assert UserTagMastery.query.filter_by(user_id="u1", tag_id=7).one().mastery_score == 20.0
+
+
+def test_migration_backfills_json_history(app):
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    from app.extensions import db
+    from app.models.models_model import GrammarTag, KTInteraction, UserKnowledgeState
+
+    updated_at = datetime(2026, 5, 1, 12, 0, 0)
+    db.session.add_all([GrammarTag(id=1, name_en="a"), GrammarTag(id=2, name_en="b")])
+    db.session.add_all(
+        [
+            # Tag không còn tồn tại và phần tử hỏng bị bỏ qua, thứ tự giữ nguyên
+            UserKnowledgeState(
+                user_id="u1",
+                latent_state=[[2, 1], [99, 1], ["x", 0], [1, 0], [2]],
+                interaction_count=5,
+                updated_at=updated_at,
+            ),
+            UserKnowledgeState(user_id="u2", latent_state=None, interaction_count=0),
+        ]
+    )
+    db.session.commit()
+    db.session.remove()
+    KTInteraction.__table__.drop(db.engine)
+
+    spec = importlib.util.spec_from_file_location("kt_interactions_migration", MIGRATION_PATH)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with db.engine.begin() as connection:
+        with Operations.context(MigrationContext.configure(connection)):
+            migration.upgrade()
+
+    rows = KTInteraction.query.order_by(KTInteraction.id).all()
+    assert [(row.user_id, row.tag_id, row.is_correct, row.created_at) for row in rows] == [
+        ("u1", 2, True, updated_at),
+        ("u1", 1, False, updated_at),
+    ]
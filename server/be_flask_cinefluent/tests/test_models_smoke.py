@@ -0,0 +1,30 @@
+"""
+Smoke test cho models: mọi relationship/back_populates phải cấu hình được và tạo được schema.
+Lỗi mapper (vd. relationship đặt nhầm class) làm hỏng MỌI truy vấn ORM của app chứ không riêng một API.
+
+    cd server/be_flask_cinefluent && python -m pytest -q tests
+"""
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+
+def test_mappers_configure():
+    from sqlalchemy.orm import configure_mappers
+
+    from app.models import models_model
+
+    configure_mappers()
+    assert "tag_masteries" in models_model.User.__mapper__.relationships
+    assert "user" in models_model.UserTagMastery.__mapper__.relationships
+    assert "grammar_tag" in models_model.UserTagMastery.__mapper__.relationships
+
+
+def test_create_all(app):
+    from sqlalchemy import inspect
+
+    from app.extensions import db
+
+    tables = set(inspect(db.engine).get_table_names())
+    assert {"user_tag_masteries", "kt_interactions", "watch_history"} <= tables
@@ -0,0 +1,88 @@
+"""
+Ghép phụ đề EN/VI (app/utils/subtitle_alignment.py) trên track sinh bởi scripts/bench_subtitle_alignment.py
+(biết trước câu EN đúng của từng câu VI).
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "scripts")))
+
+from bench_subtitle_alignment import build_en_track, build_vi_track, legacy_align  # noqa: E402
+
+from app.utils import subtitle_alignment  # noqa: E402
+from app.utils.subtitle_alignment import ALIGNMENT_STRATEGIES, align_subtitles, estimate_time_transform  # noqa: E402
+
+CUES = 3000
+
+
+def _scenario(**drift):
+    en_subs = build_en_track(CUES)
+    vi_subs, truth = build_vi_track(en_subs, **drift)
+    # File SRT thật luôn sắp theo thời gian
+    pairs = sorted(zip(vi_subs, truth), key=lambda pair: pair[0]["start_time"])
+    return en_subs, [sub for sub, _ in pairs], np.array([index for _, index in pairs])
+
+
+@pytest.fixture(scope="module")
+def synced():
+    return _scenario()
+
+
+def test_midpoint_matches_legacy_loop_on_synced_tracks(synced):
+    en_subs, vi_subs, expected = synced
+    matches = align_subtitles(en_subs, vi_subs, strategy="midpoint")
+    assert matches.tolist() == legacy_align(en_subs, vi_subs)
+    assert (matches == expected).mean() == 1.0
+
+
+@pytest.mark.parametrize("strategy", ["overlap", "auto"])
+def test_synced_tracks_stay_exact(synced, strategy):
+    en_subs, vi_subs, expected = synced
+    assert (align_subtitles(en_subs, vi_subs, strategy=strategy) == expected).mean() == 1.0
+
+
+@pytest.mark.parametrize(
+    "drift, scale, offset",
+    [
+        ({"offset": 6.5}, 1.0, 6.5),
+        ({"scale": 25 / 23.976, "offset": -3.0}, 25 / 23.976, -3.0),
+    ],
+    ids=["offset", "fps"],
+)
+@pytest.mark.parametrize("strategy", ["dtw", "auto"])
+def test_dtw_recovers_offset_and_fps_drift(strategy, drift, scale, offset):
+    en_subs, vi_subs, expected = _scenario(**drift)
+
+    transform = estimate_time_transform(en_subs, vi_subs)
+    assert transform.scale == pytest.approx(scale, rel=1e-4)
+    assert transform.offset == pytest.approx(offset, abs=subtitle_alignment.DRIFT_RESOLUTION)
+
+    matches = align_subtitles(en_subs, vi_subs, strategy=strategy)
+    assert (matches == expected).mean() >= 0.999
+    assert (matches < 0).sum() == 0
+    # Không căn thời gian thì ghép gần như sai hết: bài test thật sự đo phần ước lượng drift
+    assert (align_subtitles(en_subs, vi_subs, strategy="midpoint") == expected).mean() < 0.05
+
+
+@pytest.mark.parametrize("strategy", ALIGNMENT_STRATEGIES)
+def test_empty_inputs_return_unmatched(strategy):
+    vi_subs = [{"start_time": 1.0, "end_time": 2.0}, {"start_time": 3.0, "end_time": 4.0}]
+    assert align_subtitles([], vi_subs, strategy=strategy).tolist() == [-1, -1]
+    assert align_subtitles(vi_subs, [], strategy=strategy).tolist() == []
+
+
+def test_overlap_falls_back_to_midpoint_when_candidates_explode(monkeypatch):
+    # 40 câu EN dài chồng lên nhau: câu VI ở đầu phim giao với cả 40 nhưng tâm các câu EN ở ~50s
+    en_subs = [{"start_time": i * 0.01, "end_time": 100.0 + i * 0.01} for i in range(40)]
+    vi_subs = [{"start_time": 0.0, "end_time": 1.0}]
+
+    monkeypatch.setattr(subtitle_alignment, "OVERLAP_MAX_CANDIDATES_PER_CUE", 32)
+    assert align_subtitles(en_subs, vi_subs, strategy="overlap").tolist() == [-1]
+    assert align_subtitles(en_subs, vi_subs, strategy="midpoint").tolist() == [-1]
+
+    monkeypatch.setattr(subtitle_alignment, "OVERLAP_MAX_CANDIDATES_PER_CUE", 64)
+    assert align_subtitles(en_subs, vi_subs, strategy="overlap").tolist() == [0]
@@ -0,0 +1,150 @@
+"""
+Buffer write-behind (kt_answers, watch_history) trên SQLite: gộp sự kiện, đọc-lại trong lúc flush,
+trả lô về buffer khi lỗi, bỏ từng khóa khi IntegrityError và các biểu thức upsert cộng dồn.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+T0 = datetime(2026, 1, 1, 8, 0, 0)
+
+
+def _buffer(merge, flush, **overrides):
+    from app.services.write_behind import WriteBehindBuffer, WriteBehindSettings
+
+    settings = WriteBehindSettings(**{"max_pending": 1000, "max_lag_ms": 60000.0, **overrides})
+    buffer = WriteBehindBuffer("test", merge, flush, settings)
+    # Không chạy background task / atexit: test gọi flush() trực tiếp
+    buffer._ensure_started = lambda: None
+    return buffer
+
+
+def _progress(seconds, last_position, duration):
+    return {"watched_at": T0 + timedelta(seconds=seconds), "last_position": last_position, "duration": duration}
+
+
+def _answer(tag_id, is_correct, score, seconds):
+    from app.services.kt_interaction_service import PendingAnswers
+
+    at = T0 + timedelta(seconds=seconds)
+    return PendingAnswers(
+        interactions=[(tag_id, is_correct, at)],
+        masteries={tag_id: (score, 2.0, at)},
+        discoveries={tag_id: (1, at)},
+    )
+
+
+def test_merge_progress_keeps_positive_values():
+    from app.services.watch_history_service import _merge_progress
+
+    merged = _merge_progress(_progress(0, 120.0, 5400.0), _progress(5, 0, 0))
+    assert merged == _progress(5, 120.0, 5400.0)
+    assert _merge_progress(merged, _progress(9, 130.0, 0))["last_position"] == 130.0
+
+
+def test_merge_answers_appends_and_accumulates():
+    from app.services.kt_interaction_service import _merge_answers
+
+    merged = _merge_answers(_merge_answers(_answer(1, 1, 20.0, 0), _answer(2, 0, 0.0, 1)), _answer(1, 0, 5.0, 2))
+    assert [(tag_id, is_correct) for tag_id, is_correct, _ in merged.interactions] == [(1, 1), (2, 0), (1, 0)]
+    # Mastery là giá trị tuyệt đối: bản mới nhất thắng; số lần gặp cộng dồn, last_seen lấy mới nhất
+    assert merged.masteries[1][0] == 5.0
+    assert merged.discoveries == {1: (2, T0 + timedelta(seconds=2)), 2: (1, T0 + timedelta(seconds=1))}
+
+
+def test_pending_visible_while_flush_runs(app):
+    seen = []
+
+    def flush(batch):
+        seen.append((buffer.pending("k"), buffer.pending_items(lambda key: True)))
+        # Sự kiện đến trong lúc lô đang ghi: gộp lên trên lô đang flush
+        buffer.add("k", 2)
+        seen.append(buffer.pending("k"))
+
+    buffer = _buffer(lambda old, new: old + new, flush)
+    buffer.add("k", 1)
+    assert buffer.flush() == 1
+
+    assert seen == [(1, [("k", 1)]), 3]
+    # Lô đã commit: chỉ còn sự kiện mới
+    assert buffer.pending("k") == 2
+
+
+def test_generic_failure_restores_batch_under_newer_events(app):
+    calls = []
+
+    def flush(batch):
+        calls.append(dict(batch))
+        if len(calls) == 1:
+            buffer.add("k", ["new"])
+            raise RuntimeError("database is down")
+
+    buffer = _buffer(lambda old, new: old + new, flush)
+    buffer.add("k", ["old"])
+    assert buffer.flush() == 0
+    assert buffer.pending("k") == ["old", "new"]
+    assert buffer.metrics()["failures"] == 1
+    assert buffer.metrics()["last_error"] == "RuntimeError: database is down"
+
+    calls.clear()
+    with pytest.raises(RuntimeError):
+        buffer.flush(raise_errors=True)
+    assert buffer.pending("k") == ["old", "new", "new"]
+
+    assert buffer.flush() == 1
+    assert calls[-1] == {"k": ["old", "new", "new"]}
+    assert buffer.pending("k") is None
+
+
+def test_integrity_error_drops_only_the_bad_key(app):
+    from app.models.models_model import WatchHistory
+    from app.services.watch_history_service import _flush_progress, _merge_progress
+
+    buffer = _buffer(_merge_progress, _flush_progress)
+    buffer.add(("u1", 1), _progress(0, 10.0, 100.0))
+    buffer.add(("u2", 1), {"watched_at": None, "last_position": 5.0, "duration": 100.0})  # NOT NULL
+    buffer.add(("u3", 1), _progress(0, 30.0, 100.0))
+
+    assert buffer.flush() == 3
+    rows = {row.user_id: row.last_position for row in WatchHistory.query.all()}
+    assert rows == {"u1": 10.0, "u3": 30.0}
+    metrics = buffer.metrics()
+    assert (metrics["dropped_keys"], metrics["pending_keys"]) == (1, 0)
+    # Metrics không được chứa câu SQL / tham số (user_id)
+    assert "u2" not in metrics["last_error"] and "INSERT" not in metrics["last_error"]
+
+
+def test_watch_history_upsert_keeps_positive_columns(app):
+    from app.models.models_model import WatchHistory
+    from app.services.watch_history_service import _flush_progress, _merge_progress
+
+    buffer = _buffer(_merge_progress, _flush_progress)
+    buffer.add(("u1", 7), _progress(0, 120.0, 5400.0))
+    buffer.flush()
+    buffer.add(("u1", 7), _progress(60, 0, 0))
+    buffer.flush()
+    buffer.add(("u1", 7), _progress(90, 150.0, 0))
+    buffer.flush()
+
+    row = WatchHistory.query.filter_by(user_id="u1", video_id=7).one()
+    assert (row.last_position, row.duration, row.watched_at) == (150.0, 5400.0, T0 + timedelta(seconds=90))
+
+
+def test_kt_answers_upsert_increments_counts(app):
+    from app.models.models_model import KTInteraction, UserDiscoveredTag, UserKnowledgeState, UserTagMastery
+    from app.services.kt_interaction_service import _flush_answers, _merge_answers
+
+    buffer = _buffer(_merge_answers, _flush_answers)
+    buffer.add("u1", _answer(3, 1, 20.0, 0))
+    buffer.add("u1", _answer(3, 0, 5.0, 1))
+    buffer.flush()
+    buffer.add("u1", _answer(3, 1, 25.0, 2))
+    buffer.flush()
+
+    assert UserKnowledgeState.query.filter_by(user_id="u1").one().interaction_count == 3
+    assert UserDiscoveredTag.query.filter_by(user_id="u1", tag_id=3).one().encounter_count == 3
+    assert UserTagMastery.query.filter_by(user_id="u1", tag_id=3).one().mastery_score == 25.0
+    assert [row.is_correct for row in KTInteraction.query.order_by(KTInteraction.id).all()] == [True, False, True]